@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 import os
 import json
+import tempfile
 from pathlib import Path
 from datetime import timedelta
 from dotenv import load_dotenv
@@ -42,6 +43,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',  # Поиск файлов: tsvector и pg_trgm
     'rest_framework',
     'rest_framework_simplejwt',
     'rest_framework_simplejwt.token_blacklist',
@@ -58,6 +60,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'storage.middleware.QueryCountMiddleware',
 ]
 
 ROOT_URLCONF = 'backend.urls'
@@ -112,6 +115,38 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Хеширование выполняется в ограниченном пуле (storage/hashers.py). Пароли,
+# сохраненные в PBKDF2, проверяются и при входе пересчитываются в Argon2
+PASSWORD_HASHERS = [
+    'storage.hashers.Argon2PasswordHasher',
+    'storage.hashers.PBKDF2PasswordHasher',
+]
+# Параметры Argon2id (минимум OWASP); parallelism=1 - один хеш занимает одно ядро,
+# поэтому пропускная способность равна HASHING_WORKERS хешей одновременно.
+# Подбираются по замерам manage.py benchmark_hashing
+ARGON2_TIME_COST = int(os.getenv('ARGON2_TIME_COST', '2'))
+ARGON2_MEMORY_COST = int(os.getenv('ARGON2_MEMORY_COST', '19456'))  # КиБ
+ARGON2_PARALLELISM = int(os.getenv('ARGON2_PARALLELISM', '1'))
+# Бюджет хеширования общий для всех процессов сервера: WEB_CONCURRENCY процессов
+# по HASHING_WORKERS потоков занимают не больше половины ядер, остальные
+# остаются скачиваниям и API. HASHING_WORKERS задается на процесс
+WEB_CONCURRENCY = int(os.getenv('WEB_CONCURRENCY', '4' if os.getenv('SERVER_MODE') == 'asgi' else '1'))
+HASHING_WORKERS = (int(os.getenv('HASHING_WORKERS', '0'))
+                   or max(1, (os.cpu_count() or 1) // WEB_CONCURRENCY // 2))  # Хешей одновременно на процесс
+HASHING_QUEUE_LIMIT = int(os.getenv('HASHING_QUEUE_LIMIT', '16'))  # Сверх этого запросы получают 429
+# Заголовок Server-Timing со временем хеширования в ответах входа и регистрации
+HASHING_TIMING_HEADER = os.getenv('HASHING_TIMING_HEADER', 'True' if DEBUG else 'False') == 'True'
+
+# Ограничение частоты входа и регистрации (token bucket): (емкость ведра, токенов в секунду)
+AUTH_THROTTLE_BUCKETS = {
+    # С одного адреса: всплеск с запасом на аудиторию за одним NAT
+    'auth_ip': (int(os.getenv('AUTH_THROTTLE_IP_BURST', '60')),
+                float(os.getenv('AUTH_THROTTLE_IP_RATE', '1'))),
+    # Неудачные входы в одну учетную запись: 10 подряд, затем одна попытка в минуту
+    'auth_account': (int(os.getenv('AUTH_THROTTLE_ACCOUNT_BURST', '10')),
+                     float(os.getenv('AUTH_THROTTLE_ACCOUNT_RATE', str(1 / 60)))),
+}
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -175,6 +210,10 @@ CORS_ALLOW_HEADERS = [
     'x-csrftoken',
     'x-requested-with',
 ]
+CORS_EXPOSE_HEADERS = [
+    'x-query-count',
+    'x-query-time',
+]
 
 # REST Framework Settings
 REST_FRAMEWORK = {
@@ -182,7 +221,8 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',  # Require authentication by default
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # Пользователь берется из кэша (или из claims токена), без запроса к БД на каждый вызов
+        'storage.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.BasicAuthentication',
     ],
@@ -191,6 +231,13 @@ REST_FRAMEWORK = {
         'rest_framework.parsers.MultiPartParser',
         'rest_framework.parsers.FileUploadParser',
     ],
+    # Адрес клиента для ограничений частоты берется из X-Forwarded-For, добавленного nginx
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', '1')),
+    'DEFAULT_RENDERER_CLASSES': [
+        # orjson при наличии, иначе стандартный JSONRenderer
+        'storage.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
 
 # JWT Settings
@@ -203,8 +250,23 @@ SIMPLE_JWT = {
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
     'ALGORITHM': 'HS256',
     'UPDATE_LAST_LOGIN': True,
+    # /api/token/ и /api/token/refresh/ выпускают те же токены, что и /api/auth/
+    'TOKEN_OBTAIN_SERIALIZER': 'storage.serializers.UserTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'storage.serializers.UserTokenRefreshSerializer',
 }
 
+# Кэш пользователя для CachedJWTAuthentication
+JWT_USER_CACHE_TTL = 300  # секунд
+JWT_AUTH_VERSION_CACHE_TTL = 24 * 60 * 60
+# Stateless-режим: роль и имя берутся из claims токена, если его версия авторизации актуальна
+JWT_STATELESS_AUTH = os.getenv('JWT_STATELESS_AUTH', 'False') == 'True'
+
+# Фильтр Блума черного списка refresh-токенов (в памяти процесса)
+TOKEN_REVOCATION_FILTER_CAPACITY = 100000  # минимальная емкость; растет с числом отозванных токенов
+TOKEN_REVOCATION_FILTER_ERROR_RATE = 0.001  # доля проверок, уходящих в БД при отсутствии токена в списке
+TOKEN_REVOCATION_FILTER_REBUILD_INTERVAL = 60 * 60  # секунд; пересборка отбрасывает истекшие токены
+TOKEN_REVOCATION_ID_OVERLAP = 1000  # строк, перечитываемых при подгрузке (id фиксируются не по порядку)
+
 # MinIO Storage Settings (новый backend)
 MINIO_STORAGE_ENDPOINT =  os.getenv("MINIO_STORAGE_ENDPOINT")
 MINIO_STORAGE_ACCESS_KEY = os.getenv("MINIO_STORAGE_ACCESS_KEY")
@@ -212,17 +274,124 @@ MINIO_STORAGE_SECRET_KEY = os.getenv("MINIO_STORAGE_SECRET_KEY")
 MINIO_STORAGE_MEDIA_URL = os.getenv("MINIO_STORAGE_MEDIA_URL")
 MINIO_STORAGE_STATIC_URL = os.getenv("MINIO_STORAGE_STATIC_URL")
 MINIO_STORAGE_USE_HTTPS = False
+MINIO_STORAGE_REGION = os.getenv("MINIO_STORAGE_REGION", "us-east-1")  # Без запроса региона бакета при подписи
 MINIO_STORAGE_MEDIA_BUCKET_NAME = 'university-cloud'
 MINIO_STORAGE_AUTO_CREATE_MEDIA_BUCKET = True
 MINIO_STORAGE_STATIC_BUCKET_NAME = 'cloud-static'
 MINIO_STORAGE_AUTO_CREATE_STATIC_BUCKET = True
-MINIO_STORAGE_MEDIA_USE_PRESIGNED = False
+MINIO_STORAGE_MEDIA_USE_PRESIGNED = True  # URL файлов выдаются как краткоживущие presigned URL
+MINIO_STORAGE_AUTO_CREATE_MEDIA_POLICY = False  # Новый медиа-бакет не делаем публичным
 MINIO_STORAGE_STATIC_USE_PRESIGNED = False
 MINIO_STORAGE_MEDIA_PRESIGN_URLS = False
 
 DEFAULT_FILE_STORAGE = 'minio_storage.storage.MinioMediaStorage'
 STATICFILES_STORAGE = 'minio_storage.storage.MinioStaticStorage'
 
+# Загрузка файлов через FileViewSet.create: тело запроса передается в MinIO потоком
+FILE_UPLOAD_MAX_SIZE = 50 * 1024 * 1024  # 50MB
+FILE_UPLOAD_STREAM_TO_STORAGE = True
+
+# Пакетная загрузка (files/bulk_upload/): файлы пишутся в MinIO параллельно,
+# записи File создаются одним bulk_create
+BULK_UPLOAD_MAX_FILES = int(os.getenv('BULK_UPLOAD_MAX_FILES', '200'))
+BULK_UPLOAD_THREADS = int(os.getenv('BULK_UPLOAD_THREADS', '8'))  # Одновременных записей в MinIO на запрос
+DATA_UPLOAD_MAX_NUMBER_FILES = BULK_UPLOAD_MAX_FILES
+
+# Presigned URL для скачивания: срок действия и размер кэша подписей в процессе
+FILE_URL_TTL = timedelta(minutes=30)
+SIGNED_URL_LOCAL_CACHE_SIZE = 10000
+
+# Потоковое воспроизведение (files/{id}/stream/): проксирование из MinIO
+# или передача nginx через X-Accel-Redirect (location /internal-media/ в route.conf)
+FILE_STREAM_ACCEL_REDIRECT = os.getenv('FILE_STREAM_ACCEL_REDIRECT', 'false').lower() == 'true'
+FILE_STREAM_ACCEL_PREFIX = '/internal-media/'
+
+# ZIP-архивы файлов курса и задания (courses/{id}/archive/, assignments/{id}/archive/)
+ARCHIVE_PREFETCH_FILES = int(os.getenv('ARCHIVE_PREFETCH_FILES', '4'))  # Следующие файлы, читаемые заранее
+ARCHIVE_PREFETCH_BYTES = 4 * 1024 * 1024  # Сколько байт каждого из них читается заранее
+ARCHIVE_COMPRESS_LEVEL = 6  # DEFLATE для несжатых типов; видео, изображения и архивы пишутся без сжатия
+
+# Resumable upload sessions (multipart uploads в MinIO)
+UPLOAD_SESSION_PART_SIZE = 8 * 1024 * 1024  # Размер части, не меньше 5MB (ограничение S3)
+UPLOAD_SESSION_MAX_SIZE = 5 * 1024 * 1024 * 1024  # 5GB
+UPLOAD_SESSION_TTL = timedelta(hours=24)  # Продлевается при загрузке каждой части
+DIRECT_UPLOAD_URL_TTL = timedelta(hours=1)  # Срок действия presigned PUT URL
+
+# Превью изображений и первой страницы PDF (manage.py generate_previews)
+PREVIEW_SIZES = {'small': 160, 'medium': 640}  # Имя размера -> большая сторона в пикселях
+PREVIEW_QUALITY = 80  # Качество JPEG
+PREVIEW_MAX_SOURCE_SIZE = 50 * 1024 * 1024  # Файлы больше не обрабатываются
+# Процессов рендеринга на процесс воркеров; 0 - ядра, поделенные между процессами run_workers
+PREVIEW_WORKERS = int(os.getenv('PREVIEW_WORKERS', '0'))
+
+# Извлечение текста документов для поиска (задачи content.extract, manage.py extract_content)
+CONTENT_MAX_CHARS = 100_000  # Сохраняемый текст документа обрезается до этой длины
+CONTENT_MAX_SOURCE_SIZE = 50 * 1024 * 1024  # Файлы больше не обрабатываются
+CONTENT_SPOOL_SIZE = 8 * 1024 * 1024  # docx и PDF больше этого размера читаются через временный файл
+CONTENT_BACKFILL_RATE = float(os.getenv('CONTENT_BACKFILL_RATE', '5'))  # Файлов в секунду для manage.py extract_content
+
+# Лента сроков (assignments/deadlines/, manage.py refresh_deadlines)
+DEADLINES_DEFAULT_DAYS = 7  # Горизонт ленты по умолчанию
+DEADLINES_MAX_DAYS = 90  # Наибольший горизонт, который можно запросить параметром days
+
+# Очередь фоновых задач в БД (manage.py run_workers)
+JOB_WORKER_PROCESSES = int(os.getenv('JOB_WORKER_PROCESSES', '1'))
+JOB_WORKER_THREADS = int(os.getenv('JOB_WORKER_THREADS', '4'))
+JOB_POLL_INTERVAL = 0.5  # секунд; без задач интервал удваивается до JOB_POLL_MAX_INTERVAL
+JOB_POLL_MAX_INTERVAL = 5.0
+JOB_LEASE = timedelta(minutes=10)  # Задача, не завершенная за это время, возвращается в очередь
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_BASE_DELAY = 10  # секунд; удваивается с каждой попыткой
+JOB_RETRY_MAX_DELAY = 3600
+JOB_RETENTION = timedelta(days=7)  # Завершенные задачи хранятся для метрик
+
+# Удаление объектов MinIO: очередь ObjectDeletion, пачки multi-object delete (не больше 1000 ключей)
+OBJECT_DELETE_BATCH_SIZE = 1000
+# manage.py storage_gc не трогает объекты моложе этого срока: их запись в базу может быть еще не зафиксирована
+STORAGE_GC_GRACE = timedelta(hours=24)
+
+# Квота хранилища пользователя
+STORAGE_QUOTA_BYTES = 10 * 1024 * 1024 * 1024  # 10GB
+# Резерв загрузки без сессии старше этого срока оставлен завершившимся процессом: reconcile его снимает
+QUOTA_RESERVATION_MAX_AGE = timedelta(hours=24)
+
+# Кэш: Redis, если задан REDIS_URL, иначе файловый кэш, общий для процессов на одном хосте
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.getenv('CACHE_DIR', os.path.join(tempfile.gettempdir(), 'university_cloud_cache')),
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        },
+    }
+
+# Кэш ответов списков (курсы, задания, публичные файлы, информация о хранилище)
+RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', 'True') == 'True'
+RESPONSE_CACHE_ALIAS = 'default'
+RESPONSE_CACHE_TIMEOUT = 300  # секунд; инвалидация по сигналам, TTL лишь ограничивает хранение
+RESPONSE_CACHE_MAX_ENTRIES_PER_USER = 200
+
+# Режим сервера: 'wsgi' (runserver) или 'asgi' (gunicorn + uvicorn workers, см. entrypoint.sh)
+SERVER_MODE = os.getenv('SERVER_MODE', 'wsgi')
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', 'True' if SERVER_MODE == 'asgi' else 'False') == 'True'
+# Потоки для блокирующих вызовов из async-представлений: 'db' не больше доступных соединений с БД
+ASYNC_BRIDGE_THREADS = {
+    'db': int(os.getenv('ASYNC_BRIDGE_DB_THREADS', '16')),
+    'io': int(os.getenv('ASYNC_BRIDGE_IO_THREADS', '64')),
+}
+
+# Отладочные заголовки X-Query-Count / X-Query-Time с числом SQL-запросов на запрос
+QUERY_COUNT_HEADER = os.getenv('QUERY_COUNT_HEADER', 'True' if DEBUG else 'False') == 'True'
+QUERY_COUNT_WARNING_THRESHOLD = 50
+
 
 # Logging Settings
 LOG_DIR = os.path.join(BASE_DIR, 'logs')  # Используем локальную папку в проекте
@@ -18,10 +18,13 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from storage.views import ThrottledLoginView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('storage.urls')),
+    # Вход в browsable API с ограничениями частоты, как у /api/auth/login/
+    path('api-auth/login/', ThrottledLoginView.as_view(), name='api-auth-login'),
     path('api-auth/', include('rest_framework.urls')),
 ]
 
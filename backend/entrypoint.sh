@@ -0,0 +1,23 @@
+#!/bin/sh
+set -e
+
+python manage.py migrate
+# Бакет, созданный до перехода на presigned URL, мог остаться публичным:
+# анонимный доступ снимается, иначе срок действия ссылок ничего не защищает
+python manage.py secure_media_bucket
+
+if [ "$SERVER_MODE" = "asgi" ]; then
+    # Число процессов видит и Django: по нему делится бюджет ядер (HASHING_WORKERS)
+    export WEB_CONCURRENCY="${WEB_CONCURRENCY:-4}"
+    # Несколько процессов uvicorn под управлением gunicorn; каждый обслуживает
+    # тысячи ожидающих соединений в одном цикле событий
+    exec gunicorn backend.asgi:application \
+        --worker-class uvicorn_worker.UvicornWorker \
+        --workers "$WEB_CONCURRENCY" \
+        --bind 0.0.0.0:8000 \
+        --timeout "${GUNICORN_TIMEOUT:-120}" \
+        --graceful-timeout 30 \
+        --keep-alive 5
+fi
+
+exec python manage.py runserver 0.0.0.0:8000
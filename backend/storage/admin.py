@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import User, Course, Assignment, File
+from . import search
+from .models import User, Course, Assignment, File, Blob, UploadSession, StorageUsage, Job, ObjectDeletion, FileContent, DeadlineEntry
 
 @admin.register(User)
 class UserAdmin(admin.ModelAdmin):
@@ -22,10 +23,62 @@ class AssignmentAdmin(admin.ModelAdmin):
 @admin.register(File)
 class FileAdmin(admin.ModelAdmin):
     list_display = ['original_filename', 'file_type', 'file_size', 'uploaded_by', 'uploaded_at', 'is_public']
-    list_filter = ['file_type', 'uploaded_at', 'is_public']
+    list_filter = ['file_type', 'uploaded_at', 'is_public', 'preview_status']
     search_fields = ['original_filename', 'description']
-    readonly_fields = ['file_size', 'mime_type', 'uploaded_at']
+    readonly_fields = ['file_size', 'mime_type', 'uploaded_at', 'preview_status', 'preview_sizes']
+
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск по индексам search_vector и триграммам вместо ILIKE '%...%' по всей таблице
+        if not search_term.strip():
+            return queryset, False
+        return search.search_files(queryset, search_term), False
     
     def get_file_size_display(self, obj):
         return obj.get_file_size_display()
     get_file_size_display.short_description = 'File Size'
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ['original_filename', 'user', 'total_size', 'status', 'created_at', 'expires_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['original_filename', 'object_name']
+    readonly_fields = ['object_name', 'upload_id', 'part_size', 'file']
+
+@admin.register(Blob)
+class BlobAdmin(admin.ModelAdmin):
+    list_display = ['sha256', 'size', 'ref_count', 'created_at']
+    search_fields = ['sha256', 'object_name']
+    readonly_fields = ['sha256', 'object_name', 'size', 'etag', 'ref_count', 'created_at']
+
+@admin.register(StorageUsage)
+class StorageUsageAdmin(admin.ModelAdmin):
+    list_display = ['user', 'used_bytes', 'reserved_bytes', 'file_count', 'updated_at']
+    search_fields = ['user__username']
+    readonly_fields = ['used_bytes', 'reserved_bytes', 'file_count', 'updated_at']
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'status', 'attempts', 'run_after', 'wait_ms', 'duration_ms', 'finished_at']
+    list_filter = ['status', 'kind']
+    search_fields = ['kind', 'last_error']
+    readonly_fields = ['attempts', 'locked_by', 'locked_until', 'last_error', 'created_at',
+                       'started_at', 'finished_at', 'wait_ms', 'duration_ms']
+
+@admin.register(ObjectDeletion)
+class ObjectDeletionAdmin(admin.ModelAdmin):
+    list_display = ['object_name', 'attempts', 'created_at']
+    search_fields = ['object_name', 'last_error']
+    readonly_fields = ['object_name', 'attempts', 'last_error', 'created_at']
+
+@admin.register(FileContent)
+class FileContentAdmin(admin.ModelAdmin):
+    list_display = ['file', 'status', 'extracted_at']
+    list_filter = ['status']
+    raw_id_fields = ['file']
+    readonly_fields = ['source_sha256', 'error', 'extracted_at']
+
+@admin.register(DeadlineEntry)
+class DeadlineEntryAdmin(admin.ModelAdmin):
+    list_display = ['user', 'assignment', 'course', 'due_date', 'submitted_files', 'refreshed_at']
+    raw_id_fields = ['user', 'assignment', 'course']
+    readonly_fields = ['refreshed_at']
@@ -0,0 +1,231 @@
+import logging
+import posixpath
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from . import bridge, objects
+from .streaming import STREAM_CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Уже сжатое содержимое пишется без сжатия (STORED): DEFLATE тратил бы CPU почти без выигрыша
+STORED_FILE_TYPES = frozenset({'video', 'image', 'archive'})
+STORED_MIME_TYPES = frozenset({
+    'application/zip',
+    'application/gzip',
+    'application/x-7z-compressed',
+    'application/vnd.rar',
+    'application/x-rar-compressed',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'application/vnd.openxmlformats-officedocument.presentationml.presentation',
+    'audio/mpeg',
+    'audio/aac',
+    'audio/flac',
+})
+
+COURSE_MATERIALS_FOLDER = 'Материалы курса'
+ERRORS_ENTRY = 'errors.txt'
+
+
+class _Sink:
+    """Поток только для записи: ZipFile пишет в него, генератор забирает накопленное"""
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def write(self, data):
+        self.buffer += data
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = bytes(self.buffer)
+        self.buffer = bytearray()
+        return data
+
+
+def compression_for(file_obj):
+    """Возвращает метод сжатия ZIP для файла по его типу"""
+    if file_obj.file_type in STORED_FILE_TYPES or (file_obj.mime_type or '') in STORED_MIME_TYPES:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def _safe_component(name):
+    # Имя не должно создавать каталоги или выходить за пределы архива
+    name = (name or '').replace('/', '_').replace('\\', '_').strip()
+    return name if name not in ('', '.', '..') else '_'
+
+
+def build_entries(files, folder):
+    """
+    Назначает файлам уникальные пути внутри архива.
+
+    Args:
+        files: Файлы в порядке записи в архив
+        folder: Функция File -> кортеж имен каталогов
+
+    Returns:
+        list: Пары (путь в архиве, File)
+    """
+    entries = []
+    used = set()
+    for file_obj in files:
+        filename = _safe_component(file_obj.original_filename or posixpath.basename(file_obj.file.name))
+        directory = '/'.join(_safe_component(part) for part in folder(file_obj))
+        stem, ext = posixpath.splitext(filename)
+        arcname = posixpath.join(directory, filename)
+        counter = 2
+        while arcname.lower() in used:
+            arcname = posixpath.join(directory, f'{stem} ({counter}){ext}')
+            counter += 1
+        used.add(arcname.lower())
+        entries.append((arcname, file_obj))
+    return entries
+
+
+def _open(object_name, head_size):
+    """
+    Открывает объект и читает его начало (для небольших файлов - целиком).
+
+    Returns:
+        tuple: (ответ MinIO для чтения остатка или None, прочитанные байты)
+    """
+    response = objects.get_object(object_name)
+    try:
+        head = response.read(head_size)
+    except Exception:
+        _close(response)
+        raise
+    if len(head) < head_size:
+        _close(response)
+        return None, head
+    return response, head
+
+
+def _close(response):
+    if response is not None:
+        response.close()
+        response.release_conn()
+
+
+def _chunks(head, response):
+    # Прочитанное заранее начало отдается кусками того же размера, что и остаток
+    view = memoryview(head)
+    for start in range(0, len(view), STREAM_CHUNK_SIZE):
+        yield view[start:start + STREAM_CHUNK_SIZE]
+    if response is not None:
+        yield from response.stream(STREAM_CHUNK_SIZE)
+
+
+def _discard(future):
+    # Уже открытые упреждающим чтением соединения возвращаются в пул
+    if future.cancel():
+        return
+    try:
+        _close(future.result()[0])
+    except Exception:
+        pass
+
+
+def stream_zip(entries, prefetch=None, prefetch_bytes=None, compresslevel=None):
+    """
+    Формирует ZIP-архив на лету, без временных файлов и без перемотки потока
+    (размеры и CRC записываются в data descriptor после каждого файла).
+
+    Пока текущий файл пишется в архив, следующие prefetch файлов открываются
+    в пуле потоков и их первые prefetch_bytes читаются заранее, поэтому задержка
+    MinIO на каждый файл скрыта, а память ограничена prefetch * prefetch_bytes.
+    Файл, который не удалось открыть, пропускается и упоминается в errors.txt.
+
+    Args:
+        entries: Пары (путь в архиве, File), см. build_entries
+        prefetch (int): Сколько следующих файлов читать заранее (ARCHIVE_PREFETCH_FILES)
+        prefetch_bytes (int): Сколько байт каждого из них читать заранее (ARCHIVE_PREFETCH_BYTES)
+        compresslevel (int): Уровень DEFLATE (ARCHIVE_COMPRESS_LEVEL)
+
+    Yields:
+        bytes: Очередной фрагмент архива
+    """
+    prefetch = prefetch or settings.ARCHIVE_PREFETCH_FILES
+    prefetch_bytes = prefetch_bytes or settings.ARCHIVE_PREFETCH_BYTES
+    compresslevel = compresslevel if compresslevel is not None else settings.ARCHIVE_COMPRESS_LEVEL
+
+    executor = ThreadPoolExecutor(max_workers=prefetch, thread_name_prefix='archive-prefetch')
+    remaining = iter(entries)
+    pending = deque()
+
+    def schedule():
+        while len(pending) < prefetch:
+            entry = next(remaining, None)
+            if entry is None:
+                return
+            pending.append((entry, executor.submit(_open, entry[1].file.name, prefetch_bytes)))
+
+    sink = _Sink()
+    archive = zipfile.ZipFile(sink, 'w', compresslevel=compresslevel)
+    errors = []
+    written = 0
+    try:
+        schedule()
+        while pending:
+            (arcname, file_obj), future = pending.popleft()
+            schedule()
+            try:
+                response, head = future.result()
+            except Exception as e:
+                logger.warning(f"Could not read file {file_obj.id} for archive: {str(e)}")
+                errors.append(f'{arcname}: {str(e)}')
+                continue
+            try:
+                info = zipfile.ZipInfo(arcname, timezone.localtime(file_obj.uploaded_at).timetuple()[:6])
+                info.compress_type = compression_for(file_obj)
+                # Заявленный размер нужен заранее: по нему выбирается формат ZIP64 для файлов больше 4GB
+                info.file_size = file_obj.file_size or 0
+                chunks = _chunks(head, response)
+                with archive.open(info, 'w') as target:
+                    for chunk in chunks:
+                        target.write(chunk)
+                        if len(sink.buffer) >= STREAM_CHUNK_SIZE:
+                            yield sink.drain()
+                written += 1
+            finally:
+                _close(response)
+            if sink.buffer:
+                yield sink.drain()
+        if errors:
+            archive.writestr(ERRORS_ENTRY, '\n'.join(errors) + '\n')
+        archive.close()
+        yield sink.drain()
+        logger.info(f"Archive streamed: {written} files, {len(errors)} skipped")
+    finally:
+        for _, future in pending:
+            _discard(future)
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def archive_response(filename, entries):
+    """
+    Возвращает потоковый ответ с ZIP-архивом файлов.
+    Длина архива заранее неизвестна, поэтому ответ передается chunked.
+
+    Args:
+        filename (str): Имя архива для Content-Disposition
+        entries: Пары (путь в архиве, File), см. build_entries
+    """
+    chunks = stream_zip(entries)
+    if settings.SERVER_MODE == 'asgi':
+        chunks = bridge.aiter_chunks(chunks)
+    response = StreamingHttpResponse(chunks, content_type='application/zip')
+    response['Content-Disposition'] = f"attachment; filename*=UTF-8''{quote(_safe_component(filename))}"
+    response['Cache-Control'] = 'private, no-store'
+    # nginx не должен буферизовать архив: клиент получает данные по мере формирования
+    response['X-Accel-Buffering'] = 'no'
+    return response
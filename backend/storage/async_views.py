@@ -0,0 +1,171 @@
+import logging
+from django.conf import settings
+from django.http import HttpResponseNotModified, JsonResponse
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from .filters import FileFilterSet, SharedFileFilterSet
+from .models import File
+from .pagination import FileCursorPagination
+from .renderers import json_response
+from .serializers import FileSerializer, requested_fields
+from . import bridge, caching, quota, signing
+
+# Асинхронные версии I/O-нагруженных эндпоинтов для режима ASGI (ASYNC_VIEWS).
+# Блокирующие вызовы (ORM, MinIO, кэш) выполняются в ограниченных пулах bridge,
+# поэтому ожидающие запросы держат только корутины, а не потоки или процессы.
+
+logger = logging.getLogger('storage')
+
+
+def _error_response(exc):
+    # Формат тела как у обработчика исключений DRF
+    data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+    return JsonResponse(data, status=exc.status_code, safe=False)
+
+
+async def authenticate(request):
+    """
+    Аутентифицирует запрос классами DEFAULT_AUTHENTICATION_CLASSES, как DRF для
+    синхронных представлений (JWT, сессия, Basic): браузерные и сессионные клиенты
+    получают те же ответы, что и от синхронных версий этих эндпоинтов.
+
+    Returns:
+        tuple: (пользователь, None) или (None, JsonResponse с ошибкой 401)
+    """
+    drf_request = Request(request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+    try:
+        # Сессия, кэш и проверка пароля - блокирующие вызовы
+        user = await bridge.run('db', lambda: drf_request.user)
+    except APIException as e:
+        return None, _unauthorized(drf_request, _error_response(e))
+    if not user or not user.is_authenticated:
+        return None, _unauthorized(drf_request, JsonResponse(
+            {'detail': 'Authentication credentials were not provided.'}, status=401))
+    request.user = user
+    return user, None
+
+
+def _unauthorized(drf_request, response):
+    # Заголовок WWW-Authenticate первого класса аутентификации, как в APIView
+    if response.status_code == 401 and drf_request.authenticators:
+        header = drf_request.authenticators[0].authenticate_header(drf_request)
+        if header:
+            response['WWW-Authenticate'] = header
+    return response
+
+
+def _paginate(request, queryset, filterset_class):
+    queryset = queryset.for_listing(requested_fields(request, FileSerializer))
+    queryset = filterset_class(request.GET).filter_queryset(queryset)
+    paginator = FileCursorPagination()
+    page = paginator.paginate_queryset(queryset, Request(request))
+    return paginator, page
+
+
+def _serialize_files(request, page):
+    # Сериализация подписывает URL пакетом (signing.sign_many) - обращение к кэшу.
+    # Запрос в контексте нужен для ?fields=/?omit=
+    return FileSerializer(page, many=True, context={'request': request}).data
+
+
+async def _file_listing(request, queryset, filterset_class):
+    try:
+        paginator, page = await bridge.run('db', _paginate, request, queryset, filterset_class)
+    except APIException as e:
+        return None, _error_response(e)
+    data = await bridge.run('io', _serialize_files, request, page)
+    return paginator.get_paginated_data(data), None
+
+
+async def _cached(request, scopes, build, extra_key=''):
+    """Асинхронный аналог caching.cached_response: build - корутина, возвращающая (data, error)"""
+    if not settings.RESPONSE_CACHE_ENABLED:
+        data, error = await build()
+        return error or json_response(data)
+
+    key, etag = await bridge.run('io', caching.lookup, request, scopes, extra_key)
+    if caching.not_modified(request, etag):
+        return caching.set_validators(HttpResponseNotModified(), etag)
+
+    cached = await bridge.run('io', caching.fetch, key)
+    if cached is not None:
+        response = json_response(cached)
+        response['X-Cache'] = 'HIT'
+        return caching.set_validators(response, etag)
+
+    data, error = await build()
+    if error:
+        return error
+    await bridge.run('io', caching.store, request, key, data)
+    response = json_response(data)
+    response['X-Cache'] = 'MISS'
+    return caching.set_validators(response, etag)
+
+
+@require_GET
+async def my_files(request):
+    """Get files uploaded by the current user"""
+    user, error = await authenticate(request)
+    if error:
+        return error
+    logger.info(f"User {user.username} accessed their files list")
+    window_start, _ = signing.current_window()
+    return await _cached(
+        request, [caching.user_scope(user.pk)],
+        lambda: _file_listing(request, File.objects.filter(uploaded_by=user), FileFilterSet),
+        extra_key=str(window_start))
+
+
+@require_GET
+async def shared_files(request):
+    """Get public files"""
+    user, error = await authenticate(request)
+    if error:
+        return error
+    logger.info(f"User {user.username} accessed shared files list")
+    window_start, _ = signing.current_window()
+    return await _cached(
+        request, [caching.shared_scope()],
+        lambda: _file_listing(request, File.objects.filter(is_public=True), SharedFileFilterSet),
+        extra_key=str(window_start))
+
+
+@require_GET
+async def download(request, pk):
+    """Get download URL for a file"""
+    user, error = await authenticate(request)
+    if error:
+        return error
+    file_obj = await bridge.run('db', File.objects.filter(uploaded_by=user, pk=pk).first)
+    if not file_obj or not file_obj.file:
+        logger.error(f"Download attempt for non-existent file (ID: {pk}) by user: {user.username}")
+        return JsonResponse({'error': 'File not found'}, status=404)
+    url = await bridge.run('io', signing.file_url, file_obj.file.name)
+    logger.info(f"File download initiated: '{file_obj.original_filename}' (ID: {file_obj.id}) by user: {user.username}")
+    return JsonResponse({
+        'download_url': url,
+        'filename': file_obj.original_filename or file_obj.file.name,
+        'file_size': file_obj.file_size,
+        'mime_type': file_obj.mime_type,
+    })
+
+
+async def _storage_summary(user):
+    try:
+        return await bridge.run('db', quota.usage_summary, user), None
+    except Exception as e:
+        logger.error(f"Error getting storage info for user {user.username}: {str(e)}")
+        return {'used': 0, 'total': settings.STORAGE_QUOTA_BYTES, 'used_percentage': 0}, None
+
+
+@require_GET
+async def storage_info(request):
+    """Get storage information for current user"""
+    user, error = await authenticate(request)
+    if error:
+        return error
+    response = await _cached(request, [caching.user_scope(user.pk)], lambda: _storage_summary(user))
+    logger.info(f"Storage info accessed by user: {user.username}")
+    return response
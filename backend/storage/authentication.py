@@ -0,0 +1,150 @@
+import logging
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import get_md5_hash_password
+from .models import User
+from . import revocation
+
+logger = logging.getLogger(__name__)
+
+AUTH_VERSION_CLAIM = 'av'
+
+
+def _version_key(user_id):
+    return f'authver:{user_id}'
+
+
+def _user_key(user_id, version):
+    return f'authuser:{user_id}:{version}'
+
+
+def get_auth_version(user_id):
+    """
+    Возвращает текущую версию авторизации пользователя (из кэша, при промахе - из БД).
+
+    Returns:
+        int: Версия или None, если пользователя нет
+    """
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        version = User.objects.filter(pk=user_id).values_list('auth_version', flat=True).first()
+        if version is not None:
+            cache.set(_version_key(user_id), version, timeout=settings.JWT_AUTH_VERSION_CACHE_TTL)
+    return version
+
+
+def bump_auth_version(user):
+    """
+    Увеличивает версию авторизации: закэшированный пользователь становится
+    недостижимым, а токены со старыми claims перестают использоваться без БД.
+    """
+    User.objects.filter(pk=user.pk).update(auth_version=F('auth_version') + 1)
+    user.refresh_from_db(fields=['auth_version'])
+    transaction.on_commit(lambda: cache.delete(_version_key(user.pk)))
+
+
+def cache_user(user):
+    """Кладет пользователя в кэш под текущей версией (например, сразу после входа)"""
+    cache.set(_user_key(user.pk, user.auth_version), user, timeout=settings.JWT_USER_CACHE_TTL)
+    cache.set(_version_key(user.pk), user.auth_version, timeout=settings.JWT_AUTH_VERSION_CACHE_TTL)
+
+
+def user_claims(user):
+    """Claims профиля, по которым пользователь восстанавливается без обращения к БД"""
+    return {
+        'username': user.username,
+        'role': user.role,
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+        'email': user.email,
+        # Флаги прав входят в claims: любое сохранение пользователя меняет версию авторизации
+        'is_staff': user.is_staff,
+        'is_superuser': user.is_superuser,
+        AUTH_VERSION_CLAIM: user.auth_version,
+    }
+
+
+class UserRefreshToken(RefreshToken):
+    """
+    Refresh-токен с claims профиля; access-токен копирует их при выпуске.
+    Черный список проверяется через фильтр процесса (revocation.checker).
+    """
+
+    def check_blacklist(self):
+        if revocation.checker.is_revoked(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError("Token is blacklisted")
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for claim, value in user_claims(user).items():
+            token[claim] = value
+        return token
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT-аутентификация без запроса к БД на каждый вызов API.
+
+    Пользователь берется из кэша по ключу (id, версия авторизации) с коротким TTL.
+    В режиме JWT_STATELESS_AUTH пользователь собирается из claims токена, если
+    версия в токене совпадает с текущей; иначе используется кэш / БД.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken("Token contained no recognizable user identification")
+
+        version = get_auth_version(user_id)
+        if version is None:
+            raise AuthenticationFailed("User not found", code='user_not_found')
+
+        # Токены, выпущенные до появления флагов прав в claims, проверяются через кэш / БД
+        if (settings.JWT_STATELESS_AUTH and validated_token.get(AUTH_VERSION_CLAIM) == version
+                and 'is_staff' in validated_token):
+            return self.user_from_claims(user_id, validated_token)
+
+        key = _user_key(user_id, version)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(validated_token)
+            cache.set(key, user, timeout=settings.JWT_USER_CACHE_TTL)
+            return user
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed("User is inactive", code='user_inactive')
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+                api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed("The user's password has been changed.", code='password_changed')
+        return user
+
+    def user_from_claims(self, user_id, validated_token):
+        """
+        Собирает несохраненный экземпляр User из claims токена.
+        Содержит только id, логин, роль, имя, email и флаги прав: представления,
+        которым нужен полный профиль, перечитывают пользователя из БД.
+        """
+        user = User(
+            id=user_id,
+            username=validated_token.get('username', ''),
+            role=validated_token.get('role', 'student'),
+            first_name=validated_token.get('first_name', ''),
+            last_name=validated_token.get('last_name', ''),
+            email=validated_token.get('email', ''),
+            is_staff=validated_token.get('is_staff', False),
+            is_superuser=validated_token.get('is_superuser', False),
+            auth_version=validated_token.get(AUTH_VERSION_CLAIM, 0),
+            is_active=True,
+        )
+        user._state.adding = False
+        user._state.db = 'default'
+        user.is_token_backed = True
+        return user
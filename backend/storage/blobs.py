@@ -0,0 +1,128 @@
+import logging
+import re
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+from .models import Blob
+from . import deletions
+
+logger = logging.getLogger(__name__)
+
+SHA256_RE = re.compile(r'^[0-9a-f]{64}$')
+
+
+def find_reusable(user, sha256, size):
+    """
+    Ищет уже хранимое содержимое по хешу, заявленному клиентом.
+
+    Хеш от клиента не доказывает, что у него есть содержимое, поэтому
+    переиспользуются только блобы, на которые ссылаются собственные файлы
+    пользователя или публичные файлы, - иначе хеш стал бы ключом доступа
+    к чужим файлам.
+
+    Args:
+        user: Пользователь, загружающий файл
+        sha256 (str): SHA-256 содержимого в hex
+        size (int): Заявленный размер файла
+
+    Returns:
+        Blob: Подходящий блоб или None
+    """
+    if not sha256 or not SHA256_RE.match(sha256):
+        return None
+    return (Blob.objects
+            .filter(sha256=sha256, size=size, ref_count__gt=0)
+            .filter(Q(files__uploaded_by=user) | Q(files__is_public=True))
+            .distinct()
+            .first())
+
+
+def register_upload(sha256, object_name, size, etag=''):
+    """
+    Регистрирует содержимое, хеш которого вычислен сервером при приеме.
+    Если такое содержимое уже хранится, только что записанный объект ставится
+    в очередь на удаление (deletions.py), а файл ссылается на существующий блоб.
+    Вызывается в транзакции, создающей запись File.
+
+    Returns:
+        tuple: (Blob, True если содержимое уже хранилось)
+    """
+    blob, created = Blob.objects.get_or_create(
+        sha256=sha256, defaults={'object_name': object_name, 'size': size, 'etag': etag})
+    if not created and blob.object_name != object_name:
+        # Превью строятся только для объекта блоба: у только что записанной копии их нет
+        deletions.schedule([object_name])
+        logger.info(f"Upload {object_name} deduplicated against blob {blob.sha256[:12]}")
+    return blob, not created
+
+
+def register_uploads(uploads):
+    """
+    Пакетный аналог register_upload: регистрирует содержимое многих файлов
+    фиксированным числом запросов. Объекты, содержимое которых уже хранится
+    (в том числе повторяющиеся внутри пакета), ставятся в очередь на удаление.
+
+    Args:
+        uploads: Последовательность кортежей (sha256, object_name, size, etag)
+
+    Returns:
+        dict: SHA-256 -> Blob
+    """
+    first = {}
+    for sha256, object_name, size, etag in uploads:
+        first.setdefault(sha256, Blob(sha256=sha256, object_name=object_name, size=size, etag=etag))
+    if not first:
+        return {}
+    # Параллельная загрузка того же содержимого могла создать блоб раньше: конфликт пропускается
+    Blob.objects.bulk_create(first.values(), ignore_conflicts=True)
+    stored = {blob.sha256: blob for blob in Blob.objects.filter(sha256__in=first)}
+    duplicates = [object_name for sha256, object_name, _, _ in uploads if stored[sha256].object_name != object_name]
+    if duplicates:
+        deletions.schedule(duplicates)
+        logger.info(f"{len(duplicates)} uploads deduplicated against stored blobs")
+    return stored
+
+
+def acquire(blob_id):
+    """
+    Увеличивает счетчик ссылок блоба при создании файла.
+
+    Raises:
+        Blob.DoesNotExist: Если блоб был удален параллельно вместе с последней ссылкой
+    """
+    if not Blob.objects.filter(pk=blob_id).update(ref_count=F('ref_count') + 1):
+        raise Blob.DoesNotExist(f"Blob {blob_id} no longer exists")
+
+
+def acquire_many(counts):
+    """
+    Увеличивает счетчики ссылок нескольких блобов одним запросом.
+
+    Args:
+        counts (dict): ID блоба -> число новых ссылок
+
+    Raises:
+        Blob.DoesNotExist: Если какой-то блоб был удален параллельно
+    """
+    if not counts:
+        return
+    increment = Case(*[When(pk=pk, then=Value(n)) for pk, n in counts.items()], default=Value(0))
+    if Blob.objects.filter(pk__in=counts).update(ref_count=F('ref_count') + increment) != len(counts):
+        raise Blob.DoesNotExist("Some blobs no longer exist")
+
+
+def release(blob_id):
+    """
+    Уменьшает счетчик ссылок; с последней ссылкой удаляет блоб,
+    а объект в MinIO и его превью ставит в очередь на удаление.
+    """
+    with transaction.atomic():
+        blob = Blob.objects.select_for_update().filter(pk=blob_id).first()
+        if blob is None:
+            return
+        if blob.ref_count > 1:
+            Blob.objects.filter(pk=blob_id).update(ref_count=F('ref_count') - 1)
+            return
+        blob.delete()
+        deletions.schedule_objects([blob.object_name])
+        logger.info(f"Blob {blob.sha256[:12]} has no more references, removing {blob.object_name}")
+
@@ -0,0 +1,81 @@
+import asyncio
+import contextvars
+import functools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections
+from .middleware import track_queries
+
+logger = logging.getLogger(__name__)
+
+_executors = {}
+_lock = threading.Lock()
+
+
+def get_executor(pool):
+    """
+    Возвращает ограниченный пул потоков для блокирующих вызовов из async-представлений.
+
+    Пулы разделены: 'db' не больше числа соединений с БД, которые готов держать
+    процесс, 'io' - для MinIO и кэша. Медленный MinIO занимает только потоки 'io'
+    и не лишает запросы к БД потоков.
+    """
+    executor = _executors.get(pool)
+    if executor is None:
+        with _lock:
+            executor = _executors.get(pool)
+            if executor is None:
+                executor = ThreadPoolExecutor(max_workers=settings.ASYNC_BRIDGE_THREADS[pool],
+                                              thread_name_prefix=f'bridge-{pool}')
+                _executors[pool] = executor
+    return executor
+
+
+def _call_db(func, args, kwargs):
+    # Поток пула живет дольше запроса: соединения закрываются по тем же правилам
+    # CONN_MAX_AGE, что и в конце обычного запроса
+    close_old_connections()
+    try:
+        with track_queries():
+            return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+def _call(func, args, kwargs):
+    return func(*args, **kwargs)
+
+
+async def run(pool, func, *args, **kwargs):
+    """
+    Выполняет блокирующую функцию в пуле pool, не блокируя цикл событий.
+    Контекстные переменные вызывающей корутины передаются в поток.
+
+    Args:
+        pool (str): 'db' для ORM, 'io' для MinIO и кэша
+        func: Синхронная функция
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    target = _call_db if pool == 'db' else _call
+    return await loop.run_in_executor(
+        get_executor(pool), functools.partial(context.run, target, func, args, kwargs))
+
+
+async def aiter_chunks(chunks):
+    """
+    Асинхронная обертка над синхронным генератором для режима ASGI.
+    Django собирает синхронный итератор StreamingHttpResponse в список целиком
+    перед отправкой; здесь каждый фрагмент получается в пуле 'io'.
+    """
+    sentinel = object()
+    try:
+        while True:
+            chunk = await run('io', next, chunks, sentinel)
+            if chunk is sentinel:
+                return
+            yield chunk
+    finally:
+        await run('io', chunks.close)
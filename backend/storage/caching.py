@@ -0,0 +1,286 @@
+import hashlib
+import logging
+import pickle
+import uuid
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.http import parse_etags
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+VERSION_PREFIX = 'cachever'
+ENTRY_PREFIX = 'resp'
+REGISTRY_PREFIX = 'cachereg'
+
+
+def get_cache():
+    """Возвращает бэкенд кэша ответов (алиас RESPONSE_CACHE_ALIAS)"""
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+# Области инвалидации. Ответ кэшируется под ключом, включающим текущие токены
+# версий всех областей, от которых он зависит; смена токена делает старые
+# записи недостижимыми, а удаляет их уже TTL бэкенда.
+
+def courses_scope():
+    """Каталог курсов (списки курсов всех пользователей)"""
+    return 'courses'
+
+
+def assignments_scope():
+    """Списки заданий без фильтра по курсу"""
+    return 'assignments'
+
+
+def course_scope(course_id):
+    """Данные одного курса: его задания и файлы"""
+    return f'course:{course_id}'
+
+
+def shared_scope():
+    """Список публичных файлов"""
+    return 'shared'
+
+
+def user_scope(user_id):
+    """Данные пользователя: его файлы, использование хранилища и курсы, на которые он записан"""
+    return f'user:{user_id}'
+
+
+def users_scope():
+    """Список пользователей и их профили"""
+    return 'users'
+
+
+def _version_key(scope):
+    return f'{VERSION_PREFIX}:{scope}'
+
+
+def get_versions(scopes):
+    """
+    Возвращает токены версий областей, создавая отсутствующие.
+
+    Returns:
+        list: Токены в порядке scopes
+    """
+    cache = get_cache()
+    keys = [_version_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            token = uuid.uuid4().hex[:12]
+            # add не перезапишет токен, созданный параллельным запросом
+            if not cache.add(key, token, timeout=None):
+                token = cache.get(key, token)
+            versions[key] = token
+    return [versions[key] for key in keys]
+
+
+def bump(*scopes):
+    """
+    Инвалидирует области после фиксации текущей транзакции: до коммита
+    параллельный запрос мог бы закэшировать старые данные под новой версией.
+    """
+    scopes = [scope for scope in scopes if scope]
+    if not scopes:
+        return
+
+    def _bump():
+        try:
+            get_cache().set_many({_version_key(scope): uuid.uuid4().hex[:12] for scope in scopes}, timeout=None)
+        except Exception as e:
+            logger.warning(f"Could not invalidate cache scopes {scopes}: {str(e)}")
+
+    transaction.on_commit(_bump)
+
+
+def _registry_key(user_id):
+    return f'{REGISTRY_PREFIX}:{user_id}'
+
+
+def _register(user_id, key, size):
+    """Запоминает ключ записи и ее размер в реестре пользователя (для cache_info / clear_cache)"""
+    cache = get_cache()
+    registry_key = _registry_key(user_id)
+    registry = cache.get(registry_key) or {}
+    registry[key] = size
+    if len(registry) > settings.RESPONSE_CACHE_MAX_ENTRIES_PER_USER:
+        # Реестр упорядочен по вставке: вытесняем самые старые записи
+        for old_key in list(registry)[:len(registry) - settings.RESPONSE_CACHE_MAX_ENTRIES_PER_USER]:
+            cache.delete(old_key)
+            registry.pop(old_key)
+    cache.set(registry_key, registry, timeout=None)
+
+
+def _fingerprint(request, scopes, extra_key):
+    # Отпечаток запроса и текущих версий областей: пока ни одна область не изменилась, он тот же
+    versions = get_versions(scopes)
+    raw_key = '|'.join([request.get_host(), request.path, request.META.get('QUERY_STRING', ''),
+                        str(request.user.pk), extra_key, *scopes, *versions])
+    return hashlib.sha1(raw_key.encode('utf-8')).hexdigest()
+
+
+def response_key(request, scopes, extra_key=''):
+    """Ключ записи для запроса с учетом текущих версий областей"""
+    return f'{ENTRY_PREFIX}:{request.user.pk}:{_fingerprint(request, scopes, extra_key)}'
+
+
+def _etag(request, key):
+    # Слабый ETag: данные те же, но представление зависит от рендерера (JSON или browsable API)
+    media_type = getattr(request, 'accepted_media_type', None) or 'application/json'
+    return 'W/"%s"' % hashlib.sha1(f'{key}|{media_type}'.encode('utf-8')).hexdigest()[:32]
+
+
+def lookup(request, scopes, extra_key=''):
+    """
+    Returns:
+        tuple: (ключ записи, ETag ответа); (None, None), если кэш недоступен
+    """
+    try:
+        key = response_key(request, scopes, extra_key)
+    except Exception as e:
+        logger.warning(f"Response cache unavailable: {str(e)}")
+        return None, None
+    return key, _etag(request, key)
+
+
+def fetch(key):
+    """Возвращает закэшированные данные ответа или None"""
+    if key is None:
+        return None
+    try:
+        return get_cache().get(key)
+    except Exception as e:
+        logger.warning(f"Response cache unavailable: {str(e)}")
+        return None
+
+
+def not_modified(request, etag):
+    """Совпадает ли ETag с If-None-Match запроса (сравнение слабое, RFC 9110)"""
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header or etag is None:
+        return False
+    tags = parse_etags(header)
+    return '*' in tags or any(tag.removeprefix('W/') == etag.removeprefix('W/') for tag in tags)
+
+
+def set_validators(response, etag):
+    """
+    Добавляет ETag к ответу. no-cache: браузер хранит ответ, но перед
+    использованием переспрашивает сервер с If-None-Match; private - ответ
+    относится к пользователю и не сохраняется общими кэшами.
+    """
+    if etag is not None:
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def store(request, key, data):
+    """Сохраняет данные успешного ответа и регистрирует запись за пользователем"""
+    if key is None:
+        return
+    try:
+        size = len(pickle.dumps(data, pickle.HIGHEST_PROTOCOL))
+        get_cache().set(key, data, timeout=settings.RESPONSE_CACHE_TIMEOUT)
+        _register(request.user.pk, key, size)
+    except Exception as e:
+        logger.warning(f"Could not store response in cache: {str(e)}")
+
+
+def cached_response(request, scopes, build, extra_key=''):
+    """
+    Возвращает ответ из кэша или строит его и кэширует данные успешного ответа.
+    Ответ помечается ETag, вычисленным из версий областей; если он совпадает
+    с If-None-Match, возвращается 304 без чтения кэша, запросов к БД и сериализации.
+
+    Args:
+        request: Запрос DRF; ключ учитывает пользователя, путь и параметры запроса
+        scopes (list): Области, при изменении которых ответ устаревает
+        build (callable): Строит Response при промахе
+        extra_key (str): Дополнительная часть ключа (например, окно подписи URL)
+
+    Returns:
+        Response: 304 или ответ с заголовком X-Cache: HIT или MISS
+    """
+    if not settings.RESPONSE_CACHE_ENABLED:
+        return build()
+
+    key, etag = lookup(request, scopes, extra_key)
+    if not_modified(request, etag):
+        return set_validators(Response(status=304), etag)
+
+    cached = fetch(key)
+    if cached is not None:
+        response = Response(cached)
+        response['X-Cache'] = 'HIT'
+        return set_validators(response, etag)
+
+    response = build()
+    if response.status_code == 200:
+        store(request, key, response.data)
+        set_validators(response, etag)
+    response['X-Cache'] = 'MISS'
+    return response
+
+
+class CachedViewSetMixin:
+    """
+    Отдает list и retrieve через cached_response: ответы кэшируются и помечаются
+    ETag, повторный запрос с If-None-Match получает 304.
+    Подкласс перечисляет области, от которых зависит ответ текущего действия.
+    """
+
+    def get_cache_scopes(self):
+        """Области инвалидации ответа текущего действия"""
+        raise NotImplementedError
+
+    def get_cache_extra_key(self):
+        """Дополнительная часть ключа (например, окно подписи URL в ответе)"""
+        return ''
+
+    def list(self, request, *args, **kwargs):
+        return cached_response(request, self.get_cache_scopes(),
+                               lambda: super(CachedViewSetMixin, self).list(request, *args, **kwargs),
+                               self.get_cache_extra_key())
+
+    def retrieve(self, request, *args, **kwargs):
+        return cached_response(request, self.get_cache_scopes(),
+                               lambda: super(CachedViewSetMixin, self).retrieve(request, *args, **kwargs),
+                               self.get_cache_extra_key())
+
+
+def user_cache_info(user_id):
+    """
+    Считает записи пользователя, которые еще есть в кэше.
+
+    Returns:
+        dict: {'items_count': число записей, 'size': суммарный размер в байтах}
+    """
+    cache = get_cache()
+    registry = cache.get(_registry_key(user_id)) or {}
+    present = cache.get_many(list(registry)) if registry else {}
+    if len(present) != len(registry):
+        # Вытесненные или истекшие записи убираем из реестра
+        cache.set(_registry_key(user_id), {key: registry[key] for key in present}, timeout=None)
+    return {
+        'items_count': len(present),
+        'size': sum(registry[key] for key in present),
+    }
+
+
+def clear_user_cache(user_id):
+    """
+    Удаляет все закэшированные ответы пользователя.
+
+    Returns:
+        int: Количество удаленных записей
+    """
+    cache = get_cache()
+    registry = cache.get(_registry_key(user_id)) or {}
+    if registry:
+        cache.delete_many(list(registry))
+    cache.delete(_registry_key(user_id))
+    return len(registry)
@@ -0,0 +1,174 @@
+import logging
+import tempfile
+import time
+import zipfile
+from xml.etree.ElementTree import ParseError
+from django.conf import settings
+from .models import File, FileContent, Job
+from . import extraction, jobs, objects
+from .streaming import STREAM_CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+EXTRACT_JOB = 'content.extract'
+# Задачи дозаполнения уступают очередь обработке новых загрузок
+BACKFILL_PRIORITY = 10
+
+# Ошибки разбора поврежденного документа: повтор задачи не поможет
+DOCUMENT_ERRORS = (zipfile.BadZipFile, KeyError, ParseError, UnicodeDecodeError, ValueError)
+if extraction.pypdfium2 is not None:
+    DOCUMENT_ERRORS += (extraction.pypdfium2.PdfiumError,)
+
+
+def is_extractable(file_obj):
+    """Возвращает True, если из файла извлекается текст для поиска"""
+    return (file_obj.file_type == 'document'
+            and extraction.extractor_for(file_obj.original_filename, file_obj.mime_type) is not None)
+
+
+def _object_chunks(response):
+    try:
+        yield from response.stream(STREAM_CHUNK_SIZE)
+    finally:
+        response.close()
+        response.release_conn()
+
+
+def _read_text(file_obj, kind):
+    max_chars = settings.CONTENT_MAX_CHARS
+    chunks = _object_chunks(objects.get_object(file_obj.file.name))
+    try:
+        if extraction.needs_whole_file(kind):
+            # ZIP и PDF требуют произвольного доступа: объект копируется в память,
+            # а большие файлы - во временный файл на диске
+            with tempfile.SpooledTemporaryFile(max_size=settings.CONTENT_SPOOL_SIZE) as spool:
+                for chunk in chunks:
+                    spool.write(chunk)
+                spool.seek(0)
+                if kind == 'docx':
+                    return extraction.extract_docx(spool, max_chars)
+                return extraction.extract_pdf(spool, max_chars)
+        if kind == 'rtf':
+            return extraction.extract_rtf(chunks, max_chars, settings.CONTENT_MAX_SOURCE_SIZE)
+        return extraction.extract_plain_text(chunks, max_chars)
+    finally:
+        # Текстовый файл читается не до конца: соединение возвращается в пул сразу
+        chunks.close()
+
+
+def _save(file_obj, status, text='', error=''):
+    if not File.objects.filter(pk=file_obj.pk, sha256=file_obj.sha256).exists():
+        # Файл удален или заменен во время извлечения: результат устарел
+        return None
+    content, _ = FileContent.objects.update_or_create(
+        file_id=file_obj.pk,
+        defaults={'status': status, 'text': text, 'source_sha256': file_obj.sha256, 'error': error},
+    )
+    return content
+
+
+def extract(file_id):
+    """
+    Извлекает текст документа и сохраняет его для поиска.
+    Файл пропускается, если текст уже извлечен из того же содержимого (sha256),
+    поэтому повтор задачи после сбоя или повторная постановка в очередь безопасны.
+    Для содержимого, общего с другим файлом (дедупликация), текст копируется без чтения MinIO.
+    Ошибка чтения объекта пробрасывается (задача повторится), ошибка разбора
+    документа сохраняется со статусом 'failed'.
+
+    Returns:
+        FileContent: Результат или None, если файл удален, не документ, еще не обработан или уже извлечен
+    """
+    file_obj = File.objects.filter(pk=file_id, file_type='document').exclude(sha256='').first()
+    if file_obj is None or not file_obj.file:
+        return None
+    if FileContent.objects.filter(file_id=file_id, source_sha256=file_obj.sha256).exists():
+        return None
+
+    kind = extraction.extractor_for(file_obj.original_filename, file_obj.mime_type)
+    if kind is None:
+        return _save(file_obj, 'skipped', error='unsupported format')
+    if file_obj.file_size > settings.CONTENT_MAX_SOURCE_SIZE:
+        return _save(file_obj, 'skipped', error=f'file larger than {settings.CONTENT_MAX_SOURCE_SIZE} bytes')
+
+    shared = (FileContent.objects.filter(source_sha256=file_obj.sha256, status__in=['done', 'failed'])
+              .exclude(file_id=file_id).values('status', 'text', 'error').first())
+    if shared is not None:
+        return _save(file_obj, **shared)
+
+    started = time.monotonic()
+    try:
+        text = _read_text(file_obj, kind)
+    except DOCUMENT_ERRORS as e:
+        logger.warning(f"Could not extract text from file {file_id} ({kind}): {str(e)}")
+        return _save(file_obj, 'failed', error=str(e)[:1000])
+    content = _save(file_obj, 'done', text=text)
+    logger.info(f"Text extracted from file {file_id} ({kind}): {len(text)} chars "
+                f"in {(time.monotonic() - started) * 1000:.0f} ms")
+    return content
+
+
+def pending_files(after_id=0, batch_size=500):
+    """
+    Документы с id больше after_id, текст которых не извлечен или извлечен из
+    другого содержимого (файл заменен). Файлы без хеша еще обрабатываются
+    задачей files.process, которая сама извлечет текст.
+
+    Returns:
+        tuple: (последний просмотренный id или None, если файлов больше нет;
+        пары (id, извлекается ли текст) для файлов без актуального текста)
+    """
+    rows = list(File.objects.filter(id__gt=after_id, file_type='document').exclude(sha256='')
+                .order_by('id').values_list('id', 'sha256', 'original_filename', 'mime_type')[:batch_size])
+    if not rows:
+        return None, []
+    extracted = dict(FileContent.objects.filter(file_id__in=[row[0] for row in rows])
+                     .values_list('file_id', 'source_sha256'))
+    return rows[-1][0], [(file_id, extraction.extractor_for(filename, mime_type) is not None)
+            for file_id, sha256, filename, mime_type in rows if extracted.get(file_id) != sha256]
+
+
+def backfill(rate=None, batch_size=500, after_id=0, progress=None):
+    """
+    Ставит в очередь извлечение текста для уже загруженных документов (manage.py extract_content).
+    Задачи ставятся не быстрее rate в секунду, поэтому воркеры читают из MinIO
+    с той же скоростью, не мешая загрузкам. Файлы, для которых задача уже
+    в очереди, пропускаются; прерванный запуск продолжается с after_id.
+
+    Args:
+        rate (float): Файлов в секунду (по умолчанию CONTENT_BACKFILL_RATE)
+        batch_size (int): Файлов за один запрос к базе
+        after_id (int): Продолжить после этого id
+        progress: Функция (последний id, поставлено задач), вызываемая после каждой пачки
+
+    Returns:
+        int: Количество поставленных задач
+    """
+    rate = rate or settings.CONTENT_BACKFILL_RATE
+    queued = 0
+    started = time.monotonic()
+    while True:
+        last_id, batch = pending_files(after_id, batch_size)
+        if last_id is None:
+            break
+        after_id = last_id
+        ids = [file_id for file_id, supported in batch if supported]
+        waiting = set(Job.objects.filter(kind=EXTRACT_JOB, status__in=['queued', 'running'],
+                                         payload__file_id__in=ids).values_list('payload__file_id', flat=True))
+        ids = [file_id for file_id in ids if file_id not in waiting]
+        # Неподдерживаемые форматы помечаются сразу, без чтения объектов
+        for file_id, supported in batch:
+            if not supported:
+                extract(file_id)
+        step = max(1, int(rate))
+        for start in range(0, len(ids), step):
+            chunk = ids[start:start + step]
+            jobs.enqueue_many(EXTRACT_JOB, [{'file_id': file_id} for file_id in chunk], priority=BACKFILL_PRIORITY)
+            queued += len(chunk)
+            # Равномерный темп: следующая пачка не раньше, чем позволяет rate
+            delay = started + queued / rate - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        if progress:
+            progress(after_id, queued)
+    return queued
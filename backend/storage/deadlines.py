@@ -0,0 +1,183 @@
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import Count, Max
+from django.utils import timezone
+from .models import Assignment, Course, DeadlineEntry, File
+from . import jobs
+
+logger = logging.getLogger(__name__)
+
+# Материализованные ленты сроков (DeadlineEntry). Состав ленты меняется редко
+# (задания, состав курсов), а читается при каждом открытии панели студента,
+# поэтому строки пересчитываются при записи, а чтение - один диапазон индекса.
+# Рассылка по всем участникам курса выполняется воркером; изменения одного
+# пользователя (запись на курс, его файлы) применяются сразу.
+
+REFRESH_ASSIGNMENT_JOB = 'deadlines.refresh_assignment'
+REFRESH_COURSE_JOB = 'deadlines.refresh_course'
+
+
+def course_members(course_id):
+    """Преподаватель и студенты курса: у них задания курса входят в ленту сроков"""
+    members = set(Course.students.through.objects.filter(course_id=course_id).values_list('user_id', flat=True))
+    teacher_id = Course.objects.filter(pk=course_id).values_list('teacher_id', flat=True).first()
+    if teacher_id is not None:
+        members.add(teacher_id)
+    return members
+
+
+def _upcoming(assignments):
+    return list(assignments.filter(due_date__gte=timezone.now()).only('id', 'course', 'due_date'))
+
+
+def _upsert(user_ids, assignments):
+    """
+    Записывает строки ленты для всех пар (пользователь, задание).
+    Состояние сдачи считается одним агрегирующим запросом по файлам этих
+    пользователей, а не запросом на строку.
+    """
+    if not user_ids or not assignments:
+        return 0
+    submitted = {
+        (row['uploaded_by'], row['assignment']): row
+        for row in File.objects.filter(uploaded_by__in=user_ids, assignment__in=[a.id for a in assignments])
+        .values('uploaded_by', 'assignment').annotate(files=Count('id'), last=Max('uploaded_at'))
+    }
+    entries = []
+    for user_id in user_ids:
+        for assignment in assignments:
+            state = submitted.get((user_id, assignment.id), {})
+            entries.append(DeadlineEntry(
+                user_id=user_id, assignment_id=assignment.id, course_id=assignment.course_id,
+                due_date=assignment.due_date, submitted_files=state.get('files', 0),
+                last_submitted_at=state.get('last')))
+    DeadlineEntry.objects.bulk_create(
+        entries, batch_size=1000, update_conflicts=True, unique_fields=['user', 'assignment'],
+        update_fields=['course', 'due_date', 'submitted_files', 'last_submitted_at', 'refreshed_at'])
+    return len(entries)
+
+
+def refresh_assignment(assignment_id):
+    """
+    Приводит строки одного задания в лентах участников его курса к текущему
+    состоянию: срок, курс (задание могли перенести) и сдачу каждого участника.
+    Прошедшее или удаленное задание убирается из лент.
+    """
+    entries = DeadlineEntry.objects.filter(assignment_id=assignment_id)
+    assignment = Assignment.objects.filter(pk=assignment_id).only('id', 'course', 'due_date').first()
+    if assignment is None or assignment.due_date < timezone.now():
+        entries.delete()
+        return 0
+    members = course_members(assignment.course_id)
+    entries.exclude(user_id__in=members).delete()
+    return _upsert(members, [assignment])
+
+
+def refresh_course(course_id):
+    """Перестраивает строки всех предстоящих заданий курса (смена преподавателя, дозаполнение)"""
+    members = course_members(course_id)
+    DeadlineEntry.objects.filter(course_id=course_id).exclude(user_id__in=members).delete()
+    return _upsert(members, _upcoming(Assignment.objects.filter(course_id=course_id)))
+
+
+def add_members(course_id, user_ids):
+    """Добавляет предстоящие задания курса в ленты новых участников"""
+    return _upsert(set(user_ids), _upcoming(Assignment.objects.filter(course_id=course_id)))
+
+
+def remove_members(course_id, user_ids):
+    """Убирает задания курса из лент пользователей, покинувших курс (кроме преподавателя)"""
+    teacher_id = Course.objects.filter(pk=course_id).values_list('teacher_id', flat=True).first()
+    DeadlineEntry.objects.filter(course_id=course_id, user_id__in=set(user_ids) - {teacher_id}).delete()
+
+
+def refresh_submissions(user_id):
+    """
+    Пересчитывает состояние сдачи во всей ленте пользователя после изменения его файлов:
+    файл мог быть добавлен, удален или перенесен в другое задание.
+    Один агрегирующий запрос по файлам и одно пакетное обновление изменившихся строк.
+    """
+    entries = list(DeadlineEntry.objects.filter(user_id=user_id, due_date__gte=timezone.now())
+                   .only('id', 'assignment', 'submitted_files', 'last_submitted_at'))
+    if not entries:
+        return 0
+    submitted = {
+        row['assignment']: row
+        for row in File.objects.filter(uploaded_by_id=user_id, assignment__in=[e.assignment_id for e in entries])
+        .values('assignment').annotate(files=Count('id'), last=Max('uploaded_at'))
+    }
+    changed = []
+    for entry in entries:
+        state = submitted.get(entry.assignment_id, {})
+        files, last = state.get('files', 0), state.get('last')
+        if (entry.submitted_files, entry.last_submitted_at) != (files, last):
+            entry.submitted_files, entry.last_submitted_at = files, last
+            changed.append(entry)
+    DeadlineEntry.objects.bulk_update(changed, ['submitted_files', 'last_submitted_at'], batch_size=500)
+    return len(changed)
+
+
+def schedule_assignment(assignment_id):
+    """Ставит пересчет строк задания в очередь (вызывается при сохранении задания)"""
+    jobs.enqueue(REFRESH_ASSIGNMENT_JOB, assignment_id=assignment_id)
+
+
+def schedule_course(course_id):
+    """Ставит перестройку строк курса в очередь (вызывается при сохранении курса)"""
+    jobs.enqueue(REFRESH_COURSE_JOB, course_id=course_id)
+
+
+def prune(now=None):
+    """
+    Удаляет строки заданий, срок которых прошел: лента их не показывает.
+
+    Returns:
+        int: Количество удаленных строк
+    """
+    now = now or timezone.now()
+    past = Assignment.objects.filter(due_date__lt=now).values('id')
+    deleted, _ = DeadlineEntry.objects.filter(assignment__in=past).delete()
+    return deleted
+
+
+def refresh_all(progress=None):
+    """
+    Перестраивает ленты всех курсов с предстоящими заданиями и удаляет прошедшие
+    строки (manage.py refresh_deadlines: заполнение после развертывания и сверка).
+
+    Returns:
+        tuple: (курсов обновлено, строк записано, строк удалено)
+    """
+    pruned = prune()
+    # Курсы с предстоящими заданиями читаются по индексу assignment_due_course_idx
+    course_ids = list(Assignment.objects.filter(due_date__gte=timezone.now())
+                      .order_by('course_id').values_list('course_id', flat=True).distinct())
+    written = 0
+    for course_id in course_ids:
+        written += refresh_course(course_id)
+        if progress:
+            progress(course_id, written)
+    logger.info(f"Deadline feeds refreshed: {len(course_ids)} courses, {written} rows written, {pruned} pruned")
+    return len(course_ids), written, pruned
+
+
+def feed(user, days=None):
+    """
+    Лента сроков пользователя: задания со сроком от текущего момента до now + days,
+    по возрастанию срока.
+
+    Args:
+        user: Пользователь
+        days (int): Горизонт в днях (по умолчанию DEADLINES_DEFAULT_DAYS)
+
+    Returns:
+        QuerySet: Строки DeadlineEntry с заданием и курсом
+    """
+    now = timezone.now()
+    days = days or settings.DEADLINES_DEFAULT_DAYS
+    return (DeadlineEntry.objects.filter(user=user, due_date__gte=now, due_date__lt=now + timedelta(days=days))
+            .select_related('assignment', 'course')
+            .only('id', 'due_date', 'submitted_files', 'last_submitted_at', 'assignment', 'course',
+                  'assignment__title', 'assignment__description', 'course__name', 'course__code')
+            .order_by('due_date', 'assignment_id'))
@@ -0,0 +1,204 @@
+import heapq
+import logging
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.db.models.functions import Collate
+from django.utils import timezone
+from .models import Blob, File, Job, ObjectDeletion, UploadSession
+from . import jobs, objects
+from .previews import PREVIEW_PREFIX, preview_key
+
+logger = logging.getLogger(__name__)
+
+PURGE_JOB = 'objects.purge'
+UPLOAD_PREFIX = 'uploads/'
+
+
+def schedule(object_names):
+    """
+    Ставит объекты в очередь на удаление.
+    Вызывается в транзакции, удаляющей последнюю ссылку на объект: при откате
+    объект остается. После фиксации ставится задача удаления, если ее нет в очереди.
+
+    Args:
+        object_names: Ключи объектов
+
+    Returns:
+        int: Количество ключей
+    """
+    names = list(dict.fromkeys(name for name in object_names if name))
+    if not names:
+        return 0
+    ObjectDeletion.objects.bulk_create([ObjectDeletion(object_name=name) for name in names], ignore_conflicts=True)
+    conn = transaction.get_connection()
+    # Каскадное удаление вызывает schedule для каждого файла: задача ставится один раз на транзакцию
+    if not any(func is _enqueue_purge for _, func, _ in conn.run_on_commit):
+        transaction.on_commit(_enqueue_purge)
+    return len(names)
+
+
+def schedule_objects(object_names):
+    """Ставит в очередь на удаление объекты вместе с их превью"""
+    return schedule(key for name in object_names
+                    for key in [name] + [preview_key(name, size) for size in settings.PREVIEW_SIZES])
+
+
+def _enqueue_purge():
+    if not Job.objects.filter(kind=PURGE_JOB, status='queued').exists():
+        jobs.enqueue(PURGE_JOB)
+
+
+def purge(batch_size=None):
+    """
+    Удаляет объекты из очереди пачками через multi-object delete.
+    Строки, которые обрабатывает другой воркер, пропускаются (SKIP LOCKED).
+    Объекты, которые не удалось удалить, остаются в очереди до следующего запуска.
+
+    Returns:
+        dict: {'removed': удалено, 'failed': не удалось удалить}
+    """
+    batch_size = batch_size or settings.OBJECT_DELETE_BATCH_SIZE
+    totals = {'removed': 0, 'failed': 0}
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            batch = list(ObjectDeletion.objects.select_for_update(skip_locked=True)
+                         .filter(id__gt=last_id).order_by('id')[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1].id
+            errors = objects.remove_objects([deletion.object_name for deletion in batch])
+            ObjectDeletion.objects.filter(id__in=[d.id for d in batch if d.object_name not in errors]).delete()
+            for deletion in batch:
+                if deletion.object_name in errors:
+                    ObjectDeletion.objects.filter(pk=deletion.pk).update(
+                        attempts=F('attempts') + 1, last_error=errors[deletion.object_name])
+        totals['removed'] += len(batch) - len(errors)
+        totals['failed'] += len(errors)
+        if errors:
+            logger.warning(f"Could not remove {len(errors)} objects, e.g. {next(iter(errors.items()))}")
+    if totals['removed'] or totals['failed']:
+        logger.info(f"Object deletion queue purged: {totals['removed']} removed, {totals['failed']} failed")
+    return totals
+
+
+def _sorted_keys(queryset, field, chunk_size):
+    # Порядок байт (COLLATE "C") совпадает с порядком ключей в листинге S3;
+    # iterator на PostgreSQL читает результат серверным курсором, не загружая его целиком
+    order = Collate(field, 'C') if connection.vendor == 'postgresql' else F(field)
+    return queryset.order_by(order).values_list(field, flat=True).iterator(chunk_size=chunk_size)
+
+
+def referenced_keys(prefix=UPLOAD_PREFIX, chunk_size=2000):
+    """
+    Ключи объектов, на которые ссылается база: файлы, блобы и активные загрузки.
+
+    Yields:
+        str: Ключи в порядке байт UTF-8 (возможны повторы)
+    """
+    return heapq.merge(
+        _sorted_keys(File.objects.filter(file__startswith=prefix), 'file', chunk_size),
+        _sorted_keys(Blob.objects.filter(object_name__startswith=prefix), 'object_name', chunk_size),
+        _sorted_keys(UploadSession.objects.filter(status='active', object_name__startswith=prefix),
+                     'object_name', chunk_size),
+    )
+
+
+def find_orphans(prefix=UPLOAD_PREFIX, grace=None, stats=None, chunk_size=2000):
+    """
+    Находит объекты без ссылок в базе слиянием двух отсортированных потоков:
+    листинга бакета и ключей из базы. Память не зависит от числа объектов.
+    Объекты моложе grace пропускаются: их загрузка может быть еще не зафиксирована.
+
+    Args:
+        prefix (str): Префикс ключей
+        grace (timedelta): Минимальный возраст объекта (по умолчанию STORAGE_GC_GRACE)
+        stats (dict): Если задан, в него добавляются scanned/scanned_bytes
+
+    Yields:
+        minio.datatypes.Object: Объект без ссылок
+    """
+    cutoff = timezone.now() - (grace if grace is not None else settings.STORAGE_GC_GRACE)
+    stats = stats if stats is not None else {}
+    referenced = referenced_keys(prefix, chunk_size)
+    current = next(referenced, None)
+    for obj in objects.list_objects(prefix):
+        stats['scanned'] = stats.get('scanned', 0) + 1
+        stats['scanned_bytes'] = stats.get('scanned_bytes', 0) + (obj.size or 0)
+        while current is not None and current < obj.object_name:
+            current = next(referenced, None)
+        if current == obj.object_name:
+            continue
+        if obj.last_modified and obj.last_modified >= cutoff:
+            continue
+        yield obj
+
+
+def find_orphan_previews(grace=None, chunk_size=1000):
+    """
+    Находит превью, исходный объект которых больше не используется.
+    Ключ превью не сохраняет порядок исходных ключей, поэтому ссылки
+    проверяются запросом на каждую пачку из chunk_size превью.
+
+    Yields:
+        minio.datatypes.Object: Превью без исходного объекта
+    """
+    cutoff = timezone.now() - (grace if grace is not None else settings.STORAGE_GC_GRACE)
+    prefix = f'{PREVIEW_PREFIX}/'
+    chunk = []
+
+    def orphans(chunk):
+        sources = {source for source, _ in chunk}
+        used = set(File.objects.filter(file__in=sources).values_list('file', flat=True))
+        used.update(Blob.objects.filter(object_name__in=sources).values_list('object_name', flat=True))
+        return [obj for source, obj in chunk if source not in used]
+
+    for obj in objects.list_objects(prefix):
+        if obj.last_modified and obj.last_modified >= cutoff:
+            continue
+        source = obj.object_name[len(prefix):].rsplit('/', 1)[0]
+        chunk.append((source, obj))
+        if len(chunk) >= chunk_size:
+            yield from orphans(chunk)
+            chunk = []
+    if chunk:
+        yield from orphans(chunk)
+
+
+def collect_garbage(grace=None, dry_run=False, include_previews=True, batch_size=None):
+    """
+    Сверяет бакет с базой и удаляет объекты без ссылок (manage.py storage_gc).
+
+    Returns:
+        dict: scanned/scanned_bytes (объекты uploads/), orphans/orphan_bytes,
+        orphan_previews и результат purge (removed/failed)
+    """
+    batch_size = batch_size or settings.OBJECT_DELETE_BATCH_SIZE
+    stats = {'scanned': 0, 'scanned_bytes': 0, 'orphans': 0, 'orphan_bytes': 0, 'orphan_previews': 0,
+             'removed': 0, 'failed': 0}
+    batch = []
+
+    def flush():
+        if batch and not dry_run:
+            with transaction.atomic():
+                schedule(batch)
+        batch.clear()
+
+    for obj in find_orphans(grace=grace, stats=stats):
+        stats['orphans'] += 1
+        stats['orphan_bytes'] += obj.size or 0
+        logger.info(f"Orphaned object {obj.object_name} ({obj.size} bytes, modified {obj.last_modified})")
+        batch.append(obj.object_name)
+        if len(batch) >= batch_size:
+            flush()
+    if include_previews:
+        for obj in find_orphan_previews(grace=grace):
+            stats['orphan_previews'] += 1
+            batch.append(obj.object_name)
+            if len(batch) >= batch_size:
+                flush()
+    flush()
+    if not dry_run:
+        stats.update(purge(batch_size))
+    return stats
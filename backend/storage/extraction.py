@@ -0,0 +1,213 @@
+import codecs
+import os
+import re
+import zipfile
+from xml.etree import ElementTree
+
+try:
+    import pypdfium2
+except ImportError:  # Извлечение текста из PDF необязательно
+    pypdfium2 = None
+
+# Модуль не зависит от Django: функции получают содержимое объекта и возвращают текст
+
+TEXT_EXTENSIONS = frozenset({'.txt', '.md', '.csv'})
+WORD_NAMESPACE = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+# Управляющие слова RTF, чьи группы не содержат текста документа
+RTF_SKIP_DESTINATIONS = frozenset({
+    'fonttbl', 'colortbl', 'stylesheet', 'info', 'pict', 'object', 'header', 'footer',
+    'headerl', 'headerr', 'footerl', 'footerr', 'listtable', 'listoverridetable', 'themedata',
+    'colorschememapping', 'datastore', 'latentstyles', 'rsidtbl', 'generator', 'xmlnstbl',
+})
+RTF_TOKEN_RE = re.compile(r"\\([a-z]{1,32})(-?\d{1,10})? ?|\\'([0-9a-f]{2})|\\([^a-z])|([{}])|[\r\n]+|([^\\{}\r\n]+)",
+                          re.IGNORECASE)
+RTF_BREAKS = {'par': '\n', 'line': '\n', 'sect': '\n', 'page': '\n', 'tab': '\t', 'cell': '\t', 'row': '\n'}
+
+
+def extractor_for(filename, mime_type):
+    """
+    Определяет способ извлечения текста по расширению и MIME-типу.
+
+    Returns:
+        str: 'text', 'rtf', 'docx', 'pdf' или None, если формат не поддерживается
+    """
+    ext = os.path.splitext(filename or '')[1].lower()
+    if ext in TEXT_EXTENSIONS or mime_type == 'text/plain':
+        return 'text'
+    if ext == '.rtf' or mime_type in ('application/rtf', 'text/rtf'):
+        return 'rtf'
+    if ext == '.docx':
+        return 'docx'
+    if (ext == '.pdf' or mime_type == 'application/pdf') and pypdfium2 is not None:
+        return 'pdf'
+    return None
+
+
+def needs_whole_file(kind):
+    """docx (ZIP) и PDF читаются с произвольным доступом, текст и RTF - потоком"""
+    return kind in ('docx', 'pdf')
+
+
+def _clean(text, max_chars):
+    # NUL недопустим в тексте PostgreSQL; пробельные последовательности сжимаются
+    text = text.replace('\x00', ' ')
+    # RTF передает символы вне BMP парами \uN из суррогатов UTF-16: пары объединяются,
+    # одиночные суррогаты (их нельзя сохранить в UTF-8) заменяются на U+FFFD
+    text = text.encode('utf-16-le', 'surrogatepass').decode('utf-16-le', 'replace')
+    text = re.sub(r'[ \t\f\v]+', ' ', text)
+    text = re.sub(r'\s*\n\s*', '\n', text)
+    return text.strip()[:max_chars]
+
+
+def _detect_encoding(head):
+    if head.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+    try:
+        # Обрезанный на границе символа конец не считается ошибкой
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'cp1251'  # Типичная кодировка старых русских текстов
+
+
+def extract_plain_text(chunks, max_chars):
+    """
+    Декодирует текстовый файл по мере чтения и прекращает чтение, набрав max_chars символов.
+
+    Args:
+        chunks: Итератор фрагментов содержимого (bytes)
+        max_chars (int): Максимальная длина текста
+    """
+    decoder = None
+    parts = []
+    length = 0
+    for chunk in chunks:
+        if decoder is None:
+            decoder = codecs.getincrementaldecoder(_detect_encoding(chunk))(errors='replace')
+        text = decoder.decode(chunk)
+        parts.append(text)
+        length += len(text)
+        if length >= max_chars:
+            break
+    return _clean(''.join(parts), max_chars)
+
+
+def extract_rtf(chunks, max_chars, max_bytes):
+    """
+    Извлекает текст RTF: управляющие слова и служебные группы (шрифты, стили,
+    изображения) отбрасываются, \\'hh и \\uN декодируются по кодовой странице документа.
+    """
+    data = bytearray()
+    for chunk in chunks:
+        data += chunk
+        if len(data) >= max_bytes:
+            break
+    source = data.decode('latin-1')
+    codepage = 'cp1252'
+    stack = []
+    skip = False
+    uc_skip = 1
+    pending_skip = 0
+    out = []
+    length = 0
+    for match in RTF_TOKEN_RE.finditer(source):
+        word, arg, hex_code, symbol, brace, text = match.groups()
+        if brace == '{':
+            stack.append(skip)
+            continue
+        if brace == '}':
+            skip = stack.pop() if stack else False
+            continue
+        if word:
+            word = word.lower()
+            if word == 'ansicpg' and arg:
+                codepage = f'cp{arg}'
+            elif word == 'uc' and arg:
+                uc_skip = int(arg)
+            elif word in RTF_SKIP_DESTINATIONS:
+                skip = True
+            elif not skip and word == 'u' and arg:
+                code = int(arg)
+                out.append(chr(code + 65536 if code < 0 else code))
+                # За \uN следует замена для старых программ: ее пропускаем
+                pending_skip = uc_skip
+            elif not skip and word in RTF_BREAKS:
+                out.append(RTF_BREAKS[word])
+            continue
+        if symbol:
+            if symbol == '*':
+                skip = True
+            elif not skip and symbol in '\\{}':
+                out.append(symbol)
+            elif not skip and symbol == '~':
+                out.append(' ')
+            continue
+        if pending_skip:
+            if hex_code:
+                pending_skip -= 1
+                continue
+            if text:
+                dropped = min(pending_skip, len(text))
+                text = text[dropped:]
+                pending_skip -= dropped
+        if skip:
+            continue
+        if hex_code:
+            try:
+                out.append(bytes([int(hex_code, 16)]).decode(codepage))
+            except (LookupError, UnicodeDecodeError):
+                pass
+        elif text:
+            out.append(text)
+            length += len(text)
+            if length >= max_chars:
+                break
+    return _clean(''.join(out), max_chars)
+
+
+def extract_docx(fileobj, max_chars):
+    """
+    Извлекает текст из word/document.xml (без сторонних библиотек): XML читается
+    потоком из архива, абзацы разделяются переводом строки.
+    """
+    parts = []
+    length = 0
+    with zipfile.ZipFile(fileobj) as archive, archive.open('word/document.xml') as document:
+        for event, element in ElementTree.iterparse(document, events=('end',)):
+            if element.tag == f'{WORD_NAMESPACE}t' and element.text:
+                parts.append(element.text)
+                length += len(element.text)
+            elif element.tag == f'{WORD_NAMESPACE}tab':
+                parts.append('\t')
+            elif element.tag in (f'{WORD_NAMESPACE}p', f'{WORD_NAMESPACE}br'):
+                parts.append('\n')
+                element.clear()
+            if length >= max_chars:
+                break
+    return _clean(''.join(parts), max_chars)
+
+
+def extract_pdf(fileobj, max_chars):
+    """Извлекает текстовый слой PDF постранично до набора max_chars символов"""
+    pdf = pypdfium2.PdfDocument(fileobj)
+    parts = []
+    length = 0
+    try:
+        for index in range(len(pdf)):
+            page = pdf[index]
+            textpage = page.get_textpage()
+            try:
+                text = textpage.get_text_bounded()
+            finally:
+                textpage.close()
+                page.close()
+            parts.append(text)
+            length += len(text)
+            if length >= max_chars:
+                break
+    finally:
+        pdf.close()
+    return _clean('\n'.join(parts), max_chars)
@@ -0,0 +1,183 @@
+from datetime import datetime, time
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+from .models import File
+
+
+class Filter:
+    """
+    Фильтр по одному полю модели.
+
+    Args:
+        field (str): Поле модели
+        params (tuple): Параметры запроса; для точных фильтров - один параметр,
+            для диапазонов - нижняя и верхняя граница (включительно)
+    """
+    lookups = ('exact',)
+
+    def __init__(self, field, *params):
+        self.field = field
+        self.params = params or (field,)
+
+    def parse(self, value, lookup):
+        return value
+
+    def conditions(self, query_params):
+        """
+        Returns:
+            dict: Условия filter() для заданных в запросе параметров
+        """
+        conditions = {}
+        for param, lookup in zip(self.params, self.lookups):
+            value = query_params.get(param)
+            if value in (None, ''):
+                continue
+            try:
+                parsed = self.parse(value, lookup)
+            except (TypeError, ValueError):
+                parsed = None
+            if parsed is None:
+                raise ValidationError({'error': f'Invalid value for {param}: {value}'})
+            conditions[f'{self.field}__{lookup}'] = parsed
+        return conditions
+
+
+class IdFilter(Filter):
+    def parse(self, value, lookup):
+        return int(value) if value.isdigit() else None
+
+
+class ChoiceFilter(Filter):
+    def __init__(self, field, choices, *params):
+        super().__init__(field, *params)
+        self.choices = {value for value, _ in choices}
+
+    def parse(self, value, lookup):
+        return value if value in self.choices else None
+
+
+class BooleanFilter(Filter):
+    VALUES = {'true': True, '1': True, 'false': False, '0': False}
+
+    def parse(self, value, lookup):
+        return self.VALUES.get(value.lower())
+
+
+class RangeFilter(Filter):
+    lookups = ('gte', 'lte')
+
+    def parse(self, value, lookup):
+        return int(value) if value.isdigit() else None
+
+
+class DateTimeRangeFilter(Filter):
+    """Диапазон дат: принимает дату-время ISO 8601 или дату (верхняя граница - конец дня)"""
+    lookups = ('gte', 'lte')
+
+    def parse(self, value, lookup):
+        # Дата проверяется первой: parse_datetime принимает и дату, но как начало дня
+        day = parse_date(value)
+        if day is not None:
+            moment = datetime.combine(day, time.min if lookup == 'gte' else time.max)
+        else:
+            moment = parse_datetime(value)
+            if moment is None:
+                return None
+        return moment if timezone.is_aware(moment) else timezone.make_aware(moment)
+
+
+class FilterSet:
+    """
+    Набор фильтров списка с проверкой по индексам.
+
+    filters - имя фильтра -> Filter. indexes - имя индекса -> фильтры, которые
+    он обслуживает (столбцы индекса после условий видимости набора). Запрос
+    с сочетанием фильтров, которое не покрывает ни один индекс, отклоняется:
+    без индекса такой запрос читал бы все видимые пользователю строки.
+    """
+    filters = {}
+    indexes = {}
+
+    def __init__(self, query_params):
+        self.query_params = query_params
+
+    def active(self):
+        """Фильтры, параметры которых заданы в запросе"""
+        return {name for name, flt in self.filters.items()
+                if any(self.query_params.get(param) not in (None, '') for param in flt.params)}
+
+    def check_indexed(self, active):
+        if not active or any(active <= set(columns) for columns in self.indexes.values()):
+            return
+        supported = '; '.join(', '.join(columns) for columns in self.indexes.values())
+        raise ValidationError({'error': f"Unsupported filter combination: {', '.join(sorted(active))}. "
+                                        f"Supported combinations: {supported}"})
+
+    def filter_queryset(self, queryset):
+        active = self.active()
+        self.check_indexed(active)
+        conditions = {}
+        for name in active:
+            conditions.update(self.filters[name].conditions(self.query_params))
+        return queryset.filter(**conditions) if conditions else queryset
+
+
+class IndexedFilterBackend(BaseFilterBackend):
+    """Применяет view.filterset_class к queryset списков (к отдельному объекту фильтры не относятся)"""
+
+    def filter_queryset(self, request, queryset, view):
+        filterset_class = getattr(view, 'filterset_class', None)
+        if filterset_class is None or getattr(view, 'detail', False):
+            return queryset
+        return filterset_class(request.query_params).filter_queryset(queryset)
+
+
+class FileFilterSet(FilterSet):
+    """
+    Фильтры списков собственных файлов (files/, files/my_files/).
+    Столбцы индексов перечислены после uploaded_by: набор всегда ограничен владельцем.
+    """
+    filters = {
+        'file_type': ChoiceFilter('file_type', File.FILE_TYPE_CHOICES),
+        'course': IdFilter('course_id', 'course'),
+        'assignment': IdFilter('assignment_id', 'assignment'),
+        'uploaded_at': DateTimeRangeFilter('uploaded_at', 'uploaded_after', 'uploaded_before'),
+        'file_size': RangeFilter('file_size', 'size_min', 'size_max'),
+        'is_public': BooleanFilter('is_public'),
+    }
+    indexes = {
+        'file_owner_recent_idx': ('uploaded_at',),
+        'file_owner_type_idx': ('file_type', 'uploaded_at'),
+        'file_owner_public_idx': ('is_public', 'uploaded_at'),
+        'file_owner_size_idx': ('file_size',),
+        'file_course_recent_idx': ('course', 'uploaded_at'),
+        'file_assignment_recent_idx': ('assignment', 'uploaded_at'),
+    }
+
+
+class SharedFileFilterSet(FilterSet):
+    """Фильтры списка публичных файлов (files/shared_files/): индексы частичные, по is_public"""
+    filters = {name: flt for name, flt in FileFilterSet.filters.items() if name != 'is_public'}
+    indexes = {
+        'file_public_recent_idx': ('uploaded_at',),
+        'file_public_type_idx': ('file_type', 'uploaded_at'),
+        'file_course_recent_idx': ('course', 'uploaded_at'),
+        'file_assignment_recent_idx': ('assignment', 'uploaded_at'),
+    }
+
+
+class AssignmentFilterSet(FilterSet):
+    """
+    Фильтры списка заданий курсов пользователя.
+    course_id - прежнее имя параметра course, сохранено для существующих клиентов.
+    """
+    filters = {
+        'course': IdFilter('course_id', 'course'),
+        'course_id': IdFilter('course_id'),
+        'due_date': DateTimeRangeFilter('due_date', 'due_after', 'due_before'),
+    }
+    indexes = {
+        'assignment_course_due_idx': ('course', 'course_id', 'due_date'),
+    }
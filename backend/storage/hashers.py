@@ -0,0 +1,212 @@
+import contextvars
+import logging
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth import hashers
+from rest_framework.exceptions import Throttled
+
+logger = logging.getLogger(__name__)
+
+# Хеширование паролей (вход, регистрация, смена пароля) выполняется в отдельном
+# ограниченном пуле: одновременно не больше HASHING_WORKERS хешей на процесс,
+# не больше HASHING_QUEUE_LIMIT ожидают, остальные запросы сразу получают 429.
+# По умолчанию все WEB_CONCURRENCY процессов вместе хешируют не больше чем на половине ядер.
+# Волна входов перед экзаменом или перебор паролей не занимает все ядра,
+# и скачивание файлов продолжает обслуживаться.
+
+
+class HashingOverloaded(Throttled):
+    """Очередь хеширования заполнена: ответ 429 с Retry-After (обработчик исключений DRF)"""
+    default_detail = 'Too many sign-in requests are being processed.'
+    default_code = 'hashing_overloaded'
+
+
+class HashingStats:
+    """Счетчики пула хеширования процесса: время хеша (полное и CPU) и ожидание в очереди"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.rejected = 0
+        self.total_ms = 0.0
+        self.total_cpu_ms = 0.0
+        self.total_wait_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, duration_ms, cpu_ms, wait_ms):
+        with self._lock:
+            self.completed += 1
+            self.total_ms += duration_ms
+            self.total_cpu_ms += cpu_ms
+            self.total_wait_ms += wait_ms
+            self.max_ms = max(self.max_ms, duration_ms)
+
+    def reject(self):
+        with self._lock:
+            self.rejected += 1
+
+    def avg_ms(self):
+        return self.total_ms / self.completed if self.completed else None
+
+    def snapshot(self):
+        """
+        Returns:
+            dict: Число хешей и отказов, среднее время хеша, CPU и ожидания (мс),
+            хешей в секунду на ядро по среднему времени CPU
+        """
+        with self._lock:
+            count = self.completed
+            avg_cpu = self.total_cpu_ms / count if count else None
+            return {
+                'completed': count,
+                'rejected': self.rejected,
+                'avg_ms': self.total_ms / count if count else None,
+                'avg_cpu_ms': avg_cpu,
+                'avg_wait_ms': self.total_wait_ms / count if count else None,
+                'max_ms': self.max_ms,
+                'hashes_per_core_per_second': 1000 / avg_cpu if avg_cpu else None,
+            }
+
+
+# Хеши текущего запроса: [(длительность, ожидание в очереди)], см. start_request_timing
+_request_timings = contextvars.ContextVar('hashing_request_timings', default=None)
+
+
+class HashingExecutor:
+    """
+    Пул потоков для хеширования паролей с ограничением очереди.
+    argon2 и PBKDF2 освобождают GIL, поэтому хеши в пуле выполняются параллельно
+    и не блокируют остальные потоки процесса.
+
+    Args:
+        workers (int): Одновременно выполняемых хешей
+        queue_limit (int): Сколько хешей может ждать свободного потока
+    """
+
+    def __init__(self, workers, queue_limit):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.stats = HashingStats()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='hashing')
+        self._lock = threading.Lock()
+        self._pending = 0  # Выполняются и ожидают
+        self._local = threading.local()
+
+    def retry_after(self, pending):
+        """Оценка времени (с) до освобождения места в очереди по среднему времени хеша"""
+        avg_ms = self.stats.avg_ms() or 1000
+        return max(1, math.ceil(avg_ms * pending / self.workers / 1000))
+
+    def _timed(self, func, args, kwargs, queued_at):
+        started = time.perf_counter()
+        cpu_started = time.thread_time()
+        self._local.inside = True
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            self._local.inside = False
+            duration_ms = (time.perf_counter() - started) * 1000
+            cpu_ms = (time.thread_time() - cpu_started) * 1000
+            wait_ms = (started - queued_at) * 1000
+            self.stats.record(duration_ms, cpu_ms, wait_ms)
+            logger.debug(f"Password hash took {duration_ms:.1f} ms ({cpu_ms:.1f} ms CPU) "
+                         f"after {wait_ms:.1f} ms in queue")
+        return result, duration_ms, wait_ms
+
+    def run(self, func, *args, **kwargs):
+        """
+        Выполняет хеширование в пуле и ждет результата.
+
+        Raises:
+            HashingOverloaded: Если заняты все потоки и очередь заполнена
+        """
+        if getattr(self._local, 'inside', False):
+            # Вложенный вызов из потока пула (PBKDF2.verify вызывает encode): ожидание
+            # своего же пула могло бы занять все потоки
+            return func(*args, **kwargs)
+        with self._lock:
+            pending = self._pending
+            if pending >= self.workers + self.queue_limit:
+                self.stats.reject()
+                wait = self.retry_after(pending)
+                logger.warning(f"Password hashing overloaded: {pending} hashes in progress or queued, "
+                               f"request rejected (retry after {wait} s)")
+                raise HashingOverloaded(wait=wait)
+            self._pending += 1
+        try:
+            result, duration_ms, wait_ms = self._executor.submit(
+                self._timed, func, args, kwargs, time.perf_counter()).result()
+        finally:
+            with self._lock:
+                self._pending -= 1
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((duration_ms, wait_ms))
+        return result
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Пул хеширования процесса (создается при первом хешировании)"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = HashingExecutor(settings.HASHING_WORKERS, settings.HASHING_QUEUE_LIMIT)
+    return _executor
+
+
+def start_request_timing():
+    """Начинает учет времени хеширования в текущем запросе (для Server-Timing и журнала)"""
+    _request_timings.set([])
+
+
+def request_timing():
+    """
+    Returns:
+        tuple: (время хеширования, ожидание в очереди) в текущем запросе, мс,
+        или None, если пароль в запросе не хешировался
+    """
+    timings = _request_timings.get()
+    if not timings:
+        return None
+    return sum(duration for duration, _ in timings), sum(wait for _, wait in timings)
+
+
+class OffloadedHasherMixin:
+    """Выполняет encode и verify хешера в пуле хеширования (см. HashingExecutor)"""
+
+    def encode(self, password, salt, *args, **kwargs):
+        return get_executor().run(super().encode, password, salt, *args, **kwargs)
+
+    def verify(self, password, encoded):
+        return get_executor().run(super().verify, password, encoded)
+
+
+class Argon2PasswordHasher(OffloadedHasherMixin, hashers.Argon2PasswordHasher):
+    """
+    Argon2id с параметрами из настроек ARGON2_*. Хеши с другими параметрами
+    пересчитываются при следующем входе (must_update), поэтому параметры можно
+    менять по замерам manage.py benchmark_hashing.
+    """
+    @property
+    def time_cost(self):
+        return settings.ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.ARGON2_PARALLELISM
+
+
+class PBKDF2PasswordHasher(OffloadedHasherMixin, hashers.PBKDF2PasswordHasher):
+    """Проверка паролей, сохраненных до перехода на Argon2 (при входе они пересчитываются в Argon2)"""
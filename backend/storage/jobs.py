@@ -0,0 +1,214 @@
+import logging
+import random
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Count, F, Max, Q
+from django.utils import timezone
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+_handlers = {}
+
+
+def handler(kind):
+    """
+    Регистрирует функцию как обработчик задач вида kind.
+    Обработчик получает payload задачи как именованные аргументы и должен быть
+    идемпотентным: после истечения аренды или ошибки задача выполняется повторно.
+    """
+    def register(func):
+        _handlers[kind] = func
+        return func
+    return register
+
+
+def enqueue(kind, priority=0, delay=None, max_attempts=None, **payload):
+    """
+    Ставит задачу в очередь.
+    Внутри транзакции задача фиксируется вместе с данными, которые она обрабатывает.
+
+    Args:
+        kind (str): Вид задачи (имя зарегистрированного обработчика)
+        priority (int): Меньшее значение выполняется раньше
+        delay (timedelta): Отложить выполнение
+        max_attempts (int): Число попыток (по умолчанию JOB_MAX_ATTEMPTS)
+        **payload: Аргументы обработчика (должны сериализоваться в JSON)
+
+    Returns:
+        Job: Созданная задача
+    """
+    job = Job.objects.create(
+        kind=kind,
+        payload=payload,
+        priority=priority,
+        run_after=timezone.now() + (delay or timedelta()),
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+    )
+    logger.debug(f"Job {job.id} ({kind}) queued")
+    return job
+
+
+def enqueue_many(kind, payloads, priority=0):
+    """
+    Ставит в очередь задачи одного вида одним INSERT (для пакетных операций).
+
+    Args:
+        kind (str): Вид задачи
+        payloads (list): Аргументы обработчика для каждой задачи
+        priority (int): Меньшее значение выполняется раньше
+
+    Returns:
+        list: Созданные задачи
+    """
+    now = timezone.now()
+    created = Job.objects.bulk_create([
+        Job(kind=kind, payload=payload, priority=priority, run_after=now, max_attempts=settings.JOB_MAX_ATTEMPTS)
+        for payload in payloads
+    ])
+    if created:
+        logger.debug(f"{len(created)} jobs ({kind}) queued")
+    return created
+
+
+def claim(worker_id, batch_size=1, kinds=None):
+    """
+    Забирает готовые к выполнению задачи и берет их в аренду на JOB_LEASE.
+    Строки, заблокированные другими воркерами, пропускаются (SKIP LOCKED).
+
+    Returns:
+        list: Задачи со статусом 'running'
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        queryset = Job.objects.select_for_update(skip_locked=True).filter(status='queued', run_after__lte=now)
+        if kinds:
+            queryset = queryset.filter(kind__in=kinds)
+        ids = list(queryset.order_by('priority', 'run_after', 'id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return []
+        Job.objects.filter(id__in=ids).update(
+            status='running',
+            locked_by=worker_id,
+            locked_until=now + settings.JOB_LEASE,
+            attempts=F('attempts') + 1,
+            started_at=now,
+        )
+    return list(Job.objects.filter(id__in=ids).order_by('priority', 'run_after', 'id'))
+
+
+def retry_delay(attempts):
+    """Экспоненциальная задержка перед повтором со случайным разбросом (чтобы повторы не совпадали)"""
+    delay = min(settings.JOB_RETRY_BASE_DELAY * 2 ** max(attempts - 1, 0), settings.JOB_RETRY_MAX_DELAY)
+    return timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+
+def execute(job):
+    """
+    Выполняет задачу и записывает результат и время выполнения.
+    При ошибке задача возвращается в очередь с задержкой, пока не исчерпаны попытки.
+
+    Returns:
+        bool: True, если задача выполнена успешно
+    """
+    func = _handlers.get(job.kind)
+    started = time.monotonic()
+    try:
+        if func is None:
+            raise LookupError(f"No handler registered for job kind '{job.kind}'")
+        func(**job.payload)
+    except Exception as e:
+        duration_ms = (time.monotonic() - started) * 1000
+        _record_failure(job, e, duration_ms)
+        return False
+
+    duration_ms = (time.monotonic() - started) * 1000
+    updates = {'status': 'done', 'finished_at': timezone.now(), 'duration_ms': duration_ms,
+               'locked_until': None, 'last_error': ''}
+    if job.attempts == 1:
+        updates['wait_ms'] = (job.started_at - job.created_at).total_seconds() * 1000
+    # Аренда могла истечь и задачу забрал другой воркер: его результат не перезаписываем
+    Job.objects.filter(pk=job.pk, status='running', locked_by=job.locked_by).update(**updates)
+    logger.info(f"Job {job.id} ({job.kind}) done in {duration_ms:.1f} ms (attempt {job.attempts})")
+    return True
+
+
+def _record_failure(job, error, duration_ms):
+    now = timezone.now()
+    updates = {'duration_ms': duration_ms, 'locked_until': None, 'last_error': f"{type(error).__name__}: {error}"}
+    if job.attempts == 1:
+        updates['wait_ms'] = (job.started_at - job.created_at).total_seconds() * 1000
+    if job.attempts < job.max_attempts:
+        delay = retry_delay(job.attempts)
+        updates.update(status='queued', run_after=now + delay)
+        logger.warning(f"Job {job.id} ({job.kind}) failed on attempt {job.attempts}, "
+                       f"retrying in {delay.total_seconds():.0f}s: {str(error)}")
+    else:
+        updates.update(status='failed', finished_at=now)
+        logger.error(f"Job {job.id} ({job.kind}) failed after {job.attempts} attempts: {str(error)}",
+                     exc_info=error)
+    Job.objects.filter(pk=job.pk, status='running', locked_by=job.locked_by).update(**updates)
+
+
+def requeue_expired(now=None):
+    """
+    Возвращает в очередь задачи, аренда которых истекла (воркер остановлен или завис).
+    Задачи с исчерпанными попытками помечаются как failed.
+
+    Returns:
+        int: Количество возвращенных задач
+    """
+    now = now or timezone.now()
+    expired = Job.objects.filter(status='running', locked_until__lt=now)
+    expired.filter(attempts__gte=F('max_attempts')).update(
+        status='failed', finished_at=now, locked_until=None, last_error='Lease expired')
+    requeued = expired.update(status='queued', run_after=now, locked_until=None)
+    if requeued:
+        logger.warning(f"Requeued {requeued} jobs with expired lease")
+    return requeued
+
+
+def prune(older_than=None, batch_size=1000):
+    """
+    Удаляет завершенные задачи старше JOB_RETENTION пачками.
+
+    Returns:
+        int: Количество удаленных задач
+    """
+    cutoff = timezone.now() - (older_than or settings.JOB_RETENTION)
+    deleted = 0
+    while True:
+        ids = list(Job.objects.filter(status__in=['done', 'failed'], finished_at__lt=cutoff)
+                   .values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += Job.objects.filter(id__in=ids).delete()[0]
+
+
+def stats(since=None):
+    """
+    Метрики задач по видам: число задач в каждом статусе и время ожидания/выполнения.
+
+    Args:
+        since (datetime): Учитывать завершенные задачи начиная с этого времени (по умолчанию за час)
+
+    Returns:
+        dict: Вид задачи -> метрики
+    """
+    since = since or timezone.now() - timedelta(hours=1)
+    rows = (Job.objects
+            .filter(Q(status__in=['queued', 'running']) | Q(finished_at__gte=since))
+            .values('kind')
+            .annotate(
+                queued=Count('id', filter=Q(status='queued')),
+                running=Count('id', filter=Q(status='running')),
+                done=Count('id', filter=Q(status='done')),
+                failed=Count('id', filter=Q(status='failed')),
+                avg_wait_ms=Avg('wait_ms', filter=Q(status='done')),
+                avg_duration_ms=Avg('duration_ms', filter=Q(status='done')),
+                max_duration_ms=Max('duration_ms', filter=Q(status='done')),
+            )
+            .order_by('kind'))
+    return {row.pop('kind'): row for row in rows}
@@ -0,0 +1,56 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Measure Argon2 password hash cost and throughput per core to tune ARGON2_* and HASHING_WORKERS'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hashes', type=int, default=20, help='Hashes per measurement')
+        parser.add_argument('--threads', type=int, default=None,
+                            help='Concurrent hashes for the throughput run (default: HASHING_WORKERS)')
+        parser.add_argument('--time-cost', type=int, default=None, help='Override ARGON2_TIME_COST')
+        parser.add_argument('--memory-cost', type=int, default=None, help='Override ARGON2_MEMORY_COST (KiB)')
+        parser.add_argument('--parallelism', type=int, default=None, help='Override ARGON2_PARALLELISM')
+        parser.add_argument('--pbkdf2', action='store_true',
+                            help='Also measure the PBKDF2 hasher used by passwords saved before Argon2')
+
+    def handle(self, *args, **options):
+        hasher = hashers.Argon2PasswordHasher()
+        # Замер без пула хеширования: параметры задаются атрибутами экземпляра
+        hasher.time_cost = options['time_cost'] or settings.ARGON2_TIME_COST
+        hasher.memory_cost = options['memory_cost'] or settings.ARGON2_MEMORY_COST
+        hasher.parallelism = options['parallelism'] or settings.ARGON2_PARALLELISM
+        threads = options['threads'] or settings.HASHING_WORKERS
+        self.stdout.write(f'Argon2id time_cost={hasher.time_cost} memory_cost={hasher.memory_cost} KiB '
+                          f'parallelism={hasher.parallelism}; {os.cpu_count()} CPUs, {threads} threads')
+        self._measure('argon2', hasher, options['hashes'], threads)
+        if options['pbkdf2']:
+            self._measure('pbkdf2_sha256', hashers.PBKDF2PasswordHasher(), options['hashes'], threads)
+
+    def _measure(self, name, hasher, count, threads):
+        salt = hasher.salt()
+        hasher.encode('benchmark-password', salt)  # Прогрев: загрузка библиотеки
+
+        def one(_):
+            started = time.perf_counter()
+            cpu_started = time.thread_time()
+            hasher.encode('benchmark-password', salt)
+            return (time.perf_counter() - started) * 1000, (time.thread_time() - cpu_started) * 1000
+
+        timings = [one(i) for i in range(count)]
+        wall_ms = sum(wall for wall, _ in timings) / count
+        cpu_ms = sum(cpu for _, cpu in timings) / count
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(one, range(count * threads)))
+        throughput = count * threads / (time.perf_counter() - started)
+
+        self.stdout.write(f'{name}: {wall_ms:.1f} ms per hash ({cpu_ms:.1f} ms CPU), '
+                          f'{1000 / cpu_ms if cpu_ms else 0:.1f} hashes/s per core, '
+                          f'{throughput:.1f} hashes/s with {threads} threads')
@@ -0,0 +1,65 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from storage.models import File, User
+from storage.renderers import FastJSONRenderer, orjson
+from storage.serializers import FileSerializer
+
+SCENARIOS = (
+    # (название, параметры запроса, рендерер)
+    ('all fields, json', {}, JSONRenderer),
+    ('all fields, fast renderer', {}, FastJSONRenderer),
+    ('omit=file,file_url,previews', {'omit': 'file,file_url,previews'}, FastJSONRenderer),
+    ('fields=id,original_filename', {'fields': 'id,original_filename'}, FastJSONRenderer),
+)
+
+
+class Command(BaseCommand):
+    help = 'Measure CPU time of serializing and rendering a file listing with full and sparse fieldsets'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help='Files per response')
+        parser.add_argument('--repeat', type=int, default=20, help='Responses rendered per scenario')
+
+    def handle(self, *args, **options):
+        rows = self._files(options['rows'])
+        factory = RequestFactory()
+        self.stdout.write(f"{options['rows']} rows per response, {options['repeat']} responses, "
+                          f"orjson {'available' if orjson is not None else 'not installed'}")
+        self.stdout.write(f"{'scenario':<32}{'serialize ms':>14}{'render ms':>11}{'total ms':>10}"
+                          f"{'bytes':>10}{'vs baseline':>13}")
+        baseline = None
+        for name, params, renderer_class in SCENARIOS:
+            request = Request(factory.get('/api/files/', params))
+            renderer = renderer_class()
+            # Первый проход заполняет кэш подписанных URL: замеряется установившийся режим
+            body = renderer.render(FileSerializer(rows, many=True, context={'request': request}).data)
+            serialize = render = 0.0
+            for _ in range(options['repeat']):
+                started = time.process_time()
+                data = FileSerializer(rows, many=True, context={'request': request}).data
+                serialized = time.process_time()
+                renderer.render(data)
+                serialize += serialized - started
+                render += time.process_time() - serialized
+            serialize, render = (value * 1000 / options['repeat'] for value in (serialize, render))
+            total = serialize + render
+            baseline = baseline or total
+            self.stdout.write(f"{name:<32}{serialize:>14.1f}{render:>11.1f}{total:>10.1f}"
+                              f"{len(body):>10}{(total - baseline) / baseline * 100:>+12.0f}%")
+
+    def _files(self, count):
+        """Несохраненные файлы со всеми сериализуемыми полями: замер не зависит от базы"""
+        owner = User(id=1, username='benchmark', first_name='Bench', last_name='Mark')
+        now = timezone.now()
+        return [
+            File(id=index, file=f'uploads/benchmark/{index:06d}.pdf', original_filename=f'lecture-{index}.pdf',
+                 file_type='document', file_size=1024 * (index + 1) ** 2, mime_type='application/pdf',
+                 uploaded_at=now - timedelta(minutes=index), uploaded_by=owner, is_public=bool(index % 2),
+                 description='Benchmark file', preview_status='ready', preview_sizes=['small', 'medium'])
+            for index in range(1, count + 1)
+        ]
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from storage.uploads import cleanup_expired_sessions
+
+
+class Command(BaseCommand):
+    help = 'Abort expired upload sessions and release their parts in MinIO'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help='Number of sessions loaded per query')
+
+    def handle(self, *args, **options):
+        cleaned = cleanup_expired_sessions(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Expired upload sessions cleaned up: {cleaned}'))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from storage import content
+
+
+class Command(BaseCommand):
+    help = 'Queue text extraction for uploaded documents whose text is missing or stale'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rate', type=float, default=None,
+                            help='Files queued per second (default: CONTENT_BACKFILL_RATE)')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Number of files checked per database query')
+        parser.add_argument('--after-id', type=int, default=0,
+                            help='Resume after this file id (printed as progress)')
+
+    def handle(self, *args, **options):
+        def progress(last_id, queued):
+            self.stdout.write(f'Checked files up to id {last_id}, queued {queued}')
+
+        queued = content.backfill(rate=options['rate'], batch_size=options['batch_size'],
+                                  after_id=options['after_id'], progress=progress)
+        self.stdout.write(self.style.SUCCESS(
+            f'Files queued for text extraction: {queued} (processed by manage.py run_workers)'))
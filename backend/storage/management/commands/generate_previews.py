@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from storage import previews
+
+
+class Command(BaseCommand):
+    help = 'Generate thumbnails for uploaded images and PDFs and store them in MinIO'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Number of rendering processes (default: PREVIEW_WORKERS, or all cores)')
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Number of files claimed per batch (default: twice the workers)')
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help='Seconds to wait when there are no pending files')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit when there are no pending files instead of waiting')
+        parser.add_argument('--backfill', action='store_true',
+                            help='Queue previewable files uploaded before previews existed')
+        parser.add_argument('--requeue', action='store_true',
+                            help='Queue failed files and files left in processing by a stopped worker')
+
+    def handle(self, *args, **options):
+        if options['backfill']:
+            self.stdout.write(f'Files queued for previews: {previews.backfill()}')
+        if options['requeue']:
+            self.stdout.write(f'Files requeued for previews: {previews.requeue()}')
+        totals = previews.run(workers=options['workers'], batch_size=options['batch_size'],
+                              once=options['once'], interval=options['interval'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Previews generated: {totals['ready']}, failed: {totals['failed']}"))
@@ -0,0 +1,28 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from storage.jobs import stats
+
+
+class Command(BaseCommand):
+    help = 'Show background job counts and wait/run timings per job kind'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--minutes', type=int, default=60,
+                            help='Include jobs finished within this many minutes')
+
+    def handle(self, *args, **options):
+        rows = stats(since=timezone.now() - timedelta(minutes=options['minutes']))
+        if not rows:
+            self.stdout.write('No jobs')
+            return
+
+        def ms(value):
+            return f'{value:.1f}' if value is not None else '-'
+
+        self.stdout.write(f"{'kind':<24}{'queued':>8}{'running':>9}{'done':>8}{'failed':>8}"
+                          f"{'avg wait ms':>13}{'avg run ms':>12}{'max run ms':>12}")
+        for kind, row in rows.items():
+            self.stdout.write(f"{kind:<24}{row['queued']:>8}{row['running']:>9}{row['done']:>8}{row['failed']:>8}"
+                              f"{ms(row['avg_wait_ms']):>13}{ms(row['avg_duration_ms']):>12}"
+                              f"{ms(row['max_duration_ms']):>12}")
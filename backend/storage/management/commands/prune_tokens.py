@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from storage.revocation import prune_expired_tokens
+
+
+class Command(BaseCommand):
+    help = 'Delete expired outstanding and blacklisted refresh tokens in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Number of tokens deleted per transaction')
+        parser.add_argument('--pause', type=float, default=0.0,
+                            help='Seconds to sleep between batches')
+
+    def handle(self, *args, **options):
+        deleted = prune_expired_tokens(batch_size=options['batch_size'], pause=options['pause'])
+        self.stdout.write(self.style.SUCCESS(f'Expired tokens pruned: {deleted}'))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from storage import jobs
+from storage.quota import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Rebuild per-user storage usage counters from SUM(file_size) and active upload sessions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='users',
+                            help='Reconcile only this user id (can be repeated)')
+        parser.add_argument('--background', action='store_true',
+                            help='Queue the reconciliation for the job workers instead of running it here')
+
+    def handle(self, *args, **options):
+        if options['background']:
+            job = jobs.enqueue('quota.reconcile', user_ids=options['users'])
+            self.stdout.write(self.style.SUCCESS(f'Storage usage reconciliation queued as job {job.id}'))
+            return
+        fixed = reconcile(options['users'])
+        self.stdout.write(self.style.SUCCESS(f'Storage usage rows corrected: {fixed}'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from storage import deadlines
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the upcoming-deadline feeds of all course members and drop past entries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prune-only', action='store_true',
+                            help='Only delete entries of assignments whose due date has passed')
+
+    def handle(self, *args, **options):
+        if options['prune_only']:
+            self.stdout.write(self.style.SUCCESS(f'Past deadline entries deleted: {deadlines.prune()}'))
+            return
+
+        def progress(course_id, written):
+            self.stdout.write(f'Course {course_id} refreshed, {written} entries written')
+
+        courses, written, pruned = deadlines.refresh_all(progress=progress)
+        self.stdout.write(self.style.SUCCESS(
+            f'Deadline feeds refreshed: {courses} courses, {written} entries written, {pruned} past entries deleted'))
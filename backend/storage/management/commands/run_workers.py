@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from storage import workers
+
+
+class Command(BaseCommand):
+    help = 'Run background job workers that process the database-backed job queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=settings.JOB_WORKER_PROCESSES,
+                            help='Number of worker processes (for CPU-bound jobs)')
+        parser.add_argument('--threads', type=int, default=settings.JOB_WORKER_THREADS,
+                            help='Number of worker threads per process (for I/O-bound jobs)')
+        parser.add_argument('--kind', action='append', dest='kinds',
+                            help='Process only jobs of this kind (can be repeated)')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit when the queue is empty instead of waiting for new jobs')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Starting {options['processes']} worker process(es) "
+                          f"with {options['threads']} thread(s) each")
+        workers.run(options['processes'], options['threads'], kinds=options['kinds'], once=options['once'])
+        self.stdout.write(self.style.SUCCESS('Job workers stopped'))
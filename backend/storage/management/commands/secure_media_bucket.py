@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from storage import objects
+
+
+class Command(BaseCommand):
+    help = 'Remove an anonymous-read policy from the media bucket so files are served only through presigned URLs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Only report a public policy and exit with an error, do not remove it')
+
+    def handle(self, *args, **options):
+        bucket = objects.get_bucket_name()
+        try:
+            policy = objects.get_bucket_policy()
+        except Exception as e:
+            raise CommandError(f"Could not read the policy of bucket '{bucket}': {str(e)}")
+        public = objects.anonymous_statements(policy)
+        if not public:
+            self.stdout.write(self.style.SUCCESS(f"Bucket '{bucket}' has no anonymous access"))
+            return
+        actions = sorted({action for statement in public for action in
+                          (statement.get('Action') if isinstance(statement.get('Action'), list)
+                           else [statement.get('Action')])})
+        if options['check']:
+            raise CommandError(f"Bucket '{bucket}' allows anonymous {', '.join(map(str, actions))}: "
+                               f"files are readable without presigned URLs")
+        # Остальные правила политики сохраняются
+        statements = policy.get('Statement', [])
+        objects.set_bucket_policy({**policy, 'Statement': [
+            statement for statement in (statements if isinstance(statements, list) else [statements])
+            if statement not in public]})
+        self.stdout.write(self.style.WARNING(
+            f"Removed anonymous access from bucket '{bucket}' ({', '.join(map(str, actions))})"))
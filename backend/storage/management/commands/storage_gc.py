@@ -0,0 +1,35 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from storage import deletions
+
+
+class Command(BaseCommand):
+    help = 'Remove MinIO objects that no database row references and purge the object deletion queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=float, default=None,
+                            help='Keep objects younger than this (default: STORAGE_GC_GRACE)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report orphaned objects, do not remove them')
+        parser.add_argument('--skip-previews', action='store_true',
+                            help='Do not check previews/ for previews of removed objects')
+        parser.add_argument('--purge-only', action='store_true',
+                            help='Only remove objects already queued for deletion')
+
+    def handle(self, *args, **options):
+        if options['purge_only']:
+            totals = deletions.purge()
+            self.stdout.write(self.style.SUCCESS(
+                f"Deletion queue purged: {totals['removed']} removed, {totals['failed']} failed"))
+            return
+        grace = timedelta(hours=options['grace_hours']) if options['grace_hours'] is not None else None
+        stats = deletions.collect_garbage(grace=grace, dry_run=options['dry_run'],
+                                          include_previews=not options['skip_previews'])
+        mb = 1024 * 1024
+        self.stdout.write(f"Scanned {stats['scanned']} objects ({stats['scanned_bytes'] / mb:.1f} MB) under uploads/")
+        self.stdout.write(f"Orphaned: {stats['orphans']} objects ({stats['orphan_bytes'] / mb:.1f} MB), "
+                          f"{stats['orphan_previews']} previews")
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('Dry run: nothing removed'))
+            return
+        self.stdout.write(self.style.SUCCESS(f"Removed {stats['removed']} objects, {stats['failed']} failed"))
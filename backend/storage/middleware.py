@@ -0,0 +1,92 @@
+import contextvars
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Счетчики текущего запроса; в async-представлениях запросы к БД выполняются
+# в потоках bridge 'db', которые учитывают их через track_queries
+_query_stats = contextvars.ContextVar('query_count_stats', default=None)
+
+
+@contextmanager
+def track_queries():
+    """Учитывает SQL-запросы текущего потока в счетчиках запроса, если они ведутся"""
+    stats = _query_stats.get()
+    if stats is None:
+        yield
+        return
+    stats['tracked'] = True
+
+    def count_query(execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            stats['count'] += 1
+            stats['time'] += time.perf_counter() - started
+
+    with ExitStack() as stack:
+        for conn in connections.all():
+            stack.enter_context(conn.execute_wrapper(count_query))
+        yield
+
+
+class QueryCountMiddleware:
+    """
+    Добавляет к ответу заголовки X-Query-Count и X-Query-Time с числом и
+    суммарным временем SQL-запросов, выполненных при обработке запроса.
+    Включается настройкой QUERY_COUNT_HEADER (по умолчанию в DEBUG).
+
+    Работает и в синхронной, и в асинхронной цепочке: в режиме ASGI
+    async-представления не переводятся в поток через async_to_sync.
+    Там учитываются запросы, выполненные через bridge; синхронные
+    представления под ASGI выполняются в потоке Django, и заголовки
+    к их ответам не добавляются.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not settings.QUERY_COUNT_HEADER:
+            return self.get_response(request)
+        stats = {'count': 0, 'time': 0.0, 'tracked': False}
+        token = _query_stats.set(stats)
+        try:
+            with track_queries():
+                response = self.get_response(request)
+        finally:
+            _query_stats.reset(token)
+        return self._finish(request, response, stats)
+
+    async def __acall__(self, request):
+        if not settings.QUERY_COUNT_HEADER:
+            return await self.get_response(request)
+        stats = {'count': 0, 'time': 0.0, 'tracked': False}
+        token = _query_stats.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _query_stats.reset(token)
+        return self._finish(request, response, stats)
+
+    def _finish(self, request, response, stats):
+        if not stats['tracked']:
+            return response
+        response['X-Query-Count'] = str(stats['count'])
+        response['X-Query-Time'] = f"{stats['time'] * 1000:.1f}ms"
+        if stats['count'] > settings.QUERY_COUNT_WARNING_THRESHOLD:
+            logger.warning(f"{request.method} {request.path} executed {stats['count']} SQL queries")
+        return response
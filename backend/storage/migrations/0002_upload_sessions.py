@@ -0,0 +1,68 @@
+# Generated by Django 5.2.3 on 2026-10-17 22:51
+
+import django.db.models.deletion
+import minio_storage.storage
+import storage.models
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('storage', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='file',
+            options={'ordering': ['-uploaded_at'], 'verbose_name': 'File', 'verbose_name_plural': 'Files'},
+        ),
+        migrations.AlterField(
+            model_name='file',
+            name='file',
+            field=models.FileField(storage=minio_storage.storage.MinioMediaStorage(), upload_to=storage.models.file_upload_path),
+        ),
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('object_name', models.CharField(max_length=512)),
+                ('upload_id', models.CharField(blank=True, max_length=255)),
+                ('original_filename', models.CharField(max_length=255)),
+                ('content_type', models.CharField(blank=True, max_length=100)),
+                ('total_size', models.BigIntegerField()),
+                ('part_size', models.BigIntegerField()),
+                ('file_type', models.CharField(choices=[('document', 'Document'), ('image', 'Image'), ('video', 'Video'), ('audio', 'Audio'), ('archive', 'Archive'), ('other', 'Other')], default='other', max_length=20)),
+                ('is_public', models.BooleanField(default=False)),
+                ('description', models.TextField(blank=True)),
+                ('status', models.CharField(choices=[('active', 'Active'), ('completed', 'Completed'), ('aborted', 'Aborted'), ('expired', 'Expired')], default='active', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('assignment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='storage.assignment')),
+                ('course', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='storage.course')),
+                ('file', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='upload_session', to='storage.file')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='UploadPart',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('part_number', models.PositiveIntegerField()),
+                ('etag', models.CharField(max_length=100)),
+                ('size', models.BigIntegerField()),
+                ('uploaded_at', models.DateTimeField(auto_now=True)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='parts', to='storage.uploadsession')),
+            ],
+            options={
+                'ordering': ['part_number'],
+                'constraints': [models.UniqueConstraint(fields=('session', 'part_number'), name='uploadpart_session_part_unique')],
+            },
+        ),
+    ]
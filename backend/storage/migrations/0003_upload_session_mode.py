@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-17 22:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('storage', '0002_upload_sessions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadsession',
+            name='mode',
+            field=models.CharField(choices=[('multipart', 'Multipart'), ('direct', 'Direct')], default='multipart', max_length=10),
+        ),
+    ]
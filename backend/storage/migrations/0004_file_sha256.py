@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-17 22:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('storage', '0003_upload_session_mode'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='file',
+            name='sha256',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-17 22:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('storage', '0004_file_sha256'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='file',
+            name='etag',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+    ]
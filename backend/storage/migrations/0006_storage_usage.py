@@ -0,0 +1,37 @@
+# Generated by Django 5.2.3 on 2026-10-17 22:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def populate_storage_usage(apps, schema_editor):
+    File = apps.get_model('storage', 'File')
+    StorageUsage = apps.get_model('storage', 'StorageUsage')
+    totals = File.objects.values('uploaded_by_id').annotate(used=Sum('file_size'), count=Count('id'))
+    StorageUsage.objects.bulk_create([
+        StorageUsage(user_id=row['uploaded_by_id'], used_bytes=row['used'] or 0, file_count=row['count'])
+        for row in totals
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('storage', '0005_file_etag'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StorageUsage',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='storage_usage', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('used_bytes', models.BigIntegerField(default=0)),
+                ('reserved_bytes', models.BigIntegerField(default=0)),
+                ('file_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(populate_storage_usage, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.3 on 2026-10-17 23:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('storage', '0006_storage_usage'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='file',
+            options={'ordering': ['-uploaded_at', '-id'], 'verbose_name': 'File', 'verbose_name_plural': 'Files'},
+        ),
+        migrations.AddIndex(
+            model_name='file',
+            index=models.Index(fields=['uploaded_by', '-uploaded_at', '-id'], name='file_owner_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='file',
+            index=models.Index(condition=models.Q(('is_public', True)), fields=['-uploaded_at', '-id'], name='file_public_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.3 on 2026-10-17 23:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_blobs(apps, schema_editor):
+    # Для каждого известного хеша блобом становится объект самого раннего файла;
+    # остальные копии сохраняют собственные объекты и остаются без блоба
+    File = apps.get_model('storage', 'File')
+    Blob = apps.get_model('storage', 'Blob')
+    seen = set()
+    for file_obj in File.objects.exclude(sha256='').order_by('id').iterator():
+        if file_obj.sha256 in seen:
+            continue
+        seen.add(file_obj.sha256)
+        blob = Blob.objects.create(sha256=file_obj.sha256, object_name=file_obj.file.name, size=file_obj.file_size,
+                                   etag=file_obj.etag, ref_count=1)
+        File.objects.filter(pk=file_obj.pk).update(blob=blob)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('storage', '0007_file_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Blob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('object_name', models.CharField(max_length=512)),
+                ('size', models.BigIntegerField()),
+                ('etag', models.CharField(blank=True, max_length=100)),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='uploadsession',
+            name='sha256',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='file',
+            name='blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='files', to='storage.blob'),
+        ),
+        migrations.RunPython(populate_blobs, migrations.RunPython.noop),
+    ]
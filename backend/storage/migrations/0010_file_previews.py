@@ -0,0 +1,27 @@
+# Generated by Django 5.2.3 on 2026-10-17 23:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('storage', '0009_user_auth_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='file',
+            name='preview_sizes',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='file',
+            name='preview_status',
+            field=models.CharField(choices=[('none', 'None'), ('pending', 'Pending'), ('processing', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], default='none', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='file',
+            index=models.Index(condition=models.Q(('preview_status', 'pending')), fields=['id'], name='file_preview_pending_idx'),
+        ),
+    ]
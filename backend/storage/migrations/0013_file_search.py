@@ -0,0 +1,65 @@
+# Generated by Django 5.2.3 on 2026-10-17 23:31
+
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+# Вектор строится так же, как запрос в storage/search.py: конфигурация 'simple'
+# (имена файлов на разных языках), пунктуация имени файла - разделитель слов
+SEARCH_VECTOR_SQL = """
+    setweight(to_tsvector('simple', regexp_replace(coalesce({row}original_filename, ''), '[[:punct:]]+', ' ', 'g')), 'A') ||
+    setweight(to_tsvector('simple', coalesce({row}description, '')), 'B')
+"""
+
+CREATE_SQL = [
+    f"""
+    CREATE OR REPLACE FUNCTION storage_file_search_vector() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector := {SEARCH_VECTOR_SQL.format(row='NEW.')};
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER storage_file_search_vector_update
+        BEFORE INSERT OR UPDATE OF original_filename, description ON storage_file
+        FOR EACH ROW EXECUTE FUNCTION storage_file_search_vector()
+    """,
+    f"UPDATE storage_file SET search_vector = {SEARCH_VECTOR_SQL.format(row='')}",
+    "CREATE INDEX file_search_vector_idx ON storage_file USING gin (search_vector)",
+    "CREATE INDEX file_filename_trgm_idx ON storage_file USING gin (original_filename gin_trgm_ops)",
+]
+
+DROP_SQL = [
+    "DROP INDEX IF EXISTS file_filename_trgm_idx",
+    "DROP INDEX IF EXISTS file_search_vector_idx",
+    "DROP TRIGGER IF EXISTS storage_file_search_vector_update ON storage_file",
+    "DROP FUNCTION IF EXISTS storage_file_search_vector()",
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        # Триггер и GIN-индексы есть только в PostgreSQL; на других СУБД поиск работает без индексов
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('storage', '0012_object_deletions'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='file',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(_run(CREATE_SQL), _run(DROP_SQL)),
+    ]
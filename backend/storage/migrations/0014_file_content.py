@@ -0,0 +1,94 @@
+# Generated by Django 5.2.3 on 2026-10-17 23:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Вектор файла дополняется текстом документа с весом C (ниже имени и описания).
+# Триггер файла срабатывает и на запись search_vector: так его пересчитывает
+# триггер FileContent после извлечения текста
+CONTENT_VECTOR_SQL = """
+    setweight(to_tsvector('simple', regexp_replace(coalesce(NEW.original_filename, ''), '[[:punct:]]+', ' ', 'g')), 'A') ||
+    setweight(to_tsvector('simple', coalesce(NEW.description, '')), 'B') ||
+    setweight(to_tsvector('simple', coalesce(
+        (SELECT text FROM storage_filecontent WHERE file_id = NEW.id), '')), 'C')
+"""
+
+# Вектор без текста документа (миграция 0013)
+FILENAME_VECTOR_SQL = """
+    setweight(to_tsvector('simple', regexp_replace(coalesce(NEW.original_filename, ''), '[[:punct:]]+', ' ', 'g')), 'A') ||
+    setweight(to_tsvector('simple', coalesce(NEW.description, '')), 'B')
+"""
+
+
+def _file_trigger_sql(vector_sql, columns):
+    return [
+        f"""
+        CREATE OR REPLACE FUNCTION storage_file_search_vector() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector := {vector_sql};
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        "DROP TRIGGER IF EXISTS storage_file_search_vector_update ON storage_file",
+        f"""
+        CREATE TRIGGER storage_file_search_vector_update
+            BEFORE INSERT OR UPDATE OF {columns} ON storage_file
+            FOR EACH ROW EXECUTE FUNCTION storage_file_search_vector()
+        """,
+    ]
+
+
+CREATE_SQL = _file_trigger_sql(CONTENT_VECTOR_SQL, 'original_filename, description, search_vector') + [
+    """
+    CREATE OR REPLACE FUNCTION storage_filecontent_changed() RETURNS trigger AS $$
+    BEGIN
+        UPDATE storage_file SET search_vector = NULL
+            WHERE id = CASE WHEN TG_OP = 'DELETE' THEN OLD.file_id ELSE NEW.file_id END;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER storage_filecontent_search_vector_update
+        AFTER INSERT OR UPDATE OF text OR DELETE ON storage_filecontent
+        FOR EACH ROW EXECUTE FUNCTION storage_filecontent_changed()
+    """,
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS storage_filecontent_search_vector_update ON storage_filecontent",
+    "DROP FUNCTION IF EXISTS storage_filecontent_changed()",
+] + _file_trigger_sql(FILENAME_VECTOR_SQL, 'original_filename, description')
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        # Триггеры поиска есть только в PostgreSQL (см. миграцию 0013)
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('storage', '0013_file_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FileContent',
+            fields=[
+                ('file', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='content', serialize=False, to='storage.file')),
+                ('status', models.CharField(choices=[('done', 'Done'), ('skipped', 'Skipped'), ('failed', 'Failed')], default='done', max_length=10)),
+                ('text', models.TextField(blank=True)),
+                ('source_sha256', models.CharField(max_length=64)),
+                ('error', models.TextField(blank=True)),
+                ('extracted_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(_run(CREATE_SQL), _run(DROP_SQL)),
+    ]
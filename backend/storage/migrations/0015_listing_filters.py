@@ -0,0 +1,63 @@
+# Generated by Django 5.2.3 on 2026-10-17 23:39
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('storage', '0014_file_content'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='students',
+            field=models.ManyToManyField(blank=True, related_name='enrolled_courses', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='assignment',
+            name='course',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='assignments', to='storage.course'),
+        ),
+        migrations.AlterField(
+            model_name='file',
+            name='assignment',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='files', to='storage.assignment'),
+        ),
+        migrations.AlterField(
+            model_name='file',
+            name='course',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='files', to='storage.course'),
+        ),
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(fields=['course', 'due_date'], name='assignment_course_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='file',
+            index=models.Index(fields=['uploaded_by', 'file_type', '-uploaded_at', '-id'], name='file_owner_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='file',
+            index=models.Index(fields=['uploaded_by', 'is_public', '-uploaded_at', '-id'], name='file_owner_public_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='file',
+            index=models.Index(fields=['uploaded_by', 'file_size'], name='file_owner_size_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='file',
+            index=models.Index(condition=models.Q(('is_public', True)), fields=['file_type', '-uploaded_at', '-id'], name='file_public_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='file',
+            index=models.Index(fields=['course', '-uploaded_at', '-id'], name='file_course_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='file',
+            index=models.Index(fields=['assignment', '-uploaded_at', '-id'], name='file_assignment_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.3 on 2026-10-17 23:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def queue_feed_build(apps, schema_editor):
+    # Ленты заполняются воркерами (задача deadlines.refresh_course) по курсам с предстоящими заданиями
+    Assignment = apps.get_model('storage', 'Assignment')
+    Job = apps.get_model('storage', 'Job')
+    now = timezone.now()
+    course_ids = Assignment.objects.filter(due_date__gte=now).values_list('course_id', flat=True).distinct()
+    Job.objects.bulk_create([
+        Job(kind='deadlines.refresh_course', payload={'course_id': course_id}, priority=10, run_after=now,
+            max_attempts=settings.JOB_MAX_ATTEMPTS)
+        for course_id in course_ids.order_by('course_id')
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('storage', '0015_listing_filters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeadlineEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('due_date', models.DateTimeField()),
+                ('submitted_files', models.PositiveIntegerField(default=0)),
+                ('last_submitted_at', models.DateTimeField(blank=True, null=True)),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(fields=['due_date', 'course'], name='assignment_due_course_idx'),
+        ),
+        migrations.AddField(
+            model_name='deadlineentry',
+            name='assignment',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deadline_entries', to='storage.assignment'),
+        ),
+        migrations.AddField(
+            model_name='deadlineentry',
+            name='course',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deadline_entries', to='storage.course'),
+        ),
+        migrations.AddField(
+            model_name='deadlineentry',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='deadlines', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='deadlineentry',
+            index=models.Index(fields=['user', 'due_date'], name='deadline_user_due_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='deadlineentry',
+            constraint=models.UniqueConstraint(fields=('user', 'assignment'), name='deadline_user_assignment_uniq'),
+        ),
+        migrations.RunPython(queue_feed_build, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.db import migrations
+from django.utils import timezone
+
+
+def backfill_enrollments(apps, schema_editor):
+    # До появления записи на курс студенты видели все задания. Записываем их на курсы,
+    # в которые они уже сдавали файлы (в курс или в его задание); остальные
+    # записываются сами на странице курсов
+    File = apps.get_model('storage', 'File')
+    Course = apps.get_model('storage', 'Course')
+    Assignment = apps.get_model('storage', 'Assignment')
+    Job = apps.get_model('storage', 'Job')
+    Enrollment = Course.students.through
+
+    pairs = set()
+    submissions = File.objects.filter(uploaded_by__role='student')
+    pairs.update(submissions.filter(course__isnull=False).values_list('uploaded_by_id', 'course_id').distinct())
+    pairs.update(submissions.filter(assignment__isnull=False)
+                 .values_list('uploaded_by_id', 'assignment__course_id').distinct())
+    Enrollment.objects.bulk_create(
+        [Enrollment(user_id=user_id, course_id=course_id) for user_id, course_id in sorted(pairs)],
+        batch_size=1000, ignore_conflicts=True)
+
+    # Сигналы записи на курс в миграции не срабатывают: ленты сроков пересобираются воркером
+    now = timezone.now()
+    course_ids = (Assignment.objects.filter(due_date__gte=now, course_id__in={course_id for _, course_id in pairs})
+                  .values_list('course_id', flat=True).distinct().order_by('course_id'))
+    Job.objects.bulk_create([
+        Job(kind='deadlines.refresh_course', payload={'course_id': course_id}, priority=10, run_after=now,
+            max_attempts=settings.JOB_MAX_ATTEMPTS)
+        for course_id in course_ids
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('storage', '0016_deadline_feed'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_enrollments, migrations.RunPython.noop),
+    ]
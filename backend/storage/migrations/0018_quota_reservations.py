@@ -0,0 +1,24 @@
+# Generated by Django 5.2.3 on 2026-10-18 00:22
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('storage', '0017_backfill_enrollments'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuotaReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('size', models.BigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='quota_reservations', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -1,9 +1,12 @@
 import logging
 import time
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.search import SearchVectorField
 from django.utils import timezone
 import os
+import math
+import uuid
 import mimetypes
 from minio_storage.storage import MinioMediaStorage
 
@@ -46,6 +49,8 @@ class User(AbstractUser):
     bio = models.TextField(blank=True)
     phone = models.CharField(max_length=20, blank=True)
     date_of_birth = models.DateField(null=True, blank=True)
+    # Меняется при изменении пароля, роли, активности или профиля; сверяется с claim 'av' токена
+    auth_version = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -58,6 +63,120 @@ class User(AbstractUser):
         """Возвращает полное имя пользователя"""
         return f"{self.first_name} {self.last_name}"
 
+def listing_columns(fields, computed):
+    """
+    Столбцы для only() по полям ответа, выбранным ?fields=/?omit=.
+
+    Args:
+        fields: Имена полей сериализатора
+        computed (dict): Вычисляемое поле -> нужные ему столбцы; остальные поля
+            совпадают с именем столбца
+
+    Returns:
+        set: Имена столбцов (id загружается всегда)
+    """
+    columns = {'id'}
+    for name in fields:
+        columns.update(computed.get(name, (name,)))
+    return columns
+
+
+class CourseQuerySet(models.QuerySet):
+    # Вычисляемые поля CourseSerializer -> столбцы; assignments_count и is_enrolled - аннотации
+    LISTING_COLUMNS = {
+        'teacher_name': ('teacher', 'teacher__first_name', 'teacher__last_name'),
+        'assignments_count': (),
+        'is_enrolled': (),
+    }
+
+    def for_listing(self, fields=None):
+        """
+        Набор для списков курсов: преподаватель в том же запросе,
+        только сериализуемые колонки и число заданий курса.
+
+        Args:
+            fields: Поля ответа (по умолчанию все): преподаватель и число заданий
+                загружаются, только если выбраны teacher_name и assignments_count
+        """
+        if fields is None:
+            return (self.select_related('teacher')
+                    .only('id', 'name', 'code', 'description', 'teacher', 'created_at', 'updated_at',
+                          'teacher__first_name', 'teacher__last_name')
+                    .annotate(assignments_count=models.Count('assignments', distinct=True)))
+        courses = self.only(*listing_columns(fields, self.LISTING_COLUMNS))
+        if 'teacher_name' in fields:
+            courses = courses.select_related('teacher')
+        if 'assignments_count' in fields:
+            courses = courses.annotate(assignments_count=models.Count('assignments', distinct=True))
+        return courses
+
+    def with_enrollment(self, user):
+        """Отмечает курсы, на которые записан пользователь (аннотация is_enrolled)"""
+        enrollments = Course.students.through.objects.filter(course=models.OuterRef('pk'), user=user)
+        return self.annotate(is_enrolled=models.Exists(enrollments))
+
+    def for_member(self, user):
+        """Курсы пользователя: для преподавателя - которые он ведет, для студента - на которые он записан"""
+        return self.filter(models.Q(teacher=user) | models.Q(students=user)).distinct()
+
+
+class AssignmentQuerySet(models.QuerySet):
+    # Вычисляемые поля AssignmentSerializer -> столбцы; files_count - аннотация
+    LISTING_COLUMNS = {
+        'course_name': ('course', 'course__name'),
+        'files_count': (),
+    }
+
+    def for_listing(self, fields=None):
+        """
+        Набор для списков заданий: название курса в том же запросе и число файлов задания.
+
+        Args:
+            fields: Поля ответа (по умолчанию все): курс и число файлов
+                загружаются, только если выбраны course_name и files_count
+        """
+        if fields is None:
+            return (self.select_related('course')
+                    .only('id', 'title', 'description', 'due_date', 'course', 'created_at', 'updated_at',
+                          'course__name')
+                    .annotate(files_count=models.Count('files', distinct=True)))
+        assignments = self.only(*listing_columns(fields, self.LISTING_COLUMNS))
+        if 'course_name' in fields:
+            assignments = assignments.select_related('course')
+        if 'files_count' in fields:
+            assignments = assignments.annotate(files_count=models.Count('files', distinct=True))
+        return assignments
+
+
+class FileQuerySet(models.QuerySet):
+    # Вычисляемые поля FileSerializer -> столбцы, из которых они строятся
+    LISTING_COLUMNS = {
+        'uploaded_by_name': ('uploaded_by', 'uploaded_by__first_name', 'uploaded_by__last_name'),
+        'file_size_display': ('file_size',),
+        'file_url': ('file',),
+        'previews': ('file', 'preview_status', 'preview_sizes'),
+    }
+
+    def for_listing(self, fields=None):
+        """
+        Набор для списков файлов: имя владельца в том же запросе, без несериализуемых колонок.
+
+        Args:
+            fields: Поля ответа (по умолчанию все): владелец присоединяется,
+                только если выбрано uploaded_by_name
+        """
+        if fields is None:
+            return (self.select_related('uploaded_by')
+                    .only('id', 'file', 'original_filename', 'file_type', 'file_size', 'mime_type',
+                          'uploaded_at', 'uploaded_by', 'assignment', 'course', 'is_public', 'description',
+                          'preview_status', 'preview_sizes', 'uploaded_by__first_name', 'uploaded_by__last_name'))
+        # uploaded_at читается курсорной пагинацией у каждой строки страницы
+        files = self.only('uploaded_at', *listing_columns(fields, self.LISTING_COLUMNS))
+        if 'uploaded_by_name' in fields:
+            files = files.select_related('uploaded_by')
+        return files
+
+
 class Course(models.Model):
     """
     Модель курса, который ведет преподаватель.
@@ -67,9 +186,12 @@ class Course(models.Model):
     code = models.CharField(max_length=20)
     description = models.TextField(blank=True)
     teacher = models.ForeignKey(User, on_delete=models.CASCADE, related_name='courses')
+    students = models.ManyToManyField(User, related_name='enrolled_courses', blank=True)
     created_at = models.DateTimeField(auto_now_add=True, null=True)
     updated_at = models.DateTimeField(auto_now=True, null=True)
 
+    objects = CourseQuerySet.as_manager()
+
     def __str__(self):
         return self.name
 
@@ -81,13 +203,41 @@ class Assignment(models.Model):
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True)
     due_date = models.DateTimeField()
-    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='assignments')
+    # Индекс по course_id заменяет assignment_course_due_idx, начинающийся с того же столбца
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='assignments', db_index=False)
     created_at = models.DateTimeField(auto_now_add=True, null=True)
     updated_at = models.DateTimeField(auto_now=True, null=True)
 
+    objects = AssignmentQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Список заданий курсов пользователя с фильтром по сроку сдачи (filters.AssignmentFilterSet)
+            models.Index(fields=['course', 'due_date'], name='assignment_course_due_idx'),
+            # Предстоящие задания всех курсов: обновление лент сроков (deadlines.refresh_all)
+            models.Index(fields=['due_date', 'course'], name='assignment_due_course_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
+class Blob(models.Model):
+    """
+    Содержимое файла в MinIO, адресуемое по SHA-256.
+    Несколько записей File с одинаковым содержимым ссылаются на один объект;
+    ref_count считает такие ссылки, объект удаляется вместе с последней из них.
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    object_name = models.CharField(max_length=512)
+    size = models.BigIntegerField()
+    etag = models.CharField(max_length=100, blank=True)
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.ref_count} refs)"
+
+
 class File(models.Model):
     """
     Модель файла с метаданными.
@@ -101,86 +251,142 @@ class File(models.Model):
         ('archive', 'Archive'),
         ('other', 'Other'),
     ]
+    PREVIEW_STATUS_CHOICES = [
+        ('none', 'None'),  # превью для этого типа не строится
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ]
     
     file = models.FileField(upload_to=file_upload_path, storage=MinioMediaStorage())
     original_filename = models.CharField(max_length=255, null=True)
     file_type = models.CharField(max_length=20, choices=FILE_TYPE_CHOICES, default='other')
     file_size = models.BigIntegerField(default=0)  # Size in bytes
     mime_type = models.CharField(max_length=100, blank=True)
+    sha256 = models.CharField(max_length=64, blank=True)  # Контрольная сумма содержимого
+    etag = models.CharField(max_length=100, blank=True)  # ETag объекта в MinIO
+    blob = models.ForeignKey(Blob, on_delete=models.PROTECT, null=True, blank=True, related_name='files')
     uploaded_at = models.DateTimeField(auto_now_add=True)
     uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='files')
-    assignment = models.ForeignKey(Assignment, on_delete=models.SET_NULL, null=True, blank=True, related_name='files')
-    course = models.ForeignKey(Course, on_delete=models.SET_NULL, null=True, blank=True, related_name='files')
+    # Отдельные индексы по assignment_id и course_id заменяют составные file_*_recent_idx
+    assignment = models.ForeignKey(Assignment, on_delete=models.SET_NULL, null=True, blank=True, related_name='files',
+                                   db_index=False)
+    course = models.ForeignKey(Course, on_delete=models.SET_NULL, null=True, blank=True, related_name='files',
+                               db_index=False)
     is_public = models.BooleanField(default=False)
     description = models.TextField(blank=True)
+    preview_status = models.CharField(max_length=10, choices=PREVIEW_STATUS_CHOICES, default='none')
+    preview_sizes = models.JSONField(default=list, blank=True)  # Имена сгенерированных размеров превью
+    # Поисковый вектор имени, описания и текста документа (FileContent); заполняется
+    # триггером PostgreSQL (см. search.py и миграции 0013, 0014)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = FileQuerySet.as_manager()
     
     class Meta:
-        ordering = ['-uploaded_at']
+        ordering = ['-uploaded_at', '-id']
         verbose_name = 'File'
         verbose_name_plural = 'Files'
+        indexes = [
+            # Ключ курсорной пагинации (uploaded_at, id) в том же направлении, что и ORDER BY
+            models.Index(fields=['uploaded_by', '-uploaded_at', '-id'], name='file_owner_recent_idx'),
+            models.Index(fields=['-uploaded_at', '-id'], name='file_public_recent_idx',
+                         condition=models.Q(is_public=True)),
+            # Фильтры списков файлов (filters.FileFilterSet): равенство, затем диапазон или ключ сортировки
+            models.Index(fields=['uploaded_by', 'file_type', '-uploaded_at', '-id'], name='file_owner_type_idx'),
+            models.Index(fields=['uploaded_by', 'is_public', '-uploaded_at', '-id'], name='file_owner_public_idx'),
+            models.Index(fields=['uploaded_by', 'file_size'], name='file_owner_size_idx'),
+            models.Index(fields=['file_type', '-uploaded_at', '-id'], name='file_public_type_idx',
+                         condition=models.Q(is_public=True)),
+            models.Index(fields=['course', '-uploaded_at', '-id'], name='file_course_recent_idx'),
+            models.Index(fields=['assignment', '-uploaded_at', '-id'], name='file_assignment_recent_idx'),
+            # Очередь генерации превью: воркер выбирает только ожидающие файлы
+            models.Index(fields=['id'], name='file_preview_pending_idx',
+                         condition=models.Q(preview_status='pending')),
+            # GIN-индексы поиска (search_vector и триграммы original_filename) создаются
+            # миграцией 0013 только на PostgreSQL
+        ]
 
     def __str__(self):
         """Строковое представление файла (оригинальное имя или путь)"""
         return self.original_filename or self.file.name if self.file else 'Unnamed File'
 
-    def save(self, *args, **kwargs):
+    def populate_metadata(self):
         """
-        Переопределенный метод save для автоматического заполнения метаданных файла.
+        Заполняет метаданные, не заданные явно. Используется в save и при
+        пакетном создании файлов через bulk_create, где save не вызывается.
         Обрабатывает:
         - оригинальное имя файла
         - размер файла
         - MIME-тип
         - тип файла (по расширению)
+        - статус превью (ожидает генерации для изображений и PDF)
         """
-        try:
-            # Сохраняем оригинальное имя файла
-            if not self.original_filename and self.file:
-                self.original_filename = os.path.basename(self.file.name)
-                logger.info(f"Set original filename to {self.original_filename}")
-            
-            # Определяем размер файла
-            if not self.file_size and self.file:
-                try:
-                    if hasattr(self.file, 'size'):
-                        self.file_size = self.file.size
-                    else:
-                        self.file_size = self.file.storage.size(self.file.name)
-                    logger.debug(f"File size determined: {self.file_size} bytes")
-                except Exception as e:
-                    self.file_size = 0
-                    logger.warning(f"Could not determine file size: {str(e)}")
-            
-            # Определяем MIME-тип
-            if not self.mime_type and self.file:
+        # Сохраняем оригинальное имя файла
+        if not self.original_filename and self.file:
+            self.original_filename = os.path.basename(self.file.name)
+            logger.info(f"Set original filename to {self.original_filename}")
+        
+        # Определяем размер файла
+        if not self.file_size and self.file:
+            try:
+                if hasattr(self.file, 'size'):
+                    self.file_size = self.file.size
+                else:
+                    self.file_size = self.file.storage.size(self.file.name)
+                logger.debug(f"File size determined: {self.file_size} bytes")
+            except Exception as e:
+                self.file_size = 0
+                logger.warning(f"Could not determine file size: {str(e)}")
+        
+        # Определяем MIME-тип
+        if not self.mime_type and self.file:
+            try:
+                filename = self.original_filename or self.file.name
+                self.mime_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+                logger.debug(f"Detected MIME type: {self.mime_type}")
+            except Exception as e:
+                self.mime_type = 'application/octet-stream'
+                logger.warning(f"Could not detect MIME type: {str(e)}")
+        
+        # Определяем тип файла по расширению
+        if not self.file_type or self.file_type == 'other':
+            if self.original_filename:
                 try:
-                    filename = self.original_filename or self.file.name
-                    self.mime_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
-                    logger.debug(f"Detected MIME type: {self.mime_type}")
+                    ext = os.path.splitext(self.original_filename)[1].lower()
+                    if ext in ['.pdf', '.doc', '.docx', '.txt', '.rtf']:
+                        self.file_type = 'document'
+                    elif ext in ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.svg']:
+                        self.file_type = 'image'
+                    elif ext in ['.mp4', '.avi', '.mov', '.wmv', '.flv']:
+                        self.file_type = 'video'
+                    elif ext in ['.mp3', '.wav', '.flac', '.aac']:
+                        self.file_type = 'audio'
+                    elif ext in ['.zip', '.rar', '.7z', '.tar', '.gz']:
+                        self.file_type = 'archive'
+                    logger.debug(f"Detected file type: {self.file_type}")
                 except Exception as e:
-                    self.mime_type = 'application/octet-stream'
-                    logger.warning(f"Could not detect MIME type: {str(e)}")
-            
-            # Определяем тип файла по расширению
-            if not self.file_type or self.file_type == 'other':
-                if self.original_filename:
-                    try:
-                        ext = os.path.splitext(self.original_filename)[1].lower()
-                        if ext in ['.pdf', '.doc', '.docx', '.txt', '.rtf']:
-                            self.file_type = 'document'
-                        elif ext in ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.svg']:
-                            self.file_type = 'image'
-                        elif ext in ['.mp4', '.avi', '.mov', '.wmv', '.flv']:
-                            self.file_type = 'video'
-                        elif ext in ['.mp3', '.wav', '.flac', '.aac']:
-                            self.file_type = 'audio'
-                        elif ext in ['.zip', '.rar', '.7z', '.tar', '.gz']:
-                            self.file_type = 'archive'
-                        logger.debug(f"Detected file type: {self.file_type}")
-                    except Exception as e:
-                        logger.warning(f"Could not detect file type: {str(e)}")
-                        self.file_type = 'other'
+                    logger.warning(f"Could not detect file type: {str(e)}")
+                    self.file_type = 'other'
+        
+        # Превью строятся фоновой задачей (manage.py run_workers)
+        if self._state.adding and self.preview_status == 'none':
+            from .previews import is_previewable
+            if is_previewable(self.mime_type, self.file_size):
+                self.preview_status = 'pending'
+
+    def save(self, *args, **kwargs):
+        """
+        Переопределенный метод save для автоматического заполнения метаданных файла
+        (см. populate_metadata).
+        """
+        try:
+            self.populate_metadata()
             
-            super().save(*args, **kwargs)
+            # Счетчики использования хранилища обновляются сигналом post_save в той же транзакции
+            with transaction.atomic():
+                super().save(*args, **kwargs)
             logger.info(f"File {self.id} saved successfully")
             
         except Exception as e:
@@ -203,4 +409,234 @@ class File(models.Model):
             return f"{size:.1f} TB"
         except Exception as e:
             logger.error(f"Error formatting file size: {str(e)}")
-            return "0 B"
\ No newline at end of file
+            return "0 B"
+
+class UploadSession(models.Model):
+    """
+    Сессия возобновляемой (чанковой) загрузки файла.
+    Соответствует multipart-загрузке в MinIO: части загружаются независимо
+    (в том числе параллельно), а запись File создается только при завершении.
+    Состояние хранится в БД, поэтому сессия переживает перезапуск backend.
+    В режиме 'direct' клиент загружает объект в MinIO сам по presigned URL,
+    а сессия лишь запоминает ключ и метаданные до финализации.
+    """
+    STATUS_CHOICES = [
+        ('active', 'Active'),
+        ('completed', 'Completed'),
+        ('aborted', 'Aborted'),
+        ('expired', 'Expired'),
+    ]
+    MODE_CHOICES = [
+        ('multipart', 'Multipart'),  # части загружаются через backend
+        ('direct', 'Direct'),  # клиент загружает объект в MinIO по presigned URL
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_sessions')
+    mode = models.CharField(max_length=10, choices=MODE_CHOICES, default='multipart')
+    object_name = models.CharField(max_length=512)
+    upload_id = models.CharField(max_length=255, blank=True)
+    sha256 = models.CharField(max_length=64, blank=True)  # Хеш, заявленный клиентом для дедупликации
+    original_filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, blank=True)
+    total_size = models.BigIntegerField()
+    part_size = models.BigIntegerField()
+    file_type = models.CharField(max_length=20, choices=File.FILE_TYPE_CHOICES, default='other')
+    assignment = models.ForeignKey(Assignment, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    course = models.ForeignKey(Course, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    is_public = models.BooleanField(default=False)
+    description = models.TextField(blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='active')
+    file = models.OneToOneField(File, on_delete=models.SET_NULL, null=True, blank=True, related_name='upload_session')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.original_filename} ({self.status})"
+
+    @property
+    def part_count(self):
+        """Возвращает количество частей, на которые разбит файл"""
+        return max(1, math.ceil(self.total_size / self.part_size))
+
+    def expected_part_size(self, part_number):
+        """
+        Возвращает ожидаемый размер части с заданным номером.
+        Все части, кроме последней, имеют размер part_size.
+        """
+        if part_number < self.part_count:
+            return self.part_size
+        return self.total_size - self.part_size * (self.part_count - 1)
+
+
+class UploadPart(models.Model):
+    """
+    Загруженная часть сессии UploadSession.
+    Хранит ETag, который MinIO вернул для части; нужен при завершении загрузки.
+    """
+    session = models.ForeignKey(UploadSession, on_delete=models.CASCADE, related_name='parts')
+    part_number = models.PositiveIntegerField()
+    etag = models.CharField(max_length=100)
+    size = models.BigIntegerField()
+    uploaded_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['part_number']
+        constraints = [
+            models.UniqueConstraint(fields=['session', 'part_number'], name='uploadpart_session_part_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.session_id} #{self.part_number}"
+
+
+class StorageUsage(models.Model):
+    """
+    Счетчики использования хранилища пользователем.
+    Поддерживаются инкрементально при создании и удалении File (см. signals.py),
+    поэтому информация о хранилище читается одной строкой.
+    reserved_bytes - место, зарезервированное незавершенными загрузками.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='storage_usage')
+    used_bytes = models.BigIntegerField(default=0)
+    reserved_bytes = models.BigIntegerField(default=0)
+    file_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.used_bytes} bytes"
+
+
+class QuotaReservation(models.Model):
+    """
+    Резерв квоты загрузки без сессии (FileViewSet.create, bulk_upload, загрузка по хешу)
+    на время обработки запроса. По этим строкам и активным сессиям quota.reconcile
+    пересчитывает reserved_bytes, не теряя резервы выполняющихся загрузок.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='quota_reservations')
+    size = models.BigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.size} bytes reserved"
+
+
+class Job(models.Model):
+    """
+    Фоновая задача в очереди на PostgreSQL (см. jobs.py и manage.py run_workers).
+    Воркеры забирают задачи через SELECT ... FOR UPDATE SKIP LOCKED, поэтому
+    внешний брокер не нужен, а задача, поставленная в транзакции, становится
+    видна воркерам только вместе с ее данными.
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=100)  # Имя обработчика, зарегистрированного через jobs.handler
+    payload = models.JSONField(default=dict, blank=True)  # Именованные аргументы обработчика
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    priority = models.SmallIntegerField(default=0)  # Меньшее значение выполняется раньше
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)  # Не раньше этого времени (повтор с задержкой)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)  # Аренда: после истечения задача возвращается в очередь
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    wait_ms = models.FloatField(null=True, blank=True)  # Ожидание в очереди до первой попытки
+    duration_ms = models.FloatField(null=True, blank=True)  # Время выполнения последней попытки
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            # Выборка следующей задачи: только строки в очереди, в порядке выполнения
+            models.Index(fields=['priority', 'run_after', 'id'], name='job_queued_idx',
+                         condition=models.Q(status='queued')),
+            models.Index(fields=['locked_until'], name='job_running_idx',
+                         condition=models.Q(status='running')),
+            models.Index(fields=['status', 'finished_at'], name='job_finished_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.id} ({self.status})"
+
+
+class ObjectDeletion(models.Model):
+    """
+    Ключ объекта MinIO, ожидающий удаления (см. deletions.py).
+    Строка создается в транзакции, удаляющей последнюю ссылку на объект, поэтому
+    откат транзакции отменяет и удаление; сами объекты удаляются фоновой задачей
+    пачками через multi-object delete.
+    """
+    object_name = models.CharField(max_length=1024, unique=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return self.object_name
+
+
+class FileContent(models.Model):
+    """
+    Текст, извлеченный из документа для полнотекстового поиска (см. content.py).
+    Хранится отдельно от File, чтобы списки файлов не читали текст документов;
+    триггер PostgreSQL добавляет текст в File.search_vector (миграция 0014).
+    source_sha256 - хеш содержимого, из которого извлечен текст: при его
+    расхождении с File.sha256 файл извлекается заново.
+    """
+    STATUS_CHOICES = [
+        ('done', 'Done'),
+        ('skipped', 'Skipped'),  # формат не поддерживается или файл слишком большой
+        ('failed', 'Failed'),  # документ поврежден; повторно не обрабатывается
+    ]
+
+    file = models.OneToOneField(File, on_delete=models.CASCADE, primary_key=True, related_name='content')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='done')
+    text = models.TextField(blank=True)  # Не длиннее CONTENT_MAX_CHARS символов
+    source_sha256 = models.CharField(max_length=64)
+    error = models.TextField(blank=True)
+    extracted_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.file_id}: {self.status}, {len(self.text)} chars"
+
+
+class DeadlineEntry(models.Model):
+    """
+    Строка материализованной ленты сроков: предстоящее задание курса, в котором
+    пользователь учится или преподает, и состояние сдачи (его файлы задания).
+    Лента читается одним диапазоном индекса (user, due_date) без обхода курсов
+    и файлов; строки обновляет deadlines.py при изменении заданий, состава
+    курса и файлов пользователя.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='deadlines', db_index=False)
+    assignment = models.ForeignKey(Assignment, on_delete=models.CASCADE, related_name='deadline_entries')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='deadline_entries')
+    due_date = models.DateTimeField()  # Копия Assignment.due_date для сортировки по индексу
+    submitted_files = models.PositiveIntegerField(default=0)
+    last_submitted_at = models.DateTimeField(null=True, blank=True)
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'assignment'], name='deadline_user_assignment_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'due_date'], name='deadline_user_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.assignment_id} due {self.due_date}"
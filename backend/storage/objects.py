@@ -0,0 +1,272 @@
+import io
+import json
+import logging
+from urllib.parse import urlsplit, urlunsplit
+from minio.datatypes import Part
+from minio.deleteobjects import DeleteObject
+from minio.error import S3Error
+from minio_storage.storage import MinioStorage
+
+logger = logging.getLogger(__name__)
+
+_public_client = None
+
+
+class UploadNotFound(Exception):
+    """multipart-загрузка уже завершена или отменена (NoSuchUpload)"""
+
+
+def get_media_storage():
+    """
+    Возвращает хранилище MinIO, используемое полем File.file.
+
+    Returns:
+        MinioMediaStorage: Экземпляр хранилища с настроенным клиентом и бакетом
+    """
+    from .models import File
+    return File._meta.get_field('file').storage
+
+
+def get_client():
+    """Возвращает клиент MinIO хранилища медиафайлов"""
+    return get_media_storage().client
+
+
+def get_bucket_name():
+    """Возвращает имя бакета для медиафайлов"""
+    return get_media_storage().bucket_name
+
+
+def put_object(object_name, data, content_type=None):
+    """
+    Загружает объект целиком одним запросом (для небольших файлов).
+
+    Returns:
+        str: ETag объекта
+    """
+    result = get_client().put_object(
+        get_bucket_name(), object_name, io.BytesIO(data), len(data),
+        content_type=content_type or 'application/octet-stream')
+    return result.etag
+
+
+def create_multipart_upload(object_name, content_type=None):
+    """
+    Начинает multipart-загрузку объекта в MinIO.
+
+    Args:
+        object_name (str): Ключ объекта в бакете
+        content_type (str): MIME-тип объекта
+
+    Returns:
+        str: Идентификатор загрузки (uploadId)
+    """
+    headers = {'Content-Type': content_type or 'application/octet-stream'}
+    upload_id = get_client()._create_multipart_upload(get_bucket_name(), object_name, headers)
+    logger.debug(f"Multipart upload started for {object_name}: {upload_id}")
+    return upload_id
+
+
+def upload_part(object_name, upload_id, part_number, data):
+    """
+    Загружает одну часть multipart-загрузки.
+
+    Args:
+        object_name (str): Ключ объекта в бакете
+        upload_id (str): Идентификатор загрузки
+        part_number (int): Номер части (начиная с 1)
+        data (bytes): Содержимое части
+
+    Returns:
+        str: ETag загруженной части
+    """
+    return get_client()._upload_part(get_bucket_name(), object_name, data, None, upload_id, part_number)
+
+
+def complete_multipart_upload(object_name, upload_id, parts):
+    """
+    Завершает multipart-загрузку, собирая объект из частей.
+
+    Args:
+        object_name (str): Ключ объекта в бакете
+        upload_id (str): Идентификатор загрузки
+        parts (list): Пары (номер части, ETag) в порядке возрастания номеров
+
+    Returns:
+        str: ETag итогового объекта
+
+    Raises:
+        UploadNotFound: Если загрузка уже завершена или отменена
+    """
+    try:
+        result = get_client()._complete_multipart_upload(
+            get_bucket_name(), object_name, upload_id,
+            [Part(part_number, etag) for part_number, etag in parts])
+    except S3Error as e:
+        if e.code == 'NoSuchUpload':
+            raise UploadNotFound(upload_id) from e
+        raise
+    logger.debug(f"Multipart upload completed for {object_name}: {upload_id}")
+    return (result.etag or '').strip('"')
+
+
+def abort_multipart_upload(object_name, upload_id):
+    """
+    Отменяет multipart-загрузку и освобождает уже загруженные части.
+    Ошибки только логируются: отмена вызывается при очистке и не должна ее прерывать.
+    """
+    try:
+        get_client()._abort_multipart_upload(get_bucket_name(), object_name, upload_id)
+        logger.debug(f"Multipart upload aborted for {object_name}: {upload_id}")
+    except Exception as e:
+        logger.warning(f"Could not abort multipart upload {upload_id} for {object_name}: {str(e)}")
+
+
+def stat_object(object_name):
+    """
+    Возвращает метаданные объекта без чтения его содержимого.
+
+    Returns:
+        minio.datatypes.Object: Размер, ETag, Content-Type и время изменения объекта
+    """
+    return get_client().stat_object(get_bucket_name(), object_name)
+
+
+def get_object(object_name, offset=0, length=0):
+    """
+    Открывает чтение объекта (или его диапазона) из MinIO.
+    Ответ нужно закрыть и вернуть соединение в пул: response.close(); response.release_conn().
+
+    Args:
+        object_name (str): Ключ объекта в бакете
+        offset (int): Смещение первого байта
+        length (int): Количество байт (0 - до конца объекта)
+
+    Returns:
+        urllib3.response.BaseHTTPResponse: Потоковый ответ MinIO
+    """
+    return get_client().get_object(get_bucket_name(), object_name, offset=offset, length=length)
+
+
+def get_available_object_name(name, max_length=None):
+    """Возвращает свободный ключ объекта, добавляя суффикс при совпадении имен"""
+    return get_media_storage().get_available_name(name, max_length=max_length)
+
+
+def remove_object(object_name):
+    """Удаляет объект из бакета; отсутствие объекта не считается ошибкой"""
+    get_client().remove_object(get_bucket_name(), object_name)
+
+
+def remove_objects(object_names):
+    """
+    Удаляет объекты пачкой (S3 multi-object delete, до 1000 ключей за запрос).
+    Отсутствующие объекты не считаются ошибкой.
+
+    Returns:
+        dict: Ключ -> сообщение об ошибке для объектов, которые удалить не удалось
+    """
+    errors = get_client().remove_objects(get_bucket_name(), (DeleteObject(name) for name in object_names))
+    # Запросы выполняются по мере чтения итератора ошибок
+    return {error.name: f"{error.code}: {error.message}" for error in errors}
+
+
+def list_objects(prefix):
+    """
+    Перечисляет объекты с префиксом постранично (ListObjectsV2 по 1000 ключей)
+    в лексикографическом порядке байт UTF-8 ключа.
+
+    Yields:
+        minio.datatypes.Object: Ключ, размер и время изменения объекта
+    """
+    yield from get_client().list_objects(get_bucket_name(), prefix=prefix, recursive=True)
+
+
+def get_bucket_policy():
+    """
+    Returns:
+        dict: Политика доступа бакета медиафайлов или None, если политика не задана
+    """
+    try:
+        policy = get_client().get_bucket_policy(get_bucket_name())
+    except S3Error as e:
+        if e.code == 'NoSuchBucketPolicy':
+            return None
+        raise
+    return json.loads(policy) if policy else None
+
+
+def set_bucket_policy(policy):
+    """Заменяет политику бакета медиафайлов; пустая политика удаляется"""
+    if policy and policy.get('Statement'):
+        get_client().set_bucket_policy(get_bucket_name(), json.dumps(policy))
+    else:
+        get_client().delete_bucket_policy(get_bucket_name())
+
+
+def anonymous_statements(policy):
+    """
+    Разрешающие правила политики для анонимных запросов (Principal "*").
+
+    Returns:
+        list: Правила с Effect=Allow, доступные без подписи
+    """
+    statements = (policy or {}).get('Statement', [])
+    if isinstance(statements, dict):
+        statements = [statements]
+    public = []
+    for statement in statements:
+        principal = statement.get('Principal')
+        if isinstance(principal, dict):
+            principal = principal.get('AWS')
+        principals = principal if isinstance(principal, list) else [principal]
+        if statement.get('Effect') == 'Allow' and '*' in principals:
+            public.append(statement)
+    return public
+
+
+def get_public_client():
+    """
+    Возвращает клиент MinIO, подписывающий URL для публичного адреса хранилища.
+
+    Браузер обращается к MinIO через nginx (MINIO_STORAGE_MEDIA_URL), поэтому
+    подпись должна считаться для публичного хоста, а не для внутреннего 'minio:9000'.
+    """
+    global _public_client
+    storage = get_media_storage()
+    if not storage.base_url:
+        return storage.client
+    if _public_client is None:
+        _public_client = getattr(storage, 'base_url_client', None) or \
+            MinioStorage._create_base_url_client(storage.client, storage.bucket_name, storage.base_url)
+    return _public_client
+
+
+def presigned_url(method, object_name, expires, request_date=None, response_headers=None, internal=False):
+    """
+    Формирует presigned URL для объекта с учетом публичного адреса хранилища.
+
+    Args:
+        method (str): HTTP-метод ('GET' или 'PUT')
+        object_name (str): Ключ объекта в бакете
+        expires (timedelta): Срок действия подписи
+        request_date (datetime): Время подписи (по умолчанию текущее)
+        response_headers (dict): Переопределение заголовков ответа (response-content-*)
+        internal (bool): Подписать для внутреннего адреса MinIO (запросы от nginx)
+
+    Returns:
+        str: Подписанный URL
+    """
+    storage = get_media_storage()
+    client = storage.client if internal else get_public_client()
+    url = client.get_presigned_url(
+        method, storage.bucket_name, object_name, expires,
+        response_headers=response_headers, request_date=request_date)
+    if storage.base_url and not internal:
+        # Как и MinioStorage: путь бакета заменяется путем из MINIO_STORAGE_MEDIA_URL
+        url_parts = urlsplit(url)
+        base_path = urlsplit(storage.base_url).path
+        key_path = url_parts.path[len(storage.bucket_name) + 1:]
+        url = urlunsplit((url_parts.scheme, url_parts.netloc, base_path + key_path,
+                          url_parts.query, url_parts.fragment))
+    return url
@@ -0,0 +1,155 @@
+import base64
+import json
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Курсорная (keyset) пагинация по составному ключу сортировки.
+
+    Курсор хранит значения ключа последней строки страницы, и следующая
+    страница выбирается условием "ключ меньше курсора" по индексу, поэтому
+    глубокие страницы стоят столько же, сколько первая (в отличие от OFFSET).
+    Все поля ordering должны сортироваться в одном направлении, последнее
+    поле должно быть уникальным (обычно id).
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+    ordering = ('-uploaded_at', '-id')
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+
+        cursor = self.decode_cursor(request, queryset.model)
+        reverse = bool(cursor and cursor['reverse'])
+        ordering = self._reversed_ordering() if reverse else list(self.ordering)
+
+        if cursor:
+            queryset = queryset.filter(self._position_filter(cursor['values'], reverse))
+        rows = list(queryset.order_by(*ordering)[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.has_next = has_more if not reverse else True
+        self.has_previous = bool(cursor) if not reverse else has_more
+        self.page = rows
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def _fields(self):
+        return [field.lstrip('-') for field in self.ordering]
+
+    def _descending(self):
+        return self.ordering[0].startswith('-')
+
+    def _reversed_ordering(self):
+        return [field[1:] if field.startswith('-') else f'-{field}' for field in self.ordering]
+
+    def _position_filter(self, values, reverse):
+        """
+        Строит условие "строго после позиции" для составного ключа.
+        Ведущее условие по первому полю (<= / >=) позволяет использовать диапазон индекса.
+        """
+        fields = self._fields()
+        forward_lookup = 'lt' if self._descending() else 'gt'
+        backward_lookup = 'gt' if forward_lookup == 'lt' else 'lt'
+        lookup = backward_lookup if reverse else forward_lookup
+
+        condition = Q()
+        for i in range(len(fields)):
+            term = Q(**{f'{fields[j]}': values[j] for j in range(i)})
+            term &= Q(**{f'{fields[i]}__{lookup}': values[i]})
+            condition |= term
+        return Q(**{f'{fields[0]}__{lookup}e': values[0]}) & condition
+
+    def _encode_value(self, value):
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        return value
+
+    def _decode_value(self, model, field_name, value):
+        try:
+            return model._meta.get_field(field_name).to_python(value)
+        except FieldDoesNotExist:
+            # Аннотированные поля (например, ранг поиска) хранятся как есть
+            return value
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            values = [self._decode_value(model, name, value)
+                      for name, value in zip(self._fields(), data['v'], strict=True)]
+            return {'values': values, 'reverse': bool(data.get('r'))}
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, obj, reverse=False):
+        values = [self._encode_value(getattr(obj, field)) for field in self._fields()]
+        data = {'v': values}
+        if reverse:
+            data['r'] = 1
+        encoded = base64.urlsafe_b64encode(json.dumps(data).encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_data(self, data):
+        return {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'previous': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+
+class FileCursorPagination(KeysetPagination):
+    """Пагинация списков файлов: новые сначала, ключ (uploaded_at, id)"""
+    ordering = ('-uploaded_at', '-id')
+
+
+class FileSearchPagination(KeysetPagination):
+    """Пагинация результатов поиска: по убыванию релевантности, ключ (score, id)"""
+    ordering = ('-score', '-id')
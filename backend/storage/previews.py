@@ -0,0 +1,267 @@
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from .models import File
+from . import objects, thumbnails, workers as job_workers
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_PREFIX = 'previews'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def is_previewable(mime_type, size):
+    """Возвращает True, если для файла с таким типом и размером строятся превью"""
+    return (bool(mime_type) and mime_type in thumbnails.supported_mime_types()
+            and 0 < (size or 0) <= settings.PREVIEW_MAX_SOURCE_SIZE)
+
+
+def preview_key(object_name, size_name):
+    """
+    Ключ превью в бакете выводится из ключа исходного объекта, поэтому
+    файлы с общим содержимым (один блоб) используют одни и те же превью.
+    """
+    return f'{PREVIEW_PREFIX}/{object_name}/{size_name}.{thumbnails.EXTENSION}'
+
+
+def preview_names(file_obj):
+    """
+    Returns:
+        dict: Имя размера -> ключ превью; пустой, если превью еще не готовы
+    """
+    if file_obj.preview_status != 'ready' or not file_obj.file:
+        return {}
+    return {size: preview_key(file_obj.file.name, size) for size in file_obj.preview_sizes}
+
+
+def remove_previews(object_name):
+    """Удаляет превью объекта всех настроенных размеров; отсутствующие пропускаются"""
+    for size in settings.PREVIEW_SIZES:
+        try:
+            objects.remove_object(preview_key(object_name, size))
+        except Exception as e:
+            logger.warning(f"Could not remove preview {size} of {object_name}: {str(e)}")
+
+
+def backfill(batch_size=1000):
+    """
+    Ставит в очередь файлы, загруженные до появления превью.
+
+    Returns:
+        int: Количество поставленных в очередь файлов
+    """
+    queued = 0
+    while True:
+        ids = list(File.objects.filter(
+            preview_status='none',
+            mime_type__in=thumbnails.supported_mime_types(),
+            file_size__gt=0,
+            file_size__lte=settings.PREVIEW_MAX_SOURCE_SIZE,
+        ).order_by('id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return queued
+        queued += File.objects.filter(id__in=ids, preview_status='none').update(preview_status='pending')
+
+
+def requeue():
+    """
+    Возвращает в очередь файлы с ошибкой и файлы, обработка которых прервалась
+    (остановка воркера). Повторная генерация перезаписывает те же ключи.
+
+    Returns:
+        int: Количество файлов, снова ожидающих генерации
+    """
+    return File.objects.filter(preview_status__in=['processing', 'failed']).update(preview_status='pending')
+
+
+def claim_batch(batch_size):
+    """
+    Забирает ожидающие файлы для обработки.
+    Строки, заблокированные другим воркером, пропускаются (SKIP LOCKED),
+    поэтому несколько воркеров не обрабатывают один файл.
+
+    Returns:
+        list: Файлы со статусом 'processing'
+    """
+    with transaction.atomic():
+        ids = list(File.objects.select_for_update(skip_locked=True)
+                   .filter(preview_status='pending')
+                   .order_by('id').values_list('id', flat=True)[:batch_size])
+        if ids:
+            File.objects.filter(id__in=ids).update(preview_status='processing')
+    return list(File.objects.filter(id__in=ids).order_by('id'))
+
+
+def _download(object_name):
+    response = objects.get_object(object_name)
+    try:
+        return response.read()
+    finally:
+        response.close()
+        response.release_conn()
+
+
+def _finish(file_obj, status, sizes):
+    updated = File.objects.filter(pk=file_obj.pk, preview_status='processing').update(
+        preview_status=status, preview_sizes=sizes)
+    if not updated:
+        # Файл удален во время генерации
+        if status == 'ready' and not File.objects.filter(file=file_obj.file.name).exists():
+            remove_previews(file_obj.file.name)
+        return
+    file_obj.preview_status = status
+    file_obj.preview_sizes = sizes
+    if status == 'ready':
+        # Превью входят в закэшированные списки файлов
+        from .signals import invalidate_file_scopes
+        invalidate_file_scopes(file_obj, shared=file_obj.is_public)
+
+
+def process_batch(files, executor):
+    """
+    Строит превью для файлов: загрузка и выгрузка в MinIO выполняются здесь,
+    декодирование и масштабирование - в процессах executor, параллельно по ядрам.
+
+    Returns:
+        dict: {'ready': число готовых, 'failed': число ошибок}
+    """
+    sizes = dict(settings.PREVIEW_SIZES)
+    stats = {'ready': 0, 'failed': 0}
+    futures = {}
+    for file_obj in files:
+        name = file_obj.file.name
+        # Превью того же содержимого (дедупликация) уже построены для другого файла
+        existing = (File.objects.filter(file=name, preview_status='ready').exclude(pk=file_obj.pk)
+                    .values_list('preview_sizes', flat=True).first())
+        if existing is not None and set(existing) >= set(sizes):
+            _finish(file_obj, 'ready', existing)
+            stats['ready'] += 1
+            continue
+        try:
+            data = _download(name)
+        except Exception as e:
+            logger.warning(f"Could not read file {file_obj.id} for previews: {str(e)}")
+            _finish(file_obj, 'failed', [])
+            stats['failed'] += 1
+            continue
+        future = executor.submit(thumbnails.render, data, file_obj.mime_type, sizes, settings.PREVIEW_QUALITY)
+        futures[future] = file_obj
+
+    broken = None
+    for future in as_completed(futures):
+        file_obj = futures[future]
+        try:
+            rendered = future.result()
+            for size, content in rendered.items():
+                objects.put_object(preview_key(file_obj.file.name, size), content, thumbnails.CONTENT_TYPE)
+        except Exception as e:
+            logger.warning(f"Preview generation failed for file {file_obj.id}: {str(e)}")
+            _finish(file_obj, 'failed', [])
+            stats['failed'] += 1
+            if isinstance(e, BrokenProcessPool):
+                broken = e
+            continue
+        _finish(file_obj, 'ready', sorted(rendered))
+        stats['ready'] += 1
+        logger.debug(f"Previews generated for file {file_obj.id}")
+    if broken:
+        raise broken
+    return stats
+
+
+def _create_executor(workers):
+    # spawn, а не fork: дочерние процессы не наследуют соединения с БД и клиент MinIO
+    # (модуль thumbnails от Django не зависит)
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+
+
+def renderer_count():
+    """
+    Процессов рендеринга в пуле этого процесса: PREVIEW_WORKERS или, по умолчанию,
+    ядра, поделенные между процессами run_workers, чтобы все пулы вместе
+    не запускали больше рендереров, чем есть ядер.
+    """
+    return settings.PREVIEW_WORKERS or max(1, (os.cpu_count() or 1) // job_workers.process_count)
+
+
+def get_executor():
+    """Пул процессов рендеринга для фоновых задач; создается при первом использовании"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = _create_executor(renderer_count())
+        return _executor
+
+
+def _discard_executor(executor):
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def generate(file_id):
+    """
+    Строит превью одного файла (обработчик фоновой задачи, см. tasks.py).
+    Файл без ожидающих превью пропускается, поэтому повторный запуск безопасен.
+
+    Returns:
+        dict: {'ready', 'failed'} или None, если файл не ожидает генерации
+    """
+    if not File.objects.filter(pk=file_id, preview_status='pending').update(preview_status='processing'):
+        return None
+    file_obj = File.objects.get(pk=file_id)
+    executor = get_executor()
+    try:
+        return process_batch([file_obj], executor)
+    except BrokenProcessPool:
+        # Пул пересоздается, а файл снова ждет генерации: задача будет повторена
+        _discard_executor(executor)
+        File.objects.filter(pk=file_id).update(preview_status='pending', preview_sizes=[])
+        raise
+
+
+def run(workers=None, batch_size=None, once=False, interval=5.0):
+    """
+    Цикл воркера превью: забирает ожидающие файлы пачками и обрабатывает их,
+    пока есть работа; без работы ждет interval секунд (или завершается при once).
+
+    Returns:
+        dict: Суммарные {'ready', 'failed'} за время работы
+    """
+    workers = workers or renderer_count()
+    batch_size = batch_size or workers * 2
+    totals = {'ready': 0, 'failed': 0}
+    executor = _create_executor(workers)
+    try:
+        while True:
+            close_old_connections()
+            files = claim_batch(batch_size)
+            if not files:
+                if once:
+                    break
+                time.sleep(interval)
+                continue
+            try:
+                stats = process_batch(files, executor)
+            except BrokenProcessPool:
+                # Дочерний процесс аварийно завершился (например, по нехватке памяти)
+                logger.error("Preview process pool is broken, restarting it")
+                executor.shutdown(wait=False, cancel_futures=True)
+                executor = _create_executor(workers)
+                continue
+            for key in totals:
+                totals[key] += stats[key]
+            logger.info(f"Preview batch done: {stats['ready']} ready, {stats['failed']} failed")
+    finally:
+        executor.shutdown(cancel_futures=True)
+    return totals
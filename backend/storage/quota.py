@@ -0,0 +1,174 @@
+import logging
+from contextlib import contextmanager
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from .models import File, QuotaReservation, StorageUsage, UploadSession
+from . import caching
+
+logger = logging.getLogger(__name__)
+
+
+class QuotaExceeded(Exception):
+    """Загрузка превышает квоту хранилища пользователя"""
+
+
+def get_storage_limit(user):
+    """Возвращает лимит хранилища пользователя в байтах"""
+    return settings.STORAGE_QUOTA_BYTES
+
+
+def compute_usage(user_id):
+    """
+    Считает фактическое использование по таблицам File и UploadSession.
+
+    Returns:
+        dict: used_bytes, file_count и reserved_bytes (активные сессии и резервы
+        выполняющихся загрузок без сессии)
+    """
+    files = File.objects.filter(uploaded_by_id=user_id).aggregate(
+        used_bytes=Sum('file_size'), file_count=Count('id'))
+    sessions = UploadSession.objects.filter(user_id=user_id, status='active').aggregate(
+        reserved_bytes=Sum('total_size'))
+    requests = QuotaReservation.objects.filter(user_id=user_id).aggregate(reserved_bytes=Sum('size'))
+    return {
+        'used_bytes': files['used_bytes'] or 0,
+        'file_count': files['file_count'] or 0,
+        'reserved_bytes': (sessions['reserved_bytes'] or 0) + (requests['reserved_bytes'] or 0),
+    }
+
+
+def get_usage(user):
+    """
+    Возвращает строку счетчиков пользователя, создавая ее при первом обращении.
+
+    Returns:
+        StorageUsage: Счетчики использования хранилища
+    """
+    try:
+        return StorageUsage.objects.get(user_id=user.pk)
+    except StorageUsage.DoesNotExist:
+        usage, _ = StorageUsage.objects.get_or_create(user_id=user.pk, defaults=compute_usage(user.pk))
+        return usage
+
+
+def usage_summary(user):
+    """
+    Возвращает сводку использования хранилища для StorageViewSet.info.
+
+    Returns:
+        dict: {'used': байт занято, 'total': лимит, 'used_percentage': процент}
+    """
+    used = get_usage(user).used_bytes
+    limit = get_storage_limit(user)
+    used_percentage = (used / limit) * 100 if limit > 0 else 0
+    return {
+        'used': used,
+        'total': limit,
+        'used_percentage': round(used_percentage, 2),
+    }
+
+
+def apply_usage(user_id, bytes_delta, count_delta):
+    """
+    Атомарно изменяет счетчики пользователя на заданные величины.
+    Вызывается из обработчиков сигналов File в транзакции сохранения/удаления.
+    """
+    updated = StorageUsage.objects.filter(user_id=user_id).update(
+        used_bytes=Greatest(F('used_bytes') + bytes_delta, 0),
+        file_count=Greatest(F('file_count') + count_delta, 0))
+    if not updated and count_delta > 0:
+        # Строки еще нет: создаем ее по фактическим данным (они уже включают новый файл).
+        # При удалении строку не создаем: она могла быть удалена каскадно вместе с пользователем
+        StorageUsage.objects.get_or_create(user_id=user_id, defaults=compute_usage(user_id))
+
+
+def reserve(user, size):
+    """
+    Атомарно резервирует место под загрузку.
+
+    Проверка и резервирование выполняются одним условным UPDATE, поэтому
+    параллельные загрузки не могут вместе превысить квоту.
+
+    Raises:
+        QuotaExceeded: Если места недостаточно
+    """
+    if size <= 0:
+        return
+    get_usage(user)
+    limit = get_storage_limit(user)
+    updated = StorageUsage.objects.filter(
+        user_id=user.pk,
+        used_bytes__lte=limit - size - F('reserved_bytes'),
+    ).update(reserved_bytes=F('reserved_bytes') + size)
+    if not updated:
+        usage = get_usage(user)
+        logger.warning(f"Quota exceeded for user {user.username}: {usage.used_bytes} used, "
+                       f"{usage.reserved_bytes} reserved, {size} requested, limit {limit} bytes")
+        raise QuotaExceeded(f"Storage quota exceeded: {usage.used_bytes} of {limit} bytes used")
+
+
+def release(user_id, size):
+    """Снимает ранее сделанное резервирование"""
+    if size <= 0:
+        return
+    StorageUsage.objects.filter(user_id=user_id).update(
+        reserved_bytes=Greatest(F('reserved_bytes') - size, 0))
+
+
+@contextmanager
+def reservation(user, size):
+    """
+    Резервирует место на время загрузки и снимает резерв по ее окончании.
+    Созданный файл к этому моменту уже учтен в used_bytes сигналом post_save.
+    Резерв записывается в QuotaReservation в одной транзакции со счетчиком,
+    поэтому reconcile видит его вместе с изменением reserved_bytes.
+    """
+    if size <= 0:
+        yield
+        return
+    with transaction.atomic():
+        reserve(user, size)
+        held = QuotaReservation.objects.create(user_id=user.pk, size=size)
+    try:
+        yield
+    finally:
+        with transaction.atomic():
+            release(user.pk, size)
+            QuotaReservation.objects.filter(pk=held.pk).delete()
+
+
+def reconcile(user_ids=None):
+    """
+    Пересчитывает счетчики по фактическим данным (SUM(file_size), активные сессии
+    и резервы выполняющихся загрузок). Резервы старше QUOTA_RESERVATION_MAX_AGE
+    оставлены завершившимися процессами и удаляются.
+
+    Args:
+        user_ids: Список пользователей для пересчета (по умолчанию все с файлами или счетчиками)
+
+    Returns:
+        int: Количество исправленных строк
+    """
+    if user_ids is None:
+        user_ids = set(File.objects.values_list('uploaded_by_id', flat=True).distinct())
+        user_ids |= set(StorageUsage.objects.values_list('user_id', flat=True))
+    fixed = 0
+    stale_before = timezone.now() - settings.QUOTA_RESERVATION_MAX_AGE
+    for user_id in sorted(user_ids):
+        with transaction.atomic():
+            usage, _ = StorageUsage.objects.select_for_update().get_or_create(user_id=user_id)
+            QuotaReservation.objects.filter(user_id=user_id, created_at__lt=stale_before).delete()
+            actual = compute_usage(user_id)
+            if any(getattr(usage, field) != value for field, value in actual.items()):
+                logger.info(f"Storage usage of user {user_id} corrected: "
+                            f"{usage.used_bytes}/{usage.file_count}/{usage.reserved_bytes} -> "
+                            f"{actual['used_bytes']}/{actual['file_count']}/{actual['reserved_bytes']}")
+                for field, value in actual.items():
+                    setattr(usage, field, value)
+                usage.save()
+                caching.bump(caching.user_scope(user_id))
+                fixed += 1
+    return fixed
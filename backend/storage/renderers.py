@@ -0,0 +1,45 @@
+from django.http import HttpResponse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # orjson необязателен: без него ответы кодирует стандартный JSONRenderer
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer, кодирующий ответ через orjson (в несколько раз быстрее json).
+
+    Результат совпадает со стандартным рендерером: даты, Decimal, UUID и ленивые
+    строки передаются в JSONEncoder DRF. Без orjson, при запросе отступов
+    (?indent, Accept: application/json; indent=N) и для типов, которые orjson
+    не кодирует, используется стандартный путь.
+    """
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            return dumps(data)
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+_encoder = JSONEncoder()
+
+
+def dumps(data):
+    """
+    Кодирует данные в JSON (bytes) так же, как JSONRenderer DRF: через orjson,
+    если он установлен, иначе через json с JSONEncoder DRF.
+    """
+    if orjson is None:
+        return JSONRenderer().render(data)
+    return orjson.dumps(data, default=_encoder.default,
+                        option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS)
+
+
+def json_response(data, status=200):
+    """HttpResponse с JSON для асинхронных представлений (замена JsonResponse с тем же кодированием, что у API)"""
+    return HttpResponse(dumps(data), status=status, content_type='application/json')
@@ -0,0 +1,174 @@
+import hashlib
+import logging
+import math
+import threading
+import time
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+logger = logging.getLogger(__name__)
+
+# Токен версии в общем кэше, меняющийся при каждом занесении токена в черный список
+VERSION_KEY = 'token-revocation:version'
+
+
+class BloomFilter:
+    """
+    Фильтр Блума над bytearray.
+    Ложноположительные ответы возможны (их доля задается error_rate),
+    ложноотрицательные - нет.
+    """
+
+    def __init__(self, capacity, error_rate):
+        capacity = max(capacity, 1)
+        self.capacity = capacity
+        self.size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hash_count = max(int(round(self.size / capacity * math.log(2))), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value):
+        # Двойное хеширование: k позиций из двух 64-битных половин одного digest
+        digest = hashlib.blake2b(value.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, value):
+        """Добавляет значение; повторно добавленные значения не увеличивают count"""
+        added = False
+        for pos in self._positions(value):
+            if not self.bits[pos >> 3] & (1 << (pos & 7)):
+                self.bits[pos >> 3] |= 1 << (pos & 7)
+                added = True
+        if added:
+            self.count += 1
+
+    def __contains__(self, value):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(value))
+
+
+class RevocationChecker:
+    """
+    Проверка jti по черному списку refresh-токенов без запроса к БД в обычном случае.
+
+    Процесс держит фильтр Блума по jti из BlacklistedToken и id последней
+    загруженной строки. Новые строки подгружаются инкрементально (id > последнего),
+    и только когда токен VERSION_KEY в общем кэше изменился. Запрос к БД по jti
+    выполняется лишь при возможном попадании в фильтр, поэтому время проверки
+    не зависит от размера таблиц.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._filter = None
+        self._last_id = 0
+        self._version = None
+        self._built_at = 0
+
+    def _rebuild(self):
+        """Строит фильтр заново по еще не истекшим токенам черного списка"""
+        queryset = BlacklistedToken.objects.filter(token__expires_at__gt=aware_utcnow())
+        expected = queryset.count()
+        bloom = BloomFilter(max(expected * 2, settings.TOKEN_REVOCATION_FILTER_CAPACITY),
+                           settings.TOKEN_REVOCATION_FILTER_ERROR_RATE)
+        last_id = BlacklistedToken.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        for jti in queryset.filter(id__lte=last_id).values_list('token__jti', flat=True).iterator(chunk_size=10000):
+            bloom.add(jti)
+        self._filter = bloom
+        self._last_id = last_id
+        self._built_at = time.monotonic()
+        logger.info(f"Token revocation filter rebuilt: {bloom.count} entries, {len(bloom.bits)} bytes")
+
+    def _load_new(self):
+        """
+        Добавляет в фильтр строки черного списка, появившиеся после последней загрузки.
+        Транзакции фиксируются не в порядке id, поэтому окно в
+        TOKEN_REVOCATION_ID_OVERLAP строк перечитывается повторно.
+        """
+        since = max(self._last_id - settings.TOKEN_REVOCATION_ID_OVERLAP, 0)
+        rows = (BlacklistedToken.objects.filter(id__gt=since)
+                .order_by('id').values_list('id', 'token__jti'))
+        for row_id, jti in rows.iterator(chunk_size=10000):
+            self._filter.add(jti)
+            self._last_id = max(self._last_id, row_id)
+
+    def _sync(self):
+        try:
+            version = cache.get(VERSION_KEY)
+        except Exception as e:
+            logger.warning(f"Token revocation version unavailable: {str(e)}")
+            version = None
+        # Без версии в кэше нельзя знать, что ничего не изменилось: подгружаем изменения из БД
+        stale = (self._filter is None
+                 or self._filter.count > self._filter.capacity
+                 or time.monotonic() - self._built_at > settings.TOKEN_REVOCATION_FILTER_REBUILD_INTERVAL)
+        if stale:
+            self._rebuild()
+        elif version is None or version != self._version:
+            self._load_new()
+        self._version = version
+
+    def is_revoked(self, jti):
+        """
+        Returns:
+            bool: True, если токен с этим jti находится в черном списке
+        """
+        with self._lock:
+            self._sync()
+            maybe_revoked = jti in self._filter
+        if not maybe_revoked:
+            return False
+        return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+    def reset(self):
+        with self._lock:
+            self._filter = None
+            self._last_id = 0
+            self._version = None
+
+
+checker = RevocationChecker()
+
+
+def notify_revoked():
+    """Сообщает всем процессам, что черный список пополнился"""
+    try:
+        # Случайный токен, а не счетчик: после вытеснения ключа значение не повторится
+        cache.set(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+    except Exception as e:
+        logger.warning(f"Could not publish token revocation: {str(e)}")
+
+
+def prune_expired_tokens(batch_size=5000, pause=0.0, now=None):
+    """
+    Удаляет истекшие токены из OutstandingToken и BlacklistedToken пачками.
+
+    Пачка выбирается по первичному ключу (старые id истекают первыми), поэтому
+    на expires_at не нужен индекс, а каждая транзакция короткая и не держит
+    блокировки на всей таблице.
+
+    Args:
+        batch_size (int): Количество токенов в одной пачке
+        pause (float): Пауза между пачками в секундах (снижает нагрузку на БД)
+
+    Returns:
+        int: Количество удаленных OutstandingToken
+    """
+    now = now or aware_utcnow()
+    deleted = 0
+    while True:
+        ids = list(OutstandingToken.objects.filter(expires_at__lte=now)
+                   .order_by('id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        BlacklistedToken.objects.filter(token_id__in=ids).delete()
+        OutstandingToken.objects.filter(id__in=ids).delete()
+        deleted += len(ids)
+        logger.debug(f"Pruned {len(ids)} expired tokens")
+        if pause:
+            time.sleep(pause)
+    return deleted
@@ -0,0 +1,68 @@
+import re
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db import connections
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import Cast
+
+# Конфигурация и разбиение на слова совпадают с триггером search_vector (миграции 0013, 0014)
+SEARCH_CONFIG = 'simple'
+TOKEN_RE = re.compile(r'[^\W_]+')
+MAX_QUERY_LENGTH = 200
+MAX_TERMS = 8
+# Нечеткое сравнение коротких строк по триграммам дает случайные совпадения
+MIN_TRIGRAM_LENGTH = 3
+
+
+def prefix_query(text):
+    """
+    Строит tsquery, в котором каждое слово запроса совпадает как префикс
+    ('лаб рабо' находит 'лабораторная работа').
+
+    Returns:
+        SearchQuery: Запрос или None, если в тексте нет слов
+    """
+    terms = TOKEN_RE.findall(text.lower())[:MAX_TERMS]
+    if not terms:
+        return None
+    # Слова состоят только из букв и цифр, поэтому синтаксис tsquery в них невозможен
+    return SearchQuery(' & '.join(f'{term}:*' for term in terms), search_type='raw', config=SEARCH_CONFIG)
+
+
+def search_files(queryset, text):
+    """
+    Оставляет файлы, подходящие под запрос, и добавляет к ним оценку релевантности score.
+
+    На PostgreSQL совпадением считается полнотекстовое совпадение имени, описания
+    или извлеченного текста документа (GIN-индекс по search_vector) либо похожее на запрос слово в имени файла
+    (pg_trgm, GIN-индекс по триграммам original_filename) - так находятся имена с опечатками.
+    score - ранг ts_rank (имя весит больше описания, описание - больше текста)
+    плюс триграммная похожесть имени.
+    На других СУБД выполняется поиск подстроки без ранжирования.
+
+    Args:
+        queryset: Файлы, доступные пользователю
+        text (str): Поисковый запрос
+
+    Returns:
+        QuerySet: Файлы с аннотацией score
+    """
+    text = text.strip()[:MAX_QUERY_LENGTH]
+    if connections[queryset.db].vendor != 'postgresql':
+        return (queryset.filter(Q(original_filename__icontains=text) | Q(description__icontains=text)
+                                | Q(content__text__icontains=text))
+                .annotate(score=Value(0.0, output_field=FloatField())))
+
+    query = prefix_query(text)
+    match = Q()
+    score = Value(0.0, output_field=FloatField())
+    if query is not None:
+        match |= Q(search_vector=query)
+        score = SearchRank(F('search_vector'), query)
+    if len(text) >= MIN_TRIGRAM_LENGTH:
+        match |= Q(original_filename__trigram_word_similar=text)
+        score = score + TrigramWordSimilarity(text, 'original_filename')
+    if not match:
+        return queryset.none()
+    # ts_rank и word_similarity возвращают real: приводим к double precision, чтобы значение
+    # в курсоре пагинации точно совпадало с пересчитанным в следующем запросе
+    return queryset.annotate(score=Cast(score, FloatField())).filter(match)
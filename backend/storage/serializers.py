@@ -1,11 +1,76 @@
 import logging
 from rest_framework import serializers
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
 from django.contrib.auth import authenticate
-from .models import User, Course, Assignment, File
+from django.conf import settings
+from django.utils import timezone
+from .models import User, Course, Assignment, File, UploadSession, DeadlineEntry
+from . import previews, signing
+from .blobs import SHA256_RE
+from .hashers import HashingOverloaded
+from .authentication import UserRefreshToken, user_claims
 
 logger = logging.getLogger(__name__)
 
-class UserSerializer(serializers.ModelSerializer):
+
+def _split_names(value):
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+def requested_fields(request, serializer_class):
+    """
+    Поля ответа, выбранные параметрами запроса ?fields= (только эти поля)
+    и ?omit= (все, кроме этих); имена через запятую. Действует только для чтения.
+
+    Args:
+        request: Запрос DRF или Django (асинхронные представления)
+        serializer_class: Сериализатор с Meta.fields
+
+    Returns:
+        list: Имена полей в порядке Meta.fields или None, если параметры не заданы
+
+    Raises:
+        serializers.ValidationError: Если указано неизвестное поле
+    """
+    if request is None or request.method not in ('GET', 'HEAD'):
+        return None
+    params = request.query_params if hasattr(request, 'query_params') else request.GET
+    only, omit = params.get('fields'), params.get('omit')
+    if not only and not omit:
+        return None
+    available = serializer_class.Meta.fields
+    selected = _split_names(only) if only else set(available)
+    excluded = _split_names(omit) if omit else set()
+    unknown = (selected | excluded) - set(available)
+    if unknown:
+        raise serializers.ValidationError({'error': f"Unknown fields: {', '.join(sorted(unknown))}. "
+                                                    f"Available fields: {', '.join(available)}"})
+    return [name for name in available if name in selected and name not in excluded]
+
+
+class SparseFieldsMixin:
+    """
+    Оставляет в ответе только поля, выбранные ?fields=/?omit= (см. requested_fields).
+    Отброшенные поля не создаются, поэтому их методы (SerializerMethodField),
+    связанные объекты (source через '__') и форматирование не вычисляются.
+    Вложенные сериализаторы параметры запроса не учитывают.
+    """
+    def get_fields(self):
+        fields = super().get_fields()
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        if parent is not None:
+            return fields
+        selected = requested_fields(self.context.get('request'), type(self))
+        if selected is None:
+            return fields
+        return {name: field for name, field in fields.items() if name in selected}
+
+
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Сериализатор для модели User.
     Предоставляет полную информацию о пользователе, исключая пароль.
@@ -72,6 +137,8 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
             user.save()
             logger.info(f"New user registered: {user.username}")
             return user
+        except HashingOverloaded:
+            raise
         except Exception as e:
             logger.error(f"Error creating user: {str(e)}")
             raise serializers.ValidationError("Error creating user")
@@ -128,21 +195,62 @@ class UserLoginSerializer(serializers.Serializer):
             else:
                 logger.warning("Authentication failed - invalid credentials")
                 raise serializers.ValidationError("Invalid credentials")
+        except HashingOverloaded:
+            # Перегрузка пула хеширования - ответ 429, а не ошибка учетных данных
+            raise
         except Exception as e:
             logger.error(f"Authentication error: {str(e)}")
             raise serializers.ValidationError("Authentication error")
 
-class CourseSerializer(serializers.ModelSerializer):
+class UserTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Выпуск токенов для /api/token/: те же claims профиля, что и при auth/login"""
+    token_class = UserRefreshToken
+
+
+class UserTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Обновление токенов для /api/token/refresh/ по правилам auth/refresh/:
+    черный список проверяется через фильтр процесса (UserRefreshToken),
+    claims профиля берутся из текущих данных пользователя, а неактивные
+    и удаленные пользователи отклоняются.
+    """
+    token_class = UserRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        user = User.objects.filter(pk=refresh.get(api_settings.USER_ID_CLAIM)).first()
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+        for claim, value in user_claims(user).items():
+            refresh[claim] = value
+
+        data = {'access': str(refresh.access_token)}
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                refresh.blacklist()
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            refresh.outstand()
+            data['refresh'] = str(refresh)
+        return data
+
+
+class CourseSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Сериализатор для модели Course.
     Включает имя преподавателя как read-only поле.
+    Число заданий (assignments_count) заполняется аннотацией CourseQuerySet.for_listing,
+    запись текущего пользователя на курс (is_enrolled) - CourseQuerySet.with_enrollment.
     """
     teacher_name = serializers.CharField(source='teacher.full_name', read_only=True)
+    assignments_count = serializers.IntegerField(read_only=True)
+    is_enrolled = serializers.BooleanField(read_only=True)
     
     class Meta:
         model = Course
         fields = ['id', 'name', 'code', 'description', 'teacher', 'teacher_name', 
-                 'created_at', 'updated_at']
+                 'assignments_count', 'is_enrolled', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
 
     def validate(self, data):
@@ -150,17 +258,19 @@ class CourseSerializer(serializers.ModelSerializer):
         logger.debug(f"Course validation data: {data}")
         return data
 
-class AssignmentSerializer(serializers.ModelSerializer):
+class AssignmentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Сериализатор для модели Assignment.
     Включает название курса как read-only поле.
+    Число файлов (files_count) заполняется аннотацией AssignmentQuerySet.for_listing.
     """
     course_name = serializers.CharField(source='course.name', read_only=True)
+    files_count = serializers.IntegerField(read_only=True)
     
     class Meta:
         model = Assignment
         fields = ['id', 'title', 'description', 'due_date', 'course', 'course_name', 
-                 'created_at', 'updated_at']
+                 'files_count', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
 
     def validate_due_date(self, value):
@@ -170,26 +280,95 @@ class AssignmentSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Due date must be in the future")
         return value
 
-class FileSerializer(serializers.ModelSerializer):
+class DeadlineSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """
+    Сериализатор строки ленты сроков (DeadlineEntry).
+    submitted - есть ли у пользователя файлы задания; число файлов и время
+    последней загрузки хранятся в строке ленты и не требуют запроса к файлам.
+    """
+    title = serializers.CharField(source='assignment.title', read_only=True)
+    description = serializers.CharField(source='assignment.description', read_only=True)
+    course_name = serializers.CharField(source='course.name', read_only=True)
+    course_code = serializers.CharField(source='course.code', read_only=True)
+    submitted = serializers.SerializerMethodField()
+
+    class Meta:
+        model = DeadlineEntry
+        fields = ['assignment', 'title', 'description', 'due_date', 'course', 'course_name',
+                 'course_code', 'submitted', 'submitted_files', 'last_submitted_at']
+        read_only_fields = fields
+
+    def get_submitted(self, obj):
+        return obj.submitted_files > 0
+
+class StorageFileField(serializers.FileField):
+    """
+    Поле файла, которое при чтении возвращает URL из кэша подписей
+    вместо обращения к storage.url() для каждой строки.
+    """
+    def to_representation(self, value):
+        if not value:
+            return None
+        return self.parent.get_signed_url(value.name)
+
+
+class FileListSerializer(serializers.ListSerializer):
+    """
+    Списковый сериализатор файлов.
+    Подписывает URL всех файлов страницы одним пакетом до сериализации строк;
+    URL полей, не выбранных в ответ, не подписываются.
+    """
+    def to_representation(self, data):
+        items = list(data.all() if hasattr(data, 'all') else data)
+        fields = self.child.fields
+        sign_files = 'file' in fields or 'file_url' in fields
+        sign_previews = 'previews' in fields
+        names = []
+        for item in items:
+            if sign_files and item.file:
+                names.append(item.file.name)
+            if sign_previews:
+                names.extend(previews.preview_names(item).values())
+        if names:
+            self.child.signed_urls = signing.sign_many(names)
+        return super().to_representation(items)
+
+
+class FileSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Сериализатор для модели File.
     Включает дополнительные вычисляемые поля:
     - uploaded_by_name: полное имя загрузившего пользователя
     - file_url: URL для доступа к файлу
     - file_size_display: размер файла в удобочитаемом формате
+    - previews: URL превью по размерам (когда они сгенерированы)
     """
+    file = StorageFileField()
     uploaded_by_name = serializers.CharField(source='uploaded_by.full_name', read_only=True)
     file_url = serializers.SerializerMethodField()
     file_size_display = serializers.CharField(source='get_file_size_display', read_only=True)
+    previews = serializers.SerializerMethodField()
     
     class Meta:
         model = File
         fields = ['id', 'file', 'original_filename', 'file_type', 'file_size', 
                  'file_size_display', 'mime_type', 'uploaded_at', 'uploaded_by', 
                  'uploaded_by_name', 'assignment', 'course', 'is_public', 
-                 'description', 'file_url']
+                 'description', 'file_url', 'preview_status', 'previews']
         read_only_fields = ['id', 'file_size', 'mime_type', 'uploaded_at', 
-                           'uploaded_by', 'file_url']
+                           'uploaded_by', 'file_url', 'preview_status']
+        list_serializer_class = FileListSerializer
+
+    signed_urls = None
+
+    def get_signed_url(self, name):
+        """
+        Возвращает URL объекта: из пакета, подписанного FileListSerializer,
+        или через кэш подписей для одиночного файла.
+        """
+        if self.signed_urls and name in self.signed_urls:
+            return self.signed_urls[name]
+        return signing.file_url(name)
     
     def get_file_url(self, obj):
         """
@@ -203,12 +382,19 @@ class FileSerializer(serializers.ModelSerializer):
         """
         try:
             if obj.file:
-                return obj.file.url
+                return self.get_signed_url(obj.file.name)
             return None
         except Exception as e:
             logger.error(f"Error getting file URL: {str(e)}")
             return None
 
+    def get_previews(self, obj):
+        """Возвращает URL превью по именам размеров или None, если превью еще не готовы"""
+        keys = previews.preview_names(obj)
+        if not keys:
+            return None
+        return {size: self.get_signed_url(key) for size, key in keys.items()}
+
 class FileUploadSerializer(serializers.ModelSerializer):
     """
     Специализированный сериализатор для загрузки файлов.
@@ -233,14 +419,78 @@ class FileUploadSerializer(serializers.ModelSerializer):
             serializers.ValidationError: При недопустимом файле
         """
         try:
-            # Пример проверки размера файла (максимум 50MB)
-            max_size = 50 * 1024 * 1024
+            # Проверка размера файла (максимум FILE_UPLOAD_MAX_SIZE)
+            max_size = settings.FILE_UPLOAD_MAX_SIZE
             if value.size > max_size:
                 logger.warning(f"File too large: {value.size} bytes")
                 raise serializers.ValidationError(f"File too large. Max size is {max_size} bytes")
             
             # Дополнительные проверки можно добавить здесь
             return value
+        except serializers.ValidationError:
+            raise
         except Exception as e:
             logger.error(f"File validation error: {str(e)}")
-            raise serializers.ValidationError("Invalid file")
\ No newline at end of file
+            raise serializers.ValidationError("Invalid file")
+
+class BulkUploadSerializer(serializers.ModelSerializer):
+    """
+    Общие метаданные пакетной загрузки: применяются ко всем файлам запроса.
+    Сами файлы проверяются по одному, чтобы ошибка одного не отклоняла пакет.
+    """
+    class Meta:
+        model = File
+        fields = ['file_type', 'assignment', 'course', 'is_public', 'description']
+
+class UploadSessionSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """
+    Сериализатор для сессий возобновляемой загрузки.
+    При создании принимает метаданные будущего файла (как FileUploadSerializer),
+    его полный размер и, необязательно, SHA-256 для дедупликации; возвращает размер части и список уже загруженных частей.
+    """
+    part_count = serializers.IntegerField(read_only=True)
+    uploaded_parts = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'original_filename', 'content_type', 'total_size', 'sha256', 'part_size',
+                 'part_count', 'uploaded_parts', 'file_type', 'assignment', 'course',
+                 'is_public', 'description', 'status', 'file', 'created_at', 'expires_at']
+        read_only_fields = ['id', 'part_size', 'status', 'file', 'created_at', 'expires_at']
+
+    def get_uploaded_parts(self, obj):
+        """Возвращает номера частей, которые уже сохранены в MinIO"""
+        return [part.part_number for part in obj.parts.all()]
+
+    def validate_total_size(self, value):
+        """Проверяет, что размер файла положительный и не превышает лимит сессии"""
+        if value <= 0:
+            raise serializers.ValidationError("File size must be positive")
+        max_size = settings.UPLOAD_SESSION_MAX_SIZE
+        if value > max_size:
+            logger.warning(f"Upload session too large: {value} bytes")
+            raise serializers.ValidationError(f"File too large. Max size is {max_size} bytes")
+        return value
+
+    def validate_sha256(self, value):
+        """Проверяет формат SHA-256, заявленного клиентом (64 hex-символа)"""
+        value = value.lower()
+        if value and not SHA256_RE.match(value):
+            raise serializers.ValidationError("sha256 must be 64 hexadecimal characters")
+        return value
+
+
+class UploadIntentSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор намерения прямой загрузки в MinIO.
+    Принимает те же метаданные, что и FileUploadSerializer, плюс размер файла.
+    """
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'original_filename', 'content_type', 'total_size', 'sha256', 'file_type',
+                 'assignment', 'course', 'is_public', 'description', 'status', 'file',
+                 'created_at', 'expires_at']
+        read_only_fields = ['id', 'status', 'file', 'created_at', 'expires_at']
+
+    validate_total_size = UploadSessionSerializer.validate_total_size
+    validate_sha256 = UploadSessionSerializer.validate_sha256
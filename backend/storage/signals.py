@@ -0,0 +1,133 @@
+from django.db.models.signals import m2m_changed, post_save, post_delete
+from django.db import transaction
+from django.dispatch import receiver
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from .models import User, Course, Assignment, File, Blob
+from . import authentication, blobs, caching, content, deadlines, deletions, jobs, quota, revocation
+
+
+@receiver(post_save, sender=File)
+def file_saved(sender, instance, created, update_fields=None, **kwargs):
+    """Учитывает новый файл в счетчиках хранилища владельца и в ссылках на блоб, ставит в очередь его обработку"""
+    if created:
+        quota.apply_usage(instance.uploaded_by_id, instance.file_size or 0, 1)
+        if instance.blob_id:
+            blobs.acquire(instance.blob_id)
+        if needs_processing(instance):
+            # Хеш, тип по сигнатуре, превью и текст вычисляются воркером; задача фиксируется вместе с файлом
+            jobs.enqueue('files.process', file_id=instance.pk)
+    if instance.assignment_id or (not created and update_fields is None):
+        # Файлы задания - состояние сдачи в ленте сроков; измененный файл мог уйти из задания
+        deadlines.refresh_submissions(instance.uploaded_by_id)
+    # Изменение существующего файла могло снять флаг is_public
+    invalidate_file_scopes(instance, shared=instance.is_public or not created)
+
+
+@receiver(post_delete, sender=File)
+def file_deleted(sender, instance, **kwargs):
+    """
+    Вычитает удаленный файл (в том числе каскадно) из счетчиков владельца и ссылок на блоб,
+    ставит объект без ссылок в очередь на удаление из MinIO
+    """
+    quota.apply_usage(instance.uploaded_by_id, -(instance.file_size or 0), -1)
+    if instance.blob_id:
+        # Объект и превью удаляются вместе с последней ссылкой на блоб
+        blobs.release(instance.blob_id)
+    elif instance.file:
+        # Хеш еще не вычислен (файл без блоба): объект больше ни на что не используется
+        object_name = instance.file.name
+        if (not File.objects.filter(file=object_name).exists()
+                and not Blob.objects.filter(object_name=object_name).exists()):
+            deletions.schedule_objects([object_name])
+    if instance.assignment_id:
+        deadlines.refresh_submissions(instance.uploaded_by_id)
+    invalidate_file_scopes(instance, shared=instance.is_public)
+
+
+def needs_processing(instance):
+    """Нужна ли новому файлу фоновая задача files.process"""
+    return not instance.sha256 or instance.preview_status == 'pending' or content.is_extractable(instance)
+
+
+def invalidate_file_scopes(instance, shared):
+    """Сбрасывает закэшированные ответы, в которые входит файл"""
+    scopes = [caching.user_scope(instance.uploaded_by_id)]
+    if shared:
+        scopes.append(caching.shared_scope())
+    if instance.course_id:
+        scopes.append(caching.course_scope(instance.course_id))
+    if instance.assignment_id:
+        # Число файлов задания показывается в списках заданий
+        course_id = Assignment.objects.filter(pk=instance.assignment_id).values_list('course_id', flat=True).first()
+        scopes += [caching.assignments_scope(), caching.course_scope(course_id)]
+    caching.bump(*scopes)
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def course_changed(sender, instance, **kwargs):
+    """Название курса входит в каталог и в списки заданий; смена преподавателя меняет ленты сроков"""
+    caching.bump(caching.courses_scope(), caching.assignments_scope(), caching.course_scope(instance.pk))
+    if kwargs['signal'] is post_save and not kwargs['created']:
+        deadlines.schedule_course(instance.pk)
+
+
+@receiver(post_save, sender=Assignment)
+@receiver(post_delete, sender=Assignment)
+def assignment_changed(sender, instance, **kwargs):
+    """
+    Задания входят в списки заданий, в число заданий курса в каталоге и в ленты
+    сроков участников курса (строки удаленного задания удаляются каскадно)
+    """
+    caching.bump(caching.courses_scope(), caching.assignments_scope(), caching.course_scope(instance.course_id))
+    if kwargs['signal'] is post_save:
+        deadlines.schedule_assignment(instance.pk)
+
+
+@receiver(m2m_changed, sender=Course.students.through)
+def enrollment_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Студент видит задания только своих курсов: запись на курс меняет его список заданий и ленту сроков"""
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        user_ids = [instance.pk]
+        course_ids = list(instance.enrolled_courses.values_list('id', flat=True)) if action == 'pre_clear' \
+            else pk_set or ()
+    else:
+        user_ids = list(instance.students.values_list('id', flat=True)) if action == 'pre_clear' \
+            else pk_set or ()
+        course_ids = [instance.pk]
+    for course_id in course_ids:
+        if action == 'post_add':
+            deadlines.add_members(course_id, user_ids)
+        else:
+            deadlines.remove_members(course_id, user_ids)
+    caching.bump(*(caching.user_scope(user_id) for user_id in user_ids))
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Имя пользователя показывается в каталоге курсов и в списках файлов;
+    изменение пароля, роли, активности или профиля сбрасывает кэш аутентификации.
+    """
+    if update_fields and set(update_fields) <= {'last_login'}:
+        # Вход в систему не меняет отображаемых данных
+        return
+    if not created:
+        authentication.bump_auth_version(instance)
+    caching.bump(caching.courses_scope(), caching.shared_scope(), caching.users_scope(),
+                 caching.user_scope(instance.pk))
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    """Удаленный пользователь пропадает из списка пользователей"""
+    caching.bump(caching.users_scope())
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def token_blacklisted(sender, instance, created, **kwargs):
+    """Сообщает фильтрам отзыва в других процессах о новой записи черного списка"""
+    if created:
+        transaction.on_commit(revocation.notify_revoked)
@@ -0,0 +1,177 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone as dt_timezone
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from . import objects
+
+logger = logging.getLogger(__name__)
+
+
+class _LocalURLCache:
+    """Ограниченный по размеру LRU-кэш подписанных URL внутри процесса"""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set_many(self, items):
+        with self._lock:
+            for key, value in items.items():
+                self._data[key] = value
+                self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_local_cache = _LocalURLCache(settings.SIGNED_URL_LOCAL_CACHE_SIZE)
+
+
+def presigning_enabled():
+    """Возвращает True, если URL файлов выдаются как краткоживущие presigned URL"""
+    return settings.MINIO_STORAGE_MEDIA_USE_PRESIGNED
+
+
+def current_window(ttl_seconds=None, now=None):
+    """
+    Возвращает начало текущего окна подписи.
+
+    Подпись вычисляется от начала окна, а не от текущего момента, поэтому в
+    пределах окна (половина TTL) URL одинаков во всех процессах и его можно
+    кэшировать. Выданный URL действует не меньше половины TTL.
+
+    Returns:
+        tuple: (начало окна в секундах epoch, длина окна в секундах)
+    """
+    ttl_seconds = ttl_seconds or int(settings.FILE_URL_TTL.total_seconds())
+    window = max(ttl_seconds // 2, 1)
+    now = int(now if now is not None else time.time())
+    return now - now % window, window
+
+
+def _shared_key(object_name, ttl_seconds, window_start):
+    digest = hashlib.sha1(object_name.encode('utf-8')).hexdigest()
+    return f'signed-url:{ttl_seconds}:{window_start}:{digest}'
+
+
+def sign_many(object_names):
+    """
+    Возвращает URL для набора объектов, переиспользуя уже вычисленные подписи.
+
+    Порядок поиска: кэш процесса, затем общий кэш Django (один get_many на весь
+    набор); подписываются только отсутствующие в обоих кэшах объекты.
+
+    Args:
+        object_names: Ключи объектов в бакете
+
+    Returns:
+        dict: Ключ объекта -> URL
+    """
+    names = [name for name in dict.fromkeys(object_names) if name]
+    if not presigning_enabled():
+        storage = objects.get_media_storage()
+        return {name: storage.url(name) for name in names}
+
+    ttl_seconds = int(settings.FILE_URL_TTL.total_seconds())
+    window_start, window = current_window(ttl_seconds)
+
+    urls = {}
+    misses = []
+    for name in names:
+        url = _local_cache.get((name, ttl_seconds, window_start))
+        if url is None:
+            misses.append(name)
+        else:
+            urls[name] = url
+    if not misses:
+        return urls
+
+    shared_keys = {_shared_key(name, ttl_seconds, window_start): name for name in misses}
+    try:
+        shared = cache.get_many(list(shared_keys))
+    except Exception as e:
+        logger.warning(f"Signed URL cache unavailable: {str(e)}")
+        shared = {}
+
+    local_updates = {}
+    signed = {}
+    request_date = datetime.fromtimestamp(window_start, tz=dt_timezone.utc)
+    for key, name in shared_keys.items():
+        url = shared.get(key)
+        if url is None:
+            url = objects.presigned_url('GET', name, settings.FILE_URL_TTL, request_date=request_date)
+            signed[key] = url
+        urls[name] = url
+        local_updates[(name, ttl_seconds, window_start)] = url
+
+    _local_cache.set_many(local_updates)
+    if signed:
+        timeout = max(window_start + window - int(time.time()), 1)
+        try:
+            cache.set_many(signed, timeout=timeout)
+        except Exception as e:
+            logger.warning(f"Could not store signed URLs in cache: {str(e)}")
+        logger.debug(f"Signed {len(signed)} file URLs ({len(names) - len(signed)} reused)")
+    return urls
+
+
+def file_url(object_name):
+    """Возвращает URL одного объекта (presigned или публичный, в зависимости от настроек)"""
+    if not object_name:
+        return None
+    return sign_many([object_name]).get(object_name)
+
+
+STREAM_TOKEN_SALT = 'storage.stream'
+
+
+def stream_token(file_id, user_id):
+    """
+    Подписанный токен доступа к files/{id}/stream/ для элементов <video> и <audio>,
+    которые не передают заголовок Authorization.
+
+    Срок действия считается от начала окна подписи (current_window), как у
+    presigned URL: в пределах окна токен одинаков и URL кэшируется браузером.
+
+    Returns:
+        tuple: (токен, момент окончания действия в секундах epoch)
+    """
+    ttl_seconds = int(settings.FILE_URL_TTL.total_seconds())
+    window_start, _ = current_window(ttl_seconds)
+    expires = window_start + ttl_seconds
+    token = signing.Signer(salt=STREAM_TOKEN_SALT).sign(f'{file_id}:{user_id}:{expires}')
+    return token, expires
+
+
+def stream_token_user(token, file_id):
+    """
+    Проверяет токен потокового доступа к файлу.
+
+    Returns:
+        int: id пользователя, которому выдан токен, или None, если токен
+        подделан, истек или выдан для другого файла
+    """
+    try:
+        value = signing.Signer(salt=STREAM_TOKEN_SALT).unsign(token)
+        token_file_id, user_id, expires = (int(part) for part in value.split(':'))
+    except (signing.BadSignature, ValueError):
+        return None
+    if str(token_file_id) != str(file_id) or expires < time.time():
+        return None
+    return user_id
@@ -0,0 +1,83 @@
+import mimetypes
+import os
+
+# Сколько первых байт файла нужно для определения типа по сигнатуре
+SNIFF_BYTES = 512
+
+# Сигнатуры (magic bytes) в начале файла
+MAGIC_SIGNATURES = [
+    (b'%PDF-', 'application/pdf'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'{\\rtf', 'application/rtf'),
+    (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', 'application/msword'),
+    (b'Rar!\x1a\x07', 'application/vnd.rar'),
+    (b"7z\xbc\xaf'\x1c", 'application/x-7z-compressed'),
+    (b'\x1f\x8b', 'application/gzip'),
+    (b'ID3', 'audio/mpeg'),
+    (b'fLaC', 'audio/flac'),
+    (b'OggS', 'audio/ogg'),
+    (b'FLV\x01', 'video/x-flv'),
+    (b'\x30\x26\xb2\x75\x8e\x66\xcf\x11', 'video/x-ms-wmv'),
+    (b'\xff\xf1', 'audio/aac'),
+    (b'\xff\xf9', 'audio/aac'),
+    (b'\xff\xfb', 'audio/mpeg'),
+    (b'\xff\xf3', 'audio/mpeg'),
+    (b'\xff\xf2', 'audio/mpeg'),
+    (b'BM', 'image/bmp'),
+]
+
+# Форматы-контейнеры на основе ZIP: уточняются по расширению
+ZIP_BASED_EXTENSIONS = {'.docx', '.xlsx', '.pptx', '.odt', '.ods', '.odp', '.epub', '.jar'}
+
+
+def sniff_mime(head, filename=None):
+    """
+    Определяет MIME-тип по первым байтам файла (magic bytes).
+
+    Args:
+        head (bytes): Начало файла (достаточно SNIFF_BYTES байт)
+        filename (str): Имя файла, используется для уточнения ZIP-контейнеров
+
+    Returns:
+        str: MIME-тип или None, если сигнатура не распознана
+    """
+    if not head:
+        return None
+
+    if head[:4] == b'RIFF' and len(head) >= 12:
+        return {
+            b'WEBP': 'image/webp',
+            b'WAVE': 'audio/wav',
+            b'AVI ': 'video/x-msvideo',
+        }.get(head[8:12])
+
+    if head[4:8] == b'ftyp':
+        brand = head[8:12]
+        if brand == b'qt  ':
+            return 'video/quicktime'
+        if brand in (b'M4A ', b'M4B '):
+            return 'audio/mp4'
+        return 'video/mp4'
+
+    if head[:4] == b'PK\x03\x04':
+        ext = os.path.splitext(filename or '')[1].lower()
+        if ext in ZIP_BASED_EXTENSIONS:
+            return mimetypes.guess_type(filename)[0] or 'application/zip'
+        return 'application/zip'
+
+    if len(head) >= 262 and head[257:262] == b'ustar':
+        return 'application/x-tar'
+
+    for signature, mime_type in MAGIC_SIGNATURES:
+        if head.startswith(signature):
+            return mime_type
+
+    stripped = head.lstrip()
+    if stripped[:5] == b'<?xml' or stripped[:4] == b'<svg':
+        if b'<svg' in head:
+            return 'image/svg+xml'
+
+    return None
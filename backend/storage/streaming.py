@@ -0,0 +1,183 @@
+import logging
+import re
+from urllib.parse import quote, urlsplit
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import http_date, parse_http_date_safe
+from . import bridge, objects
+
+logger = logging.getLogger(__name__)
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(Exception):
+    """Запрошенный диапазон лежит за пределами файла"""
+
+
+def parse_range(header, size):
+    """
+    Разбирает заголовок Range для одного диапазона байт.
+
+    Args:
+        header (str): Значение заголовка Range (например, 'bytes=0-1023' или 'bytes=-500')
+        size (int): Размер файла в байтах
+
+    Returns:
+        tuple: (start, end) включительно или None, если заголовок не задан или
+        не поддерживается (несколько диапазонов) - тогда отдается весь файл
+
+    Raises:
+        RangeNotSatisfiable: Если диапазон не пересекается с файлом
+    """
+    if not header:
+        return None
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if size == 0:
+        # В пустом файле нет ни одного байта, который можно было бы отдать диапазоном
+        raise RangeNotSatisfiable()
+    if not first:
+        # Суффиксный диапазон: последние N байт
+        length = int(last)
+        if length == 0:
+            raise RangeNotSatisfiable()
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        raise RangeNotSatisfiable()
+    return start, min(end, size - 1)
+
+
+def _etag_matches(header, etag):
+    """Проверяет If-None-Match / If-Range по слабому сравнению ETag"""
+    if not header or not etag:
+        return False
+    if header.strip() == '*':
+        return True
+    candidates = [tag.strip() for tag in header.split(',')]
+    return any(tag.removeprefix('W/') == etag for tag in candidates)
+
+
+def is_not_modified(request, etag, last_modified):
+    """
+    Проверяет условные заголовки запроса (If-None-Match приоритетнее If-Modified-Since).
+
+    Returns:
+        bool: True, если клиенту можно ответить 304
+    """
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        return _etag_matches(if_none_match, etag)
+    if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    if if_modified_since and last_modified:
+        return int(last_modified.timestamp()) <= if_modified_since
+    return False
+
+
+def _iter_object(object_name, offset, length):
+    """Читает диапазон объекта из MinIO кусками, освобождая соединение в конце"""
+    response = objects.get_object(object_name, offset=offset, length=length)
+    try:
+        for chunk in response.stream(STREAM_CHUNK_SIZE):
+            yield chunk
+    finally:
+        response.close()
+        response.release_conn()
+
+
+def object_body(object_name, offset=0, length=0):
+    """
+    Тело потокового ответа с диапазоном объекта MinIO.
+    В режиме ASGI генератор оборачивается в асинхронный (bridge.aiter_chunks):
+    синхронный итератор Django прочитал бы объект в память целиком до отправки.
+    """
+    chunks = _iter_object(object_name, offset, length)
+    if settings.SERVER_MODE == 'asgi':
+        return bridge.aiter_chunks(chunks)
+    return chunks
+
+
+def stream_file(request, file_obj, etag):
+    """
+    Формирует ответ для потокового воспроизведения файла.
+
+    Поддерживает Range (206 / 416), If-Range, If-None-Match и If-Modified-Since (304).
+    Данные либо проксируются из MinIO через StreamingHttpResponse, либо,
+    при FILE_STREAM_ACCEL_REDIRECT, отдаются nginx через X-Accel-Redirect.
+
+    Args:
+        request: HTTP-запрос
+        file_obj (File): Файл для воспроизведения
+        etag (str): ETag объекта из сохраненных метаданных
+
+    Returns:
+        HttpResponse: Ответ 200, 206, 304 или 416
+    """
+    quoted_etag = f'"{etag}"' if etag else None
+    last_modified = file_obj.uploaded_at
+    size = file_obj.file_size
+
+    if is_not_modified(request, quoted_etag, last_modified):
+        response = HttpResponseNotModified()
+        _set_validators(response, quoted_etag, last_modified)
+        return response
+
+    if settings.FILE_STREAM_ACCEL_REDIRECT:
+        # nginx сам обработает Range, запросив объект у MinIO по внутреннему presigned URL
+        url = objects.presigned_url('GET', file_obj.file.name, settings.FILE_URL_TTL, internal=True)
+        parts = urlsplit(url)
+        response = HttpResponse(content_type=file_obj.mime_type or 'application/octet-stream')
+        response['X-Accel-Redirect'] = f"{settings.FILE_STREAM_ACCEL_PREFIX.rstrip('/')}{parts.path}?{parts.query}"
+        response['X-Accel-Buffering'] = 'no'
+        _set_validators(response, quoted_etag, last_modified)
+        _set_disposition(response, file_obj)
+        return response
+
+    byte_range = None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range or _etag_matches(if_range, quoted_etag):
+        try:
+            byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    if byte_range:
+        start, end = byte_range
+        length = end - start + 1
+        response = StreamingHttpResponse(
+            object_body(file_obj.file.name, start, length), status=206,
+            content_type=file_obj.mime_type or 'application/octet-stream')
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    else:
+        length = size
+        response = StreamingHttpResponse(
+            object_body(file_obj.file.name),
+            content_type=file_obj.mime_type or 'application/octet-stream')
+    response['Content-Length'] = str(length)
+    response['Accept-Ranges'] = 'bytes'
+    _set_validators(response, quoted_etag, last_modified)
+    _set_disposition(response, file_obj)
+    return response
+
+
+def _set_validators(response, etag, last_modified):
+    if etag:
+        response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    response['Cache-Control'] = 'private, max-age=0, must-revalidate'
+
+
+def _set_disposition(response, file_obj):
+    filename = file_obj.original_filename or file_obj.file.name.rsplit('/', 1)[-1]
+    response['Content-Disposition'] = f"inline; filename*=UTF-8''{quote(filename)}"
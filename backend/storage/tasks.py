@@ -0,0 +1,57 @@
+import logging
+from .jobs import handler
+from . import content, deadlines, deletions, previews, quota, uploads
+
+# Обработчики фоновых задач (manage.py run_workers). Каждый обработчик идемпотентен:
+# задача повторяется после ошибки или истечения аренды.
+
+logger = logging.getLogger(__name__)
+
+
+@handler('files.process')
+def process_file(file_id):
+    """
+    Обработка файла после загрузки: хеш и тип по сигнатуре для загрузок, где они
+    не вычислены при приеме, затем превью и текст документа для поиска.
+    """
+    file_obj = uploads.inspect_upload(file_id)
+    if file_obj is None or file_obj.preview_status == 'pending':
+        previews.generate(file_id)
+    content.extract(file_id)
+
+
+@handler('previews.generate')
+def generate_previews(file_id):
+    """Построение превью одного файла"""
+    previews.generate(file_id)
+
+
+@handler(content.EXTRACT_JOB)
+def extract_content(file_id):
+    """Извлечение текста документа (manage.py extract_content)"""
+    content.extract(file_id)
+
+
+@handler(deadlines.REFRESH_ASSIGNMENT_JOB)
+def refresh_assignment_deadlines(assignment_id):
+    """Пересчет строк задания в лентах сроков участников курса"""
+    deadlines.refresh_assignment(assignment_id)
+
+
+@handler(deadlines.REFRESH_COURSE_JOB)
+def refresh_course_deadlines(course_id):
+    """Перестройка строк предстоящих заданий курса в лентах сроков"""
+    deadlines.refresh_course(course_id)
+
+
+@handler('quota.reconcile')
+def reconcile_usage(user_ids=None):
+    """Пересчет счетчиков использования хранилища"""
+    fixed = quota.reconcile(user_ids)
+    logger.info(f"Storage usage reconciled in background: {fixed} rows corrected")
+
+
+@handler(deletions.PURGE_JOB)
+def purge_objects():
+    """Пакетное удаление объектов из очереди ObjectDeletion"""
+    deletions.purge()
@@ -1,3 +1,1643 @@
-from django.test import TestCase
+import hashlib
+import io
+import threading
+import time as clock
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time, timedelta
+from types import SimpleNamespace
+from unittest import mock, skipUnless
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.uploadhandler import StopFutureHandlers
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.http import QueryDict
+from django.test.utils import CaptureQueriesContext
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework.exceptions import AuthenticationFailed, NotFound, ValidationError
+from rest_framework.request import Request
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from .authentication import CachedJWTAuthentication, UserRefreshToken
+from .extraction import extract_docx, extract_plain_text, extract_rtf, extractor_for, needs_whole_file
+from .filters import AssignmentFilterSet, FileFilterSet, SharedFileFilterSet
+from .hashers import HashingExecutor, HashingOverloaded
+from .models import Assignment, Blob, Course, DeadlineEntry, File, FileContent, Job, ObjectDeletion, QuotaReservation, StorageUsage, UploadSession, User
+from .pagination import FileCursorPagination
+from .quota import QuotaExceeded
+from .revocation import BloomFilter
+from .sniffing import sniff_mime
+from .streaming import RangeNotSatisfiable, parse_range
+from .throttles import AuthIPThrottle, LoginAccountThrottle
+from .upload_handlers import MinioStreamingUploadHandler
+from . import archives, authentication, blobs, deadlines, deletions, jobs, objects, previews, quota, revocation, search, signing, uploads, workers as job_workers
+from . import tasks  # noqa: F401  # Регистрация обработчиков задач
 
-# Create your tests here.
+
+class SniffMimeTests(SimpleTestCase):
+    def test_magic_signatures(self):
+        self.assertEqual(sniff_mime(b'%PDF-1.7\n'), 'application/pdf')
+        self.assertEqual(sniff_mime(b'\x89PNG\r\n\x1a\n\x00\x00'), 'image/png')
+        self.assertEqual(sniff_mime(b'{\\rtf1\\ansi'), 'application/rtf')
+
+    def test_riff_and_ftyp_containers(self):
+        self.assertEqual(sniff_mime(b'RIFF\x00\x00\x00\x00WAVEfmt '), 'audio/wav')
+        self.assertEqual(sniff_mime(b'RIFF\x00\x00\x00\x00WEBPVP8 '), 'image/webp')
+        self.assertIsNone(sniff_mime(b'RIFF\x00\x00\x00\x00XXXX'))
+        self.assertEqual(sniff_mime(b'\x00\x00\x00\x18ftypisom'), 'video/mp4')
+        self.assertEqual(sniff_mime(b'\x00\x00\x00\x18ftypqt  '), 'video/quicktime')
+        self.assertEqual(sniff_mime(b'\x00\x00\x00\x18ftypM4A '), 'audio/mp4')
+
+    def test_zip_containers_use_extension(self):
+        head = b'PK\x03\x04\x14\x00'
+        self.assertEqual(sniff_mime(head, 'report.docx'),
+                         'application/vnd.openxmlformats-officedocument.wordprocessingml.document')
+        self.assertEqual(sniff_mime(head, 'archive.zip'), 'application/zip')
+        self.assertEqual(sniff_mime(head, 'renamed.pdf'), 'application/zip')
+
+    def test_tar_and_svg(self):
+        self.assertEqual(sniff_mime(b'\x00' * 257 + b'ustar\x0000'), 'application/x-tar')
+        self.assertEqual(sniff_mime(b'  <?xml version="1.0"?><svg xmlns="x"/>'), 'image/svg+xml')
+        self.assertIsNone(sniff_mime(b'<?xml version="1.0"?><note/>'))
+
+    def test_unknown_or_empty(self):
+        self.assertIsNone(sniff_mime(b''))
+        self.assertIsNone(sniff_mime(b'plain text'))
+
+
+@override_settings(UPLOAD_SESSION_PART_SIZE=0, FILE_UPLOAD_MAX_SIZE=12 * 1024 * 1024)
+class StreamingUploadHandlerTests(SimpleTestCase):
+    MB = 1024 * 1024
+
+    def setUp(self):
+        patcher = mock.patch('storage.upload_handlers.objects')
+        self.objects = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.objects.create_multipart_upload.return_value = 'upload-1'
+        self.objects.upload_part.side_effect = lambda name, upload_id, number, data: f'etag-{number}'
+        self.objects.complete_multipart_upload.return_value = 'etag-final'
+        self.objects.put_object.return_value = 'etag-single'
+
+        patcher = mock.patch('storage.uploads.build_object_name', return_value='uploads/1/file.bin')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _upload(self, chunks, file_name='file.bin'):
+        handler = MinioStreamingUploadHandler(mock.Mock())
+        with self.assertRaises(StopFutureHandlers):
+            handler.new_file('file', file_name, 'application/octet-stream', None)
+        position = 0
+        for chunk in chunks:
+            handler.receive_data_chunk(chunk, position)
+            position += len(chunk)
+        return handler, handler.file_complete(position)
+
+    def test_small_file_single_put(self):
+        handler, uploaded = self._upload([b'%PDF-1.4 ', b'body'])
+        self.objects.put_object.assert_called_once_with('uploads/1/file.bin', b'%PDF-1.4 body',
+                                                        'application/octet-stream')
+        self.objects.create_multipart_upload.assert_not_called()
+        self.assertEqual(uploaded.size, 13)
+        self.assertEqual(uploaded.sha256, hashlib.sha256(b'%PDF-1.4 body').hexdigest())
+        self.assertEqual(uploaded.sniffed_type, 'application/pdf')
+        self.assertEqual(uploaded.etag, 'etag-single')
+
+    def test_large_file_sent_in_parts(self):
+        chunk = b'x' * self.MB
+        handler, uploaded = self._upload([chunk] * 11)
+        self.assertEqual(self.objects.upload_part.call_count, 3)
+        self.objects.complete_multipart_upload.assert_called_once_with(
+            'uploads/1/file.bin', 'upload-1', [(1, 'etag-1'), (2, 'etag-2'), (3, 'etag-3')])
+        self.assertEqual(uploaded.size, 11 * self.MB)
+        self.assertEqual(uploaded.etag, 'etag-final')
+
+    def test_oversized_file_discarded(self):
+        chunk = b'x' * self.MB
+        handler, uploaded = self._upload([chunk] * 13)
+        self.objects.abort_multipart_upload.assert_called_once_with('uploads/1/file.bin', 'upload-1')
+        self.objects.complete_multipart_upload.assert_not_called()
+        self.objects.put_object.assert_not_called()
+        # Размер считается до конца, чтобы сериализатор отклонил файл с понятной ошибкой
+        self.assertEqual(uploaded.size, 13 * self.MB)
+        self.assertIsNone(uploaded.object_name)
+        self.assertIsNone(uploaded.sha256)
+
+
+class ParseRangeTests(SimpleTestCase):
+    def test_absent_or_unsupported_header_serves_whole_file(self):
+        self.assertIsNone(parse_range(None, 1000))
+        self.assertIsNone(parse_range('', 1000))
+        self.assertIsNone(parse_range('bytes=-', 1000))
+        self.assertIsNone(parse_range('bytes=0-10,20-30', 1000))
+        self.assertIsNone(parse_range('items=0-10', 1000))
+
+    def test_bounded_and_open_ranges(self):
+        self.assertEqual(parse_range('bytes=0-99', 1000), (0, 99))
+        self.assertEqual(parse_range(' bytes=500- ', 1000), (500, 999))
+        self.assertEqual(parse_range('bytes=900-5000', 1000), (900, 999))
+
+    def test_suffix_range(self):
+        self.assertEqual(parse_range('bytes=-100', 1000), (900, 999))
+        self.assertEqual(parse_range('bytes=-5000', 1000), (0, 999))
+
+    def test_unsatisfiable(self):
+        for header in ('bytes=1000-', 'bytes=1000-2000', 'bytes=50-10', 'bytes=-0'):
+            with self.subTest(header=header), self.assertRaises(RangeNotSatisfiable):
+                parse_range(header, 1000)
+
+    def test_empty_file(self):
+        for header in ('bytes=0-', 'bytes=0-0', 'bytes=-10'):
+            with self.subTest(header=header), self.assertRaises(RangeNotSatisfiable):
+                parse_range(header, 0)
+        self.assertIsNone(parse_range('bytes=0-10,20-30', 0))
+
+
+class ExtractionTests(SimpleTestCase):
+    def test_plain_text_encodings(self):
+        self.assertEqual(extract_plain_text([b'\xef\xbb\xbfhello  world'], 100), 'hello world')
+        self.assertEqual(extract_plain_text(['привет'.encode('utf-16')], 100), 'привет')
+        # Многобайтовый символ разрезан между фрагментами
+        encoded = 'курс'.encode('utf-8')
+        self.assertEqual(extract_plain_text([encoded[:3], encoded[3:]], 100), 'курс')
+        self.assertEqual(extract_plain_text(['задание'.encode('cp1251')], 100), 'задание')
+
+    def test_plain_text_stops_at_max_chars(self):
+        chunks = iter([b'a' * 10, b'b' * 10, b'c' * 10])
+        self.assertEqual(extract_plain_text(chunks, 15), 'a' * 10 + 'b' * 5)
+        self.assertEqual(next(chunks), b'c' * 10)
+
+    def test_rtf(self):
+        document = (rb"{\rtf1\ansi\ansicpg1251{\fonttbl{\f0 Times New Roman;}}"
+                    rb"{\*\generator Writer;}{\info{\title Secret}}"
+                    rb"\f0 Hello\par \'cf\'f0\'e8\'e2\'e5\'f2\tab \u1082?\u1091?\u1088?\u1089?\par "
+                    rb"\{braces\}}")
+        self.assertEqual(extract_rtf([document], 1000, 10000), 'Hello\nПривет курс\n{braces}')
+
+    def test_rtf_surrogate_pairs(self):
+        # 😀 (U+1F600) записывается парой \u-10179 \u-8704
+        document = rb"{\rtf1\ansi Hi \u-10179?\u-8704? and \u55357?alone}"
+        text = extract_rtf([document], 1000, 10000)
+        self.assertEqual(text, 'Hi \U0001F600 and \ufffdalone')
+        text.encode('utf-8')
+
+    def test_rtf_limits(self):
+        document = rb"{\rtf1 " + b'x' * 100 + b'}'
+        self.assertEqual(extract_rtf([document], 10, 10000), 'x' * 10)
+        self.assertEqual(extract_rtf([document[:20], document[20:]], 1000, 20), 'x' * 13)
+
+    def _docx(self, body):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as archive:
+            archive.writestr('[Content_Types].xml', '<Types/>')
+            archive.writestr('word/document.xml', (
+                '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+                f'<w:body>{body}</w:body></w:document>'))
+        buffer.seek(0)
+        return buffer
+
+    def test_docx(self):
+        docx = self._docx('<w:p><w:r><w:t>Первый</w:t></w:r><w:r><w:tab/><w:t>абзац</w:t></w:r></w:p>'
+                          '<w:p><w:r><w:t>Второй</w:t><w:br/><w:t>абзац</w:t></w:r></w:p>')
+        self.assertEqual(extract_docx(docx, 1000), 'Первый абзац\nВторой\nабзац')
+        self.assertEqual(extract_docx(self._docx('<w:p><w:r><w:t>abcdef</w:t></w:r></w:p>'), 3), 'abc')
+
+    def test_docx_without_document(self):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as archive:
+            archive.writestr('content.xml', '<office/>')
+        with self.assertRaises(KeyError):
+            extract_docx(buffer, 1000)
+
+    def test_extractor_for(self):
+        self.assertEqual(extractor_for('notes.MD', None), 'text')
+        self.assertEqual(extractor_for('noext', 'text/plain'), 'text')
+        self.assertEqual(extractor_for('essay.rtf', None), 'rtf')
+        self.assertEqual(extractor_for('report.docx', None), 'docx')
+        self.assertIsNone(extractor_for('photo.png', 'image/png'))
+        self.assertTrue(needs_whole_file('docx'))
+        self.assertFalse(needs_whole_file('rtf'))
+
+
+class FilterSetTests(SimpleTestCase):
+    def _conditions(self, filterset_class, query):
+        filterset = filterset_class(QueryDict(query))
+        active = filterset.active()
+        filterset.check_indexed(active)
+        conditions = {}
+        for name in active:
+            conditions.update(filterset.filters[name].conditions(filterset.query_params))
+        return conditions
+
+    def test_indexed_combinations(self):
+        self.assertEqual(self._conditions(FileFilterSet, ''), {})
+        self.assertEqual(self._conditions(FileFilterSet, 'file_type=document&uploaded_after=2024-01-01'),
+                         {'file_type__exact': 'document',
+                          'uploaded_at__gte': self._aware(2024, 1, 1)})
+        self.assertEqual(self._conditions(FileFilterSet, 'size_min=10&size_max=20'),
+                         {'file_size__gte': 10, 'file_size__lte': 20})
+        self.assertEqual(self._conditions(AssignmentFilterSet, 'course_id=3&due_before=2024-05-31'),
+                         {'course_id__exact': 3, 'due_date__lte': self._aware(2024, 5, 31, end_of_day=True)})
+
+    def test_unindexed_combination_rejected(self):
+        for filterset_class, query in ((FileFilterSet, 'file_type=document&size_min=10'),
+                                       (FileFilterSet, 'course=1&assignment=2'),
+                                       (SharedFileFilterSet, 'file_type=document&course=1')):
+            with self.subTest(query=query), self.assertRaises(ValidationError):
+                self._conditions(filterset_class, query)
+
+    def test_shared_files_ignore_is_public(self):
+        self.assertEqual(self._conditions(SharedFileFilterSet, 'is_public=false'), {})
+
+    def test_invalid_values_rejected(self):
+        for query in ('file_type=spreadsheet', 'course=abc', 'is_public=maybe',
+                      'uploaded_after=yesterday', 'size_min=-5'):
+            with self.subTest(query=query), self.assertRaises(ValidationError):
+                self._conditions(FileFilterSet, query)
+
+    def test_empty_values_ignored(self):
+        self.assertEqual(self._conditions(FileFilterSet, 'file_type=&course='), {})
+
+    def _aware(self, year, month, day, end_of_day=False):
+        moment = datetime.combine(date(year, month, day), time.max if end_of_day else time.min)
+        return timezone.make_aware(moment)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+                   AUTH_THROTTLE_BUCKETS={'auth_ip': (3, 0.5), 'auth_account': (2, 0.1)})
+class TokenBucketThrottleTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.now = 1000.0
+        patcher = mock.patch('storage.throttles.time.time', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.factory = RequestFactory()
+
+    def _allowed(self, throttle_class, request):
+        throttle = throttle_class()
+        return throttle.allow_request(request, None), throttle.wait()
+
+    def test_burst_then_refill(self):
+        request = self.factory.post('/api/auth/login/', REMOTE_ADDR='10.0.0.1')
+        for _ in range(3):
+            self.assertEqual(self._allowed(AuthIPThrottle, request), (True, None))
+        allowed, wait = self._allowed(AuthIPThrottle, request)
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(wait, 2.0)
+
+        self.now += 2
+        self.assertEqual(self._allowed(AuthIPThrottle, request), (True, None))
+        self.assertFalse(self._allowed(AuthIPThrottle, request)[0])
+        # Другой адрес ограничивается отдельным ведром
+        self.assertTrue(self._allowed(AuthIPThrottle, self.factory.post('/', REMOTE_ADDR='10.0.0.2'))[0])
+
+    def test_account_charged_only_on_failure(self):
+        request = self.factory.post('/api/auth/login/', {'username': 'Student '})
+        request.data = request.POST
+        throttle = LoginAccountThrottle()
+        for _ in range(5):
+            self.assertTrue(throttle.allow_request(request, None))
+        throttle.charge(request)
+        throttle.charge(request)
+        # Ключ не зависит от регистра и пробелов в имени
+        other = self.factory.post('/api/auth/login/', {'username': 'student'})
+        self.assertFalse(LoginAccountThrottle().allow_request(other, None))
+        self.now += 10
+        self.assertTrue(LoginAccountThrottle().allow_request(other, None))
+
+    def test_request_without_account_not_limited(self):
+        request = self.factory.post('/api/auth/login/', {'password': 'x'})
+        throttle = LoginAccountThrottle()
+        throttle.charge(request)
+        self.assertTrue(throttle.allow_request(request, None))
+
+    def test_cache_failure_lets_request_through(self):
+        request = self.factory.post('/api/auth/login/', REMOTE_ADDR='10.0.0.1')
+        with mock.patch('storage.throttles.cache.get', side_effect=ConnectionError('down')):
+            self.assertTrue(AuthIPThrottle().allow_request(request, None))
+
+
+class HashingExecutorTests(SimpleTestCase):
+    def setUp(self):
+        self.executor = HashingExecutor(workers=1, queue_limit=1)
+        self.addCleanup(self.executor._executor.shutdown)
+
+    def _wait_pending(self, count):
+        deadline = clock.monotonic() + 5
+        while self.executor._pending < count:
+            self.assertLess(clock.monotonic(), deadline)
+            clock.sleep(0.001)
+
+    def test_sheds_load_when_queue_full(self):
+        release = threading.Event()
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.executor.run(release.wait, 5)))
+                   for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        self._wait_pending(2)
+
+        with self.assertRaises(HashingOverloaded) as context:
+            self.executor.run(lambda: 'hash')
+        self.assertGreaterEqual(context.exception.wait, 1)
+        self.assertEqual(self.executor.stats.rejected, 1)
+
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(results, [True, True])
+        self.assertEqual(self.executor.run(lambda: 'hash'), 'hash')
+        self.assertEqual(self.executor.stats.snapshot()['completed'], 3)
+
+    def test_nested_call_runs_inline(self):
+        # Единственный поток пула не ждет сам себя (PBKDF2.verify вызывает encode)
+        result = self.executor.run(lambda: self.executor.run(lambda: threading.current_thread().name))
+        self.assertTrue(result.startswith('hashing'))
+
+    def test_errors_release_slot(self):
+        def fail():
+            raise ValueError('bad hash')
+
+        for _ in range(3):
+            with self.assertRaises(ValueError):
+                self.executor.run(fail)
+        self.assertEqual(self.executor._pending, 0)
+
+
+class KeysetPaginationTests(SimpleTestCase):
+    def _request(self, query=''):
+        return Request(RequestFactory().get(f'/api/files/my_files/?{query}'))
+
+    def test_cursor_round_trip(self):
+        paginator = FileCursorPagination()
+        paginator.base_url = 'http://testserver/api/files/my_files/?file_type=image'
+        uploaded_at = timezone.make_aware(datetime(2024, 3, 1, 12, 30, 15, 123456))
+        link = paginator.encode_cursor(File(id=42, uploaded_at=uploaded_at), reverse=True)
+        self.assertTrue(link.startswith('http://testserver/api/files/my_files/?'))
+        self.assertIn('file_type=image', link)
+
+        cursor = paginator.decode_cursor(self._request(link.split('?', 1)[1]), File)
+        self.assertEqual(cursor, {'values': [uploaded_at, 42], 'reverse': True})
+
+    def test_invalid_cursor(self):
+        paginator = FileCursorPagination()
+        self.assertIsNone(paginator.decode_cursor(self._request(), File))
+        for cursor in ('not-base64!', 'eyJ2IjogWzFdfQ==', 'eyJ2IjogWyJ4IiwgMV19'):
+            with self.subTest(cursor=cursor), self.assertRaises(NotFound):
+                paginator.decode_cursor(self._request(f'cursor={cursor}'), File)
+
+    def test_page_size_bounds(self):
+        paginator = FileCursorPagination()
+        self.assertEqual(paginator.get_page_size(self._request('page_size=10')), 10)
+        self.assertEqual(paginator.get_page_size(self._request('page_size=100000')), paginator.max_page_size)
+        self.assertEqual(paginator.get_page_size(self._request('page_size=0')), 1)
+        self.assertEqual(paginator.get_page_size(self._request('page_size=abc')), paginator.page_size)
+
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+MINIO_FUNCTIONS = ('put_object', 'create_multipart_upload', 'upload_part', 'complete_multipart_upload',
+                   'abort_multipart_upload', 'stat_object', 'get_object', 'remove_object', 'remove_objects',
+                   'list_objects', 'get_available_object_name', 'presigned_url')
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class StorageTestCase(TestCase):
+    """Тесты с базой: кэш в памяти процесса, обращения к MinIO заменены заглушками (self.minio)"""
+    client_class = APIClient
+
+    def setUp(self):
+        cache.clear()
+        signing._local_cache.clear()
+        patcher = mock.patch.multiple(objects, **{name: mock.DEFAULT for name in MINIO_FUNCTIONS})
+        self.minio = SimpleNamespace(**patcher.start())
+        self.addCleanup(patcher.stop)
+        self.minio.get_available_object_name.side_effect = lambda name, max_length=None: name
+        self.minio.presigned_url.side_effect = lambda method, name, *args, **kwargs: f'https://minio.test/{name}'
+        self.minio.create_multipart_upload.return_value = 'upload-1'
+        self.minio.upload_part.side_effect = lambda name, upload_id, number, data: f'etag-{number}'
+        self.minio.complete_multipart_upload.return_value = 'etag-final'
+        self.minio.put_object.return_value = 'etag-put'
+        self.user = self.create_user('student')
+        self.client.force_authenticate(self.user)
+
+    def create_user(self, username, **fields):
+        # Без пароля: хеширование Argon2 тестам не нужно
+        return User.objects.create_user(username, email=f'{username}@example.com', **fields)
+
+    def create_file(self, user=None, name='notes.txt', size=100, **fields):
+        """Файл с уже известными метаданными: сохранение не обращается к MinIO"""
+        user = user or self.user
+        fields.setdefault('mime_type', 'text/plain')
+        return File.objects.create(file=f'uploads/{user.pk}/{name}', original_filename=name, file_size=size,
+                                   uploaded_by=user, **fields)
+
+    def create_course(self, teacher=None, name='Physics', students=()):
+        teacher = teacher or self.create_user(f'teacher{Course.objects.count()}', role='teacher')
+        course = Course.objects.create(name=name, code=name[:4].upper(), teacher=teacher)
+        course.students.add(*students)
+        return course
+
+    def create_assignment(self, course, title='Lab', due_in=timedelta(days=7)):
+        return Assignment.objects.create(course=course, title=title, due_date=timezone.now() + due_in)
+
+    def usage(self, user=None):
+        return StorageUsage.objects.get(user=user or self.user)
+
+
+@override_settings(UPLOAD_SESSION_PART_SIZE=0)
+class UploadSessionTests(StorageTestCase):
+    MB = 1024 * 1024
+
+    def _start(self, total_size=6 * MB):
+        response = self.client.post('/api/uploads/', {'original_filename': 'lecture.mp4', 'total_size': total_size,
+                                                      'content_type': 'video/mp4', 'file_type': 'video'})
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data
+
+    def _put_part(self, session_id, number, size):
+        return self.client.put(f'/api/uploads/{session_id}/parts/{number}/', b'x' * size,
+                               content_type='application/octet-stream')
+
+    def test_upload_and_complete(self):
+        session = self._start()
+        self.assertEqual((session['part_size'], session['part_count']), (5 * self.MB, 2))
+        self.assertEqual(self.usage().reserved_bytes, 6 * self.MB)
+
+        self.assertEqual(self._put_part(session['id'], 2, self.MB).status_code, 200)
+        self.assertEqual(self._put_part(session['id'], 1, self.MB).status_code, 400)
+        response = self.client.post(f'/api/uploads/{session["id"]}/complete/')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['missing_parts'], [1])
+
+        self.assertEqual(self._put_part(session['id'], 1, 5 * self.MB).status_code, 200)
+        response = self.client.post(f'/api/uploads/{session["id"]}/complete/')
+        self.assertEqual(response.status_code, 201)
+        self.minio.complete_multipart_upload.assert_called_once_with(
+            UploadSession.objects.get(pk=session['id']).object_name, 'upload-1', [(1, 'etag-1'), (2, 'etag-2')])
+        file_obj = File.objects.get(pk=response.data['id'])
+        self.assertEqual((file_obj.file_size, file_obj.etag), (6 * self.MB, 'etag-final'))
+        usage = self.usage()
+        self.assertEqual((usage.used_bytes, usage.reserved_bytes, usage.file_count), (6 * self.MB, 0, 1))
+
+        # Повторное завершение возвращает тот же файл без обращения к MinIO
+        response = self.client.post(f'/api/uploads/{session["id"]}/complete/')
+        self.assertEqual(response.data['id'], file_obj.pk)
+        self.assertEqual(self.minio.complete_multipart_upload.call_count, 1)
+
+    def test_complete_after_object_assembled(self):
+        session = self._start(self.MB)
+        self._put_part(session['id'], 1, self.MB)
+        self.minio.complete_multipart_upload.side_effect = objects.UploadNotFound('upload-1')
+        self.minio.stat_object.return_value = SimpleNamespace(size=self.MB, etag='"etag-stored"')
+        response = self.client.post(f'/api/uploads/{session["id"]}/complete/')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(File.objects.get(pk=response.data['id']).etag, 'etag-stored')
+
+    def test_session_row_failure_releases_reservation(self):
+        with mock.patch.object(UploadSession.objects, 'create', side_effect=RuntimeError('db down')):
+            with self.assertRaises(RuntimeError):
+                uploads.start_session(self.user, original_filename='a.bin', total_size=self.MB)
+        self.minio.abort_multipart_upload.assert_called_once_with(mock.ANY, 'upload-1')
+        self.assertEqual(self.usage().reserved_bytes, 0)
+
+    def test_abort_and_expiry_release_reservation(self):
+        aborted = self._start()
+        self.assertEqual(self.client.delete(f'/api/uploads/{aborted["id"]}/').status_code, 204)
+        self.assertEqual(UploadSession.objects.get(pk=aborted['id']).status, 'aborted')
+
+        expired = self._start()
+        UploadSession.objects.filter(pk=expired['id']).update(expires_at=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(uploads.cleanup_expired_sessions(), 1)
+        self.assertEqual(UploadSession.objects.get(pk=expired['id']).status, 'expired')
+        self.assertEqual(self.minio.abort_multipart_upload.call_count, 2)
+        self.assertEqual(self.usage().reserved_bytes, 0)
+
+    @override_settings(STORAGE_QUOTA_BYTES=10 * 1024 * 1024)
+    def test_quota_exceeded(self):
+        self._start()
+        response = self.client.post('/api/uploads/', {'original_filename': 'b.mp4', 'total_size': 6 * self.MB})
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(UploadSession.objects.count(), 1)
+
+
+class DirectUploadTests(StorageTestCase):
+    def _intent(self, **data):
+        data = {'original_filename': 'essay.pdf', 'total_size': 2048, 'content_type': 'application/pdf',
+                'file_type': 'document', **data}
+        return self.client.post('/api/files/upload_intent/', data)
+
+    def test_intent_and_finalize(self):
+        response = self._intent()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['method'], 'PUT')
+        object_name = UploadSession.objects.get(pk=response.data['id']).object_name
+        self.assertEqual(response.data['upload_url'], f'https://minio.test/{object_name}')
+        self.minio.presigned_url.assert_called_with('PUT', object_name, mock.ANY)
+        self.assertEqual(self.usage().reserved_bytes, 2048)
+        upload_id = response.data['id']
+
+        self.minio.stat_object.side_effect = Exception('NoSuchKey')
+        response = self.client.post('/api/files/finalize_upload/', {'upload_id': upload_id})
+        self.assertEqual(response.status_code, 400)
+
+        self.minio.stat_object.side_effect = None
+        self.minio.stat_object.return_value = SimpleNamespace(size=1000, etag='"e1"', content_type='application/pdf')
+        response = self.client.post('/api/files/finalize_upload/', {'upload_id': upload_id})
+        self.assertEqual(response.status_code, 400)
+
+        self.minio.stat_object.return_value = SimpleNamespace(
+            size=2048, etag='"e1"', content_type='application/octet-stream')
+        response = self.client.post('/api/files/finalize_upload/', {'upload_id': upload_id})
+        self.assertEqual(response.status_code, 201)
+        file_obj = File.objects.get(pk=response.data['id'])
+        self.assertEqual((file_obj.file.name, file_obj.file_size, file_obj.mime_type, file_obj.etag),
+                         (object_name, 2048, 'application/pdf', 'e1'))
+        # Хеш и тип по сигнатуре вычисляет фоновая задача: объект не читается в запросе
+        self.assertTrue(Job.objects.filter(kind='files.process', payload={'file_id': file_obj.pk}).exists())
+        self.minio.get_object.assert_not_called()
+        usage = self.usage()
+        self.assertEqual((usage.used_bytes, usage.reserved_bytes), (2048, 0))
+
+        response = self.client.post('/api/files/finalize_upload/', {'upload_id': upload_id})
+        self.assertEqual((response.status_code, response.data['id']), (201, file_obj.pk))
+        self.assertEqual(File.objects.count(), 1)
+
+    def test_finalize_foreign_or_unknown_upload(self):
+        upload_id = self._intent().data['id']
+        self.client.force_authenticate(self.create_user('other'))
+        self.assertEqual(self.client.post('/api/files/finalize_upload/', {'upload_id': upload_id}).status_code, 404)
+        self.assertEqual(self.client.post('/api/files/finalize_upload/', {'upload_id': 'nope'}).status_code, 404)
+
+    def test_invalid_intent(self):
+        self.assertEqual(self._intent(total_size=0).status_code, 400)
+        self.assertEqual(self._intent(sha256='xyz').status_code, 400)
+        self.assertFalse(UploadSession.objects.exists())
+        self.minio.presigned_url.assert_not_called()
+
+
+class SignedURLTests(StorageTestCase):
+    def test_listing_signs_each_object_once_per_window(self):
+        for index in range(3):
+            self.create_file(name=f'file{index}.txt')
+        response = self.client.get('/api/files/my_files/')
+        self.assertEqual(response.status_code, 200)
+        results = response.data['results']
+        self.assertEqual({item['file_url'] for item in results},
+                         {f'https://minio.test/uploads/{self.user.pk}/file{index}.txt' for index in range(3)})
+        self.assertEqual(self.minio.presigned_url.call_count, 3)
+
+        # Другой процесс (пустой кэш процесса) берет подписи из общего кэша
+        signing._local_cache.clear()
+        name = f'uploads/{self.user.pk}/file0.txt'
+        self.assertEqual(signing.sign_many([name]), {name: f'https://minio.test/{name}'})
+        self.assertEqual(self.client.get('/api/files/my_files/').data['results'], results)
+        self.assertEqual(self.minio.presigned_url.call_count, 3)
+
+    def test_signature_window(self):
+        ttl = int(settings.FILE_URL_TTL.total_seconds())
+        start, window = signing.current_window(now=10 * ttl + 1)
+        self.assertEqual((start, window), (10 * ttl, ttl // 2))
+        self.assertEqual(signing.current_window(now=10 * ttl + ttl // 2)[0], 10 * ttl + ttl // 2)
+
+        with mock.patch('storage.signing.time.time', return_value=start + 1):
+            signing.sign_many(['a.txt'])
+            signing.sign_many(['a.txt'])
+        self.assertEqual(self.minio.presigned_url.call_count, 1)
+        request_date = self.minio.presigned_url.call_args.kwargs['request_date']
+        self.assertEqual(request_date.timestamp(), start)
+        with mock.patch('storage.signing.time.time', return_value=start + window):
+            signing.sign_many(['a.txt'])
+        self.assertEqual(self.minio.presigned_url.call_count, 2)
+
+    def test_download_only_own_files(self):
+        own = self.create_file()
+        other = self.create_user('other')
+        shared = self.create_file(other, 'shared.txt', is_public=True)
+        private = self.create_file(other, 'private.txt')
+        response = self.client.get(f'/api/files/{own.pk}/download/')
+        self.assertEqual(response.data['download_url'], f'https://minio.test/{own.file.name}')
+        self.assertEqual(self.client.get(f'/api/files/{shared.pk}/download/').status_code, 404)
+        self.assertEqual(self.client.get(f'/api/files/{private.pk}/download/').status_code, 404)
+
+
+class SecureMediaBucketTests(SimpleTestCase):
+    PUBLIC = {'Effect': 'Allow', 'Principal': {'AWS': ['*']}, 'Action': ['s3:GetObject'],
+              'Resource': ['arn:aws:s3:::media/*']}
+    OWN = {'Effect': 'Allow', 'Principal': {'AWS': ['arn:aws:iam::1:user/backup']}, 'Action': ['s3:ListBucket'],
+           'Resource': ['arn:aws:s3:::media']}
+
+    def _run(self, policy, *args):
+        out = io.StringIO()
+        with mock.patch.object(objects, 'get_bucket_name', return_value='media'), \
+                mock.patch.object(objects, 'get_bucket_policy', return_value=policy), \
+                mock.patch.object(objects, 'set_bucket_policy') as set_policy:
+            call_command('secure_media_bucket', *args, stdout=out)
+        return set_policy, out.getvalue()
+
+    def test_removes_only_anonymous_statements(self):
+        set_policy, output = self._run({'Version': '2012-10-17', 'Statement': [self.PUBLIC, self.OWN]})
+        set_policy.assert_called_once_with({'Version': '2012-10-17', 'Statement': [self.OWN]})
+        self.assertIn("Removed anonymous access from bucket 'media' (s3:GetObject)", output)
+
+    def test_private_bucket_untouched(self):
+        set_policy, output = self._run(None)
+        set_policy.assert_not_called()
+        set_policy, output = self._run({'Statement': [self.OWN]})
+        set_policy.assert_not_called()
+
+    def test_check_only_reports(self):
+        with self.assertRaises(CommandError):
+            self._run({'Statement': self.PUBLIC}, '--check')
+
+
+class StorageQuotaTests(StorageTestCase):
+    def test_counters_follow_files(self):
+        first = self.create_file(size=300)
+        self.create_file(name='second.txt', size=200)
+        usage = self.usage()
+        self.assertEqual((usage.used_bytes, usage.file_count), (500, 2))
+        first.delete()
+        usage = self.usage()
+        self.assertEqual((usage.used_bytes, usage.file_count), (200, 1))
+        response = self.client.get('/api/storage/info/')
+        self.assertEqual((response.data['used'], response.data['total']), (200, settings.STORAGE_QUOTA_BYTES))
+
+    @override_settings(STORAGE_QUOTA_BYTES=1000)
+    def test_reserve_and_release(self):
+        self.create_file(size=600)
+        quota.reserve(self.user, 300)
+        with self.assertRaises(QuotaExceeded):
+            quota.reserve(self.user, 101)
+        quota.release(self.user.pk, 300)
+        quota.reserve(self.user, 400)
+        self.assertEqual(self.usage().reserved_bytes, 400)
+        # Лишнее освобождение не уводит счетчик в минус
+        quota.release(self.user.pk, 1000)
+        self.assertEqual(self.usage().reserved_bytes, 0)
+
+    @override_settings(STORAGE_QUOTA_BYTES=1000)
+    def test_upload_reserves_content_length(self):
+        self.create_file(size=900)
+        upload = SimpleUploadedFile('essay.txt', b'x' * 200, content_type='text/plain')
+        response = self.client.post('/api/files/', {'file': upload, 'file_type': 'document'})
+        self.assertEqual(response.status_code, 413)
+        self.minio.put_object.assert_not_called()
+
+        self.client.force_authenticate(self.create_user('other'))
+        upload = SimpleUploadedFile('essay.txt', b'x' * 200, content_type='text/plain')
+        response = self.client.post('/api/files/', {'file': upload, 'file_type': 'document'})
+        self.assertEqual(response.status_code, 201, response.data)
+        usage = StorageUsage.objects.get(user__username='other')
+        self.assertEqual((usage.used_bytes, usage.reserved_bytes), (200, 0))
+        self.assertFalse(QuotaReservation.objects.exists())
+
+    def test_upload_without_content_length(self):
+        upload = SimpleUploadedFile('essay.txt', b'x' * 200, content_type='text/plain')
+        response = self.client.post('/api/files/', {'file': upload}, CONTENT_LENGTH='')
+        self.assertEqual(response.status_code, 411)
+        response = self.client.post('/api/files/bulk_upload/', {'files': upload}, CONTENT_LENGTH='')
+        self.assertEqual(response.status_code, 411)
+        self.assertFalse(File.objects.exists())
+
+    def test_reconcile_keeps_in_flight_reservations(self):
+        self.create_file(size=100)
+        UploadSession.objects.create(user=self.user, object_name='uploads/x', original_filename='x',
+                                     total_size=50, part_size=50, expires_at=timezone.now())
+        with quota.reservation(self.user, 30):
+            StorageUsage.objects.filter(user=self.user).update(used_bytes=7, reserved_bytes=0, file_count=9)
+            self.assertEqual(quota.reconcile([self.user.pk]), 1)
+            usage = self.usage()
+            self.assertEqual((usage.used_bytes, usage.file_count, usage.reserved_bytes), (100, 1, 80))
+        self.assertEqual(self.usage().reserved_bytes, 50)
+
+    def test_reconcile_drops_stale_reservations(self):
+        quota.get_usage(self.user)
+        QuotaReservation.objects.create(user=self.user, size=40)
+        StorageUsage.objects.filter(user=self.user).update(reserved_bytes=40)
+        self.assertEqual(quota.reconcile([self.user.pk]), 0)
+        QuotaReservation.objects.update(created_at=timezone.now() - settings.QUOTA_RESERVATION_MAX_AGE * 2)
+        self.assertEqual(quota.reconcile([self.user.pk]), 1)
+        self.assertEqual(self.usage().reserved_bytes, 0)
+        self.assertFalse(QuotaReservation.objects.exists())
+
+
+@skipUnless(connection.vendor == 'postgresql', 'concurrent row locking requires PostgreSQL')
+@override_settings(CACHES=LOCMEM_CACHES, STORAGE_QUOTA_BYTES=1000)
+class ConcurrentQuotaTests(TransactionTestCase):
+    def test_parallel_reservations_stay_within_quota(self):
+        user = User.objects.create_user('student')
+        quota.get_usage(user)
+        barrier = threading.Barrier(8)
+        outcomes = []
+
+        def reserve():
+            try:
+                barrier.wait(5)
+                quota.reserve(user, 300)
+                outcomes.append(True)
+            except QuotaExceeded:
+                outcomes.append(False)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=reserve) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+        self.assertEqual(outcomes.count(True), 3)
+        self.assertEqual(StorageUsage.objects.get(user=user).reserved_bytes, 900)
+
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class ListQueryCountTests(StorageTestCase):
+    """Число запросов списка не зависит от числа строк на странице"""
+
+    def _queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def _assert_constant(self, url, add_rows):
+        add_rows(0)
+        baseline = self._queries(url)
+        add_rows(1)
+        self.assertEqual(self._queries(url), baseline)
+
+    def test_files(self):
+        course = self.create_course(students=[self.user])
+        assignment = self.create_assignment(course)
+
+        def add_rows(batch):
+            for index in range(3):
+                self.create_file(name=f'{batch}-{index}.txt', course=course if index else None,
+                                 assignment=assignment if index == 2 else None)
+
+        self._assert_constant('/api/files/', add_rows)
+        self._assert_constant('/api/files/my_files/', lambda batch: None)
+
+    def test_courses(self):
+        students = [self.create_user(f'student{index}') for index in range(3)]
+
+        def add_rows(batch):
+            for index in range(3):
+                course = self.create_course(name=f'Course {batch}{index}', students=students)
+                self.create_assignment(course)
+
+        self._assert_constant('/api/courses/', add_rows)
+
+    def test_assignments(self):
+        def add_rows(batch):
+            for index in range(3):
+                course = self.create_course(name=f'Course {batch}{index}', students=[self.user])
+                assignment = self.create_assignment(course)
+                self.create_file(name=f'{batch}-{index}.txt', assignment=assignment)
+
+        self._assert_constant('/api/assignments/', add_rows)
+
+
+class DeduplicationTests(StorageTestCase):
+    CONTENT = b'%PDF-1.4 same lecture notes'
+    SHA256 = hashlib.sha256(CONTENT).hexdigest()
+
+    def _upload(self, name):
+        upload = SimpleUploadedFile(name, self.CONTENT, content_type='application/pdf')
+        response = self.client.post('/api/files/', {'file': upload, 'file_type': 'document'})
+        self.assertEqual(response.status_code, 201, response.data)
+        return File.objects.latest('pk')
+
+    def test_same_content_shares_one_object(self):
+        first = self._upload('first.pdf')
+        second = self._upload('second.pdf')
+        blob = Blob.objects.get(sha256=self.SHA256)
+        self.assertEqual((first.blob_id, second.blob_id), (blob.pk, blob.pk))
+        self.assertEqual((first.file.name, second.file.name), (blob.object_name, blob.object_name))
+        self.assertEqual(blob.ref_count, 2)
+        self.assertEqual((first.original_filename, second.original_filename), ('first.pdf', 'second.pdf'))
+        # Только что записанная копия удаляется из MinIO
+        duplicate = self.minio.put_object.call_args_list[1].args[0]
+        self.assertNotEqual(duplicate, blob.object_name)
+        self.assertTrue(ObjectDeletion.objects.filter(object_name=duplicate).exists())
+        self.assertFalse(ObjectDeletion.objects.filter(object_name=blob.object_name).exists())
+
+        first.delete()
+        blob.refresh_from_db()
+        self.assertEqual(blob.ref_count, 1)
+        self.assertFalse(ObjectDeletion.objects.filter(object_name=blob.object_name).exists())
+        second.delete()
+        self.assertFalse(Blob.objects.exists())
+        self.assertTrue(ObjectDeletion.objects.filter(object_name=blob.object_name).exists())
+
+    def test_session_with_known_hash_skips_upload(self):
+        stored = self._upload('first.pdf')
+        response = self.client.post('/api/uploads/', {'original_filename': 'copy.pdf', 'sha256': self.SHA256,
+                                                      'total_size': len(self.CONTENT)})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['status'], 'completed')
+        self.minio.create_multipart_upload.assert_not_called()
+        copy = File.objects.get(pk=response.data['file'])
+        self.assertEqual(copy.file.name, stored.file.name)
+        self.assertEqual(Blob.objects.get().ref_count, 2)
+        usage = self.usage()
+        self.assertEqual((usage.used_bytes, usage.reserved_bytes), (2 * len(self.CONTENT), 0))
+
+    def test_hash_of_foreign_private_file_is_not_reusable(self):
+        self._upload('private.pdf')
+        other = self.create_user('other')
+        self.assertIsNone(blobs.find_reusable(other, self.SHA256, len(self.CONTENT)))
+        self.assertIsNone(blobs.find_reusable(self.user, self.SHA256, len(self.CONTENT) + 1))
+        File.objects.update(is_public=True)
+        self.assertIsNotNone(blobs.find_reusable(other, self.SHA256, len(self.CONTENT)))
+
+
+class ResponseCacheTests(StorageTestCase):
+    def get(self, path, user=None):
+        self.client.force_authenticate(user or self.user)
+        return self.client.get(path)
+
+    def test_repeated_list_is_served_from_cache(self):
+        self.create_file()
+        self.assertEqual(self.get('/api/files/my_files/')['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            response = self.get('/api/files/my_files/')
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_entries_are_per_user(self):
+        self.get('/api/courses/')
+        self.assertEqual(self.get('/api/courses/', self.create_user('other'))['X-Cache'], 'MISS')
+
+    def test_write_invalidates_after_commit(self):
+        self.get('/api/files/my_files/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_file(name='new.txt')
+        response = self.get('/api/files/my_files/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual([item['original_filename'] for item in response.data['results']], ['new.txt'])
+
+    def test_cache_info_and_clear(self):
+        self.get('/api/courses/')
+        self.get('/api/files/my_files/')
+        info = self.get('/api/storage/cache/info/').data
+        self.assertEqual(info['items_count'], 2)
+        self.assertGreater(info['size'], 0)
+
+        response = self.client.post('/api/storage/cache/clear/')
+        self.assertEqual(response.data['removed'], 2)
+        self.assertEqual(self.get('/api/storage/cache/info/').data, {'items_count': 0, 'size': 0})
+        self.assertEqual(self.get('/api/courses/')['X-Cache'], 'MISS')
+
+    @override_settings(RESPONSE_CACHE_MAX_ENTRIES_PER_USER=2)
+    def test_oldest_entries_are_evicted(self):
+        for path in ('/api/courses/', '/api/assignments/', '/api/files/my_files/'):
+            self.get(path)
+        self.assertEqual(self.get('/api/storage/cache/info/').data['items_count'], 2)
+        self.assertEqual(self.get('/api/courses/')['X-Cache'], 'MISS')
+        self.assertEqual(self.get('/api/files/my_files/')['X-Cache'], 'HIT')
+
+    @override_settings(RESPONSE_CACHE_ENABLED=False)
+    def test_disabled_cache(self):
+        response = self.get('/api/courses/')
+        self.assertNotIn('X-Cache', response)
+        self.assertNotIn('ETag', response)
+
+
+class CachedJWTAuthenticationTests(StorageTestCase):
+    def authenticate(self, token):
+        request = RequestFactory().get('/api/files/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        user, _ = CachedJWTAuthentication().authenticate(request)
+        return user
+
+    def access_token(self, user=None):
+        return str(UserRefreshToken.for_user(user or self.user).access_token)
+
+    def test_user_is_resolved_from_cache(self):
+        token = self.access_token()
+        self.assertEqual(self.authenticate(token), self.user)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.authenticate(token).pk, self.user.pk)
+
+    def test_saving_the_user_invalidates_the_cached_user(self):
+        token = self.access_token()
+        self.authenticate(token)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.role = 'teacher'
+            self.user.save()
+        self.assertEqual(self.user.auth_version, 1)
+        self.assertEqual(self.authenticate(token).role, 'teacher')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(token)
+
+    def test_deleted_user_is_rejected(self):
+        token = self.access_token()
+        User.objects.filter(pk=self.user.pk).delete()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(token)
+
+    @override_settings(JWT_STATELESS_AUTH=True)
+    def test_stateless_user_is_built_from_claims(self):
+        self.user.is_staff = True
+        token = self.access_token()
+        authentication.get_auth_version(self.user.pk)
+        with self.assertNumQueries(0):
+            user = self.authenticate(token)
+        self.assertTrue(user.is_token_backed)
+        self.assertEqual((user.pk, user.username, user.role, user.is_staff),
+                         (self.user.pk, 'student', 'student', True))
+
+    @override_settings(JWT_STATELESS_AUTH=True)
+    def test_stateless_claims_of_an_old_version_are_not_trusted(self):
+        token = self.access_token()
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.get(pk=self.user.pk).save()
+        user = self.authenticate(token)
+        self.assertFalse(getattr(user, 'is_token_backed', False))
+        self.assertEqual(user.auth_version, 1)
+
+
+class BloomFilterTests(SimpleTestCase):
+    def test_no_false_negatives(self):
+        bloom = BloomFilter(1000, 0.01)
+        values = [f'jti-{i}' for i in range(1000)]
+        for value in values:
+            bloom.add(value)
+        self.assertTrue(all(value in bloom for value in values))
+        self.assertEqual(bloom.count, 1000)
+        bloom.add('jti-1')
+        self.assertEqual(bloom.count, 1000)
+        false_positives = sum(f'other-{i}' in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+
+class TokenRevocationTests(StorageTestCase):
+    def setUp(self):
+        super().setUp()
+        revocation.checker.reset()
+        self.addCleanup(revocation.checker.reset)
+
+    def revoke(self, token):
+        with self.captureOnCommitCallbacks(execute=True):
+            token.blacklist()
+
+    def test_revoked_token_is_found_and_others_skip_the_database(self):
+        revoked, active = UserRefreshToken.for_user(self.user), UserRefreshToken.for_user(self.user)
+        self.revoke(revoked)
+        self.assertTrue(revocation.checker.is_revoked(revoked['jti']))
+        with self.assertNumQueries(0):
+            self.assertFalse(revocation.checker.is_revoked(active['jti']))
+
+    def test_new_revocations_are_loaded_incrementally(self):
+        first, second = UserRefreshToken.for_user(self.user), UserRefreshToken.for_user(self.user)
+        self.revoke(first)
+        self.assertFalse(revocation.checker.is_revoked(second['jti']))
+        bloom = revocation.checker._filter
+        self.revoke(second)
+        self.assertTrue(revocation.checker.is_revoked(second['jti']))
+        self.assertIs(revocation.checker._filter, bloom)
+
+    def test_refresh_with_rotated_token_is_rejected(self):
+        refresh = str(UserRefreshToken.for_user(self.user))
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/token/refresh/', {'refresh': refresh})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.data['refresh'], refresh)
+        response = self.client.post('/api/token/refresh/', {'refresh': refresh})
+        self.assertEqual(response.status_code, 401)
+
+    def test_prune_removes_only_expired_tokens(self):
+        expired, active = UserRefreshToken.for_user(self.user), UserRefreshToken.for_user(self.user)
+        self.revoke(expired)
+        OutstandingToken.objects.filter(jti=expired['jti']).update(expires_at=timezone.now() - timedelta(days=1))
+        self.assertEqual(revocation.prune_expired_tokens(batch_size=1), 1)
+        self.assertEqual(list(OutstandingToken.objects.values_list('jti', flat=True)), [active['jti']])
+        self.assertFalse(BlacklistedToken.objects.exists())
+
+
+class PreviewTests(StorageTestCase):
+    def setUp(self):
+        super().setUp()
+        image = io.BytesIO()
+        Image.new('RGB', (800, 400), 'red').save(image, 'PNG')
+        self.minio.get_object.return_value = mock.Mock(read=mock.Mock(return_value=image.getvalue()))
+        executor = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(executor.shutdown)
+        patcher = mock.patch.object(previews, 'get_executor', return_value=executor)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create_image(self, name='photo.png', **fields):
+        return self.create_file(name=name, size=5000, mime_type='image/png', **fields)
+
+    def test_image_previews_are_generated(self):
+        file_obj = self.create_image()
+        self.assertEqual(file_obj.preview_status, 'pending')
+        self.assertEqual(previews.generate(file_obj.pk), {'ready': 1, 'failed': 0})
+        file_obj.refresh_from_db()
+        self.assertEqual((file_obj.preview_status, file_obj.preview_sizes), ('ready', ['medium', 'small']))
+        written = {call.args[0]: call.args[1] for call in self.minio.put_object.call_args_list}
+        self.assertEqual(set(written), {previews.preview_key(file_obj.file.name, size) for size in ('small', 'medium')})
+        small = Image.open(io.BytesIO(written[previews.preview_key(file_obj.file.name, 'small')]))
+        self.assertEqual(small.size, (160, 80))
+        # Повторный запуск задачи ничего не делает
+        self.assertIsNone(previews.generate(file_obj.pk))
+
+    def test_shared_content_reuses_previews(self):
+        first = self.create_image()
+        previews.generate(first.pk)
+        self.minio.get_object.reset_mock()
+        second = self.create_image(user=self.create_user('other'))
+        File.objects.filter(pk=second.pk).update(file=first.file.name)
+        self.assertEqual(previews.generate(second.pk), {'ready': 1, 'failed': 0})
+        self.minio.get_object.assert_not_called()
+        second.refresh_from_db()
+        self.assertEqual(second.preview_sizes, ['medium', 'small'])
+
+    def test_failures_are_recorded_and_requeued(self):
+        file_obj = self.create_image()
+        self.minio.get_object.side_effect = OSError('connection reset')
+        self.assertEqual(previews.generate(file_obj.pk), {'ready': 0, 'failed': 1})
+        file_obj.refresh_from_db()
+        self.assertEqual(file_obj.preview_status, 'failed')
+        self.assertEqual(previews.requeue(), 1)
+        file_obj.refresh_from_db()
+        self.assertEqual(file_obj.preview_status, 'pending')
+
+    def test_documents_are_not_previewed(self):
+        self.assertEqual(self.create_file().preview_status, 'none')
+        self.assertFalse(previews.is_previewable('image/png', settings.PREVIEW_MAX_SOURCE_SIZE + 1))
+
+    @override_settings(PREVIEW_WORKERS=0)
+    def test_renderers_are_split_between_worker_processes(self):
+        with mock.patch('os.cpu_count', return_value=8), mock.patch.object(job_workers, 'process_count', 3):
+            self.assertEqual(previews.renderer_count(), 2)
+        with mock.patch('os.cpu_count', return_value=2), mock.patch.object(job_workers, 'process_count', 4):
+            self.assertEqual(previews.renderer_count(), 1)
+        with override_settings(PREVIEW_WORKERS=5):
+            self.assertEqual(previews.renderer_count(), 5)
+
+
+class JobQueueTests(StorageTestCase):
+    def setUp(self):
+        super().setUp()
+        self.calls = []
+        patcher = mock.patch.dict(jobs._handlers, {'test.ok': self.run_job, 'test.fail': self.fail_job})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_job(self, **payload):
+        self.calls.append(payload)
+
+    def fail_job(self, **payload):
+        raise RuntimeError('boom')
+
+    def test_claim_order_and_lease(self):
+        low = jobs.enqueue('test.ok', priority=5)
+        high = jobs.enqueue('test.ok', priority=-1)
+        jobs.enqueue('test.ok', delay=timedelta(minutes=1))
+        claimed = jobs.claim('worker-a', batch_size=10)
+        self.assertEqual([job.pk for job in claimed], [high.pk, low.pk])
+        job = claimed[0]
+        self.assertEqual((job.status, job.locked_by, job.attempts), ('running', 'worker-a', 1))
+        self.assertAlmostEqual(job.locked_until, job.started_at + settings.JOB_LEASE, delta=timedelta(seconds=1))
+        self.assertEqual(jobs.claim('worker-b', batch_size=10), [])
+        self.assertEqual(jobs.claim('worker-b', kinds=['other']), [])
+
+    def test_successful_job(self):
+        jobs.enqueue('test.ok', value=1)
+        job, = jobs.claim('worker-a')
+        self.assertTrue(jobs.execute(job))
+        job.refresh_from_db()
+        self.assertEqual(self.calls, [{'value': 1}])
+        self.assertEqual((job.status, job.locked_until, job.last_error), ('done', None, ''))
+        self.assertIsNotNone(job.wait_ms)
+
+    def test_failed_job_is_retried_with_backoff(self):
+        jobs.enqueue('test.fail', max_attempts=2)
+        job, = jobs.claim('worker-a')
+        before = timezone.now()
+        with mock.patch('random.uniform', return_value=1.0):
+            self.assertFalse(jobs.execute(job))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.last_error), ('queued', 'RuntimeError: boom'))
+        self.assertAlmostEqual(job.run_after, before + timedelta(seconds=settings.JOB_RETRY_BASE_DELAY),
+                               delta=timedelta(seconds=1))
+        self.assertEqual(jobs.claim('worker-a'), [])
+
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        job, = jobs.claim('worker-a')
+        jobs.execute(job)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+        self.assertIsNotNone(job.finished_at)
+
+    def test_retry_delay_is_capped(self):
+        with mock.patch('random.uniform', return_value=1.0):
+            delays = [jobs.retry_delay(attempts).total_seconds() for attempts in (1, 2, 3, 20)]
+        self.assertEqual(delays, [10, 20, 40, settings.JOB_RETRY_MAX_DELAY])
+
+    def test_expired_lease_is_requeued(self):
+        jobs.enqueue('test.ok')
+        jobs.enqueue('test.ok', max_attempts=1)
+        stale, exhausted = jobs.claim('worker-a', batch_size=2)
+        later = timezone.now() + settings.JOB_LEASE + timedelta(seconds=1)
+        self.assertEqual(jobs.requeue_expired(now=later), 1)
+        stale.refresh_from_db()
+        exhausted.refresh_from_db()
+        self.assertEqual((stale.status, stale.locked_until), ('queued', None))
+        self.assertEqual((exhausted.status, exhausted.last_error), ('failed', 'Lease expired'))
+
+        # Воркер с истекшей арендой не перезаписывает результат нового владельца
+        Job.objects.filter(pk=stale.pk).update(run_after=timezone.now())
+        reclaimed, = jobs.claim('worker-b')
+        jobs.execute(stale)
+        reclaimed.refresh_from_db()
+        self.assertEqual((reclaimed.status, reclaimed.locked_by, reclaimed.attempts), ('running', 'worker-b', 2))
+
+    def test_unknown_kind_fails(self):
+        jobs.enqueue('test.unknown', max_attempts=1)
+        job, = jobs.claim('worker-a')
+        self.assertFalse(jobs.execute(job))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('No handler registered', job.last_error)
+
+    def test_prune_and_stats(self):
+        jobs.enqueue('test.ok')
+        job, = jobs.claim('worker-a')
+        jobs.execute(job)
+        jobs.enqueue('test.ok')
+        metrics = jobs.stats()['test.ok']
+        self.assertEqual([metrics[name] for name in ('queued', 'running', 'done', 'failed')], [1, 0, 1, 0])
+        self.assertIsNotNone(metrics['avg_duration_ms'])
+        self.assertEqual(jobs.prune(), 0)
+        self.assertEqual(jobs.prune(older_than=timedelta(seconds=-1)), 1)
+        self.assertEqual(Job.objects.count(), 1)
+
+
+class BulkUploadTests(StorageTestCase):
+    def post(self, *files, **data):
+        return self.client.post('/api/files/bulk_upload/', {'files': list(files), 'file_type': 'document', **data})
+
+    def test_partial_success(self):
+        response = self.post(SimpleUploadedFile('a.txt', b'same text'), SimpleUploadedFile('empty.txt', b''),
+                             SimpleUploadedFile('b.txt', b'same text'))
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual((response.data['created'], response.data['failed']), (2, 1))
+        self.assertEqual([result['status'] for result in response.data['results']], ['created', 'error', 'created'])
+        self.assertEqual(response.data['results'][1]['error'], 'The submitted file is empty.')
+
+        files = list(File.objects.order_by('pk'))
+        self.assertEqual([f.original_filename for f in files], ['a.txt', 'b.txt'])
+        blob = Blob.objects.get()
+        self.assertEqual(blob.ref_count, 2)
+        self.assertEqual({f.file.name for f in files}, {blob.object_name})
+        self.assertEqual(ObjectDeletion.objects.count(), 1)
+        usage = self.usage()
+        self.assertEqual((usage.used_bytes, usage.file_count, usage.reserved_bytes), (18, 2, 0))
+        self.assertEqual(set(Job.objects.filter(kind='files.process').values_list('payload__file_id', flat=True)),
+                         {f.pk for f in files})
+
+    def test_all_failed(self):
+        response = self.post(SimpleUploadedFile('empty.txt', b''))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['created'], 0)
+        self.assertFalse(File.objects.exists())
+
+    @override_settings(BULK_UPLOAD_MAX_FILES=1)
+    def test_too_many_files_are_discarded(self):
+        response = self.post(SimpleUploadedFile('a.txt', b'first'), SimpleUploadedFile('b.txt', b'second'))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('files', response.data)
+        written = {call.args[0] for call in self.minio.put_object.call_args_list}
+        self.assertEqual(len(written), 2)
+        self.assertEqual({call.args[0] for call in self.minio.remove_object.call_args_list}, written)
+        self.assertEqual(self.usage().reserved_bytes, 0)
+
+    @override_settings(STORAGE_QUOTA_BYTES=10)
+    def test_quota_is_checked_before_reading_the_body(self):
+        response = self.post(SimpleUploadedFile('a.txt', b'much more than ten bytes'))
+        self.assertEqual(response.status_code, 413)
+        self.minio.put_object.assert_not_called()
+
+
+class FakeObject(io.BytesIO):
+    """Ответ get_object MinIO над байтами в памяти"""
+
+    def stream(self, amount):
+        while chunk := self.read(amount):
+            yield chunk
+
+    def release_conn(self):
+        pass
+
+
+class ArchiveTests(StorageTestCase):
+    def setUp(self):
+        super().setUp()
+        self.contents = {}
+        self.minio.get_object.side_effect = lambda name: FakeObject(self.contents[name])
+        self.course = self.create_course(students=[self.user])
+        self.teacher = self.course.teacher
+        self.lab = self.create_assignment(self.course, title='Lab 1')
+
+    def add_file(self, user, name, content, **fields):
+        file_obj = self.create_file(user=user, name=name, size=len(content), **fields)
+        self.contents[file_obj.file.name] = content
+        return file_obj
+
+    def download(self, path, user):
+        self.client.force_authenticate(user)
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        return zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+
+    @override_settings(ARCHIVE_PREFETCH_BYTES=4)
+    def test_teacher_gets_all_files(self):
+        self.add_file(self.teacher, 'syllabus.txt', b'course plan', course=self.course)
+        self.add_file(self.user, 'report.txt', b'student report ' * 100, assignment=self.lab)
+        other = self.create_user('zoe')
+        self.add_file(other, 'report.txt', b'first', assignment=self.lab)
+        second = self.add_file(other, 'report-2.txt', b'second', assignment=self.lab)
+        File.objects.filter(pk=second.pk).update(original_filename='report.txt')
+        self.add_file(self.user, 'photo.png', b'\x89PNG image', assignment=self.lab,
+                      file_type='image', mime_type='image/png')
+
+        archive = self.download(f'/api/courses/{self.course.pk}/archive/', self.teacher)
+        # Положение файлов без задания зависит от сортировки NULL в СУБД
+        self.assertCountEqual(archive.namelist(), [
+            'Lab 1/student/photo.png', 'Lab 1/student/report.txt',
+            'Lab 1/zoe/report.txt', 'Lab 1/zoe/report (2).txt',
+            f'Материалы курса/{self.teacher.username}/syllabus.txt'])
+        self.assertEqual(archive.read('Lab 1/student/report.txt'), b'student report ' * 100)
+        self.assertEqual(archive.getinfo('Lab 1/student/photo.png').compress_type, zipfile.ZIP_STORED)
+        self.assertEqual(archive.getinfo('Lab 1/student/report.txt').compress_type, zipfile.ZIP_DEFLATED)
+        self.assertIsNone(archive.testzip())
+
+    def test_students_get_own_and_public_files(self):
+        self.add_file(self.user, 'mine.txt', b'mine', assignment=self.lab)
+        other = self.create_user('zoe')
+        self.add_file(other, 'private.txt', b'private', assignment=self.lab)
+        self.add_file(other, 'shared.txt', b'shared', assignment=self.lab, is_public=True)
+        archive = self.download(f'/api/assignments/{self.lab.pk}/archive/', self.user)
+        self.assertEqual(archive.namelist(), ['student/mine.txt', 'zoe/shared.txt'])
+
+    def test_unreadable_file_is_listed_in_errors(self):
+        self.add_file(self.user, 'good.txt', b'good', assignment=self.lab)
+        self.create_file(name='missing.txt', assignment=self.lab)
+        archive = self.download(f'/api/assignments/{self.lab.pk}/archive/', self.teacher)
+        self.assertEqual(archive.namelist(), ['student/good.txt', archives.ERRORS_ENTRY])
+        self.assertIn('student/missing.txt', archive.read(archives.ERRORS_ENTRY).decode())
+
+    def test_entry_names_cannot_escape_the_archive(self):
+        file_obj = File(original_filename='../../etc/passwd', file='uploads/1/x')
+        (arcname, _), = archives.build_entries([file_obj], lambda f: ('..', 'a/b'))
+        self.assertEqual(arcname, '_/a_b/.._.._etc_passwd')
+
+
+class GarbageCollectionTests(StorageTestCase):
+    def setUp(self):
+        super().setUp()
+        self.minio.remove_objects.return_value = {}
+        self.listing = []
+        self.minio.list_objects.side_effect = lambda prefix: iter(
+            [obj for obj in sorted(self.listing, key=lambda obj: obj.object_name) if obj.object_name.startswith(prefix)])
+
+    def stored(self, name, age=timedelta(days=2), size=10):
+        self.listing.append(SimpleNamespace(object_name=name, size=size, last_modified=timezone.now() - age))
+
+    def create_references(self):
+        self.create_file(name='a.txt')
+        Blob.objects.create(sha256='b' * 64, object_name='uploads/blob/b', size=10, ref_count=1)
+        for name, status in (('c', 'active'), ('d', 'completed')):
+            UploadSession.objects.create(user=self.user, object_name=f'uploads/{self.user.pk}/{name}',
+                                         original_filename=name, total_size=10, part_size=10, status=status,
+                                         expires_at=timezone.now())
+        for name in ('a.txt', 'c', 'd'):
+            self.stored(f'uploads/{self.user.pk}/{name}')
+        self.stored(f'uploads/{self.user.pk}/fresh', age=timedelta(minutes=5))
+        self.stored('uploads/blob/b')
+        self.stored('uploads/zz/lost', size=25)
+
+    def test_orphans_are_found_by_merging_listing_and_references(self):
+        self.create_references()
+        stats = {}
+        orphans = [obj.object_name for obj in deletions.find_orphans(grace=timedelta(hours=1), stats=stats)]
+        self.assertEqual(orphans, [f'uploads/{self.user.pk}/d', 'uploads/zz/lost'])
+        self.assertEqual(stats, {'scanned': 6, 'scanned_bytes': 75})
+
+    def test_dry_run_schedules_nothing(self):
+        self.create_references()
+        stats = deletions.collect_garbage(grace=timedelta(hours=1), dry_run=True)
+        self.assertEqual((stats['orphans'], stats['orphan_bytes']), (2, 35))
+        self.assertFalse(ObjectDeletion.objects.exists())
+        self.minio.remove_objects.assert_not_called()
+
+    def test_orphans_and_unused_previews_are_removed(self):
+        self.create_references()
+        used = previews.preview_key(f'uploads/{self.user.pk}/a.txt', 'small')
+        unused = previews.preview_key('uploads/zz/lost', 'small')
+        self.stored(used)
+        self.stored(unused)
+        stats = deletions.collect_garbage(grace=timedelta(hours=1))
+        self.assertEqual((stats['orphans'], stats['orphan_previews'], stats['removed']), (2, 1, 3))
+        removed, = self.minio.remove_objects.call_args.args
+        self.assertCountEqual(removed, [f'uploads/{self.user.pk}/d', 'uploads/zz/lost', unused])
+        self.assertFalse(ObjectDeletion.objects.exists())
+
+    def test_failed_removals_stay_queued(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            deletions.schedule(['uploads/1/a', 'uploads/1/b'])
+        self.assertEqual(Job.objects.filter(kind=deletions.PURGE_JOB).count(), 1)
+        self.minio.remove_objects.side_effect = lambda names: {
+            name: 'AccessDenied: denied' for name in names if name == 'uploads/1/b'}
+        self.assertEqual(deletions.purge(batch_size=1), {'removed': 1, 'failed': 1})
+        deletion = ObjectDeletion.objects.get()
+        self.assertEqual((deletion.object_name, deletion.attempts, deletion.last_error),
+                         ('uploads/1/b', 1, 'AccessDenied: denied'))
+
+    def test_last_reference_schedules_object_and_previews(self):
+        blob = Blob.objects.create(sha256='c' * 64, object_name='uploads/blob/c', size=10)
+        file_obj = self.create_file(name='c.txt', blob=blob, sha256=blob.sha256)
+        File.objects.filter(pk=file_obj.pk).update(file=blob.object_name)
+        with self.captureOnCommitCallbacks(execute=True):
+            File.objects.get(pk=file_obj.pk).delete()
+        self.assertCountEqual(ObjectDeletion.objects.values_list('object_name', flat=True),
+                              [blob.object_name] + [previews.preview_key(blob.object_name, size)
+                                                    for size in settings.PREVIEW_SIZES])
+        self.assertEqual(Job.objects.filter(kind=deletions.PURGE_JOB, status='queued').count(), 1)
+
+
+class SearchQueryTests(SimpleTestCase):
+    def test_prefix_query(self):
+        query = search.prefix_query('Лаб. работа №2 & !x:*')
+        self.assertEqual(query.source_expressions[-1].value, 'лаб:* & работа:* & 2:* & x:*')
+        self.assertIsNone(search.prefix_query('&! ::'))
+
+
+class FileSearchTests(StorageTestCase):
+    def setUp(self):
+        super().setUp()
+        self.other = self.create_user('other')
+        self.report = self.create_file(name='lab_report.pdf', description='Лабораторная работа по оптике')
+        self.notes = self.create_file(name='notes.txt')
+        FileContent.objects.create(file=self.notes, text='Законы оптики и преломление', source_sha256='')
+        self.shared = self.create_file(user=self.other, name='optics_shared.pdf', is_public=True)
+        self.private = self.create_file(user=self.other, name='optics_private.pdf')
+
+    def search(self, **params):
+        response = self.client.get('/api/files/search/', params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return [item['id'] for item in response.data['results']]
+
+    def test_only_own_and_public_files_are_found(self):
+        self.assertCountEqual(self.search(q='optics'), [self.shared.pk])
+        self.assertCountEqual(self.search(q='оптик'), [self.report.pk, self.notes.pk])
+
+    def test_filters_and_validation(self):
+        self.assertEqual(self.search(q='оптик', file_type='image'), [])
+        self.assertEqual(self.search(q='оптик', file_type='document', course=self.create_course().pk), [])
+        self.assertEqual(self.client.get('/api/files/search/', {'q': ' '}).status_code, 400)
+        self.assertEqual(self.client.get('/api/files/search/', {'q': 'x', 'course': 'abc'}).status_code, 400)
+
+    @skipUnless(connection.vendor == 'postgresql', 'Полнотекстовый поиск и pg_trgm есть только в PostgreSQL')
+    def test_ranking_and_typos(self):
+        self.assertEqual(self.search(q='лаб раб'), [self.report.pk])
+        # Совпадение в имени весит больше совпадения в тексте
+        self.create_file(name='оптика.pdf')
+        results = self.search(q='оптика')
+        self.assertEqual(results[-1], self.notes.pk)
+        self.assertIn(self.report.pk, self.search(q='lab_reprot'))
+
+
+class ConditionalRequestTests(StorageTestCase):
+    def setUp(self):
+        super().setUp()
+        self.course = self.create_course(students=[self.user])
+        self.create_assignment(self.course)
+
+    def get(self, path, etag=None, user=None):
+        self.client.force_authenticate(user or self.user)
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get(path, **headers)
+
+    def etag(self, path, user=None):
+        response = self.get(path, user=user)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+        return response['ETag']
+
+    def assertChanged(self, path, etag, changed=True, user=None):
+        response = self.get(path, etag, user=user)
+        self.assertEqual(response.status_code, 200 if changed else 304)
+
+    def test_unchanged_response_is_not_modified(self):
+        etag = self.etag('/api/assignments/')
+        self.assertTrue(etag.startswith('W/"'))
+        with self.assertNumQueries(0):
+            response = self.get('/api/assignments/', etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertFalse(response.content)
+        # Сравнение слабое: сильная форма и список тегов тоже подходят
+        self.assertChanged('/api/assignments/', etag.removeprefix('W/'), changed=False)
+        self.assertChanged('/api/assignments/', f'"other", {etag}', changed=False)
+        self.assertChanged('/api/assignments/', '"other"')
+
+    def test_etag_is_per_user(self):
+        etag = self.etag('/api/courses/')
+        self.assertChanged('/api/courses/', etag, user=self.create_user('other'))
+
+    def test_assignment_change_invalidates_lists(self):
+        assignments, courses = self.etag('/api/assignments/'), self.etag('/api/courses/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_assignment(self.course, title='Lab 2')
+        self.assertChanged('/api/assignments/', assignments)
+        self.assertChanged('/api/courses/', courses)
+
+    def test_enrollment_invalidates_only_the_student(self):
+        mine = self.etag('/api/assignments/')
+        other = self.create_user('other')
+        others = self.etag('/api/assignments/', user=other)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course.students.remove(self.user)
+        self.assertChanged('/api/assignments/', mine)
+        self.assertChanged('/api/assignments/', others, changed=False, user=other)
+
+    def test_file_changes_invalidate_owner_and_shared_lists(self):
+        file_obj = self.create_file(is_public=True)
+        reader = self.create_user('reader')
+        mine, shared = self.etag('/api/files/my_files/'), self.etag('/api/files/shared_files/', user=reader)
+        readers = self.etag('/api/files/my_files/', user=reader)
+        with self.captureOnCommitCallbacks(execute=True):
+            file_obj.is_public = False
+            file_obj.save()
+        self.assertChanged('/api/files/my_files/', mine)
+        self.assertChanged('/api/files/shared_files/', shared, user=reader)
+        self.assertChanged('/api/files/my_files/', readers, changed=False, user=reader)
+
+    def test_profile_change_invalidates_course_catalog(self):
+        etag = self.etag('/api/courses/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course.teacher.last_name = 'Newton'
+            self.course.teacher.save()
+        self.assertChanged('/api/courses/', etag)
+
+    def test_uncommitted_change_keeps_etag(self):
+        etag = self.etag('/api/assignments/')
+        with self.captureOnCommitCallbacks(execute=False):
+            self.create_assignment(self.course, title='Draft')
+        self.assertChanged('/api/assignments/', etag, changed=False)
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class SparseFieldsTests(StorageTestCase):
+    def setUp(self):
+        super().setUp()
+        self.course = self.create_course(students=[self.user])
+        self.create_assignment(self.course)
+        self.create_file(description='secret description')
+
+    def get(self, path, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path, params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response, ' '.join(query['sql'] for query in queries.captured_queries)
+
+    def test_fields_selects_and_skips_work(self):
+        response, sql = self.get('/api/files/my_files/', fields='id,original_filename')
+        self.assertEqual(list(response.data['results'][0]), ['id', 'original_filename'])
+        self.minio.presigned_url.assert_not_called()
+        self.assertNotIn('secret', str(response.data))
+        self.assertNotIn('"description"', sql)
+        self.assertNotIn('"storage_user"."first_name"', sql)
+
+    def test_omit_removes_fields(self):
+        response, _ = self.get('/api/files/my_files/', omit='file,file_url,previews')
+        item = response.data['results'][0]
+        self.assertNotIn('file_url', item)
+        self.assertIn('uploaded_by_name', item)
+        self.minio.presigned_url.assert_not_called()
+
+    def test_related_counts_are_computed_only_when_selected(self):
+        response, sql = self.get('/api/courses/', fields='id,name')
+        self.assertEqual(response.data, [{'id': self.course.pk, 'name': 'Physics'}])
+        self.assertNotIn('COUNT', sql.upper())
+        response, sql = self.get('/api/assignments/', omit='files_count,course_name')
+        self.assertNotIn('files_count', response.data[0])
+        self.assertNotIn('COUNT(', sql.upper().replace('COUNT(*)', ''))
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get('/api/files/my_files/', {'fields': 'id,password'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Unknown fields: password', response.data['error'])
+
+    def test_writes_ignore_the_parameters(self):
+        file_obj = File.objects.get()
+        response = self.client.patch(f'/api/files/{file_obj.pk}/?fields=id', {'description': 'updated'})
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['description'], 'updated')
+
+
+class DeadlineFeedTests(StorageTestCase):
+    def setUp(self):
+        super().setUp()
+        self.course = self.create_course(students=[self.user])
+        self.teacher = self.course.teacher
+
+    def run_jobs(self):
+        """Выполняет поставленные задачи так же, как воркер"""
+        while claimed := jobs.claim('test', batch_size=10):
+            for job in claimed:
+                self.assertTrue(jobs.execute(job), job.last_error)
+
+    def feed(self, user=None):
+        self.client.force_authenticate(user or self.user)
+        response = self.client.get('/api/assignments/deadlines/')
+        self.assertEqual(response.status_code, 200)
+        return [(item['title'], item['submitted_files']) for item in response.data]
+
+    def test_new_assignment_reaches_course_members(self):
+        self.create_assignment(self.course, title='Lab 2', due_in=timedelta(days=3))
+        self.create_assignment(self.course, title='Lab 1', due_in=timedelta(days=1))
+        self.create_assignment(self.course, title='Past', due_in=timedelta(days=-1))
+        self.assertEqual(self.feed(), [])
+        self.run_jobs()
+        self.assertEqual(self.feed(), [('Lab 1', 0), ('Lab 2', 0)])
+        self.assertEqual(self.feed(self.teacher), [('Lab 1', 0), ('Lab 2', 0)])
+        self.assertEqual(self.feed(self.create_user('outsider')), [])
+
+    def test_assignment_changes_are_applied(self):
+        lab = self.create_assignment(self.course)
+        self.run_jobs()
+        lab.title = 'Renamed'
+        lab.due_date = timezone.now() + timedelta(days=60)
+        lab.save()
+        self.run_jobs()
+        self.assertEqual(self.feed(), [])
+        self.client.force_authenticate(self.user)
+        self.assertEqual(len(self.client.get('/api/assignments/deadlines/', {'days': 90}).data), 1)
+
+        lab.due_date = timezone.now() - timedelta(hours=1)
+        lab.save()
+        self.run_jobs()
+        self.assertFalse(DeadlineEntry.objects.exists())
+
+    def test_enrollment_changes_apply_immediately(self):
+        self.create_assignment(self.course)
+        self.run_jobs()
+        newcomer = self.create_user('newcomer')
+        self.course.students.add(newcomer)
+        self.assertEqual(self.feed(newcomer), [('Lab', 0)])
+        newcomer.enrolled_courses.remove(self.course)
+        self.assertEqual(self.feed(newcomer), [])
+        self.course.students.clear()
+        self.assertEqual(self.feed(), [])
+        self.assertEqual(self.feed(self.teacher), [('Lab', 0)])
+
+    def test_submissions_update_the_feed(self):
+        lab = self.create_assignment(self.course)
+        self.run_jobs()
+        first = self.create_file(name='report.pdf', assignment=lab)
+        self.create_file(name='appendix.pdf', assignment=lab)
+        self.assertEqual(self.feed(), [('Lab', 2)])
+        self.assertEqual(self.feed(self.teacher), [('Lab', 0)])
+        first.delete()
+        self.assertEqual(self.feed(), [('Lab', 1)])
+        moved = File.objects.get()
+        moved.assignment = None
+        moved.save()
+        self.assertEqual(self.feed(), [('Lab', 0)])
+
+    def test_teacher_change_rebuilds_the_course(self):
+        self.create_assignment(self.course)
+        self.run_jobs()
+        new_teacher = self.create_user('new_teacher', role='teacher')
+        self.course.teacher = new_teacher
+        self.course.save()
+        self.run_jobs()
+        self.assertEqual(self.feed(new_teacher), [('Lab', 0)])
+        self.assertEqual(self.feed(self.teacher), [])
+
+    def test_refresh_all_rebuilds_and_prunes(self):
+        lab = self.create_assignment(self.course)
+        past = self.create_assignment(self.course, title='Past')
+        self.run_jobs()
+        DeadlineEntry.objects.filter(assignment=lab).delete()
+        Assignment.objects.filter(pk=past.pk).update(due_date=timezone.now() - timedelta(days=1))
+        self.assertEqual(deadlines.refresh_all(), (1, 2, 2))
+        self.assertEqual(set(DeadlineEntry.objects.values_list('assignment', flat=True)), {lab.pk})
+
+    def test_days_are_validated(self):
+        response = self.client.get('/api/assignments/deadlines/', {'days': '0'})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,100 @@
+import hashlib
+import logging
+import math
+import time
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Ограничение частоты по алгоритму token bucket: ведро вмещает capacity
+    запросов подряд и пополняется на refill_rate в секунду, поэтому короткий
+    всплеск проходит, а длительный поток ограничен средней скоростью.
+    Параметры - AUTH_THROTTLE_BUCKETS[scope]; состояние ведра хранится в общем
+    кэше, как у SimpleRateThrottle DRF.
+    """
+    scope = None
+    # False - запрос только проверяет, что ведро не пусто; токен списывает charge()
+    charge_on_request = True
+
+    def __init__(self):
+        self.capacity, self.refill_rate = settings.AUTH_THROTTLE_BUCKETS[self.scope]
+        self.wait_seconds = None
+
+    def get_cache_key(self, request, view):
+        """Ключ ведра или None, если запрос не ограничивается"""
+        raise NotImplementedError('.get_cache_key() must be overridden')
+
+    def _tokens(self, key, now):
+        state = cache.get(key)
+        if state is None:
+            return self.capacity
+        tokens, updated = state
+        return min(self.capacity, tokens + (now - updated) * self.refill_rate)
+
+    def _save(self, key, tokens, now):
+        # Запись живет, пока ведро не наполнится снова: полное ведро равно отсутствующему
+        timeout = math.ceil((self.capacity - tokens) / self.refill_rate) + 1
+        cache.set(key, (tokens, now), timeout=timeout)
+
+    def allow_request(self, request, view):
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+        now = time.time()
+        try:
+            tokens = self._tokens(key, now)
+            if tokens < 1:
+                self.wait_seconds = (1 - tokens) / self.refill_rate
+                return False
+            if self.charge_on_request:
+                self._save(key, tokens - 1, now)
+        except Exception as e:
+            # Недоступный кэш не должен закрывать вход: запрос пропускается без ограничения
+            logger.warning(f"Throttle cache unavailable ({self.scope}): {str(e)}")
+        return True
+
+    def charge(self, request, view=None):
+        """Списывает токен (для ограничений, которые учитывают только неудачные попытки)"""
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return
+        now = time.time()
+        try:
+            self._save(key, max(self._tokens(key, now) - 1, 0), now)
+        except Exception as e:
+            logger.warning(f"Throttle cache unavailable ({self.scope}): {str(e)}")
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class AuthIPThrottle(TokenBucketThrottle):
+    """Вход и регистрация с одного адреса (всплеск с запасом на аудиторию за одним NAT)"""
+    scope = 'auth_ip'
+
+    def get_cache_key(self, request, view):
+        return f'throttle:{self.scope}:{self.get_ident(request)}'
+
+
+class LoginAccountThrottle(TokenBucketThrottle):
+    """
+    Неудачные входы в одну учетную запись (перебор паролей с разных адресов).
+    Токены списывают только неудачные попытки: обычные входы владельца
+    в лимит не засчитываются.
+    """
+    scope = 'auth_account'
+    charge_on_request = False
+
+    def get_cache_key(self, request, view):
+        # Запрос DRF (request.data) или форма входа Django (request.POST)
+        data = request.data if hasattr(request, 'data') else request.POST
+        account = data.get('username') or data.get('email')
+        if not account or not isinstance(account, str):
+            return None
+        digest = hashlib.sha1(account.strip().lower().encode('utf-8')).hexdigest()
+        return f'throttle:{self.scope}:{digest}'
@@ -0,0 +1,92 @@
+import io
+from PIL import Image, ImageOps
+
+try:
+    import pypdfium2
+except ImportError:  # Растеризация PDF необязательна: без pypdfium2 превью строятся только для изображений
+    pypdfium2 = None
+
+# Модуль не зависит от Django: render выполняется в дочерних процессах пула
+
+IMAGE_MIME_TYPES = frozenset({
+    'image/jpeg',
+    'image/png',
+    'image/gif',
+    'image/bmp',
+    'image/webp',
+    'image/tiff',
+})
+PDF_MIME_TYPE = 'application/pdf'
+
+CONTENT_TYPE = 'image/jpeg'
+EXTENSION = 'jpg'
+
+
+def supported_mime_types():
+    """Возвращает MIME-типы, для которых можно построить превью"""
+    if pypdfium2 is None:
+        return IMAGE_MIME_TYPES
+    return IMAGE_MIME_TYPES | {PDF_MIME_TYPE}
+
+
+def _load_image(data, max_edge):
+    image = Image.open(io.BytesIO(data))
+    # JPEG декодируется сразу в уменьшенном масштабе (1/2..1/8), не меньше нужного размера
+    image.draft('RGB', (max_edge, max_edge))
+    return ImageOps.exif_transpose(image)
+
+
+def _load_pdf_page(data, max_edge):
+    pdf = pypdfium2.PdfDocument(data)
+    try:
+        page = pdf[0]
+        width, height = page.get_size()  # В пунктах (1/72 дюйма)
+        scale = max_edge / max(width, height, 1)
+        return page.render(scale=scale).to_pil().copy()
+    finally:
+        pdf.close()
+
+
+def _to_rgb(image):
+    # JPEG не поддерживает прозрачность: прозрачные области заливаются белым
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def render(data, mime_type, sizes, quality=80):
+    """
+    Строит превью изображения или первой страницы PDF.
+
+    Args:
+        data (bytes): Содержимое исходного файла
+        mime_type (str): MIME-тип исходного файла
+        sizes (dict): Имя размера -> максимальная сторона в пикселях
+        quality (int): Качество JPEG
+
+    Returns:
+        dict: Имя размера -> содержимое JPEG
+
+    Raises:
+        ValueError: Если тип файла не поддерживается
+    """
+    if mime_type not in supported_mime_types():
+        raise ValueError(f"Previews are not supported for {mime_type}")
+    max_edge = max(sizes.values())
+    if mime_type == PDF_MIME_TYPE:
+        image = _load_pdf_page(data, max_edge)
+    else:
+        image = _load_image(data, max_edge)
+    image = _to_rgb(image)
+
+    result = {}
+    # От большего размера к меньшему: каждый следующий уменьшается из предыдущего
+    for name, edge in sorted(sizes.items(), key=lambda item: item[1], reverse=True):
+        image.thumbnail((edge, edge), Image.Resampling.LANCZOS, reducing_gap=3.0)
+        buffer = io.BytesIO()
+        image.save(buffer, 'JPEG', quality=quality, optimize=True, progressive=True)
+        result[name] = buffer.getvalue()
+    return result
@@ -0,0 +1,219 @@
+import hashlib
+import logging
+import threading
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopFutureHandlers
+from . import objects
+from .sniffing import SNIFF_BYTES, sniff_mime
+
+logger = logging.getLogger(__name__)
+
+
+class MinioUploadedFile(UploadedFile):
+    """
+    Файл, содержимое которого уже загружено в MinIO обработчиком загрузки.
+    Локальной копии нет: вместо содержимого хранятся ключ объекта и
+    вычисленные при приеме метаданные (размер, SHA-256, MIME-тип по сигнатуре).
+    """
+
+    def __init__(self, object_name, name, content_type, size, charset, sha256,
+                 sniffed_type=None, etag='', content_type_extra=None, future=None):
+        super().__init__(None, name, content_type, size, charset, content_type_extra)
+        self.object_name = object_name
+        self.sha256 = sha256
+        self.sniffed_type = sniffed_type
+        self.etag = etag
+        # Для MinioConcurrentUploadHandler: запись еще выполняется, результат - ETag
+        self.future = future
+
+    def wait(self):
+        """
+        Дожидается записи объекта в MinIO.
+
+        Returns:
+            str: ETag объекта
+
+        Raises:
+            Exception: Ошибка записи объекта
+        """
+        if self.future is not None:
+            self.etag = self.future.result()
+            self.future = None
+        return self.etag
+
+    def open(self, mode=None):
+        raise ValueError("Content of a streamed upload is stored in MinIO only")
+
+    def read(self, *args, **kwargs):
+        raise ValueError("Content of a streamed upload is stored in MinIO only")
+
+
+class MinioStreamingUploadHandler(FileUploadHandler):
+    """
+    Обработчик загрузки, передающий тело multipart-запроса в MinIO по мере приема.
+
+    Данные копятся в буфере размером с часть multipart-загрузки, поэтому память
+    на одну загрузку ограничена UPLOAD_SESSION_PART_SIZE независимо от размера
+    файла, а временные файлы на диске не создаются. За тот же проход
+    считаются размер, SHA-256 и MIME-тип по сигнатуре. Файлы меньше одной части
+    отправляются одним PUT без multipart-загрузки.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.part_size = max(settings.UPLOAD_SESSION_PART_SIZE, 5 * 1024 * 1024)
+        self.max_size = settings.FILE_UPLOAD_MAX_SIZE
+        self._reset()
+
+    def _reset(self):
+        self.object_name = None
+        self.upload_id = None
+        self.buffer = bytearray()
+        self.parts = []
+        self.size = 0
+        self.head = b''
+        self.sha256 = None
+        self.discarding = False
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None, content_type_extra=None):
+        """Начинает прием нового файла; ключ объекта генерируется как для File.file"""
+        super().new_file(field_name, file_name, content_type, content_length, charset, content_type_extra)
+        from .uploads import build_object_name
+        self._reset()
+        self.sha256 = hashlib.sha256()
+        self.object_name = build_object_name(getattr(self.request, 'user', None), file_name)
+        raise StopFutureHandlers()
+
+    def receive_data_chunk(self, raw_data, start):
+        """Обновляет хеш и размер; при заполнении буфера отправляет часть в MinIO"""
+        self.size += len(raw_data)
+        if self.discarding:
+            return None
+        if self.size > self.max_size:
+            # Файл все равно будет отклонен сериализатором: дальше не пишем в MinIO
+            logger.warning(f"Streamed upload '{self.file_name}' exceeds {self.max_size} bytes, discarding")
+            self._abort()
+            self.discarding = True
+            return None
+
+        self.sha256.update(raw_data)
+        if len(self.head) < SNIFF_BYTES:
+            self.head += raw_data[:SNIFF_BYTES - len(self.head)]
+        self.buffer += raw_data
+        if len(self.buffer) >= self.part_size:
+            self._flush_part()
+        return None
+
+    def _flush_part(self):
+        if self.upload_id is None:
+            self.upload_id = objects.create_multipart_upload(self.object_name, self.content_type)
+        part_number = len(self.parts) + 1
+        etag = objects.upload_part(self.object_name, self.upload_id, part_number, bytes(self.buffer))
+        self.parts.append((part_number, etag))
+        self.buffer = bytearray()
+
+    def _abort(self):
+        if self.upload_id:
+            objects.abort_multipart_upload(self.object_name, self.upload_id)
+        self.upload_id = None
+        self.parts = []
+        self.buffer = bytearray()
+
+    def file_complete(self, file_size):
+        """Завершает загрузку объекта и возвращает MinioUploadedFile с метаданными"""
+        if self.discarding:
+            return MinioUploadedFile(None, self.file_name, self.content_type, self.size,
+                                     self.charset, None, content_type_extra=self.content_type_extra)
+        try:
+            if self.upload_id is None:
+                etag = objects.put_object(self.object_name, bytes(self.buffer), self.content_type)
+            else:
+                if self.buffer:
+                    self._flush_part()
+                etag = objects.complete_multipart_upload(self.object_name, self.upload_id, self.parts)
+        except Exception:
+            self._abort()
+            raise
+        sniffed_type = sniff_mime(self.head, self.file_name)
+        logger.debug(f"Streamed upload '{self.file_name}' stored as {self.object_name} "
+                     f"({self.size} bytes, {len(self.parts) or 1} parts)")
+        uploaded = MinioUploadedFile(
+            self.object_name, self.file_name, self.content_type, self.size, self.charset,
+            self.sha256.hexdigest(), sniffed_type, etag, self.content_type_extra)
+        self.buffer = bytearray()
+        return uploaded
+
+    def upload_interrupted(self):
+        """Отменяет незавершенную multipart-загрузку при обрыве соединения"""
+        logger.warning(f"Streamed upload of '{self.file_name}' interrupted")
+        self._abort()
+
+
+class MinioConcurrentUploadHandler(MinioStreamingUploadHandler):
+    """
+    Обработчик пакетной загрузки: файлы меньше одной части отправляются в MinIO
+    в потоках executor, пока из тела запроса читаются следующие файлы.
+    Число одновременно хранимых в памяти и записываемых файлов ограничено
+    max_in_flight, поэтому память на запрос не превышает max_in_flight частей.
+    Большие файлы передаются multipart-загрузкой по мере приема, как в базовом классе.
+    """
+
+    def __init__(self, request, executor, max_in_flight):
+        super().__init__(request)
+        self.executor = executor
+        self.slots = threading.BoundedSemaphore(max_in_flight)
+        self.uploaded = []
+
+    def _put(self, object_name, data, content_type):
+        try:
+            return objects.put_object(object_name, data, content_type)
+        finally:
+            self.slots.release()
+
+    def file_complete(self, file_size):
+        """Ставит запись небольшого файла в пул и сразу возвращает MinioUploadedFile с future"""
+        if self.discarding or self.upload_id is not None:
+            uploaded = super().file_complete(file_size)
+        else:
+            # Ждем свободного слота: чтение тела запроса приостанавливается, пока MinIO не догонит
+            self.slots.acquire()
+            try:
+                future = self.executor.submit(self._put, self.object_name, bytes(self.buffer), self.content_type)
+            except Exception:
+                self.slots.release()
+                raise
+            uploaded = MinioUploadedFile(
+                self.object_name, self.file_name, self.content_type, self.size, self.charset,
+                self.sha256.hexdigest(), sniff_mime(self.head, self.file_name),
+                content_type_extra=self.content_type_extra, future=future)
+            self.buffer = bytearray()
+        self.uploaded.append(uploaded)
+        return uploaded
+
+    def discard(self):
+        """Дожидается начатых записей и удаляет все объекты, загруженные этим обработчиком"""
+        for uploaded in self.uploaded:
+            try:
+                uploaded.wait()
+            except Exception:
+                continue  # Объект не записан
+        discard_streamed_files(self.uploaded)
+
+
+def discard_streamed_files(files):
+    """
+    Удаляет из MinIO объекты, загруженные обработчиком для отклоненного запроса.
+
+    Args:
+        files: request.FILES (MultiValueDict) или список загруженных файлов
+    """
+    if hasattr(files, 'lists'):
+        files = [f for _, file_list in files.lists() for f in file_list]
+    for uploaded in files:
+        if isinstance(uploaded, MinioUploadedFile) and uploaded.object_name:
+            try:
+                objects.remove_object(uploaded.object_name)
+                logger.debug(f"Discarded streamed upload {uploaded.object_name}")
+            except Exception as e:
+                logger.warning(f"Could not discard streamed upload {uploaded.object_name}: {str(e)}")
@@ -0,0 +1,547 @@
+import hashlib
+import logging
+import math
+from collections import Counter
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .models import File, UploadSession, UploadPart, file_upload_path
+from . import blobs, deadlines, jobs, objects, quota
+from .previews import is_previewable
+from .signals import invalidate_file_scopes, needs_processing
+from .sniffing import SNIFF_BYTES, sniff_mime
+from .upload_handlers import MinioUploadedFile, discard_streamed_files
+
+logger = logging.getLogger(__name__)
+
+# Ограничения S3 API: минимальный размер части (кроме последней) и число частей
+MIN_PART_SIZE = 5 * 1024 * 1024
+MAX_PART_COUNT = 10000
+
+
+class UploadSessionError(Exception):
+    """Ошибка работы с сессией загрузки (неверная часть, незавершенная загрузка и т.п.)"""
+
+
+def build_object_name(user, filename):
+    """
+    Генерирует свободный ключ объекта так же, как это делает поле File.file.
+
+    Args:
+        user: Пользователь, загружающий файл
+        filename (str): Исходное имя файла
+
+    Returns:
+        str: Ключ объекта в формате 'uploads/{user_id}/{timestamp}_{filename}'
+    """
+    name = file_upload_path(File(uploaded_by=user), filename)
+    max_length = File._meta.get_field('file').max_length
+    return objects.get_available_object_name(name, max_length=max_length)
+
+
+def choose_part_size(total_size):
+    """
+    Подбирает размер части так, чтобы файл уложился в лимит числа частей S3.
+
+    Returns:
+        int: Размер части в байтах (кратный 1 MB)
+    """
+    part_size = max(settings.UPLOAD_SESSION_PART_SIZE, MIN_PART_SIZE)
+    if math.ceil(total_size / part_size) > MAX_PART_COUNT:
+        mb = 1024 * 1024
+        part_size = math.ceil(total_size / MAX_PART_COUNT / mb) * mb
+    return part_size
+
+
+def start_deduplicated(user, blob, mode, **metadata):
+    """
+    Создает файл из уже хранимого содержимого без загрузки байт.
+    Сессия сразу получает статус 'completed' и ссылку на созданный файл.
+
+    Args:
+        user: Пользователь, загружающий файл
+        blob (Blob): Найденное по хешу содержимое
+        mode (str): Режим сессии ('multipart' или 'direct')
+        **metadata: Проверенные поля сериализатора сессии
+
+    Returns:
+        UploadSession: Завершенная сессия
+    """
+    # Пользователю файл засчитывается в квоту полностью, хотя объект общий
+    with quota.reservation(user, blob.size), transaction.atomic():
+        file_obj = File(
+            file=blob.object_name,
+            original_filename=metadata['original_filename'],
+            file_type=metadata.get('file_type', 'other'),
+            file_size=blob.size,
+            mime_type=metadata.get('content_type', ''),
+            sha256=blob.sha256,
+            etag=blob.etag,
+            blob=blob,
+            uploaded_by=user,
+            assignment=metadata.get('assignment'),
+            course=metadata.get('course'),
+            is_public=metadata.get('is_public', False),
+            description=metadata.get('description', ''),
+        )
+        file_obj.save()
+        session = UploadSession.objects.create(
+            user=user,
+            mode=mode,
+            object_name=blob.object_name,
+            part_size=blob.size,
+            status='completed',
+            file=file_obj,
+            expires_at=timezone.now(),
+            **metadata,
+        )
+    logger.info(f"Upload of '{session.original_filename}' by user {user.username} "
+                f"deduplicated: file {file_obj.id} reuses stored content")
+    return session
+
+
+def start_session(user, **metadata):
+    """
+    Создает сессию загрузки и соответствующую multipart-загрузку в MinIO.
+    Если клиент передал SHA-256 уже доступного ему содержимого, загрузка не нужна
+    и возвращается завершенная сессия.
+
+    Args:
+        user: Пользователь, загружающий файл
+        **metadata: Проверенные поля UploadSessionSerializer
+
+    Returns:
+        UploadSession: Новая активная (или сразу завершенная) сессия
+    """
+    blob = blobs.find_reusable(user, metadata.get('sha256'), metadata['total_size'])
+    if blob:
+        return start_deduplicated(user, blob, 'multipart', **metadata)
+    quota.reserve(user, metadata['total_size'])
+    upload_id = None
+    try:
+        object_name = build_object_name(user, metadata['original_filename'])
+        upload_id = objects.create_multipart_upload(object_name, metadata.get('content_type'))
+        session = UploadSession.objects.create(
+            user=user,
+            object_name=object_name,
+            upload_id=upload_id,
+            part_size=choose_part_size(metadata['total_size']),
+            expires_at=timezone.now() + settings.UPLOAD_SESSION_TTL,
+            **metadata,
+        )
+    except Exception:
+        # Без строки сессии резерв и части в MinIO никто бы не освободил
+        if upload_id:
+            objects.abort_multipart_upload(object_name, upload_id)
+        quota.release(user.pk, metadata['total_size'])
+        raise
+    logger.info(f"Upload session {session.id} started for '{session.original_filename}' "
+                f"({session.total_size} bytes, {session.part_count} parts) by user: {user.username}")
+    return session
+
+
+def upload_part(session, part_number, stream):
+    """
+    Загружает часть сессии в MinIO и запоминает ее ETag.
+    Повторная загрузка той же части перезаписывает ее, поэтому обрыв соединения
+    приводит к повтору только одной части.
+
+    Args:
+        session (UploadSession): Активная сессия
+        part_number (int): Номер части (начиная с 1)
+        stream: Файлоподобный объект с телом запроса
+
+    Returns:
+        UploadPart: Сохраненная часть
+
+    Raises:
+        UploadSessionError: При неверном номере или размере части
+    """
+    if session.status != 'active' or session.mode != 'multipart':
+        raise UploadSessionError(f"Upload session is {session.status}")
+    if not 1 <= part_number <= session.part_count:
+        raise UploadSessionError(f"Part number must be between 1 and {session.part_count}")
+
+    expected_size = session.expected_part_size(part_number)
+    data = stream.read(expected_size + 1) if stream is not None else b''
+    if len(data) != expected_size:
+        raise UploadSessionError(f"Part {part_number} must be exactly {expected_size} bytes, got {len(data)}")
+
+    etag = objects.upload_part(session.object_name, session.upload_id, part_number, data)
+    part, _ = UploadPart.objects.update_or_create(
+        session=session, part_number=part_number,
+        defaults={'etag': etag, 'size': expected_size})
+    # Скользящий срок жизни: активная загрузка не должна считаться устаревшей
+    UploadSession.objects.filter(pk=session.pk).update(
+        expires_at=timezone.now() + settings.UPLOAD_SESSION_TTL, updated_at=timezone.now())
+    logger.debug(f"Upload session {session.id}: part {part_number} stored ({expected_size} bytes)")
+    return part
+
+
+def missing_parts(session):
+    """Возвращает отсортированный список номеров еще не загруженных частей"""
+    uploaded = set(session.parts.values_list('part_number', flat=True))
+    return [n for n in range(1, session.part_count + 1) if n not in uploaded]
+
+
+def _assembled_etag(session):
+    try:
+        stat = objects.stat_object(session.object_name)
+    except Exception:
+        raise UploadSessionError("Multipart upload no longer exists")
+    if stat.size != session.total_size:
+        raise UploadSessionError(f"Stored object is {stat.size} bytes, expected {session.total_size}")
+    return (stat.etag or '').strip('"')
+
+
+def complete_session(session):
+    """
+    Собирает объект из загруженных частей и создает запись File.
+    Повторный вызов для завершенной сессии возвращает уже созданный файл.
+
+    Returns:
+        File: Созданная запись файла
+
+    Raises:
+        UploadSessionError: Если сессия неактивна или загружены не все части
+    """
+    if session.status == 'completed' and session.file_id:
+        return session.file
+
+    # Сессия блокируется до обращения к MinIO: параллельный повтор ждет и получает
+    # уже созданный файл, а не NoSuchUpload от повторной сборки объекта
+    with transaction.atomic():
+        session = UploadSession.objects.select_for_update().get(pk=session.pk)
+        if session.status == 'completed' and session.file_id:
+            return session.file
+        if session.status != 'active' or session.mode != 'multipart':
+            raise UploadSessionError(f"Upload session is {session.status}")
+
+        missing = missing_parts(session)
+        if missing:
+            raise UploadSessionError(f"Missing parts: {missing[:20]}")
+
+        parts = list(session.parts.order_by('part_number').values_list('part_number', 'etag'))
+        try:
+            etag = objects.complete_multipart_upload(session.object_name, session.upload_id, parts)
+        except objects.UploadNotFound:
+            # Объект уже собран прошлой попыткой, транзакция которой не завершилась
+            etag = _assembled_etag(session)
+        file_obj = File(
+            file=session.object_name,
+            original_filename=session.original_filename,
+            file_type=session.file_type,
+            file_size=session.total_size,
+            mime_type=session.content_type,
+            etag=etag,
+            uploaded_by=session.user,
+            assignment=session.assignment,
+            course=session.course,
+            is_public=session.is_public,
+            description=session.description,
+        )
+        file_obj.save()
+        session.status = 'completed'
+        session.file = file_obj
+        session.save(update_fields=['status', 'file', 'updated_at'])
+        quota.release(session.user_id, session.total_size)
+
+    logger.info(f"Upload session {session.id} completed as file {file_obj.id}")
+    return file_obj
+
+
+def start_direct_upload(user, **metadata):
+    """
+    Создает сессию прямой загрузки: клиент отправляет байты в MinIO сам,
+    по presigned PUT URL для ключа, который сгенерировал бы file_upload_path.
+
+    Returns:
+        tuple: (UploadSession, presigned URL для PUT или None, если содержимое
+        найдено по SHA-256 и файл уже создан)
+    """
+    blob = blobs.find_reusable(user, metadata.get('sha256'), metadata['total_size'])
+    if blob:
+        return start_deduplicated(user, blob, 'direct', **metadata), None
+    quota.reserve(user, metadata['total_size'])
+    try:
+        object_name = build_object_name(user, metadata['original_filename'])
+        session = UploadSession.objects.create(
+            user=user,
+            mode='direct',
+            object_name=object_name,
+            part_size=metadata['total_size'],
+            expires_at=timezone.now() + settings.UPLOAD_SESSION_TTL,
+            **metadata,
+        )
+    except Exception:
+        quota.release(user.pk, metadata['total_size'])
+        raise
+    url = objects.presigned_url('PUT', object_name, settings.DIRECT_UPLOAD_URL_TTL)
+    logger.info(f"Direct upload {session.id} issued for '{session.original_filename}' "
+                f"({session.total_size} bytes) to user: {user.username}")
+    return session, url
+
+
+def finalize_direct_upload(session):
+    """
+    Проверяет загруженный клиентом объект через stat (без чтения содержимого)
+    и создает запись File с размером и MIME-типом из метаданных объекта.
+
+    Returns:
+        File: Созданная запись файла
+
+    Raises:
+        UploadSessionError: Если объект не загружен или его размер не совпадает с заявленным
+    """
+    if session.status == 'completed' and session.file_id:
+        return session.file
+    if session.status != 'active' or session.mode != 'direct':
+        raise UploadSessionError(f"Upload session is {session.status}")
+
+    try:
+        stat = objects.stat_object(session.object_name)
+    except Exception as e:
+        logger.warning(f"Direct upload {session.id} not found in storage: {str(e)}")
+        raise UploadSessionError("Object has not been uploaded yet")
+    if stat.size != session.total_size:
+        raise UploadSessionError(f"Uploaded object is {stat.size} bytes, expected {session.total_size}")
+
+    with transaction.atomic():
+        session = UploadSession.objects.select_for_update().get(pk=session.pk)
+        if session.status == 'completed' and session.file_id:
+            return session.file
+        content_type = stat.content_type
+        if not content_type or content_type == 'application/octet-stream':
+            content_type = session.content_type
+        file_obj = File(
+            file=session.object_name,
+            original_filename=session.original_filename,
+            file_type=session.file_type,
+            file_size=stat.size,
+            mime_type=content_type or '',
+            etag=(stat.etag or '').strip('"'),
+            uploaded_by=session.user,
+            assignment=session.assignment,
+            course=session.course,
+            is_public=session.is_public,
+            description=session.description,
+        )
+        file_obj.save()
+        session.status = 'completed'
+        session.file = file_obj
+        session.save(update_fields=['status', 'file', 'updated_at'])
+        quota.release(session.user_id, session.total_size)
+
+    logger.info(f"Direct upload {session.id} finalized as file {file_obj.id}")
+    return file_obj
+
+
+def abort_session(session, status='aborted'):
+    """
+    Отменяет сессию: освобождает части в MinIO и помечает сессию статусом status.
+    Для прямой загрузки удаляет объект, если клиент успел его загрузить.
+    """
+    if session.status != 'active':
+        return session
+    if session.mode == 'direct':
+        try:
+            objects.remove_object(session.object_name)
+        except Exception as e:
+            logger.warning(f"Could not remove object of direct upload {session.id}: {str(e)}")
+    elif session.upload_id:
+        objects.abort_multipart_upload(session.object_name, session.upload_id)
+    session.status = status
+    session.save(update_fields=['status', 'updated_at'])
+    quota.release(session.user_id, session.total_size)
+    session.parts.all().delete()
+    logger.info(f"Upload session {session.id} {status}")
+    return session
+
+
+def cleanup_expired_sessions(now=None, batch_size=100):
+    """
+    Отменяет активные сессии с истекшим сроком жизни.
+
+    Returns:
+        int: Количество отмененных сессий
+    """
+    now = now or timezone.now()
+    cleaned = 0
+    while True:
+        expired = list(UploadSession.objects.filter(status='active', expires_at__lt=now)[:batch_size])
+        if not expired:
+            break
+        for session in expired:
+            abort_session(session, status='expired')
+            cleaned += 1
+    return cleaned
+
+
+def inspect_upload(file_id):
+    """
+    Вычисляет для файла, загруженного сессией или напрямую в MinIO, то, что потоковая
+    загрузка считает на лету: SHA-256 и MIME-тип по сигнатуре. Затем содержимое
+    регистрируется как блоб; если оно уже хранится, файл переключается на
+    существующий объект, а его копия удаляется.
+    Выполняется в фоновой задаче, чтобы завершение загрузки не ждало чтения объекта.
+
+    Returns:
+        File: Обновленный файл или None, если файл удален или уже обработан
+    """
+    file_obj = File.objects.filter(pk=file_id, sha256='').first()
+    if file_obj is None or not file_obj.file:
+        return None
+
+    digest = hashlib.sha256()
+    head = b''
+    response = objects.get_object(file_obj.file.name)
+    try:
+        for chunk in response.stream(settings.UPLOAD_SESSION_PART_SIZE):
+            digest.update(chunk)
+            if len(head) < SNIFF_BYTES:
+                head += chunk[:SNIFF_BYTES - len(head)]
+    finally:
+        response.close()
+        response.release_conn()
+    sha256 = digest.hexdigest()
+
+    with transaction.atomic():
+        file_obj = File.objects.select_for_update().filter(pk=file_id, sha256='').first()
+        if file_obj is None:
+            return None
+        blob, deduplicated = blobs.register_upload(sha256, file_obj.file.name, file_obj.file_size, file_obj.etag)
+        blobs.acquire(blob.pk)
+        file_obj.sha256 = sha256
+        file_obj.blob = blob
+        file_obj.file.name = blob.object_name
+        file_obj.mime_type = sniff_mime(head, file_obj.original_filename) or file_obj.mime_type
+        if deduplicated and file_obj.preview_status != 'none':
+            # Превью строятся по ключу объекта: для общего объекта они берутся заново
+            file_obj.preview_status = 'pending'
+            file_obj.preview_sizes = []
+        elif file_obj.preview_status == 'none' and is_previewable(file_obj.mime_type, file_obj.file_size):
+            file_obj.preview_status = 'pending'
+        File.objects.filter(pk=file_id).update(
+            sha256=sha256, blob=blob, file=blob.object_name, mime_type=file_obj.mime_type,
+            preview_status=file_obj.preview_status, preview_sizes=file_obj.preview_sizes)
+        invalidate_file_scopes(file_obj, shared=file_obj.is_public)
+
+    logger.info(f"File {file_id} inspected: sha256 {sha256[:12]}"
+                f"{', deduplicated' if deduplicated else ''}, type {file_obj.mime_type}")
+    return file_obj
+
+
+def _save_to_storage(object_name, uploaded):
+    return objects.get_media_storage().save(object_name, uploaded)
+
+
+def store_files(user, uploaded_files, executor):
+    """
+    Дожидается записи файлов пакетной загрузки в MinIO.
+    Файлы, принятые потоковым обработчиком, уже записаны или записываются в executor;
+    остальные (FILE_UPLOAD_STREAM_TO_STORAGE выключен) записываются здесь в executor.
+    Ошибка одного файла не прерывает пакет: она возвращается в его результате.
+
+    Args:
+        user: Пользователь, загружающий файлы
+        uploaded_files (list): Файлы из request.FILES
+        executor: Пул потоков для записи в MinIO
+
+    Returns:
+        list: Для каждого файла словарь с filename, size и либо object_name, sha256,
+        mime_type, etag, либо error
+    """
+    max_size = settings.FILE_UPLOAD_MAX_SIZE
+    pending = []
+    for uploaded in uploaded_files:
+        future = None
+        if (not isinstance(uploaded, MinioUploadedFile)
+                and 0 < uploaded.size <= max_size):
+            future = executor.submit(_save_to_storage, build_object_name(user, uploaded.name), uploaded)
+        pending.append((uploaded, future))
+
+    items = []
+    for uploaded, future in pending:
+        item = {'filename': uploaded.name, 'size': uploaded.size}
+        try:
+            if isinstance(uploaded, MinioUploadedFile):
+                if uploaded.object_name is None or uploaded.size > max_size:
+                    raise UploadSessionError(f"File too large. Max size is {max_size} bytes")
+                etag = uploaded.wait()
+                if not uploaded.size:
+                    discard_streamed_files([uploaded])
+                    raise UploadSessionError("The submitted file is empty.")
+                item.update(object_name=uploaded.object_name, sha256=uploaded.sha256,
+                            mime_type=uploaded.sniffed_type or '', etag=etag)
+            else:
+                if future is None:
+                    raise UploadSessionError("The submitted file is empty." if not uploaded.size
+                                             else f"File too large. Max size is {max_size} bytes")
+                item.update(object_name=future.result(), sha256='', mime_type='', etag='')
+        except Exception as e:
+            logger.warning(f"Bulk upload of '{uploaded.name}' by user {user.username} failed: {str(e)}")
+            item['error'] = str(e)
+        items.append(item)
+    return items
+
+
+def discard_stored(items):
+    """Удаляет из MinIO объекты, записанные store_files, если файлы не были созданы"""
+    for item in items:
+        if item.get('object_name'):
+            try:
+                objects.remove_object(item['object_name'])
+            except Exception as e:
+                logger.warning(f"Could not discard bulk upload {item['object_name']}: {str(e)}")
+
+
+def create_files(user, items, **metadata):
+    """
+    Создает записи File для успешно записанных файлов пакета одним bulk_create.
+
+    bulk_create не вызывает save и не отправляет post_save, поэтому то, что для
+    одиночной загрузки делают File.save и сигнал file_saved, выполняется здесь
+    для всего пакета сразу: заполнение метаданных, регистрация блобов и счетчики
+    ссылок, счетчики квоты, фоновые задачи обработки, состояние сдачи в ленте
+    сроков и сброс кэша.
+
+    Args:
+        user: Пользователь, загружающий файлы
+        items (list): Результаты store_files без ошибок
+        **metadata: Общие для пакета поля (file_type, assignment, course, is_public, description)
+
+    Returns:
+        list: Созданные файлы в порядке items
+    """
+    if not items:
+        return []
+    with transaction.atomic():
+        stored = blobs.register_uploads([
+            (item['sha256'], item['object_name'], item['size'], item['etag'])
+            for item in items if item['sha256']])
+        files = []
+        for item in items:
+            blob = stored.get(item['sha256'])
+            file_obj = File(
+                file=blob.object_name if blob else item['object_name'],
+                original_filename=item['filename'],
+                file_size=item['size'],
+                mime_type=item['mime_type'],
+                sha256=item['sha256'],
+                etag=(blob.etag if blob else '') or item['etag'],
+                blob=blob,
+                uploaded_by=user,
+                **metadata,
+            )
+            file_obj.populate_metadata()
+            files.append(file_obj)
+        File.objects.bulk_create(files)
+
+        quota.apply_usage(user.pk, sum(f.file_size for f in files), len(files))
+        blobs.acquire_many(Counter(f.blob_id for f in files if f.blob_id))
+        jobs.enqueue_many('files.process', [
+            {'file_id': f.pk} for f in files if needs_processing(f)])
+        if files[0].assignment_id:
+            deadlines.refresh_submissions(user.pk)
+        invalidate_file_scopes(files[0], shared=files[0].is_public)
+    return files
@@ -1,7 +1,10 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
-from .views import AuthViewSet, UserViewSet, CourseViewSet, AssignmentViewSet, FileViewSet, StorageViewSet
+from rest_framework_simplejwt.views import TokenRefreshView
+from .views import (
+    AuthViewSet, ThrottledTokenObtainPairView, UserViewSet, CourseViewSet, AssignmentViewSet, FileViewSet,
+    UploadSessionViewSet, StorageViewSet)
 
 router = DefaultRouter()
 router.register(r'auth', AuthViewSet, basename='auth')
@@ -9,13 +12,25 @@ router.register(r'users', UserViewSet)
 router.register(r'courses', CourseViewSet)
 router.register(r'assignments', AssignmentViewSet)
 router.register(r'files', FileViewSet, basename='file')
+router.register(r'uploads', UploadSessionViewSet, basename='upload')
 
 urlpatterns = [
     path('', include(router.urls)),
-    path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('token/', ThrottledTokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     # Storage endpoints
     path('storage/info/', StorageViewSet.as_view({'get': 'info'}), name='storage-info'),
     path('storage/cache/info/', StorageViewSet.as_view({'get': 'cache_info'}), name='storage-cache-info'),
     path('storage/cache/clear/', StorageViewSet.as_view({'post': 'clear_cache'}), name='storage-cache-clear'),
-] 
\ No newline at end of file
+] 
+if settings.ASYNC_VIEWS:
+    # В режиме ASGI I/O-нагруженные эндпоинты обслуживаются async-представлениями;
+    # они стоят раньше маршрутов router и перекрывают синхронные версии
+    from . import async_views
+
+    urlpatterns = [
+        path('files/my_files/', async_views.my_files, name='file-my-files-async'),
+        path('files/shared_files/', async_views.shared_files, name='file-shared-files-async'),
+        path('files/<int:pk>/download/', async_views.download, name='file-download-async'),
+        path('storage/info/', async_views.storage_info, name='storage-info-async'),
+    ] + urlpatterns
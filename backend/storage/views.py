@@ -1,31 +1,89 @@
 from django.shortcuts import render
-from rest_framework import viewsets, permissions, status
+from rest_framework import viewsets, mixins, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.request import Empty
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.models import User as AuthUser
-from .models import User, Course, Assignment, File
+from django.contrib.auth.views import LoginView
+from django.http import HttpResponse
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.views import TokenObtainPairView
+from .models import User, Course, Assignment, File, UploadSession
 from .serializers import (
     UserSerializer, UserRegistrationSerializer, UserLoginSerializer,
-    CourseSerializer, AssignmentSerializer, FileSerializer, FileUploadSerializer)
+    CourseSerializer, AssignmentSerializer, FileSerializer, FileUploadSerializer,
+    UploadSessionSerializer, UploadIntentSerializer, BulkUploadSerializer, DeadlineSerializer, requested_fields)
+from . import archives, blobs, caching, deadlines, uploads, search, signing, streaming, objects, quota
+from .upload_handlers import (
+    MinioConcurrentUploadHandler, MinioStreamingUploadHandler, MinioUploadedFile, discard_streamed_files)
+from .quota import QuotaExceeded
+from .pagination import FileCursorPagination, FileSearchPagination
+from .filters import AssignmentFilterSet, FileFilterSet, IndexedFilterBackend, SharedFileFilterSet
+from .hashers import request_timing, start_request_timing
+from .throttles import AuthIPThrottle, LoginAccountThrottle
 from django.utils import timezone
-from rest_framework_simplejwt.tokens import RefreshToken
+from django.urls import reverse
+from urllib.parse import urlencode
+from datetime import datetime, timezone as dt_timezone
+from .authentication import UserRefreshToken, cache_user, user_claims
 from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.core.exceptions import ValidationError as DjangoValidationError
+from concurrent.futures import ThreadPoolExecutor
 import logging
 
 # Получаем логгер для приложения storage
 logger = logging.getLogger('storage')
 
+# Действия только на чтение: для них queryset загружает связанные объекты и аннотации
+LISTING_ACTIONS = ('list', 'retrieve', 'my_files', 'shared_files')
+
+def upload_length(request):
+    """Content-Length загрузки или None, если длина не передана (например, chunked-тело)"""
+    try:
+        length = int(request.META.get('CONTENT_LENGTH') or '')
+    except ValueError:
+        return None
+    return length if length >= 0 else None
+
+LENGTH_REQUIRED = {'error': 'Content-Length is required for uploads'}
+
+def hashing_note():
+    """Время хеширования пароля в запросе для журнала ('' если пароль не хешировался)"""
+    timing = request_timing()
+    return f", password hash {timing[0]:.0f} ms, queued {timing[1]:.0f} ms" if timing else ''
+
 class AuthViewSet(viewsets.ViewSet):
     permission_classes = [permissions.AllowAny]
+
+    def get_throttles(self):
+        """Password checks are rate limited per client address and, for failed logins, per account"""
+        if self.action == 'login':
+            return [AuthIPThrottle(), LoginAccountThrottle()]
+        if self.action == 'register':
+            return [AuthIPThrottle()]
+        return []
+
+    def initial(self, request, *args, **kwargs):
+        start_request_timing()
+        super().initial(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        timing = request_timing()
+        if timing and settings.HASHING_TIMING_HEADER:
+            response['Server-Timing'] = f'hash;dur={timing[0]:.1f}, hash-queue;dur={timing[1]:.1f}'
+        return response
         
     @action(detail=False, methods=['post'])
     def register(self, request):
         serializer = UserRegistrationSerializer(data=request.data)
         if serializer.is_valid():
             user = serializer.save()
-            logger.info(f"New user registered: {user.username} (ID: {user.id})")
-            refresh = RefreshToken.for_user(user)
+            logger.info(f"New user registered: {user.username} (ID: {user.id}){hashing_note()}")
+            refresh = UserRefreshToken.for_user(user)
             return Response({
                 'user': UserSerializer(user).data,
                 'tokens': {
@@ -41,8 +99,10 @@ class AuthViewSet(viewsets.ViewSet):
         serializer = UserLoginSerializer(data=request.data)
         if serializer.is_valid():
             user = serializer.validated_data['user']
-            logger.info(f"User logged in: {user.username} (ID: {user.id})")
-            refresh = RefreshToken.for_user(user)
+            logger.info(f"User logged in: {user.username} (ID: {user.id}){hashing_note()}")
+            # Первые запросы фронтенда после входа не обращаются к БД за пользователем
+            cache_user(user)
+            refresh = UserRefreshToken.for_user(user)
             return Response({
                 'user': UserSerializer(user).data,
                 'tokens': {
@@ -50,7 +110,8 @@ class AuthViewSet(viewsets.ViewSet):
                     'refresh': str(refresh),
                 }
             })
-        logger.warning(f"Failed login attempt for username: {request.data.get('username', 'unknown')}")
+        LoginAccountThrottle().charge(request, self)
+        logger.warning(f"Failed login attempt for username: {request.data.get('username', 'unknown')}{hashing_note()}")
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
     @action(detail=False, methods=['post'])
@@ -58,7 +119,7 @@ class AuthViewSet(viewsets.ViewSet):
         try:
             refresh_token = request.data.get('refresh')
             if refresh_token:
-                token = RefreshToken(refresh_token)
+                token = UserRefreshToken(refresh_token)
                 token.blacklist()
             user_info = f"User ID: {request.user.id}" if request.user.is_authenticated else "Anonymous"
             logger.info(f"User logged out: {user_info}")
@@ -75,15 +136,28 @@ class AuthViewSet(viewsets.ViewSet):
                 logger.warning("Token refresh attempt without refresh token")
                 return Response({'error': 'No refresh token provided'}, status=status.HTTP_400_BAD_REQUEST)
             
-            refresh = RefreshToken(refresh_token)
+            refresh = UserRefreshToken(refresh_token)
             user_info = f"User ID: {request.user.id}" if request.user.is_authenticated else "Unknown"
-            
+
+            # Claims профиля берутся из текущих данных пользователя, а не из старого токена
+            user = User.objects.filter(pk=refresh.get('user_id')).first()
+            if user is None or not user.is_active:
+                return Response({'error': 'No active account found for the given token'},
+                                status=status.HTTP_401_UNAUTHORIZED)
+            for claim, value in user_claims(user).items():
+                refresh[claim] = value
+
             if getattr(settings, 'SIMPLE_JWT', {}).get('ROTATE_REFRESH_TOKENS', False):
-                new_refresh = refresh.rotate()
+                if settings.SIMPLE_JWT.get('BLACKLIST_AFTER_ROTATION', False):
+                    refresh.blacklist()
+                refresh.set_jti()
+                refresh.set_exp()
+                refresh.set_iat()
+                refresh.outstand()
                 logger.info(f"Token refreshed with rotation: {user_info}")
                 return Response({
-                    'access': str(new_refresh.access_token),
-                    'refresh': str(new_refresh),
+                    'access': str(refresh.access_token),
+                    'refresh': str(refresh),
                 })
             else:
                 logger.info(f"Token refreshed: {user_info}")
@@ -95,22 +169,64 @@ class AuthViewSet(viewsets.ViewSet):
             logger.error(f"Token refresh error: {str(e)}")
             return Response({'error': f'Invalid refresh token: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
 
-class UserViewSet(viewsets.ModelViewSet):
+class ThrottledTokenObtainPairView(TokenObtainPairView):
+    """simplejwt token endpoint with the same password-check limits as auth/login"""
+    throttle_classes = [AuthIPThrottle, LoginAccountThrottle]
+
+    def post(self, request, *args, **kwargs):
+        try:
+            return super().post(request, *args, **kwargs)
+        except AuthenticationFailed:
+            LoginAccountThrottle().charge(request, self)
+            logger.warning(f"Failed token request for username: {request.data.get('username', 'unknown')}")
+            raise
+
+
+class ThrottledLoginView(LoginView):
+    """Browsable API session login with the same password-check limits as auth/login"""
+    template_name = 'rest_framework/login.html'
+
+    def post(self, request, *args, **kwargs):
+        for throttle in (AuthIPThrottle(), LoginAccountThrottle()):
+            if not throttle.allow_request(request, self):
+                response = HttpResponse('Too many login attempts.', status=status.HTTP_429_TOO_MANY_REQUESTS)
+                response['Retry-After'] = str(max(1, round(throttle.wait())))
+                return response
+        return super().post(request, *args, **kwargs)
+
+    def form_invalid(self, form):
+        LoginAccountThrottle().charge(self.request, self)
+        logger.warning(f"Failed session login for username: {self.request.POST.get('username', 'unknown')}")
+        return super().form_invalid(form)
+
+
+class UserViewSet(caching.CachedViewSetMixin, viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated]
+
+    def get_cache_scopes(self):
+        return [caching.users_scope()]
+
+    def get_queryset(self):
+        users = User.objects.all()
+        fields = requested_fields(self.request, UserSerializer)
+        if self.action in LISTING_ACTIONS and fields is not None:
+            users = users.only('id', *fields)
+        return users
         
     @action(detail=False, methods=['get'])
     def profile(self, request):
         """Get current user profile"""
         logger.info(f"Profile accessed by user: {request.user.username} (ID: {request.user.id})")
-        serializer = self.get_serializer(request.user)
+        # request.user может быть собран из claims токена: полный профиль читаем из БД
+        serializer = self.get_serializer(User.objects.get(pk=request.user.pk))
         return Response(serializer.data)
         
     @action(detail=False, methods=['put', 'patch'])
     def update_profile(self, request):
         """Update current user profile"""
-        serializer = self.get_serializer(request.user, data=request.data, partial=True)
+        serializer = self.get_serializer(User.objects.get(pk=request.user.pk), data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
             logger.info(f"Profile updated by user: {request.user.username} (ID: {request.user.id})")
@@ -118,71 +234,213 @@ class UserViewSet(viewsets.ModelViewSet):
         logger.warning(f"Profile update failed for user: {request.user.username} (ID: {request.user.id})")
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-class CourseViewSet(viewsets.ModelViewSet):
+def archive_files(user, files, teacher_id):
+    """Files to put in a course or assignment archive: the teacher gets all of them, others their own and public ones"""
+    files = files.exclude(file='')
+    if teacher_id != user.id:
+        files = files.filter(Q(uploaded_by=user) | Q(is_public=True))
+    return (files.select_related('uploaded_by', 'assignment')
+            .order_by('assignment__title', 'uploaded_by__username', 'original_filename', 'id'))
+
+class CourseViewSet(caching.CachedViewSetMixin, viewsets.ModelViewSet):
     queryset = Course.objects.all()
     serializer_class = CourseSerializer
     permission_classes = [permissions.IsAuthenticated]
         
     def perform_create(self, serializer):
         course = serializer.save(teacher=self.request.user)
-        logger.info(f"Course created: '{course.title}' (ID: {course.id}) by teacher: {self.request.user.username}")
+        logger.info(f"Course created: '{course.name}' (ID: {course.id}) by teacher: {self.request.user.username}")
     
     def perform_update(self, serializer):
         course = serializer.save()
-        logger.info(f"Course updated: '{course.title}' (ID: {course.id}) by user: {self.request.user.username}")
+        logger.info(f"Course updated: '{course.name}' (ID: {course.id}) by user: {self.request.user.username}")
     
     def perform_destroy(self, instance):
-        logger.info(f"Course deleted: '{instance.title}' (ID: {instance.id}) by user: {self.request.user.username}")
+        logger.info(f"Course deleted: '{instance.name}' (ID: {instance.id}) by user: {self.request.user.username}")
         instance.delete()
     
+    def get_cache_scopes(self):
+        """Course catalog and course details change with any course or assignment; is_enrolled with enrollment"""
+        return [caching.courses_scope(), caching.user_scope(self.request.user.pk)]
+
     def get_queryset(self):
         user = self.request.user
+        courses = Course.objects.all()
+        if self.action in LISTING_ACTIONS:
+            fields = requested_fields(self.request, CourseSerializer)
+            courses = courses.for_listing(fields)
+            if fields is None or 'is_enrolled' in fields:
+                courses = courses.with_enrollment(user)
         if user.role == 'teacher':
-            return Course.objects.filter(teacher=user)
+            return courses.filter(teacher=user)
         else:
-            return Course.objects.all()  # Students can see all courses
+            return courses  # Students can see all courses
+
+    @action(detail=True, methods=['get'])
+    def archive(self, request, pk=None):
+        """Stream a ZIP archive of the course files, grouped by assignment and author"""
+        course = self.get_object()
+        files = archive_files(request.user, File.objects.filter(Q(course=course) | Q(assignment__course=course)),
+                              course.teacher_id)
+        entries = archives.build_entries(files, lambda f: (
+            f.assignment.title if f.assignment else archives.COURSE_MATERIALS_FOLDER, f.uploaded_by.username))
+        logger.info(f"Course archive requested: '{course.name}' (ID: {course.id}, {len(entries)} files) by user: {request.user.username}")
+        return archives.archive_response(f'{course.code or course.name}.zip', entries)
 
-class AssignmentViewSet(viewsets.ModelViewSet):
+    @action(detail=True, methods=['post'])
+    def enroll(self, request, pk=None):
+        """Enroll the current student in the course"""
+        course = self.get_object()
+        if request.user.role != 'student':
+            return Response({'error': 'Only students can enroll in courses'}, status=status.HTTP_403_FORBIDDEN)
+        course.students.add(request.user)
+        logger.info(f"User {request.user.username} enrolled in course '{course.name}' (ID: {course.id})")
+        return Response({'enrolled': True})
+
+    @action(detail=True, methods=['post'])
+    def leave(self, request, pk=None):
+        """Remove the current student from the course"""
+        course = self.get_object()
+        course.students.remove(request.user)
+        logger.info(f"User {request.user.username} left course '{course.name}' (ID: {course.id})")
+        return Response({'enrolled': False})
+
+class AssignmentViewSet(caching.CachedViewSetMixin, viewsets.ModelViewSet):
     queryset = Assignment.objects.all()
     serializer_class = AssignmentSerializer
     permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [IndexedFilterBackend]
+    filterset_class = AssignmentFilterSet
     
     def perform_create(self, serializer):
         assignment = serializer.save()
-        logger.info(f"Assignment created: '{assignment.title}' (ID: {assignment.id}) for course: {assignment.course.title} by user: {self.request.user.username}")
+        logger.info(f"Assignment created: '{assignment.title}' (ID: {assignment.id}) for course: {assignment.course.name} by user: {self.request.user.username}")
     
     def perform_update(self, serializer):
         assignment = serializer.save()
         logger.info(f"Assignment updated: '{assignment.title}' (ID: {assignment.id}) by user: {self.request.user.username}")
     
     def perform_destroy(self, instance):
-        logger.info(f"Assignment deleted: '{instance.title}' (ID: {instance.id}) from course: {instance.course.title} by user: {self.request.user.username}")
+        logger.info(f"Assignment deleted: '{instance.title}' (ID: {instance.id}) from course: {instance.course.name} by user: {self.request.user.username}")
         instance.delete()
     
+    def get_cache_scopes(self):
+        """Assignments of one course are cached per course; visibility depends on the user's courses"""
+        params = self.request.query_params
+        course_id = params.get('course') or params.get('course_id')
+        scope = caching.course_scope(course_id) if course_id and not self.detail else caching.assignments_scope()
+        # Запись на курс сбрасывает user_scope студента
+        return [scope, caching.user_scope(self.request.user.pk)]
+
     def get_queryset(self):
-        course_id = self.request.query_params.get('course_id')
-        if course_id:
-            return Assignment.objects.filter(course_id=course_id)
-        return Assignment.objects.all()
+        """Assignments of the courses the user teaches or is enrolled in; administrators see all"""
+        user = self.request.user
+        assignments = Assignment.objects.all()
+        if self.action in LISTING_ACTIONS:
+            assignments = assignments.for_listing(requested_fields(self.request, AssignmentSerializer))
+        if user.role == 'admin' or user.is_staff:
+            return assignments
+        return assignments.filter(course__in=Course.objects.for_member(user).values('id'))
+
+    @action(detail=False, methods=['get'])
+    def deadlines(self, request):
+        """Upcoming deadlines across the user's courses with the user's submission state"""
+        days = request.query_params.get('days', '')
+        if days and (not days.isdigit() or not 1 <= int(days) <= settings.DEADLINES_MAX_DAYS):
+            return Response({'error': f'days must be between 1 and {settings.DEADLINES_MAX_DAYS}'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        entries = deadlines.feed(request.user, int(days) if days else None)
+        serializer = DeadlineSerializer(entries, many=True, context=self.get_serializer_context())
+        return Response(serializer.data)
+
+    @action(detail=True, methods=['get'])
+    def archive(self, request, pk=None):
+        """Stream a ZIP archive of the assignment files, one folder per author"""
+        assignment = self.get_object()
+        files = archive_files(request.user, assignment.files.all(), assignment.course.teacher_id)
+        entries = archives.build_entries(files, lambda f: (f.uploaded_by.username,))
+        logger.info(f"Assignment archive requested: '{assignment.title}' (ID: {assignment.id}, {len(entries)} files) by user: {request.user.username}")
+        return archives.archive_response(f'{assignment.title}.zip', entries)
 
-class FileViewSet(viewsets.ModelViewSet):
+class FileViewSet(caching.CachedViewSetMixin, viewsets.ModelViewSet):
     queryset = File.objects.all()
     serializer_class = FileSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = FileCursorPagination
+    filter_backends = [IndexedFilterBackend]
+    filterset_class = FileFilterSet
         
     def get_serializer_class(self):
         """Use FileUploadSerializer for create/update operations"""
         if self.action in ['create', 'update', 'partial_update']:
             return FileUploadSerializer
         return FileSerializer
+
+    def get_permissions(self):
+        """<video> and <audio> cannot send Authorization: stream also accepts a signed ?token="""
+        if self.action == 'stream':
+            return [permissions.AllowAny()]
+        return super().get_permissions()
+
+    def get_cache_scopes(self):
+        return [caching.user_scope(self.request.user.pk)]
+
+    def get_cache_extra_key(self):
+        # Ответ содержит подписанные URL: ключ привязан к окну подписи, в котором они действительны
+        window_start, _ = signing.current_window()
+        return str(window_start)
         
     def get_queryset(self):
         """Return files for the current user"""
-        return File.objects.filter(uploaded_by=self.request.user)
+        files = File.objects.filter(uploaded_by=self.request.user)
+        if self.action in LISTING_ACTIONS:
+            files = files.for_listing(requested_fields(self.request, FileSerializer))
+        return files
         
+    def create(self, request, *args, **kwargs):
+        """Stream the uploaded file straight into MinIO instead of a temp file"""
+        if settings.FILE_UPLOAD_STREAM_TO_STORAGE:
+            try:
+                request._request.upload_handlers = [MinioStreamingUploadHandler(request._request)]
+            except AttributeError:
+                logger.warning("Upload handlers could not be replaced: request body already parsed")
+        # Резервируем место по Content-Length до чтения тела: превышение квоты отклоняется сразу.
+        # Без длины резервировать нечего, и квота не была бы проверена
+        content_length = upload_length(request)
+        if content_length is None:
+            return Response(LENGTH_REQUIRED, status=status.HTTP_411_LENGTH_REQUIRED)
+        try:
+            with quota.reservation(request.user, content_length):
+                return super().create(request, *args, **kwargs)
+        except QuotaExceeded as e:
+            return Response({'error': str(e)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        except Exception:
+            # Отклоненная загрузка не должна оставлять объект в MinIO
+            if request._files is not Empty:
+                discard_streamed_files(request._files)
+            raise
+
     def perform_create(self, serializer):
         """Set the uploaded_by field to the current user"""
-        file_obj = serializer.save(uploaded_by=self.request.user)
+        uploaded = serializer.validated_data.get('file')
+        if isinstance(uploaded, MinioUploadedFile):
+            # Содержимое уже в MinIO: сохраняем только ключ и метаданные, вычисленные при приеме.
+            # Если такое содержимое уже хранится, файл ссылается на существующий объект
+            with transaction.atomic():
+                blob, deduplicated = blobs.register_upload(
+                    uploaded.sha256, uploaded.object_name, uploaded.size, uploaded.etag)
+                file_obj = serializer.save(
+                    uploaded_by=self.request.user,
+                    file=blob.object_name,
+                    # Ключ объекта содержит префикс времени: имя берем из загрузки
+                    original_filename=serializer.validated_data.get('original_filename') or uploaded.name,
+                    file_size=uploaded.size,
+                    mime_type=uploaded.sniffed_type or '',
+                    sha256=uploaded.sha256,
+                    etag=blob.etag or uploaded.etag,
+                    blob=blob)
+        else:
+            file_obj = serializer.save(uploaded_by=self.request.user)
         file_size_mb = file_obj.file_size / (1024 * 1024) if file_obj.file_size else 0
         logger.info(f"File uploaded: '{file_obj.original_filename}' (ID: {file_obj.id}, Size: {file_size_mb:.2f}MB) by user: {self.request.user.username}")
     
@@ -197,25 +455,163 @@ class FileViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def my_files(self, request):
         """Get files uploaded by the current user"""
-        files = self.get_queryset()
-        logger.info(f"User {request.user.username} accessed their files list ({files.count()} files)")
-        serializer = self.get_serializer(files, many=True)
-        return Response(serializer.data)
+        logger.info(f"User {request.user.username} accessed their files list")
+        return self.list(request)
         
     @action(detail=False, methods=['get'])
     def shared_files(self, request):
         """Get public files"""
-        files = File.objects.filter(is_public=True).order_by('-uploaded_at')
-        logger.info(f"User {request.user.username} accessed shared files list ({files.count()} files)")
-        
-        # Add pagination
-        page = self.paginate_queryset(files)
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-        serializer = self.get_serializer(files, many=True)
-        return Response(serializer.data)
+        logger.info(f"User {request.user.username} accessed shared files list")
+
+        def build():
+            files = SharedFileFilterSet(request.query_params).filter_queryset(
+                File.objects.filter(is_public=True).for_listing(requested_fields(request, FileSerializer)))
+            page = self.paginate_queryset(files)
+            if page is not None:
+                serializer = self.get_serializer(page, many=True)
+                return self.get_paginated_response(serializer.data)
+            serializer = self.get_serializer(files, many=True)
+            return Response(serializer.data)
+
+        # Ответ содержит подписанные URL: ключ привязан к окну подписи, в котором они действительны
+        window_start, _ = signing.current_window()
+        return caching.cached_response(request, [caching.shared_scope()], build, extra_key=str(window_start))
         
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """Ranked full-text and fuzzy filename search over own and public files"""
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            return Response({'error': 'Query parameter q is required'}, status=status.HTTP_400_BAD_REQUEST)
+        files = (File.objects.filter(Q(uploaded_by=request.user) | Q(is_public=True))
+                 .for_listing(requested_fields(request, FileSerializer)))
+        for param in ('course', 'assignment'):
+            value = request.query_params.get(param)
+            if value:
+                if not value.isdigit():
+                    return Response({'error': f'Invalid {param} id'}, status=status.HTTP_400_BAD_REQUEST)
+                files = files.filter(**{f'{param}_id': int(value)})
+        file_type = request.query_params.get('file_type')
+        if file_type:
+            files = files.filter(file_type=file_type)
+
+        paginator = FileSearchPagination()
+        page = paginator.paginate_queryset(search.search_files(files, text), request, view=self)
+        serializer = FileSerializer(page, many=True, context=self.get_serializer_context())
+        logger.info(f"User {request.user.username} searched files for '{text[:50]}'")
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['post'])
+    def upload_intent(self, request):
+        """Validate metadata and quota, return a presigned PUT URL for direct upload to MinIO"""
+        serializer = UploadIntentSerializer(data=request.data, context=self.get_serializer_context())
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            session, url = uploads.start_direct_upload(request.user, **serializer.validated_data)
+        except QuotaExceeded as e:
+            return Response({'error': str(e)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        data = UploadIntentSerializer(session).data
+        if url is None:
+            # Содержимое с таким SHA-256 уже хранится: файл создан без загрузки
+            data['upload_url'] = None
+            return Response(data, status=status.HTTP_201_CREATED)
+        data.update({
+            'method': 'PUT',
+            'upload_url': url,
+            'headers': {'Content-Type': session.content_type or 'application/octet-stream'},
+        })
+        return Response(data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['post'])
+    def finalize_upload(self, request):
+        """Create the File record for an object uploaded directly to MinIO"""
+        session_id = request.data.get('upload_id')
+        try:
+            session = UploadSession.objects.get(pk=session_id, user=request.user, mode='direct')
+        except (UploadSession.DoesNotExist, ValueError, DjangoValidationError):
+            return Response({'error': 'Upload not found'}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            file_obj = uploads.finalize_direct_upload(session)
+        except uploads.UploadSessionError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        file_size_mb = file_obj.file_size / (1024 * 1024)
+        logger.info(f"File uploaded: '{file_obj.original_filename}' (ID: {file_obj.id}, Size: {file_size_mb:.2f}MB) directly to storage by user: {request.user.username}")
+        return Response(FileSerializer(file_obj, context=self.get_serializer_context()).data,
+                        status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['post'])
+    def bulk_upload(self, request):
+        """Upload many files in one request: MinIO writes run concurrently, records are inserted in one query"""
+        content_length = upload_length(request)
+        if content_length is None:
+            return Response(LENGTH_REQUIRED, status=status.HTTP_411_LENGTH_REQUIRED)
+        executor = ThreadPoolExecutor(max_workers=settings.BULK_UPLOAD_THREADS, thread_name_prefix='bulk-upload')
+        handler = None
+        if settings.FILE_UPLOAD_STREAM_TO_STORAGE:
+            handler = MinioConcurrentUploadHandler(request._request, executor, settings.BULK_UPLOAD_THREADS * 2)
+            try:
+                request._request.upload_handlers = [handler]
+            except AttributeError:
+                logger.warning("Upload handlers could not be replaced: request body already parsed")
+                handler = None
+        try:
+            with executor, quota.reservation(request.user, content_length):
+                return self._bulk_upload(request, executor, handler)
+        except QuotaExceeded as e:
+            return Response({'error': str(e)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+    def _bulk_upload(self, request, executor, handler):
+        try:
+            serializer = BulkUploadSerializer(data=request.data, context=self.get_serializer_context())
+            files = request.FILES.getlist('files')
+            if not serializer.is_valid():
+                errors = serializer.errors
+            elif not files:
+                errors = {'files': ['No files were submitted.']}
+            elif len(files) > settings.BULK_UPLOAD_MAX_FILES:
+                errors = {'files': [f'At most {settings.BULK_UPLOAD_MAX_FILES} files can be uploaded at once.']}
+            else:
+                errors = None
+            if errors:
+                if handler is not None:
+                    handler.discard()
+                return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+            items = uploads.store_files(request.user, files, executor)
+        except Exception:
+            # Отклоненная загрузка не должна оставлять объекты в MinIO
+            if handler is not None:
+                handler.discard()
+            raise
+
+        stored = [item for item in items if 'error' not in item]
+        try:
+            created = uploads.create_files(request.user, stored, **serializer.validated_data)
+        except Exception:
+            uploads.discard_stored(stored)
+            raise
+
+        data = iter(FileSerializer(created, many=True, context=self.get_serializer_context()).data)
+        results = []
+        for index, item in enumerate(items):
+            result = {'index': index, 'filename': item['filename']}
+            if 'error' in item:
+                result.update(status='error', error=item['error'])
+            else:
+                result.update(status='created', file=next(data))
+            results.append(result)
+
+        if not created:
+            response_status = status.HTTP_400_BAD_REQUEST
+        elif len(created) < len(items):
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_201_CREATED
+        logger.info(f"Bulk upload by user {request.user.username}: "
+                    f"{len(created)} of {len(items)} files uploaded")
+        return Response({'results': results, 'created': len(created), 'failed': len(items) - len(created)},
+                        status=response_status)
+
     @action(detail=True, methods=['get'])
     def download(self, request, pk=None):
         """Get download URL for a file"""
@@ -223,8 +619,8 @@ class FileViewSet(viewsets.ModelViewSet):
         if file_obj.file:
             # Check if user has permission to download this file
             if file_obj.uploaded_by == request.user or file_obj.is_public:
-                # Получаем presigned URL для Minio
-                url = file_obj.file.storage.url(file_obj.file.name)
+                # Получаем presigned URL для Minio (из кэша подписей)
+                url = signing.file_url(file_obj.file.name)
                 logger.info(f"File download initiated: '{file_obj.original_filename}' (ID: {file_obj.id}) by user: {request.user.username}")
                 return Response({
                     'download_url': url,
@@ -238,38 +634,126 @@ class FileViewSet(viewsets.ModelViewSet):
         logger.error(f"Download attempt for non-existent file (ID: {pk}) by user: {request.user.username}")
         return Response({'error': 'File not found'}, status=status.HTTP_404_NOT_FOUND)
 
+    @action(detail=True, methods=['get'])
+    def stream_url(self, request, pk=None):
+        """Get a short-lived signed URL for playing the file in <video> or <audio>"""
+        file_obj = (File.objects.filter(Q(uploaded_by=request.user) | Q(is_public=True), pk=pk)
+                    .only('id', 'file').first())
+        if not file_obj or not file_obj.file:
+            return Response({'error': 'File not found'}, status=status.HTTP_404_NOT_FOUND)
+        token, expires = signing.stream_token(file_obj.id, request.user.pk)
+        url = request.build_absolute_uri(reverse('file-stream', args=[file_obj.id]))
+        return Response({
+            'stream_url': f'{url}?{urlencode({"token": token})}',
+            'expires_at': datetime.fromtimestamp(expires, tz=dt_timezone.utc).isoformat(),
+        })
+
+    @action(detail=True, methods=['get'])
+    def stream(self, request, pk=None):
+        """Stream audio/video with Range and conditional GET support"""
+        if not str(pk).isdigit():
+            # Доступно без аутентификации: нечисловой id не должен доходить до запроса к БД
+            return Response({'error': 'File not found'}, status=status.HTTP_404_NOT_FOUND)
+        token = request.query_params.get('token')
+        if token:
+            user_id = signing.stream_token_user(token, pk)
+            if user_id is None:
+                return Response({'error': 'Invalid or expired stream token'}, status=status.HTTP_403_FORBIDDEN)
+        elif request.user.is_authenticated:
+            user_id = request.user.pk
+        else:
+            return Response({'error': 'Authentication credentials were not provided.'},
+                            status=status.HTTP_401_UNAUTHORIZED)
+        file_obj = File.objects.filter(Q(uploaded_by_id=user_id) | Q(is_public=True), pk=pk).first()
+        if not file_obj or not file_obj.file:
+            return Response({'error': 'File not found'}, status=status.HTTP_404_NOT_FOUND)
+        etag = file_obj.etag
+        if not etag:
+            # Файлы, загруженные до появления поля etag: берем ETag из метаданных объекта один раз
+            try:
+                etag = (objects.stat_object(file_obj.file.name).etag or '').strip('"')
+                File.objects.filter(pk=file_obj.pk).update(etag=etag)
+            except Exception as e:
+                logger.error(f"Could not stat object for file {file_obj.id}: {str(e)}")
+                return Response({'error': 'File not found in storage'}, status=status.HTTP_404_NOT_FOUND)
+        logger.debug(f"File stream requested: '{file_obj.original_filename}' (ID: {file_obj.id}, Range: {request.META.get('HTTP_RANGE', '-')}) by user ID: {user_id}")
+        return streaming.stream_file(request, file_obj, etag)
+
+class UploadSessionViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin,
+                           mixins.ListModelMixin, mixins.DestroyModelMixin,
+                           viewsets.GenericViewSet):
+    """Resumable chunked uploads backed by MinIO multipart uploads"""
+    serializer_class = UploadSessionSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        """Return upload sessions of the current user"""
+        queryset = UploadSession.objects.filter(user=self.request.user).prefetch_related('parts')
+        if self.action == 'list':
+            queryset = queryset.filter(status='active')
+        return queryset
+
+    def create(self, request, *args, **kwargs):
+        try:
+            return super().create(request, *args, **kwargs)
+        except QuotaExceeded as e:
+            return Response({'error': str(e)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+    def perform_create(self, serializer):
+        """Start a multipart upload in MinIO for the new session"""
+        serializer.instance = uploads.start_session(self.request.user, **serializer.validated_data)
+
+    def perform_destroy(self, instance):
+        """Abort the upload and release already stored parts"""
+        uploads.abort_session(instance)
+        logger.info(f"Upload session aborted: {instance.id} by user: {self.request.user.username}")
+
+    @action(detail=True, methods=['put'], url_path=r'parts/(?P<part_number>[0-9]+)')
+    def upload_part(self, request, pk=None, part_number=None):
+        """Upload a single part; the request body is the raw part content"""
+        session = self.get_object()
+        try:
+            part = uploads.upload_part(session, int(part_number), request.stream)
+        except uploads.UploadSessionError as e:
+            logger.warning(f"Rejected part {part_number} for upload session {session.id}: {str(e)}")
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'part_number': part.part_number, 'etag': part.etag, 'size': part.size})
+
+    @action(detail=True, methods=['post'])
+    def complete(self, request, pk=None):
+        """Assemble the uploaded parts and create the File record"""
+        session = self.get_object()
+        try:
+            file_obj = uploads.complete_session(session)
+        except uploads.UploadSessionError as e:
+            logger.warning(f"Upload session {session.id} could not be completed: {str(e)}")
+            return Response({'error': str(e), 'missing_parts': uploads.missing_parts(session)},
+                            status=status.HTTP_400_BAD_REQUEST)
+        logger.info(f"File uploaded: '{file_obj.original_filename}' (ID: {file_obj.id}) via upload session by user: {request.user.username}")
+        return Response(FileSerializer(file_obj, context=self.get_serializer_context()).data,
+                        status=status.HTTP_201_CREATED)
+
 class StorageViewSet(viewsets.ViewSet):
     permission_classes = [permissions.IsAuthenticated]
         
     @action(detail=False, methods=['get'])
     def info(self, request):
         """Get storage information for current user"""
+        return caching.cached_response(
+            request, [caching.user_scope(request.user.pk)], lambda: self._storage_info(request))
+
+    def _storage_info(self, request):
         try:
-            # Получаем все файлы пользователя
-            user_files = File.objects.filter(uploaded_by=request.user)
-                        
-            # Вычисляем общий размер файлов пользователя
-            total_used = sum(file.file_size for file in user_files if file.file_size)
-                        
-            # Лимит хранилища (10 GB в байтах)
-            storage_limit = 10 * 1024 * 1024 * 1024
-                        
-            # Вычисляем процент использования
-            used_percentage = (total_used / storage_limit) * 100 if storage_limit > 0 else 0
-            
-            used_mb = total_used / (1024 * 1024)
-            logger.info(f"Storage info accessed by user: {request.user.username} (Used: {used_mb:.2f}MB, {used_percentage:.1f}%)")
-                        
-            return Response({
-                'used': total_used,
-                'total': storage_limit,
-                'used_percentage': round(used_percentage, 2)
-            })
+            # Счетчики поддерживаются инкрементально: читаем одну строку
+            summary = quota.usage_summary(request.user)
+            used_mb = summary['used'] / (1024 * 1024)
+            logger.info(f"Storage info accessed by user: {request.user.username} (Used: {used_mb:.2f}MB, {summary['used_percentage']:.1f}%)")
+            return Response(summary)
         except Exception as e:
             logger.error(f"Error getting storage info for user {request.user.username}: {str(e)}")
             return Response({
                 'used': 0,
-                'total': 10 * 1024 * 1024 * 1024,
+                'total': settings.STORAGE_QUOTA_BYTES,
                 'used_percentage': 0
             })
         
@@ -278,12 +762,8 @@ class StorageViewSet(viewsets.ViewSet):
         """Get cache information"""
         try:
             logger.info(f"Cache info accessed by user: {request.user.username}")
-            # В реальном приложении здесь можно получить информацию о кэше
-            # Пока возвращаем базовую информацию
-            return Response({
-                'size': 0,  # Размер кэша в байтах
-                'items_count': 0  # Количество элементов в кэше
-            })
+            # Закэшированные ответы пользователя: количество и суммарный размер в байтах
+            return Response(caching.user_cache_info(request.user.pk))
         except Exception as e:
             logger.error(f"Error getting cache info for user {request.user.username}: {str(e)}")
             return Response({
@@ -295,10 +775,9 @@ class StorageViewSet(viewsets.ViewSet):
     def clear_cache(self, request):
         """Clear cache"""
         try:
-            logger.info(f"Cache cleared by user: {request.user.username}")
-            # В реальном приложении здесь можно очистить кэш
-            # Пока просто возвращаем успешный ответ
-            return Response({'message': 'Cache cleared successfully'})
+            removed = caching.clear_user_cache(request.user.pk)
+            logger.info(f"Cache cleared by user: {request.user.username} ({removed} entries)")
+            return Response({'message': 'Cache cleared successfully', 'removed': removed})
         except Exception as e:
             logger.error(f"Error clearing cache for user {request.user.username}: {str(e)}")
             return Response({'error': 'Failed to clear cache'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
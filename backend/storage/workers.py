@@ -0,0 +1,145 @@
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+
+# Модуль не импортирует модели при загрузке: process_main выполняется в новом
+# процессе (spawn) до django.setup()
+
+logger = logging.getLogger(__name__)
+
+# Как часто один из потоков процесса возвращает задачи с истекшей арендой и чистит старые
+MAINTENANCE_INTERVAL = 60
+
+# Число процессов воркеров, между которыми делятся ядра (пулы рендеринга превью)
+process_count = 1
+
+
+class _Maintenance:
+    """Общий для потоков процесса признак, что пора выполнить обслуживание очереди"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._next_run = 0
+
+    def due(self):
+        with self._lock:
+            now = time.monotonic()
+            if now < self._next_run:
+                return False
+            self._next_run = now + MAINTENANCE_INTERVAL
+            return True
+
+
+def _worker_loop(worker_id, stop, kinds, once, maintenance):
+    from django.conf import settings
+    from django.db import close_old_connections
+    from . import jobs
+
+    interval = settings.JOB_POLL_INTERVAL
+    while not stop.is_set():
+        close_old_connections()
+        try:
+            if maintenance.due():
+                jobs.requeue_expired()
+                jobs.prune()
+            claimed = jobs.claim(worker_id, kinds=kinds)
+        except Exception as e:
+            # Недоступность БД не должна останавливать поток: повторяем после паузы
+            logger.error(f"Job worker {worker_id} could not poll the queue: {str(e)}")
+            stop.wait(settings.JOB_POLL_MAX_INTERVAL)
+            continue
+        if not claimed:
+            if once:
+                break
+            # Без работы опрашиваем реже, с работой - сразу берем следующую задачу
+            stop.wait(interval)
+            interval = min(interval * 2, settings.JOB_POLL_MAX_INTERVAL)
+            continue
+        interval = settings.JOB_POLL_INTERVAL
+        for job in claimed:
+            try:
+                jobs.execute(job)
+            except Exception as e:
+                # Результат не записан: задача вернется в очередь после истечения аренды
+                logger.error(f"Could not record result of job {job.id} ({job.kind}): {str(e)}")
+    close_old_connections()
+
+
+def run_threads(threads, kinds=None, once=False, stop=None):
+    """
+    Запускает threads потоков-воркеров в текущем процессе и ждет их завершения.
+    SIGTERM и SIGINT завершают потоки после текущей задачи.
+    """
+    from . import tasks  # noqa: F401  # Регистрация обработчиков задач
+
+    stop = stop or threading.Event()
+    if threading.current_thread() is threading.main_thread():
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *args: stop.set())
+
+    maintenance = _Maintenance()
+    prefix = f'{socket.gethostname()}:{os.getpid()}'
+    workers = [
+        threading.Thread(target=_worker_loop, name=f'job-worker-{i}',
+                         args=(f'{prefix}:{i}', stop, kinds, once, maintenance), daemon=True)
+        for i in range(threads)
+    ]
+    for worker in workers:
+        worker.start()
+    logger.info(f"Job worker process {os.getpid()} started with {threads} threads")
+    while any(worker.is_alive() for worker in workers):
+        for worker in workers:
+            worker.join(timeout=1)
+    logger.info(f"Job worker process {os.getpid()} stopped")
+
+
+def process_main(threads, kinds, once, processes=1):
+    """Точка входа дочернего процесса воркеров"""
+    global process_count
+    process_count = processes
+    import django
+    django.setup()
+    run_threads(threads, kinds, once)
+
+
+def run(processes, threads, kinds=None, once=False):
+    """
+    Запускает воркеры: processes процессов по threads потоков.
+    Процессы нужны для задач, нагружающих CPU, потоки - для задач,
+    ожидающих MinIO и БД. При одном процессе потоки работают в текущем.
+    """
+    if processes <= 1:
+        run_threads(threads, kinds, once)
+        return
+
+    context = multiprocessing.get_context('spawn')
+    children = [context.Process(target=process_main, args=(threads, kinds, once, processes), name=f'job-process-{i}')
+                for i in range(processes)]
+    stopping = False
+
+    def _stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for child in children:
+            if child.is_alive():
+                child.terminate()  # SIGTERM: потоки дочернего процесса завершат текущие задачи
+
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, _stop)
+    for child in children:
+        child.start()
+
+    while True:
+        for i, child in enumerate(children):
+            if child.is_alive() or stopping or once:
+                continue
+            logger.error(f"Job worker process {child.pid} exited with code {child.exitcode}, restarting")
+            children[i] = context.Process(target=process_main, args=(threads, kinds, once, processes), name=child.name)
+            children[i].start()
+        if not any(child.is_alive() for child in children) and (stopping or once):
+            break
+        time.sleep(1)
@@ -8,4 +8,17 @@ export interface Assignment {
   status: 'pending' | 'completed' | 'overdue' | 'upcoming';
   description?: string;
   files?: FileItem[];
-} 
\ No newline at end of file
+} 
+// Строка ленты сроков (GET /assignments/deadlines/)
+export interface Deadline {
+  assignment: number;
+  title: string;
+  description: string;
+  due_date: string; // ISO date string
+  course: number;
+  course_name: string;
+  course_code: string;
+  submitted: boolean;
+  submitted_files: number;
+  last_submitted_at: string | null;
+}
@@ -6,6 +6,7 @@ export interface Course {
   code: string;
   description: string;
   teacher: User;
+  is_enrolled?: boolean;
   created_at: string;
   updated_at: string;
 } 
\ No newline at end of file
@@ -15,4 +15,5 @@ export interface FileItem {
   is_public: boolean;
   description: string;
   file_url?: string; // full URL for download
+  previews?: Record<string, string> | null; // thumbnail URLs by size name ('small', 'medium')
 } 
\ No newline at end of file
@@ -7,6 +7,8 @@ import {
   createCourse, 
   updateCourse, 
   deleteCourse,
+  enrollCourse,
+  leaveCourse,
   CreateCourseData
 } from '../services/courseService';
 import { Course } from '../contracts/Course';
@@ -331,6 +333,21 @@ const Courses: React.FC = () => {
     }
   };
 
+  const handleToggleEnrollment = async (course: Course) => {
+    try {
+      if (course.is_enrolled) {
+        if (!window.confirm('Покинуть курс? Его задания пропадут из вашего списка.')) return;
+        await leaveCourse(course.id);
+      } else {
+        await enrollCourse(course.id);
+      }
+      setCourses(courses.map(c => c.id === course.id ? { ...c, is_enrolled: !course.is_enrolled } : c));
+    } catch (error) {
+      console.error('Error changing enrollment:', error);
+      alert('Ошибка при записи на курс');
+    }
+  };
+
   const openEditModal = (course: Course) => {
     setEditingCourse(course);
     setFormData({
@@ -447,6 +464,12 @@ const Courses: React.FC = () => {
                     >
                       <i className="fas fa-eye"></i>
                     </Button>
+                    {user?.role === 'student' && (
+                      <Button onClick={() => handleToggleEnrollment(course)}>
+                        <i className={course.is_enrolled ? 'fas fa-sign-out-alt' : 'fas fa-user-plus'}></i>
+                        {course.is_enrolled ? 'Покинуть курс' : 'Записаться'}
+                      </Button>
+                    )}
                     {user?.role === 'teacher' && course.teacher.id === user.id && (
                       <>
                         <Button 
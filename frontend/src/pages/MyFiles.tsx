@@ -6,6 +6,8 @@ import {
   deleteFile, 
   downloadFile,
   downloadFileDirect,
+  isPlayable,
+  playFile,
   getFileIcon, 
   formatFileSize, 
   formatDate,
@@ -155,6 +157,13 @@ const FileIcon = styled.div`
   justify-content: center;
   font-size: 1.5rem;
   color: #1976d2;
+  overflow: hidden;
+
+  img {
+    width: 100%;
+    height: 100%;
+    object-fit: cover;
+  }
 `;
 
 const FileInfo = styled.div`
@@ -296,6 +305,12 @@ const LoadingSpinner = styled.div`
   }
 `;
 
+const LoadMore = styled.div`
+  display: flex;
+  justify-content: center;
+  margin-top: 1.5rem;
+`;
+
 const EmptyState = styled.div`
   text-align: center;
   padding: 3rem;
@@ -311,7 +326,9 @@ const EmptyState = styled.div`
 const MyFiles: React.FC = () => {
   const [activeFilter, setActiveFilter] = useState('all');
   const [files, setFiles] = useState<FileItem[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [uploadModalOpen, setUploadModalOpen] = useState(false);
   const [uploading, setUploading] = useState(false);
   const [searchTerm, setSearchTerm] = useState('');
@@ -321,15 +338,19 @@ const MyFiles: React.FC = () => {
     is_public: false
   });
 
+  // Тип файла фильтруется на сервере (индекс), чтобы страницы не приходили полупустыми
+  const typeFilter = activeFilter === 'all' ? {} : { file_type: activeFilter };
+
   useEffect(() => {
     loadFiles();
-  }, []);
+  }, [activeFilter]);
 
   const loadFiles = async () => {
     try {
       setLoading(true);
-      const data = await getMyFiles();
-      setFiles(data);
+      const page = await getMyFiles(typeFilter);
+      setFiles(page.results);
+      setNextCursor(page.nextCursor);
     } catch (error) {
       console.error('Error loading files:', error);
     } finally {
@@ -337,6 +358,20 @@ const MyFiles: React.FC = () => {
     }
   };
 
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    try {
+      setLoadingMore(true);
+      const page = await getMyFiles(typeFilter, nextCursor);
+      setFiles(prev => [...prev, ...page.results]);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      console.error('Error loading files:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleFileUpload = async () => {
     if (!selectedFile) return;
 
@@ -361,6 +396,15 @@ const MyFiles: React.FC = () => {
     }
   };
 
+  const handleFilePlay = async (file: FileItem) => {
+    try {
+      await playFile(file.id);
+    } catch (error) {
+      console.error('Error playing file:', error);
+      alert('Ошибка при воспроизведении файла');
+    }
+  };
+
   const handleFileDownload = async (file: FileItem) => {
     try {
       await downloadFileDirect(file.id);
@@ -383,12 +427,11 @@ const MyFiles: React.FC = () => {
   };
 
   const filteredFiles = files.filter(file => {
-    const matchesFilter = activeFilter === 'all' || file.file_type === activeFilter;
     const filename = file.original_filename || '';
     const description = file.description || '';
     const matchesSearch = filename.toLowerCase().includes(searchTerm.toLowerCase()) ||
                          description.toLowerCase().includes(searchTerm.toLowerCase());
-    return matchesFilter && matchesSearch;
+    return matchesSearch;
   });
 
   if (loading) {
@@ -485,7 +528,11 @@ const MyFiles: React.FC = () => {
               {filteredFiles.map((file) => (
                 <FileCard key={file.id}>
                   <FileIcon>
-                    <i className={getFileIcon(file.file_type)}></i>
+                    {file.previews?.small ? (
+                      <img src={file.previews.small} alt="" loading="lazy" />
+                    ) : (
+                      <i className={getFileIcon(file.file_type)}></i>
+                    )}
                   </FileIcon>
                   <FileInfo>
                     <h3>{file.original_filename}</h3>
@@ -502,6 +549,15 @@ const MyFiles: React.FC = () => {
                     </span>
                   </FileMeta>
                   <FileActions>
+                    {isPlayable(file) && (
+                      <Button
+                        className="btn-icon"
+                        title="Воспроизвести"
+                        onClick={() => handleFilePlay(file)}
+                      >
+                        <i className="fas fa-play"></i>
+                      </Button>
+                    )}
                     <Button 
                       className="btn-icon" 
                       title="Скачать"
@@ -521,6 +577,14 @@ const MyFiles: React.FC = () => {
               ))}
             </FilesGrid>
           )}
+          {nextCursor && (
+            <LoadMore>
+              <Button onClick={loadMore} disabled={loadingMore}>
+                <i className={loadingMore ? 'fas fa-spinner fa-spin' : 'fas fa-chevron-down'}></i>
+                Загрузить еще
+              </Button>
+            </LoadMore>
+          )}
         </FilesSection>
       </FilesContainer>
 
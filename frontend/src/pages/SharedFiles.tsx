@@ -4,6 +4,8 @@ import {
   getSharedFiles, 
   downloadFile,
   downloadFileDirect,
+  isPlayable,
+  playFile,
   getFileIcon, 
   formatFileSize, 
   formatDate 
@@ -150,6 +152,13 @@ const FileIcon = styled.div`
   justify-content: center;
   font-size: 1.25rem;
   color: #1976d2;
+  overflow: hidden;
+
+  img {
+    width: 100%;
+    height: 100%;
+    object-fit: cover;
+  }
 `;
 
 const FileInfo = styled.div`
@@ -197,6 +206,12 @@ const LoadingSpinner = styled.div`
   }
 `;
 
+const LoadMore = styled.div`
+  display: flex;
+  justify-content: center;
+  margin-top: 1.5rem;
+`;
+
 const EmptyState = styled.div`
   text-align: center;
   padding: 3rem;
@@ -212,18 +227,24 @@ const EmptyState = styled.div`
 const SharedFiles: React.FC = () => {
   const [activeFilter, setActiveFilter] = useState('all');
   const [files, setFiles] = useState<FileItem[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [searchTerm, setSearchTerm] = useState('');
 
+  // Тип файла фильтруется на сервере (индекс), чтобы страницы не приходили полупустыми
+  const typeFilter = activeFilter === 'all' ? {} : { file_type: activeFilter };
+
   useEffect(() => {
     loadSharedFiles();
-  }, []);
+  }, [activeFilter]);
 
   const loadSharedFiles = async () => {
     try {
       setLoading(true);
-      const data = await getSharedFiles();
-      setFiles(data);
+      const page = await getSharedFiles(typeFilter);
+      setFiles(page.results);
+      setNextCursor(page.nextCursor);
     } catch (error) {
       console.error('Error loading shared files:', error);
     } finally {
@@ -231,6 +252,29 @@ const SharedFiles: React.FC = () => {
     }
   };
 
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    try {
+      setLoadingMore(true);
+      const page = await getSharedFiles(typeFilter, nextCursor);
+      setFiles(prev => [...prev, ...page.results]);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      console.error('Error loading shared files:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  const handleFilePlay = async (file: FileItem) => {
+    try {
+      await playFile(file.id);
+    } catch (error) {
+      console.error('Error playing file:', error);
+      alert('Ошибка при воспроизведении файла');
+    }
+  };
+
   const handleFileDownload = async (file: FileItem) => {
     try {
       await downloadFileDirect(file.id);
@@ -241,12 +285,11 @@ const SharedFiles: React.FC = () => {
   };
 
   const filteredFiles = files.filter(file => {
-    const matchesFilter = activeFilter === 'all' || file.file_type === activeFilter;
     const filename = file.original_filename || '';
     const description = file.description || '';
     const matchesSearch = filename.toLowerCase().includes(searchTerm.toLowerCase()) ||
                          description.toLowerCase().includes(searchTerm.toLowerCase());
-    return matchesFilter && matchesSearch;
+    return matchesSearch;
   });
 
   if (loading) {
@@ -336,7 +379,11 @@ const SharedFiles: React.FC = () => {
               {filteredFiles.map((file) => (
                 <SharedFileItem key={file.id}>
                   <FileIcon>
-                    <i className={getFileIcon(file.file_type)}></i>
+                    {file.previews?.small ? (
+                      <img src={file.previews.small} alt="" loading="lazy" />
+                    ) : (
+                      <i className={getFileIcon(file.file_type)}></i>
+                    )}
                   </FileIcon>
                   <FileInfo>
                     <h3>{file.original_filename}</h3>
@@ -357,6 +404,15 @@ const SharedFiles: React.FC = () => {
                     </span>
                   </FileMeta>
                   <FileActions>
+                    {isPlayable(file) && (
+                      <Button
+                        className="btn-icon"
+                        title="Воспроизвести"
+                        onClick={() => handleFilePlay(file)}
+                      >
+                        <i className="fas fa-play"></i>
+                      </Button>
+                    )}
                     <Button 
                       className="btn-icon" 
                       title="Скачать"
@@ -369,6 +425,14 @@ const SharedFiles: React.FC = () => {
               ))}
             </SharedFilesList>
           )}
+          {nextCursor && (
+            <LoadMore>
+              <Button onClick={loadMore} disabled={loadingMore}>
+                <i className={loadingMore ? 'fas fa-spinner fa-spin' : 'fas fa-chevron-down'}></i>
+                Загрузить еще
+              </Button>
+            </LoadMore>
+          )}
         </SharedSection>
       </SharedContainer>
     </>
@@ -1,10 +1,28 @@
-import { Assignment } from '../contracts/Assignment';
+import { Assignment, Deadline } from '../contracts/Assignment';
 import { apiRequest } from './api';
 
-export function getAssignments(): Promise<Assignment[]> {
-  return apiRequest<Assignment[]>('/assignments');
+export interface AssignmentFilters {
+  course?: number;
+  due_after?: string; // ISO date or datetime
+  due_before?: string;
+}
+
+// Задания курсов, которые пользователь ведет или на которые записан
+export function getAssignments(filters: AssignmentFilters = {}): Promise<Assignment[]> {
+  const query = new URLSearchParams();
+  Object.entries(filters).forEach(([key, value]) => {
+    if (value !== undefined && value !== '') query.append(key, String(value));
+  });
+  const suffix = query.toString() ? `?${query}` : '';
+  return apiRequest<Assignment[]>(`/assignments${suffix}`);
 }
 
 export function getAssignment(id: string): Promise<Assignment> {
   return apiRequest<Assignment>(`/assignments/${id}`);
-} 
\ No newline at end of file
+} 
+
+// Задания со сроком в ближайшие days дней (по умолчанию 7) по всем курсам пользователя
+export function getDeadlines(days?: number): Promise<Deadline[]> {
+  const suffix = days ? `?days=${days}` : '';
+  return apiRequest<Deadline[]>(`/assignments/deadlines/${suffix}`);
+}
@@ -29,4 +29,12 @@ export async function updateCourse(id: number, data: Partial<Course>): Promise<C
 
 export async function deleteCourse(id: number): Promise<void> {
   await api.delete(`/courses/${id}/`);
-} 
\ No newline at end of file
+}
+
+export async function enrollCourse(id: number): Promise<void> {
+  await api.post(`/courses/${id}/enroll/`);
+}
+
+export async function leaveCourse(id: number): Promise<void> {
+  await api.post(`/courses/${id}/leave/`);
+}
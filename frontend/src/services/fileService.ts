@@ -9,18 +9,76 @@ export interface UploadFileData {
   course?: number;
 }
 
-export async function getFiles(): Promise<FileItem[]> {
-  const response = await api.get<FileItem[]>('/files/');
-  return response.data;
+export interface PaginatedFiles {
+  next: string | null;
+  previous: string | null;
+  results: FileItem[];
 }
 
-export async function getMyFiles(): Promise<FileItem[]> {
-  const response = await api.get<FileItem[]>('/files/my_files/');
+// Фильтры списков файлов; сочетания, не покрытые индексами, сервер отклоняет (400)
+export interface FileFilters {
+  file_type?: string;
+  course?: number;
+  assignment?: number;
+  uploaded_after?: string; // ISO date or datetime
+  uploaded_before?: string;
+  size_min?: number;
+  size_max?: number;
+  is_public?: boolean;
+}
+
+function cursorFromLink(link: string | null): string | null {
+  if (!link) return null;
+  return new URL(link, window.location.origin).searchParams.get('cursor');
+}
+
+export async function getFilesPage(
+  url: string, cursor?: string | null, pageSize?: number, filters: FileFilters = {}
+): Promise<PaginatedFiles> {
+  const params: Record<string, string | number | boolean> = { ...filters };
+  if (cursor) params.cursor = cursor;
+  if (pageSize) params.page_size = pageSize;
+  const response = await api.get<PaginatedFiles>(url, { params });
   return response.data;
 }
 
-export async function getSharedFiles(): Promise<FileItem[]> {
-  const response = await api.get<FileItem[]>('/files/shared_files/');
+// Одна страница списка и курсор следующей (null - страниц больше нет);
+// следующие страницы загружаются по запросу пользователя
+export interface FilePage {
+  results: FileItem[];
+  nextCursor: string | null;
+}
+
+async function getPage(url: string, filters: FileFilters = {}, cursor?: string | null): Promise<FilePage> {
+  const page = await getFilesPage(url, cursor, undefined, filters);
+  return { results: page.results, nextCursor: cursorFromLink(page.next) };
+}
+
+export async function getFiles(filters?: FileFilters, cursor?: string | null): Promise<FilePage> {
+  return getPage('/files/', filters, cursor);
+}
+
+export async function getMyFiles(filters?: FileFilters, cursor?: string | null): Promise<FilePage> {
+  return getPage('/files/my_files/', filters, cursor);
+}
+
+export async function getSharedFiles(
+  filters?: Omit<FileFilters, 'is_public'>, cursor?: string | null
+): Promise<FilePage> {
+  return getPage('/files/shared_files/', filters, cursor);
+}
+
+export interface SearchFilesParams {
+  course?: number;
+  assignment?: number;
+  file_type?: string;
+  cursor?: string | null;
+  page_size?: number;
+}
+
+// Поиск по имени и описанию среди своих и публичных файлов, по убыванию релевантности
+export async function searchFiles(query: string, params: SearchFilesParams = {}): Promise<PaginatedFiles> {
+  const response = await api.get<PaginatedFiles>('/files/search/', { params: { q: query, ...params } });
   return response.data;
 }
 
@@ -57,6 +115,53 @@ export async function uploadFile(data: UploadFileData): Promise<FileItem> {
   return response.data;
 }
 
+export interface BulkUploadData extends Omit<UploadFileData, 'file'> {
+  files: File[];
+}
+
+export interface BulkUploadResult {
+  index: number;
+  filename: string;
+  status: 'created' | 'error';
+  file?: FileItem;
+  error?: string;
+}
+
+export interface BulkUploadResponse {
+  results: BulkUploadResult[];
+  created: number;
+  failed: number;
+}
+
+// Загружает несколько файлов одним запросом; ошибка одного файла не отменяет остальные
+export async function uploadFiles(data: BulkUploadData): Promise<BulkUploadResponse> {
+  const formData = new FormData();
+  data.files.forEach((file) => formData.append('files', file));
+
+  if (data.description) {
+    formData.append('description', data.description);
+  }
+
+  if (data.is_public !== undefined) {
+    formData.append('is_public', data.is_public.toString());
+  }
+
+  if (data.assignment) {
+    formData.append('assignment', data.assignment.toString());
+  }
+
+  if (data.course) {
+    formData.append('course', data.course.toString());
+  }
+
+  const response = await api.post<BulkUploadResponse>('/files/bulk_upload/', formData, {
+    headers: {
+      'Content-Type': 'multipart/form-data',
+    },
+  });
+  return response.data;
+}
+
 export async function updateFile(id: number, data: Partial<FileItem>): Promise<FileItem> {
   const response = await api.put<FileItem>(`/files/${id}/`, data);
   return response.data;
@@ -71,6 +176,38 @@ export async function downloadFile(id: number): Promise<{ download_url: string }
   return response.data;
 }
 
+export interface StreamUrl {
+  stream_url: string;
+  expires_at: string;
+}
+
+// Подписанный URL воспроизведения (Range): <video>/<audio> не передают заголовок Authorization
+export async function getStreamUrl(id: number): Promise<StreamUrl> {
+  const response = await api.get<StreamUrl>(`/files/${id}/stream_url/`);
+  return response.data;
+}
+
+export function isPlayable(file: FileItem): boolean {
+  return file.file_type === 'video' || file.file_type === 'audio';
+}
+
+// Открывает файл во встроенном проигрывателе браузера. Вкладка открывается до запроса,
+// пока действует жест пользователя, иначе ее заблокирует браузер
+export async function playFile(id: number): Promise<void> {
+  const tab = window.open('', '_blank');
+  try {
+    const { stream_url } = await getStreamUrl(id);
+    if (tab) {
+      tab.location.href = stream_url;
+    } else {
+      window.location.href = stream_url;
+    }
+  } catch (error) {
+    tab?.close();
+    throw error;
+  }
+}
+
 export async function downloadFileDirect(id: number): Promise<void> {
   try {
     // Get the download URL